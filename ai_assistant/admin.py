@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import AttritionRisk, ResumeParsingJob
+from .models import AttritionRisk, ResumeBatch, ResumeParsingJob, SmartAlert
 
 
 @admin.register(AttritionRisk)
@@ -16,6 +16,21 @@ class AttritionRiskAdmin(admin.ModelAdmin):
 
 @admin.register(ResumeParsingJob)
 class ResumeParsingJobAdmin(admin.ModelAdmin):
-    list_display = ("id", "parsed_name", "parsed_email", "status", "uploaded_at")
+    list_display = ("id", "parsed_name", "parsed_email", "status", "batch", "uploaded_at")
     list_filter = ("status", "uploaded_at")
-    search_fields = ("parsed_name", "parsed_email")
+    search_fields = ("parsed_name", "parsed_email", "original_filename")
+
+
+@admin.register(ResumeBatch)
+class ResumeBatchAdmin(admin.ModelAdmin):
+    list_display = ("id", "company", "uploaded_by", "total_files", "status", "created_at", "completed_at")
+    list_filter = ("status",)
+    readonly_fields = ("created_at", "completed_at")
+
+
+@admin.register(SmartAlert)
+class SmartAlertAdmin(admin.ModelAdmin):
+    list_display = ("alert_type", "recipient", "employee", "severity", "is_active", "updated_at")
+    list_filter = ("alert_type", "audience", "severity", "is_active")
+    search_fields = ("dedup_key", "recipient__email")
+    readonly_fields = ("created_at", "updated_at")
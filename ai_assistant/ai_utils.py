@@ -8,13 +8,16 @@ AI-powered utilities for HRMS
 import re
 from datetime import datetime, timedelta
 
-import openai
-from django.conf import settings
+from django.core.cache import cache
 from django.db.models import Count
 from django.utils import timezone
 
+from ai_assistant import chat_context, intent_router
+from ai_assistant.llm_client import get_llm_client, llm_enabled
 from ai_assistant.models import AttritionRisk
-from employees.models import Attendance, Employee, LeaveRequest
+from employees.models import Attendance, Employee, LeaveBalance, LeaveRequest
+
+CHATBOT_MODEL = "gpt-3.5-turbo"
 
 
 class AttritionPredictor:
@@ -27,20 +30,40 @@ class AttritionPredictor:
         """
         Calculate attrition risk score (0-100) based on multiple factors
         """
-        score = 0
-        factors = {}
-
         # Get data for last 3 months
         three_months_ago = timezone.now() - timedelta(days=90)
 
-        # Factor 1: Frequent Sick Leaves (0-25 points)
         sick_leaves = LeaveRequest.objects.filter(
             employee=employee,
             leave_type="SL",
             status="APPROVED",
             created_at__gte=three_months_ago,
         ).count()
+        late_arrivals = Attendance.objects.filter(
+            employee=employee, is_late=True, date__gte=three_months_ago.date()
+        ).count()
+        missing_punches = Attendance.objects.filter(
+            employee=employee, status="MISSING_PUNCH", date__gte=three_months_ago.date()
+        ).count()
+        absences = Attendance.objects.filter(
+            employee=employee, status="ABSENT", date__gte=three_months_ago.date()
+        ).count()
 
+        return AttritionPredictor.score_from_counts(
+            sick_leaves, late_arrivals, missing_punches, absences, employee.date_of_joining
+        )
+
+    @staticmethod
+    def score_from_counts(sick_leaves, late_arrivals, missing_punches, absences, date_of_joining, today=None):
+        """
+        Turn the 3-month counts of an employee into a risk score, level and factors.
+        Shared by calculate_risk_score and the batch scorer in ai_assistant.attrition_scoring.
+        """
+        today = today or timezone.now().date()
+        score = 0
+        factors = {}
+
+        # Factor 1: Frequent Sick Leaves (0-25 points)
         if sick_leaves >= 5:
             sick_leave_score = 25
         elif sick_leaves >= 3:
@@ -58,10 +81,6 @@ class AttritionPredictor:
         }
 
         # Factor 2: Late Arrivals (0-25 points)
-        late_arrivals = Attendance.objects.filter(
-            employee=employee, is_late=True, date__gte=three_months_ago.date()
-        ).count()
-
         if late_arrivals >= 10:
             late_score = 25
         elif late_arrivals >= 5:
@@ -79,10 +98,6 @@ class AttritionPredictor:
         }
 
         # Factor 3: Missing Punches (0-20 points)
-        missing_punches = Attendance.objects.filter(
-            employee=employee, status="MISSING_PUNCH", date__gte=three_months_ago.date()
-        ).count()
-
         if missing_punches >= 8:
             missing_score = 20
         elif missing_punches >= 4:
@@ -100,10 +115,6 @@ class AttritionPredictor:
         }
 
         # Factor 4: Absences (0-20 points)
-        absences = Attendance.objects.filter(
-            employee=employee, status="ABSENT", date__gte=three_months_ago.date()
-        ).count()
-
         if absences >= 5:
             absence_score = 20
         elif absences >= 3:
@@ -121,8 +132,8 @@ class AttritionPredictor:
         }
 
         # Factor 5: Tenure (0-10 points - new employees are higher risk)
-        if employee.date_of_joining:
-            tenure_days = (timezone.now().date() - employee.date_of_joining).days
+        if date_of_joining:
+            tenure_days = (today - date_of_joining).days
             if tenure_days < 90:  # Less than 3 months
                 tenure_score = 10
             elif tenure_days < 180:  # Less than 6 months
@@ -134,9 +145,9 @@ class AttritionPredictor:
 
         score += tenure_score
         factors["tenure"] = {
-            "days": tenure_days if employee.date_of_joining else 0,
+            "days": tenure_days if date_of_joining else 0,
             "score": tenure_score,
-            "description": f"Tenure: {tenure_days if employee.date_of_joining else 0} days",
+            "description": f"Tenure: {tenure_days if date_of_joining else 0} days",
         }
 
         # Determine risk level
@@ -168,55 +179,29 @@ class HRChatbot:
         """
         question_lower = question.lower().strip()
         user_name = employee.user.first_name or employee.user.username
+        intents = intent_router.classify(question_lower)
 
         # 1. Critical UI Actions - Keep these rule-based to ensure UI widgets (buttons) render correctly
         # Clock In
-        if any(w in question_lower for w in ["clock in", "clock-in", "clockin", "punch in", "check in"]):
+        if "clock_in" in intents:
             return HRChatbot._handle_clock_in(employee, user_name)
 
         # Clock Out
-        if any(w in question_lower for w in ["clock out", "clock-out", "clockout", "punch out", "check out"]):
+        if "clock_out" in intents:
             return HRChatbot._handle_clock_out(employee, user_name)
 
         # Apply Leave UI
-        if any(
-            phrase in question_lower
-            for phrase in [
-                "apply sick leave",
-                "take sick leave",
-                "sick leave",
-                "apply sl",
-            ]
-        ):
+        if "apply_sick_leave" in intents:
             return HRChatbot._handle_leave_application(employee, user_name, "SL")
 
-        if any(
-            phrase in question_lower
-            for phrase in [
-                "apply casual leave",
-                "take casual leave",
-                "casual leave",
-                "apply cl",
-            ]
-        ):
+        if "apply_casual_leave" in intents:
             return HRChatbot._handle_leave_application(employee, user_name, "CL")
 
-        if any(
-            phrase in question_lower
-            for phrase in [
-                "apply earned leave",
-                "take earned leave",
-                "earned leave",
-                "apply el",
-            ]
-        ):
+        if "apply_earned_leave" in intents:
             return HRChatbot._handle_leave_application(employee, user_name, "EL")
 
         # General Apply Leave UI
-        if (
-            any(phrase in question_lower for phrase in ["apply leave", "request leave", "book leave"])
-            and "balance" not in question_lower
-        ):
+        if "apply_leave" in intents:
             return {
                 "answer": f"Sure, {user_name}! 📝\n\nWhich type of leave would you like to apply?\n\n🏥 **Sick Leave (SL)**\n🌴 **Casual Leave (CL)**\n✈️ **Earned Leave (EL)**",
                 "type": "leave_options",
@@ -273,51 +258,38 @@ class HRChatbot:
                 print(f"Error in context handler: {e}")
 
         # Approve/Reject Leave
-        if "approve leave" in question_lower or "reject leave" in question_lower:
+        if "leave_action" in intents:
             return HRChatbot._handle_approval_action(question_lower, employee, user_name)
 
         # Configuration Actions (Admin Only)
-        if (role == "COMPANY_ADMIN" or employee.user.is_superuser) and "add holiday" in question_lower:
+        if (role == "COMPANY_ADMIN" or employee.user.is_superuser) and "add_holiday" in intents:
             response = HRChatbot._handle_configuration_action(question_lower, employee, user_name)
             if response:
                 return response
 
         # 4. Role-Specific High-Priority Intent Matchers (Check before AI for precise navigation)
         if role == "COMPANY_ADMIN" or employee.user.is_superuser:
-            resp = HRChatbot._handle_admin_query(question_lower, employee, user_name, request)
+            resp = HRChatbot._handle_admin_query(question_lower, employee, user_name, request, intents)
             if resp:
                 return resp
 
         if role in ["MANAGER", "COMPANY_ADMIN"] or employee.user.is_superuser:
-            resp = HRChatbot._handle_manager_query(question_lower, employee, user_name, request)
+            resp = HRChatbot._handle_manager_query(question_lower, employee, user_name, request, intents)
             if resp:
                 return resp
 
         # 5. AI Intelligence Layer
-        # If OpenAI key is configured, use it for all other queries
-        if getattr(settings, "OPENAI_API_KEY", None):
+        # If OpenAI key (or the fake backend) is configured, use it for all other queries
+        if llm_enabled():
             return HRChatbot._get_llm_response(question, employee, role, request)
 
         # 3. Legacy Rule-Based Fallback (if no AI key)
         # Greetings
-        if (
-            any(
-                greeting in question_lower
-                for greeting in [
-                    "hello",
-                    "hi",
-                    "hey",
-                    "good morning",
-                    "good afternoon",
-                    "good evening",
-                ]
-            )
-            and len(question_lower) < 20
-        ):
+        if "greeting" in intents and len(question_lower) < 20:
             return HRChatbot._get_greeting_response(user_name, role)
 
         # Thanks
-        if any(thanks in question_lower for thanks in ["thank", "thanks", "appreciate"]):
+        if "thanks" in intents:
             return {
                 "answer": f"You're welcome, {user_name}! 😊\n\nIs there anything else I can help you with?",
                 "type": "acknowledgment",
@@ -325,20 +297,20 @@ class HRChatbot:
 
         # Routing based on Role (Legacy)
         if role == "COMPANY_ADMIN":
-            response = HRChatbot._handle_admin_query(question_lower, employee, user_name, request)
+            response = HRChatbot._handle_admin_query(question_lower, employee, user_name, request, intents)
             if response:
                 return response
-            response = HRChatbot._handle_manager_query(question_lower, employee, user_name, request)
+            response = HRChatbot._handle_manager_query(question_lower, employee, user_name, request, intents)
             if response:
                 return response
 
         elif role == "MANAGER":
-            response = HRChatbot._handle_manager_query(question_lower, employee, user_name, request)
+            response = HRChatbot._handle_manager_query(question_lower, employee, user_name, request, intents)
             if response:
                 return response
 
         # Fallback for everyone
-        response = HRChatbot._handle_employee_query(question_lower, employee, user_name, request)
+        response = HRChatbot._handle_employee_query(question_lower, employee, user_name, request, intents)
         if response:
             return response
 
@@ -351,10 +323,6 @@ class HRChatbot:
         """
         try:
             from ai_assistant.models import ChatMessage
-            from companies.models import Holiday
-            from employees.models import HandbookSection, Payslip, PolicySection
-
-            client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
 
             # --- 1. Handle Context-Aware "Yes" ---
             # If user says "yes" or similar, check previous bot message to infer action
@@ -383,146 +351,8 @@ class HRChatbot:
                     if "Clock Out" in last_msg.bot_response:
                         return HRChatbot._handle_clock_out(employee, employee.user.first_name)
 
-            # --- 2. Gather Context for LLM ---
-            context_data = []
-
-            # Employee Profile
-            profile_info = f"""
-            User: {employee.user.get_full_name()} (ID: {employee.badge_id})
-            Designation: {employee.designation}
-            Department: {employee.department}
-            Location: {employee.location.name if employee.location else "Unknown"}
-            Manager: {employee.manager.get_full_name() if employee.manager else "None"}
-            Role: {role}
-            """
-            context_data.append(profile_info)
-
-            # Leave Balance
-            if hasattr(employee, "leave_balance"):
-                lb = employee.leave_balance
-                balance_info = f"""
-                Leave Balance:
-                - Casual Leave (CL): {lb.casual_leave_balance}
-                - Sick Leave (SL): {lb.sick_leave_balance}
-                """
-                if hasattr(lb, "earned_leave_balance"):
-                    balance_info += f"- Earned Leave (EL): {lb.earned_leave_balance}\n"
-                context_data.append(balance_info)
-
-            # Attendance Today
-            today = timezone.now().date()
-            att = Attendance.objects.filter(employee=employee, date=today).first()
-            if att:
-                att_info = f"Attendance Today ({today}): Status={att.status}"
-                if att.clock_in:
-                    att_info += f", Clock In={att.clock_in.strftime('%I:%M %p')}"
-                if att.clock_out:
-                    att_info += f", Clock Out={att.clock_out.strftime('%I:%M %p')}"
-                context_data.append(att_info)
-            else:
-                context_data.append(f"Attendance Today ({today}): Not clocked in yet.")
-
-            # Upcoming Holidays (Next 3)
-            holidays = Holiday.objects.filter(company=employee.company, date__gte=today, is_active=True).order_by(
-                "date"
-            )[:5]
-            if holidays:
-                h_list = "\n".join([f"- {h.name}: {h.date.strftime('%d %b %Y')}" for h in holidays])
-                context_data.append(f"Upcoming Holidays:\n{h_list}")
-            else:
-                context_data.append("No upcoming holidays found.")
-
-            # Latest Payslip
-            latest_payslip = Payslip.objects.filter(employee=employee).order_by("-month").first()
-            if latest_payslip:
-                payslip_info = (
-                    f"Latest Payslip: {latest_payslip.month.strftime('%B %Y')}, Net Salary: {latest_payslip.net_salary}"
-                )
-                if latest_payslip.pdf_file:
-                    payslip_info += f" (Download available at: {latest_payslip.pdf_file.url})"
-                context_data.append(payslip_info)
-            else:
-                context_data.append("No payslips found.")
-
-            # Policies & Handbook (Titles only to save tokens)
-            policies = PolicySection.objects.filter(is_active=True).values_list("title", flat=True)
-            handbook = HandbookSection.objects.filter(is_active=True).values_list("title", flat=True)
-            if policies:
-                context_data.append(f"Available Policies: {', '.join(policies)}")
-            if handbook:
-                context_data.append(f"Handbook Sections: {', '.join(handbook)}")
-
-            # Team info (for Managers/Admins)
-            if role in ["MANAGER", "COMPANY_ADMIN"]:
-                team = Employee.objects.filter(manager=employee.user, is_active=True)
-                team_count = team.count()
-
-                # 1. Basic Stats
-                present_today = Attendance.objects.filter(
-                    employee__in=team, date=today, status__in=["PRESENT", "WFH"]
-                ).count()
-
-                pending_leaves = LeaveRequest.objects.filter(employee__manager=employee.user, status="PENDING").count()
-
-                context_data.append(
-                    f"Team Stats: {team_count} employees. Present Today: {present_today}. Pending Leave Requests: {pending_leaves}."
-                )
-
-                if pending_leaves > 0:
-                    context_data.append(
-                        "You have pending leave requests to approve. Ask user if they want to see them."
-                    )
-
-                # 2. Deep Insights (Triggered only if query asks for analytics/insights/performance/risk)
-                if any(
-                    w in question.lower()
-                    for w in ["insight", "performance", "risk", "analytics", "attendance", "trend"]
-                ):
-                    # A. Attrition Risk Analysis
-                    high_risk_employees = AttritionRisk.objects.filter(
-                        employee__in=team, risk_level__in=["HIGH", "CRITICAL"]
-                    )
-                    risk_count = high_risk_employees.count()
-                    context_data.append(f"Attrition Risk Analysis: {risk_count} employees are at High/Critical risk.")
-                    if risk_count > 0:
-                        names = ", ".join([r.employee.user.get_full_name() for r in high_risk_employees])
-                        context_data.append(
-                            f"High Risk Employees: {names}. (Review factors like frequent leave or late arrivals)."
-                        )
-                    else:
-                        context_data.append("Attrition Risk Analysis: The team is stable with low predicted attrition.")
-
-                    # B. Attendance Intelligence (Last 30 Days)
-                    last_30_days = today - timedelta(days=30)
-                    team_attendance = Attendance.objects.filter(employee__in=team, date__gte=last_30_days)
-
-                    # Avg Late Arrivals
-                    total_late = team_attendance.filter(is_late=True).count()
-                    avg_late_per_emp = round(total_late / team_count, 1) if team_count > 0 else 0
-
-                    context_data.append(
-                        f"Attendance Intelligence (Last 30 Days): Total Late Arrivals: {total_late} (Avg {avg_late_per_emp} per employee)."
-                    )
-
-                    # Most Punctual & Least Punctual (Proxy for Performance)
-                    late_counts = (
-                        team_attendance.filter(is_late=True)
-                        .values("employee__user__first_name")
-                        .annotate(count=Count("id"))
-                        .order_by("-count")
-                    )
-                    if late_counts:
-                        most_late = f"{late_counts[0]['employee__user__first_name']} ({late_counts[0]['count']} times)"
-                        context_data.append(
-                            f"Performance Insight (Punctuality): Employee with most late arrivals: {most_late}."
-                        )
-
-                    # C. Performance Insights (Work Hours Proxy)
-                    # We can roughly estimate 'Effort' by average work hours if clock_out exists
-                    # This is a simplified logic for the chatbot context
-                    context_data.append(
-                        "Performance Insights: Based on system data, 'Performance' here refers to punctuality and schedule adherence."
-                    )
+            # --- 2. Gather Context for LLM (cached per section) ---
+            context_data = chat_context.build_context(employee, role, question)
 
             # System Prompt
             system_prompt = f"""
@@ -544,15 +374,18 @@ class HRChatbot:
                 - If the user implies **Applied Leave**, **Clock In/Out**, give the buttons.
             """
 
-            # Call OpenAI
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": question}],
-                temperature=0.7,
-                max_tokens=400,
-            )
-
-            ai_text = response.choices[0].message.content.strip()
+            # Same question against the same data: reuse the answer
+            response_key = chat_context.response_key(question, role, system_prompt, CHATBOT_MODEL)
+            ai_text = cache.get(response_key)
+            if ai_text is None:
+                response = get_llm_client().chat.completions.create(
+                    model=CHATBOT_MODEL,
+                    messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": question}],
+                    temperature=0.7,
+                    max_tokens=400,
+                )
+                ai_text = response.choices[0].message.content.strip()
+                cache.set(response_key, ai_text, chat_context.RESPONSE_TIMEOUT)
 
             # Add Action Buttons dynamically based on AI response keywords
             action = None
@@ -714,11 +547,13 @@ class HRChatbot:
     # ==========================
 
     @staticmethod
-    def _handle_admin_query(query, employee, user_name, request=None):
+    def _handle_admin_query(query, employee, user_name, request=None, intents=None):
         """Handle Admin-specific intents with friendly tone"""
+        if intents is None:
+            intents = intent_router.classify(query)
 
         # Employee Management
-        if "employee" in query and any(w in query for w in ["add", "create", "new", "onboard", "hire"]):
+        if "admin_add_employee" in intents:
             return {
                 "answer": f"Sure thing, {user_name}! 😊\n\nTo add a new employee:\n1. Go to **Employees** in the sidebar\n2. Click **Add Employee**\n3. Fill in their basic details\n\nNeed help with any specific step?",
                 "type": "navigation",
@@ -726,23 +561,7 @@ class HRChatbot:
 
         # Total Employees / Company Members Stats
         # Catch: "total employees", "list members", "check members", "show workforce"
-        if (
-            "total" in query
-            or "list" in query
-            or "check" in query
-            or "view" in query
-            or "show" in query
-            or "count" in query
-            or "who" in query
-        ) and (
-            "employee" in query
-            or "staff" in query
-            or "workforce" in query
-            or "member" in query
-            or "memebr" in query
-            or "people" in query
-            or "person" in query
-        ):
+        if "admin_member_stats" in intents:
             count = Employee.objects.filter(company=employee.company, is_active=True).count()
             dept_counts = (
                 Employee.objects.filter(company=employee.company, is_active=True)
@@ -759,58 +578,56 @@ class HRChatbot:
 
         # Configuration - Specific Handlers (Prevent Loop)
         # Shift Settings
-        if "shift" in query and any(
-            w in query for w in ["setting", "config", "setup", "manage", "create", "edit", "update", "working"]
-        ):
+        if "admin_shift_settings" in intents:
             return {
                 "answer": f"Sure, {user_name}! ⏰\n\nTo configure Shift Settings:\n\n1. Go to **Configuration** in the sidebar\n2. Select **Shift Settings**\n3. Create or Edit shifts as needed.\n\n[Open Shift Settings](/config/shifts/)",
                 "type": "navigation",
             }
 
         # Week-Off Settings
-        if ("week" in query and "off" in query) or ("weekoff" in query):
+        if "admin_week_off" in intents:
             return {
                 "answer": f"No problem, {user_name}! 📅\n\nTo configure Week-Offs:\n\n1. Go to **Configuration** in the sidebar\n2. Select **Week-Off Config**\n3. Set weekends and off days.\n\n[Open Week-Off Config](/companies/week-off-config/)",
                 "type": "navigation",
             }
 
         # Roles & Permissions
-        if "role" in query or "permission" in query or "access" in query:
+        if "admin_roles" in intents:
             return {
                 "answer": f"Got it, {user_name}! 🔐\n\nTo manage Roles & Permissions:\n\n1. Go to **Configuration** in the sidebar\n2. Select **Roles & Permissions**\n3. Define roles and access levels.\n\n[Open Roles Configuration](/companies/role-configuration/)",
                 "type": "navigation",
             }
 
         # Holidays
-        if "holiday" in query and any(w in query for w in ["config", "setting", "manage", "view", "add", "list"]):
+        if "admin_holidays" in intents:
             return {
                 "answer": "Managing Holidays? 🎉\n\nYou can:\n\n1. **Add a holiday directly here:**\n   Type: `Add holiday [Name] on YYYY-MM-DD`\n   (e.g., `Add holiday New Year on 2026-01-01`)\n\n2. **Go to Configuration:**\n   Sidebar → **Configuration** → **Holidays**\n   [Open Holidays](/config/holidays/)",
                 "type": "navigation",
             }
 
         # Configuration - API Check
-        if "api" in query or "integration" in query or "token" in query:
+        if "admin_api" in intents:
             return {
                 "answer": f"Tech savvy, {user_name}! 🤖\n\nYou can manage API tokens and integrations in:\n\n**Configuration** → **API Settings**",
                 "type": "navigation",
             }
 
         # Configuration - General Fallback
-        if any(w in query for w in ["config", "setting", "setup", "configure"]):
+        if "admin_configuration" in intents:
             return {
                 "answer": f"Got it, {user_name}! 👍\n\nYou can configure settings from the **Configuration** menu:\n\n• Shift Settings\n• Week-Off Config\n• Holidays\n• Roles & Permissions\n\nWhich one would you like to set up?",
                 "type": "navigation",
             }
 
         # Exit Actions
-        if "exit" in query or "resign" in query or "terminate" in query:
+        if "admin_exit" in intents:
             return {
                 "answer": f"Managing exits, {user_name}? 🚪\n\nYou can handle resignations and terminations in:\n\n**Employees** → **Exit Management**\n\nNeed to see the attrition risk analysis?",
                 "type": "navigation",
             }
 
         # Alerts / Anomalies
-        if "alert" in query or "risk" in query or "missing" in query:
+        if "admin_alerts" in intents:
             # Missing Clock-outs
             missing_out = (
                 Attendance.objects.filter(
@@ -834,7 +651,7 @@ class HRChatbot:
             }
 
         # Reports - Specific Handlers (Prevent Loop)
-        if "attendance" in query and ("report" in query or "analytics" in query or "sheet" in query):
+        if "admin_attendance_report" in intents:
             # Quick Summary
             today = timezone.now().date()
             total_staff = Employee.objects.filter(company=employee.company, is_active=True).count()
@@ -847,32 +664,34 @@ class HRChatbot:
                 "type": "navigation",
             }
 
-        if "leave" in query and ("report" in query or "history" in query):
+        if "admin_leave_report" in intents:
             # Quick Summary
             today = timezone.now().date()
-            on_leave = LeaveRequest.objects.filter(
-                employee__company=employee.company, start_date__lte=today, end_date__gte=today, status="APPROVED"
-            ).count()
+            on_leave = (
+                LeaveRequest.objects.filter(employee__company=employee.company, status="APPROVED")
+                .overlapping(today)
+                .count()
+            )
 
             return {
                 "answer": f"Here is the Leave Report snapshot, {user_name}: 🌴\n\n**Employees on Leave Today:** {on_leave}\n\nFor detailed history and export:\n[Open Leave Requests](/leaves/history/)",
                 "type": "navigation",
             }
 
-        if "payroll" in query and ("report" in query or "salary" in query):
+        if "admin_payroll_report" in intents:
             return {
                 "answer": f"Accessing Payroll Reports, {user_name}! 💰\n\nYou can view salary sheets and payroll data here:\n\n[Open Payroll Dashboard](/payroll/)",
                 "type": "navigation",
             }
 
-        if "employee" in query and ("data" in query or "list" in query or "report" in query):
+        if "admin_employee_data" in intents:
             return {
                 "answer": f"Managing Employee Data, {user_name}? 👥\n\nYou can view and export employee lists from the directory:\n\n[Open Employee Directory](/)",
                 "type": "navigation",
             }
 
         # Reports - General Fallback
-        if "report" in query or "export" in query:
+        if "admin_reports" in intents:
             return {
                 "answer": f"No problem, {user_name}! 📊\n\nYou can generate reports from the **Reports** section:\n\n• Attendance Reports\n• Leave Reports\n• Payroll Reports\n• Employee Data\n\nWhich report do you need?",
                 "type": "navigation",
@@ -881,17 +700,20 @@ class HRChatbot:
         return None
 
     @staticmethod
-    def _handle_manager_query(query, employee, user_name, request=None):
+    def _handle_manager_query(query, employee, user_name, request=None, intents=None):
         """Handle Manager-specific intents with friendly tone"""
         from django.utils import timezone
 
         from employees.models import Attendance, Employee, LeaveRequest
 
+        if intents is None:
+            intents = intent_router.classify(query)
+
         # Total Employees (Manager View)
-        if "total" in query and ("employee" in query or "staff" in query or "workforce" in query):
+        if "manager_headcount" in intents:
             # Managers might ask this. Show team count.
             if hasattr(employee.user, "role") and (employee.user.role == "COMPANY_ADMIN" or employee.user.is_superuser):
-                return HRChatbot._handle_admin_query(query, employee, user_name, request)
+                return HRChatbot._handle_admin_query(query, employee, user_name, request, intents)
 
             team_count = Employee.objects.filter(
                 company=employee.company, manager=employee.user, is_active=True
@@ -902,7 +724,7 @@ class HRChatbot:
             }
 
         # Team Attendance
-        if "team" in query and any(w in query for w in ["attendance", "present", "absent", "status"]):
+        if "manager_team_attendance" in intents:
             try:
                 # If superuser or company admin, show all company employees
                 if hasattr(employee.user, "role") and (
@@ -937,7 +759,7 @@ class HRChatbot:
                 }
 
         # Who is absent
-        if "absent" in query or "who is not here" in query:
+        if "manager_absentees" in intents:
             try:
                 # Team context logic (same as above)
                 if hasattr(employee.user, "role") and (
@@ -981,7 +803,7 @@ class HRChatbot:
                 }
 
         # Late Logins
-        if "late" in query:
+        if "manager_late" in intents:
             try:
                 # Team context logic
                 if hasattr(employee.user, "role") and (
@@ -1015,7 +837,7 @@ class HRChatbot:
                 pass
 
         # Pending Leave Requests
-        if "leave" in query and any(w in query for w in ["request", "pending", "approve", "approval"]):
+        if "manager_pending_leaves" in intents:
             try:
                 # If superuser or company admin, show all company pending leaves
                 if hasattr(employee.user, "role") and (
@@ -1086,7 +908,7 @@ class HRChatbot:
                 }
 
         # Handle Approval/Rejection Action
-        if "approve leave" in query or "reject leave" in query:
+        if "leave_action" in intents:
             try:
                 action = "APPROVED" if "approve" in query else "REJECTED"
                 # Extract ID
@@ -1132,7 +954,7 @@ class HRChatbot:
 
         # Team Performance / AI
         # Team Performance / AI Insights
-        if any(w in query for w in ["performance", "insight", "analytics", "risk"]):
+        if "manager_insights" in intents:
             try:
                 # Team context logic
                 if hasattr(employee.user, "role") and (
@@ -1171,136 +993,70 @@ class HRChatbot:
         return None
 
     @staticmethod
-    def _handle_employee_query(query, employee, user_name, request=None):
+    def _handle_employee_query(query, employee, user_name, request=None, intents=None):
         """Handle standard Employee intents with friendly, conversational tone and actionable features"""
+        if intents is None:
+            intents = intent_router.classify(query)
 
         # Check if user is actually a manager (has subordinates) but role might be EMPLOYEE
         # This acts as a safety net for "Team" queries
         # Keywords expanded to catch "pending leave", "who is absent", "total employees" etc.
-        manager_keywords = [
-            "team",
-            "subordinate",
-            "approval",
-            "approve",
-            "reject",
-            "who is",
-            "pending",
-            "insight",
-            "analytics",
-            "risk",
-            "late",
-            "absent",
-            "total employee",
-            "total staff",
-        ]
-
-        if any(w in query for w in manager_keywords):
+        if "employee_team_query" in intents:
             # Check if they have subordinates OR are marked as Manager/Admin
             if (
                 employee.user.subordinates_user.exists()
                 or employee.user.role in ["MANAGER", "COMPANY_ADMIN"]
                 or employee.user.is_superuser
             ):
-                response = HRChatbot._handle_manager_query(query, employee, user_name, request)
+                response = HRChatbot._handle_manager_query(query, employee, user_name, request, intents)
                 if response:
                     return response
 
         # Also check "Show pending leave requests" specifically if missed above
-        if "leave" in query and ("request" in query or "pending" in query) and "apply" not in query:
+        if "employee_pending_leaves" in intents:
             if employee.user.subordinates_user.exists() or employee.user.role in [
                 "MANAGER",
                 "COMPANY_ADMIN",
             ]:
-                response = HRChatbot._handle_manager_query(query, employee, user_name, request)
+                response = HRChatbot._handle_manager_query(query, employee, user_name, request, intents)
                 if response:
                     return response
 
         # Clock In/Out Actions
-        if any(w in query for w in ["clock in", "clock-in", "clockin", "punch in", "check in"]):
+        if "clock_in" in intents:
             return HRChatbot._handle_clock_in(employee, user_name)
 
-        if any(w in query for w in ["clock out", "clock-out", "clockout", "punch out", "check out"]):
+        if "clock_out" in intents:
             return HRChatbot._handle_clock_out(employee, user_name)
 
         # Leave Application Actions
-        if any(
-            phrase in query
-            for phrase in [
-                "apply sick leave",
-                "take sick leave",
-                "sick leave",
-                "apply sl",
-            ]
-        ):
+        if "apply_sick_leave" in intents:
             return HRChatbot._handle_leave_application(employee, user_name, "SL")
 
-        if any(
-            phrase in query
-            for phrase in [
-                "apply casual leave",
-                "take casual leave",
-                "casual leave",
-                "apply cl",
-            ]
-        ):
+        if "apply_casual_leave" in intents:
             return HRChatbot._handle_leave_application(employee, user_name, "CL")
 
-        if any(
-            phrase in query
-            for phrase in [
-                "apply earned leave",
-                "take earned leave",
-                "earned leave",
-                "apply el",
-            ]
-        ):
+        if "apply_earned_leave" in intents:
             return HRChatbot._handle_leave_application(employee, user_name, "EL")
 
         # Regularization Action
-        if any(
-            phrase in query
-            for phrase in [
-                "regularize attendance",
-                "regularization",
-                "regularize",
-                "missed punch",
-            ]
-        ):
+        if "employee_regularization" in intents:
             return HRChatbot._handle_regularization(employee, user_name)
 
         # Policy queries - Enhanced with actual policy data
-        if any(w in query for w in ["policy", "policies", "rule", "rules", "guideline", "guidelines"]):
+        if "employee_policy" in intents:
             return HRChatbot._get_policy_info(employee, user_name, query)
 
         # Employee Handbook
-        if any(w in query for w in ["handbook", "employee handbook", "manual", "guide book"]):
+        if "employee_handbook" in intents:
             return HRChatbot._get_handbook_info(employee, user_name, query)
 
         # Leave Balance - check before general "leave" queries
-        if any(
-            w in query
-            for w in [
-                "leave balance",
-                "leaves left",
-                "remaining leave",
-                "how many leave",
-                "leave quota",
-                "check leave",
-            ]
-        ):
+        if "employee_leave_balance" in intents:
             return HRChatbot._get_leave_balance_response(employee, user_name)
 
         # Leave Application (general)
-        if any(
-            phrase in query
-            for phrase in [
-                "apply leave",
-                "apply for leave",
-                "request leave",
-                "take leave",
-                "book leave",
-            ]
-        ):
+        if "employee_apply_leave" in intents:
             return {
                 "answer": f"Sure, {user_name}! 📝\n\nWhich type of leave would you like to apply?\n\n🏥 **Sick Leave (SL)**\n🌴 **Casual Leave (CL)**\n✈️ **Earned Leave (EL)**\n\nJust tell me which one, and I'll help you apply!\n\nOr you can go to:\n**Leaves** → **Apply Leave**",
                 "type": "leave_options",
@@ -1315,43 +1071,23 @@ class HRChatbot:
             }
 
         # Portal Access / Login / Account
-        if any(
-            w in query
-            for w in [
-                "portal",
-                "login",
-                "access",
-                "account",
-                "username",
-                "password",
-                "credentials",
-            ]
-        ):
+        if "employee_portal_access" in intents:
             return HRChatbot._get_portal_access_info(employee, user_name, query)
 
         # General leave info (only if not caught above)
-        if "leave" in query and not any(w in query for w in ["balance", "apply", "request"]):
+        if "employee_leave_info" in intents:
             return HRChatbot._get_leave_balance_response(employee, user_name)
 
         # Attendance Status (Today)
-        if any(
-            w in query
-            for w in [
-                "attendance",
-                "present",
-                "check my attendance",
-                "attendance status",
-                "today attendance",
-            ]
-        ):
+        if "employee_attendance" in intents:
             return HRChatbot._get_attendance_info(employee, user_name)
 
         # Holidays
-        if any(w in query for w in ["holiday", "holidays", "festival", "off day", "upcoming holiday"]):
+        if "employee_holidays" in intents:
             return HRChatbot._get_holiday_info(employee, user_name)
 
         # Payroll / Salary
-        if any(w in query for w in ["salary", "payslip", "pay", "payroll", "income", "ctc"]):
+        if "employee_payroll" in intents:
             if "download" in query or "view" in query or "see" in query:
                 return {
                     "answer": f"Sure, {user_name}! 💰\n\nTo download your payslip:\n\n**Step 1:** Click **'Me'** in the sidebar\n**Step 2:** Select **'Finance'**\n**Step 3:** Choose the month\n**Step 4:** Click **'Download Payslip'**\n\nNeed help with anything else?",
@@ -1364,7 +1100,7 @@ class HRChatbot:
                 }
 
         # Profile
-        if "profile" in query or "personal detail" in query or "update detail" in query:
+        if "employee_profile" in intents:
             if "update" in query or "edit" in query or "change" in query:
                 return {
                     "answer": f"No problem, {user_name}! 👤\n\nTo update your profile:\n\n**Step 1:** Go to **'Me'** → **'My Profile'**\n**Step 2:** Click **'Edit Profile'**\n**Step 3:** Update the information\n**Step 4:** Click **'Save Changes'**\n\nWhat would you like to update?",
@@ -1377,11 +1113,11 @@ class HRChatbot:
                 }
 
         # Shift Info
-        if "shift" in query or "timing" in query or "schedule" in query or "work time" in query:
+        if "employee_shift" in intents:
             return HRChatbot._get_shift_info(employee, user_name)
 
         # Manager Info
-        if "manager" in query or "reporting" in query or "supervisor" in query or "boss" in query:
+        if "employee_manager_info" in intents:
             return HRChatbot._get_manager_info(employee, user_name)
 
         return None
@@ -1394,13 +1130,8 @@ class HRChatbot:
     def _get_leave_balance_response(employee, user_name):
         """Friendly leave balance response"""
         try:
-            # Safe access to leave balance
-            if not hasattr(employee, "leave_balance"):
-                return {
-                    "answer": f"Hi {user_name}, it seems your leave balance account hasn't been set up yet. Please contact HR.",
-                    "type": "error",
-                }
-
+            # Fresh balance in one query; a missing one is created with 0 leaves
+            LeaveBalance.objects.attach([employee])
             balance = employee.leave_balance
             total = balance.total_balance
 
@@ -0,0 +1,339 @@
+"""
+Smart alert engine.
+
+Evaluates the SmartNotifications rules (missed clock-out, LOP threshold,
+probation ending, late-login pattern, pending approvals) in bulk for the
+employees of a company and stores the result as SmartAlert rows:
+
+- every rule is one query for the whole set of employees
+- each alert has a dedup_key, so re-evaluating upserts it in place
+- alerts of the evaluated employees that no longer fire are deactivated
+
+refresh_company_alerts runs hourly for every company from the in-process
+scheduler (core.email_scheduler runs refresh_smart_alerts), since missed
+clock-outs only fire hours after the punch and probation notices change by
+date. A company that was never evaluated is evaluated on its first read
+(ensure_company_alerts). The receivers in ai_assistant.signals refresh
+single employees when their leaves change; a punch re-evaluates only the
+PUNCH_ALERT_TYPES rules. Reading alerts is one indexed query per user.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from companies.models import Company
+from employees.models import Attendance, Employee, LeaveBalance, LeaveRequest
+
+from .models import SmartAlert
+
+logger = logging.getLogger(__name__)
+
+MISSED_CLOCK_OUT_HOURS = 10
+LATE_LOGIN_DAYS = 7
+LATE_LOGIN_THRESHOLD = 3
+PROBATION_NOTICE_DAYS = 30
+TEAM_PROBATION_NOTICE_DAYS = 15
+OLD_PENDING_DAYS = 2
+
+# The rules a clock-in or clock-out can change
+PUNCH_ALERT_TYPES = ["MISSED_CLOCK_OUT", "LATE_LOGIN_PATTERN"]
+
+
+def _alert(employee, recipient_id, audience, alert_type, severity, dedup_key, company_id=None, **payload):
+    return SmartAlert(
+        recipient_id=recipient_id,
+        employee_id=employee.id if employee else None,
+        company_id=company_id or employee.company_id,
+        audience=audience,
+        alert_type=alert_type,
+        severity=severity,
+        payload=payload,
+        dedup_key=dedup_key,
+        is_active=True,
+    )
+
+
+def _lop_warnings(balance):
+    casual = balance.casual_leave_allocated - balance.casual_leave_used
+    sick = balance.sick_leave_allocated - balance.sick_leave_used
+    warnings = []
+    if casual < 0:
+        warnings.append(
+            {
+                "type": "NEGATIVE_BALANCE",
+                "leave_type": "Casual Leave",
+                "balance": casual,
+                "message": f"Your Casual Leave balance is negative ({casual}). Future leaves will be LOP.",
+            }
+        )
+    elif casual < 1:
+        warnings.append(
+            {
+                "type": "LOW_BALANCE",
+                "leave_type": "Casual Leave",
+                "balance": casual,
+                "message": f"Only {casual} Casual Leave remaining.",
+            }
+        )
+    if sick < 0:
+        warnings.append(
+            {
+                "type": "NEGATIVE_BALANCE",
+                "leave_type": "Sick Leave",
+                "balance": sick,
+                "message": f"Your Sick Leave balance is negative ({sick}). Future leaves will be LOP.",
+            }
+        )
+    return warnings
+
+
+def _probation_alert(employee, today, days_ahead):
+    end_date = employee.get_probation_end_date()
+    if not end_date:
+        return None
+    days_to_end = (end_date - today).days
+    if not 0 < days_to_end <= days_ahead:
+        return None
+    return end_date, {
+        "type": "PROBATION_ENDING",
+        "date": end_date.isoformat(),
+        "days_remaining": days_to_end,
+        "message": f"Probation period ends in {days_to_end} days ({end_date}).",
+        "action_required": "Confirmation or extension needed",
+    }
+
+
+def evaluate_alerts(employees, now=None, alert_types=None):
+    """
+    Unsaved SmartAlert rows for the employees (and their managers) at
+    ``now``. ``alert_types`` limits evaluation to those rules.
+    """
+    now = now or timezone.now()
+    today = now.date()
+    employees = list(employees)
+    employee_ids = [employee.id for employee in employees]
+    manager_ids = {employee.manager_id for employee in employees if employee.manager_id}
+
+    def wanted(alert_type):
+        return alert_types is None or alert_type in alert_types
+
+    balances = {}
+    if wanted("LOP_THRESHOLD"):
+        balances = LeaveBalance.objects.in_bulk(employee_ids, field_name="employee_id")
+    open_punches = {}
+    if wanted("MISSED_CLOCK_OUT"):
+        open_punches = dict(
+            Attendance.objects.filter(
+                employee_id__in=employee_ids,
+                date=today,
+                clock_in__isnull=False,
+                clock_out__isnull=True,
+                clock_in__lt=now - timedelta(hours=MISSED_CLOCK_OUT_HOURS),
+            ).values_list("employee_id", "clock_in")
+        )
+    late_counts = {}
+    if wanted("LATE_LOGIN_PATTERN"):
+        late_counts = dict(
+            Attendance.objects.filter(
+                employee_id__in=employee_ids,
+                date__gte=today - timedelta(days=LATE_LOGIN_DAYS),
+                date__lte=today,
+                is_late=True,
+            )
+            .values("employee_id")
+            .annotate(total=Count("id"))
+            .values_list("employee_id", "total")
+            .order_by()
+        )
+    pending = []
+    if wanted("PENDING_APPROVALS"):
+        pending = (
+            LeaveRequest.objects.filter(
+                employee__manager_id__in=manager_ids, employee__is_active=True, status="PENDING"
+            )
+            .values("employee__manager_id", "employee__company_id")
+            .annotate(
+                total=Count("id"),
+                old=Count("id", filter=Q(created_at__lt=now - timedelta(days=OLD_PENDING_DAYS))),
+            )
+            .order_by()
+        )
+    check_probation = wanted("CONTRACT_EXPIRY")
+
+    alerts = []
+    for employee in employees:
+        clock_in = open_punches.get(employee.id)
+        if clock_in:
+            hours = (now - clock_in).total_seconds() / 3600
+            alerts.append(
+                _alert(
+                    employee,
+                    employee.user_id,
+                    "EMPLOYEE",
+                    "MISSED_CLOCK_OUT",
+                    "MEDIUM",
+                    f"missed-clock-out:{employee.id}:{today.isoformat()}",
+                    message="You have not clocked out today. Please confirm.",
+                    clock_in_time=clock_in.isoformat(),
+                    hours_elapsed=round(hours, 1),
+                )
+            )
+
+        balance = balances.get(employee.id)
+        warnings = _lop_warnings(balance) if balance else []
+        if warnings:
+            negative = any(warning["type"] == "NEGATIVE_BALANCE" for warning in warnings)
+            alerts.append(
+                _alert(
+                    employee,
+                    employee.user_id,
+                    "EMPLOYEE",
+                    "LOP_THRESHOLD",
+                    "HIGH" if negative else "MEDIUM",
+                    f"lop-threshold:{employee.id}",
+                    warnings=warnings,
+                )
+            )
+
+        probation = check_probation and _probation_alert(employee, today, PROBATION_NOTICE_DAYS)
+        if probation:
+            end_date, detail = probation
+            alerts.append(
+                _alert(
+                    employee,
+                    employee.user_id,
+                    "EMPLOYEE",
+                    "CONTRACT_EXPIRY",
+                    "HIGH" if detail["days_remaining"] <= 7 else "MEDIUM",
+                    f"contract-expiry:{employee.id}:{end_date.isoformat()}",
+                    alerts=[detail],
+                )
+            )
+
+        team_probation = check_probation and _probation_alert(employee, today, TEAM_PROBATION_NOTICE_DAYS)
+        if team_probation and employee.manager_id:
+            end_date, detail = team_probation
+            alerts.append(
+                _alert(
+                    employee,
+                    employee.manager_id,
+                    "MANAGER",
+                    "CONTRACT_EXPIRY",
+                    "HIGH" if detail["days_remaining"] <= 7 else "MEDIUM",
+                    f"team-contract-expiry:{employee.manager_id}:{employee.id}:{end_date.isoformat()}",
+                    alerts=[detail],
+                    employee_name=employee.user.get_full_name(),
+                )
+            )
+
+        late_count = late_counts.get(employee.id, 0)
+        if late_count >= LATE_LOGIN_THRESHOLD:
+            alerts.append(
+                _alert(
+                    employee,
+                    employee.user_id,
+                    "EMPLOYEE",
+                    "LATE_LOGIN_PATTERN",
+                    "MEDIUM",
+                    f"late-login-pattern:{employee.id}",
+                    message=f"You have been late {late_count} times in the last {LATE_LOGIN_DAYS} days.",
+                    late_count=late_count,
+                    action="Please ensure timely attendance to avoid LOP.",
+                )
+            )
+
+    for row in pending:
+        manager_id = row["employee__manager_id"]
+        alerts.append(
+            _alert(
+                None,
+                manager_id,
+                "MANAGER",
+                "PENDING_APPROVALS",
+                "HIGH" if row["old"] else "MEDIUM",
+                f"pending-approvals:{manager_id}:{row['employee__company_id']}",
+                company_id=row["employee__company_id"],
+                message=f"You have {row['total']} pending leave approval(s).",
+                total_pending=row["total"],
+                old_pending=row["old"],
+            )
+        )
+    return alerts
+
+
+def store_alerts(alerts, stale):
+    """Upsert ``alerts`` by dedup_key and deactivate the active rows of ``stale`` that were not re-raised"""
+    with transaction.atomic():
+        SmartAlert.objects.bulk_create(
+            alerts,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=["dedup_key"],
+            update_fields=["recipient", "employee", "severity", "payload", "is_active", "updated_at"],
+        )
+        stale.filter(is_active=True).exclude(dedup_key__in=[alert.dedup_key for alert in alerts]).update(
+            is_active=False, updated_at=timezone.now()
+        )
+    return len(alerts)
+
+
+def refresh_employee_alerts(employee_ids, now=None, alert_types=None):
+    """
+    Re-evaluate the alerts of some employees and the pending-approval alerts
+    of their managers, or only the ``alert_types`` rules when given.
+    """
+    employees = list(
+        Employee.objects.filter(id__in=employee_ids, is_active=True).select_related("user")
+    )
+    manager_ids = {employee.manager_id for employee in employees if employee.manager_id}
+    alerts = evaluate_alerts(employees, now=now, alert_types=alert_types)
+    stale = SmartAlert.objects.filter(
+        Q(employee_id__in=employee_ids) | Q(alert_type="PENDING_APPROVALS", recipient_id__in=manager_ids)
+    )
+    if alert_types is not None:
+        stale = stale.filter(alert_type__in=alert_types)
+    return store_alerts(alerts, stale)
+
+
+def _populated_key(company_id):
+    return f"smart_alerts_populated_{company_id}"
+
+
+def refresh_company_alerts(company, now=None):
+    """Re-evaluate every alert of a company"""
+    employees = Employee.objects.filter(company=company, is_active=True).select_related("user")
+    alerts = evaluate_alerts(employees, now=now)
+    active = store_alerts(alerts, SmartAlert.objects.filter(company=company))
+    cache.set(_populated_key(company.id), True, None)
+    return active
+
+
+def ensure_company_alerts(company_id):
+    """
+    Evaluate a company's alerts on first read if they were never evaluated,
+    e.g. right after deploying the alert engine, before the first scheduled run
+    """
+    if not company_id or cache.get(_populated_key(company_id)):
+        return
+    if SmartAlert.objects.filter(company_id=company_id).exists():
+        cache.set(_populated_key(company_id), True, None)
+        return
+    company = Company.objects.filter(id=company_id).first()
+    if company:
+        refresh_company_alerts(company)
+
+
+def refresh_all_companies(now=None):
+    """Run refresh_company_alerts for every active company; returns the number of active alerts"""
+    total = 0
+    for company in Company.objects.filter(is_active=True):
+        try:
+            total += refresh_company_alerts(company, now=now)
+        except Exception:
+            logger.exception(f"Smart alert refresh failed for company {company.id}")
+    return total
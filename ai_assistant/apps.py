@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AiAssistantConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "ai_assistant"
+
+    def ready(self):
+        # Import signals to register them
+        import ai_assistant.signals  # noqa: F401
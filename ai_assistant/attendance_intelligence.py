@@ -1,12 +1,78 @@
 """
 AI Attendance Intelligence Module
 Analyzes attendance patterns and provides insights
+
+Pattern counts for a whole company are computed at once: the attendance
+window is loaded in one query into a pandas frame and counted per employee
+with a single group-by. The result is cached per company for a few minutes;
+analyze_employee_patterns and get_company_insights both read from it.
 """
 
 from datetime import timedelta
+
+import pandas as pd
+from django.core.cache import cache
 from django.utils import timezone
+
 from employees.models import Attendance, Employee
 
+PATTERNS_CACHE_TIMEOUT = 60 * 10  # Attendance changes all day; keep the window short
+
+PATTERN_FIELDS = ["total_days", "late_logins", "early_logouts", "missed_clock_out", "absences", "half_days", "friday_absences"]
+
+EMPTY_PATTERNS = dict.fromkeys(PATTERN_FIELDS, 0)
+
+
+def company_attendance_patterns(company_id, days=30):
+    """
+    Map employee id -> pattern counts over the last ``days`` days for every
+    employee of the company with attendance in the window. Weekly offs and
+    holidays are not counted.
+    """
+    end_date = timezone.now().date()
+    start_date = end_date - timedelta(days=days)
+    cache_key = f"attendance_patterns_{company_id}_{days}_{end_date.isoformat()}"
+    patterns = cache.get(cache_key)
+    if patterns is not None:
+        return patterns
+
+    rows = (
+        Attendance.objects.filter(employee__company_id=company_id, date__gte=start_date, date__lte=end_date)
+        .exclude(status__in=["WEEKLY_OFF", "HOLIDAY"])
+        .values_list("employee_id", "date", "status", "is_late", "is_early_departure", "clock_in", "clock_out")
+    )
+    frame = pd.DataFrame.from_records(
+        list(rows),
+        columns=["employee_id", "date", "status", "is_late", "is_early_departure", "clock_in", "clock_out"],
+    )
+
+    patterns = {}
+    if not frame.empty:
+        absent = frame["status"] == "ABSENT"
+        counts = (
+            pd.DataFrame(
+                {
+                    "employee_id": frame["employee_id"],
+                    "total_days": 1,
+                    "late_logins": frame["is_late"].astype(bool),
+                    "early_logouts": frame["is_early_departure"].astype(bool),
+                    "missed_clock_out": frame["clock_in"].notna() & frame["clock_out"].isna(),
+                    "absences": absent,
+                    "half_days": frame["status"] == "HALF_DAY",
+                    "friday_absences": absent & (pd.to_datetime(frame["date"]).dt.dayofweek == 4),
+                }
+            )
+            .groupby("employee_id")
+            .sum()
+        )
+        patterns = {
+            employee_id: {field: int(value) for field, value in row.items()}
+            for employee_id, row in counts.to_dict("index").items()
+        }
+
+    cache.set(cache_key, patterns, PATTERNS_CACHE_TIMEOUT)
+    return patterns
+
 
 class AttendanceIntelligence:
     """
@@ -19,18 +85,15 @@ class AttendanceIntelligence:
         Analyze attendance patterns for a specific employee
         Returns insights about late logins, early logouts, missed punches, etc.
         """
-        end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=days)
+        counts = company_attendance_patterns(employee.company_id, days).get(employee.id, EMPTY_PATTERNS)
+        return AttendanceIntelligence._analysis_from_counts(employee, days, counts)
 
-        attendances = (
-            Attendance.objects.filter(
-                employee=employee, date__gte=start_date, date__lte=end_date
-            )
-            .exclude(status="WEEKLY_OFF")
-            .exclude(status="HOLIDAY")
-        )
-
-        total_days = attendances.count()
+    @staticmethod
+    def _analysis_from_counts(employee, days, counts):
+        """
+        Insights and risk score from the pattern counts of one employee
+        """
+        total_days = counts["total_days"]
         if total_days == 0:
             return {
                 "employee": employee,
@@ -41,14 +104,11 @@ class AttendanceIntelligence:
                 "score": 0,
             }
 
-        # Count various patterns
-        late_logins = attendances.filter(is_late=True).count()
-        early_logouts = attendances.filter(is_early_departure=True).count()
-        missed_clock_out = attendances.filter(
-            clock_in__isnull=False, clock_out__isnull=True
-        ).count()
-        absences = attendances.filter(status="ABSENT").count()
-        half_days = attendances.filter(status="HALF_DAY").count()
+        late_logins = counts["late_logins"]
+        early_logouts = counts["early_logouts"]
+        missed_clock_out = counts["missed_clock_out"]
+        absences = counts["absences"]
+        half_days = counts["half_days"]
 
         # Calculate percentages
         late_percentage = (late_logins / total_days) * 100 if total_days > 0 else 0
@@ -136,10 +196,7 @@ class AttendanceIntelligence:
             risk_score += half_days * 2
 
         # Check for Friday pattern (potential long weekend abuse)
-        friday_absences = attendances.filter(
-            date__week_day=6,  # Friday
-            status="ABSENT",
-        ).count()
+        friday_absences = counts["friday_absences"]
 
         if friday_absences >= 2:
             insights.append(
@@ -196,13 +253,15 @@ class AttendanceIntelligence:
         """
         Get attendance insights for entire company
         """
-        employees = Employee.objects.filter(company=company, is_active=True)
+        employees = list(Employee.objects.filter(company=company, is_active=True).select_related("user"))
+        patterns = company_attendance_patterns(company.id if company else None, days)
 
         all_insights = []
         high_risk_employees = []
 
         for emp in employees:
-            analysis = AttendanceIntelligence.analyze_employee_patterns(emp, days)
+            counts = patterns.get(emp.id, EMPTY_PATTERNS)
+            analysis = AttendanceIntelligence._analysis_from_counts(emp, days, counts)
 
             if analysis["risk_level"] in ["HIGH", "CRITICAL"]:
                 high_risk_employees.append(
@@ -220,7 +279,7 @@ class AttendanceIntelligence:
         high_risk_employees.sort(key=lambda x: x["risk_score"], reverse=True)
 
         return {
-            "total_employees": employees.count(),
+            "total_employees": len(employees),
             "high_risk_count": len(high_risk_employees),
             "high_risk_employees": high_risk_employees,
             "all_insights": all_insights,
@@ -0,0 +1,129 @@
+"""
+Batch attrition risk scoring.
+
+AttritionPredictor.calculate_risk_score runs four COUNT queries per
+employee. Scoring a whole company here takes three queries however many
+employees it has:
+
+- sick leaves per employee, from one grouped LeaveRequest query
+- late arrivals, missing punches and absences per employee, from one grouped
+  Attendance query with conditional counts
+- one bulk upsert of AttritionRisk
+
+Scores go through AttritionPredictor.score_from_counts, so the batch and the
+per-employee scores use the same thresholds. The in-process scheduler
+(core.email_scheduler) runs score_all_companies every hour. The attrition
+dashboard reads the stored rows, and rescores its company first when rows
+are missing or older than SCORE_MAX_AGE (refresh_stale_scores).
+"""
+
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from companies.models import Company
+from employees.models import Attendance, Employee, LeaveRequest
+
+from .ai_utils import AttritionPredictor
+from .models import AttritionRisk
+
+logger = logging.getLogger(__name__)
+
+LOOKBACK_DAYS = 90
+# Same hourly refresh the dashboard used to do per employee
+SCORE_MAX_AGE = timedelta(hours=1)
+
+
+def company_risk_counts(employee_ids, since):
+    """Map employee id -> (sick leaves, late arrivals, missing punches, absences) since ``since``"""
+    counts = {employee_id: [0, 0, 0, 0] for employee_id in employee_ids}
+    if not counts:
+        return counts
+
+    sick_leaves = (
+        LeaveRequest.objects.filter(
+            employee_id__in=counts, leave_type="SL", status="APPROVED", created_at__gte=since
+        )
+        .values("employee_id")
+        .annotate(total=Count("id"))
+        .order_by()
+    )
+    for row in sick_leaves:
+        counts[row["employee_id"]][0] = row["total"]
+
+    attendance = (
+        Attendance.objects.filter(employee_id__in=counts, date__gte=since.date())
+        .values("employee_id")
+        .annotate(
+            late=Count("id", filter=Q(is_late=True)),
+            missing=Count("id", filter=Q(status="MISSING_PUNCH")),
+            absent=Count("id", filter=Q(status="ABSENT")),
+        )
+        .order_by()
+    )
+    for row in attendance:
+        counts[row["employee_id"]][1:] = [row["late"], row["missing"], row["absent"]]
+
+    return counts
+
+
+def score_company(company, now=None):
+    """Recompute and store the attrition risk of every active employee of a company"""
+    now = now or timezone.now()
+    since = now - timedelta(days=LOOKBACK_DAYS)
+    employees = dict(
+        Employee.objects.filter(company=company, is_active=True).values_list("id", "date_of_joining")
+    )
+    counts = company_risk_counts(employees, since)
+
+    risks = []
+    for employee_id, date_of_joining in employees.items():
+        result = AttritionPredictor.score_from_counts(*counts[employee_id], date_of_joining, today=now.date())
+        risks.append(
+            AttritionRisk(
+                employee_id=employee_id,
+                risk_score=result["score"],
+                risk_level=result["risk_level"],
+                risk_factors=result["factors"],
+            )
+        )
+
+    with transaction.atomic():
+        AttritionRisk.objects.bulk_create(
+            risks,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=["employee"],
+            update_fields=["risk_score", "risk_level", "risk_factors", "last_updated"],
+        )
+    return len(risks)
+
+
+def refresh_stale_scores(company, now=None):
+    """
+    Rescore the company when an active employee has no score or the oldest
+    score is older than SCORE_MAX_AGE. Returns True if it rescored.
+    """
+    now = now or timezone.now()
+    scores = AttritionRisk.objects.filter(employee__company=company, employee__is_active=True).aggregate(
+        scored=Count("id"), oldest=Min("last_updated")
+    )
+    missing = scores["scored"] < Employee.objects.filter(company=company, is_active=True).count()
+    if not missing and (scores["oldest"] is None or scores["oldest"] > now - SCORE_MAX_AGE):
+        return False
+    score_company(company, now=now)
+    return True
+
+
+def score_all_companies(now=None):
+    """Run score_company for every active company; returns the number of employees scored"""
+    scored = 0
+    for company in Company.objects.filter(is_active=True):
+        try:
+            scored += score_company(company, now=now)
+        except Exception:
+            logger.exception(f"Attrition scoring failed for company {company.id}")
+    return scored
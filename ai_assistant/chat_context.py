@@ -0,0 +1,252 @@
+"""
+Context snapshots and response cache for the LLM chatbot.
+
+The chatbot's system prompt carries the user's profile, leave balance,
+today's attendance, upcoming holidays, latest payslip, policy and handbook
+titles and, for managers, team stats. Each of these is cached as its own
+section, so a change only rebuilds the section it touches:
+
+- profile, leave balance, attendance, payslip: per employee, cleared by the
+  receivers in ai_assistant.signals (leave balance through
+  leave_balance_cache_keys, which bulk approval and accrual also clear)
+- holidays: per company, cleared when a holiday changes
+- policy and handbook titles: one shared section
+- team stats and insights: per manager, short-lived
+
+Day-dependent sections remember the day they were built for and rebuild
+after midnight. Answers are cached by (role, normalized question, context
+hash), so a repeated question against unchanged data skips the LLM.
+"""
+
+import hashlib
+import re
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+
+from employees.leave_ledger import apply_ledger_totals
+from employees.models import Attendance, Employee, LeaveRequest
+
+CONTEXT_TIMEOUT = 60 * 60
+TEAM_CONTEXT_TIMEOUT = 60 * 5  # Team stats change with every punch; no invalidation
+RESPONSE_TIMEOUT = 60 * 10
+
+POLICIES_KEY = "chatbot_context_policies"
+
+INSIGHT_WORDS = ["insight", "performance", "risk", "analytics", "attendance", "trend"]
+
+
+def profile_key(employee_id):
+    return f"chatbot_context_profile_{employee_id}"
+
+
+def leave_balance_key(employee_id):
+    return f"chatbot_context_leave_balance_{employee_id}"
+
+
+def attendance_key(employee_id):
+    return f"chatbot_context_attendance_{employee_id}"
+
+
+def payslip_key(employee_id):
+    return f"chatbot_context_payslip_{employee_id}"
+
+
+def holidays_key(company_id):
+    return f"chatbot_context_holidays_{company_id}"
+
+
+def team_key(user_id):
+    return f"chatbot_context_team_{user_id}"
+
+
+def insights_key(user_id):
+    return f"chatbot_context_insights_{user_id}"
+
+
+def employee_context_keys(employee_id):
+    """Every per-employee section, for callers that change several at once"""
+    return [
+        profile_key(employee_id),
+        leave_balance_key(employee_id),
+        attendance_key(employee_id),
+        payslip_key(employee_id),
+    ]
+
+
+def _section(key, build, day, timeout=CONTEXT_TIMEOUT):
+    cached = cache.get(key)
+    if cached is not None and cached[0] == day:
+        return cached[1]
+    text = build()
+    cache.set(key, (day, text), timeout)
+    return text
+
+
+def _profile(employee):
+    return f"""
+            User: {employee.user.get_full_name()} (ID: {employee.badge_id})
+            Designation: {employee.designation}
+            Department: {employee.department}
+            Location: {employee.location.name if employee.location else "Unknown"}
+            Manager: {employee.manager.get_full_name() if employee.manager else "None"}
+            """
+
+
+def _leave_balance(employee):
+    if not hasattr(employee, "leave_balance"):
+        return ""
+    (lb,) = apply_ledger_totals([employee.leave_balance])
+    return f"""
+                Leave Balance:
+                - Casual Leave (CL): {lb.casual_leave_balance}
+                - Sick Leave (SL): {lb.sick_leave_balance}
+                """
+
+
+def _attendance(employee, today):
+    att = Attendance.objects.filter(employee=employee, date=today).first()
+    if not att:
+        return f"Attendance Today ({today}): Not clocked in yet."
+    att_info = f"Attendance Today ({today}): Status={att.status}"
+    if att.clock_in:
+        att_info += f", Clock In={att.clock_in.strftime('%I:%M %p')}"
+    if att.clock_out:
+        att_info += f", Clock Out={att.clock_out.strftime('%I:%M %p')}"
+    return att_info
+
+
+def _holidays(company_id, today):
+    from companies.models import Holiday
+
+    holidays = Holiday.objects.filter(company_id=company_id, date__gte=today, is_active=True).order_by("date")[:5]
+    if not holidays:
+        return "No upcoming holidays found."
+    h_list = "\n".join([f"- {h.name}: {h.date.strftime('%d %b %Y')}" for h in holidays])
+    return f"Upcoming Holidays:\n{h_list}"
+
+
+def _payslip(employee):
+    from employees.models import Payslip
+
+    latest_payslip = Payslip.objects.filter(employee=employee).order_by("-month").first()
+    if not latest_payslip:
+        return "No payslips found."
+    payslip_info = f"Latest Payslip: {latest_payslip.month.strftime('%B %Y')}, Net Salary: {latest_payslip.net_salary}"
+    if latest_payslip.pdf_file:
+        payslip_info += f" (Download available at: {latest_payslip.pdf_file.url})"
+    return payslip_info
+
+
+def _policies():
+    from employees.models import HandbookSection, PolicySection
+
+    # Titles only to save tokens
+    policies = PolicySection.objects.filter(is_active=True).values_list("title", flat=True)
+    handbook = HandbookSection.objects.filter(is_active=True).values_list("title", flat=True)
+    parts = []
+    if policies:
+        parts.append(f"Available Policies: {', '.join(policies)}")
+    if handbook:
+        parts.append(f"Handbook Sections: {', '.join(handbook)}")
+    return "".join(parts)
+
+
+def _team(employee, today):
+    team = Employee.objects.filter(manager=employee.user, is_active=True)
+    team_count = team.count()
+    present_today = Attendance.objects.filter(employee__in=team, date=today, status__in=["PRESENT", "WFH"]).count()
+    pending_leaves = LeaveRequest.objects.filter(employee__manager=employee.user, status="PENDING").count()
+
+    text = f"Team Stats: {team_count} employees. Present Today: {present_today}. Pending Leave Requests: {pending_leaves}."
+    if pending_leaves > 0:
+        text += "You have pending leave requests to approve. Ask user if they want to see them."
+    return text
+
+
+def _insights(employee, today):
+    from .models import AttritionRisk
+
+    team = Employee.objects.filter(manager=employee.user, is_active=True)
+    team_count = team.count()
+    parts = []
+
+    # A. Attrition Risk Analysis
+    high_risk_employees = AttritionRisk.objects.filter(
+        employee__in=team, risk_level__in=["HIGH", "CRITICAL"]
+    ).select_related("employee__user")
+    names = [r.employee.user.get_full_name() for r in high_risk_employees]
+    parts.append(f"Attrition Risk Analysis: {len(names)} employees are at High/Critical risk.")
+    if names:
+        parts.append(
+            f"High Risk Employees: {', '.join(names)}. (Review factors like frequent leave or late arrivals)."
+        )
+    else:
+        parts.append("Attrition Risk Analysis: The team is stable with low predicted attrition.")
+
+    # B. Attendance Intelligence (Last 30 Days)
+    team_attendance = Attendance.objects.filter(employee__in=team, date__gte=today - timedelta(days=30))
+    total_late = team_attendance.filter(is_late=True).count()
+    avg_late_per_emp = round(total_late / team_count, 1) if team_count > 0 else 0
+    parts.append(
+        f"Attendance Intelligence (Last 30 Days): Total Late Arrivals: {total_late} (Avg {avg_late_per_emp} per employee)."
+    )
+
+    # Most Punctual & Least Punctual (Proxy for Performance)
+    late_counts = (
+        team_attendance.filter(is_late=True)
+        .values("employee__user__first_name")
+        .annotate(count=Count("id"))
+        .order_by("-count")[:1]
+    )
+    if late_counts:
+        most_late = f"{late_counts[0]['employee__user__first_name']} ({late_counts[0]['count']} times)"
+        parts.append(f"Performance Insight (Punctuality): Employee with most late arrivals: {most_late}.")
+
+    # C. Performance Insights (Work Hours Proxy)
+    parts.append(
+        "Performance Insights: Based on system data, 'Performance' here refers to punctuality and schedule adherence."
+    )
+    return "".join(parts)
+
+
+def build_context(employee, role, question):
+    """The CONTEXT DATA sections of the chatbot prompt, mostly served from cache"""
+    today = timezone.now().date()
+    context_data = [
+        _section(profile_key(employee.id), lambda: _profile(employee), None) + f"Role: {role}\n",
+        _section(leave_balance_key(employee.id), lambda: _leave_balance(employee), None),
+        _section(attendance_key(employee.id), lambda: _attendance(employee, today), today),
+        _section(holidays_key(employee.company_id), lambda: _holidays(employee.company_id, today), today),
+        _section(payslip_key(employee.id), lambda: _payslip(employee), None),
+        _section(POLICIES_KEY, _policies, None),
+    ]
+
+    # Team info (for Managers/Admins)
+    if role in ["MANAGER", "COMPANY_ADMIN"]:
+        context_data.append(
+            _section(team_key(employee.user_id), lambda: _team(employee, today), today, TEAM_CONTEXT_TIMEOUT)
+        )
+        # Deep insights only if the question asks for analytics/insights/performance/risk
+        if any(w in question.lower() for w in INSIGHT_WORDS):
+            context_data.append(
+                _section(
+                    insights_key(employee.user_id), lambda: _insights(employee, today), today, TEAM_CONTEXT_TIMEOUT
+                )
+            )
+
+    return [part for part in context_data if part]
+
+
+def normalize_question(question):
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    return re.sub(r"\s+", " ", question.lower()).strip().rstrip("?!. ")
+
+
+def response_key(question, role, context_text, model):
+    digest = hashlib.sha256(
+        "\x1f".join([model, role, normalize_question(question), context_text]).encode("utf-8")
+    ).hexdigest()
+    return f"chatbot_response_{digest}"
@@ -5,9 +5,248 @@ Extracts: Basic Info, Education, Experience, Projects, Certifications, Skills
 
 import re
 import hashlib
+import time
 from datetime import datetime
 from dateutil import parser as date_parser
 
+from . import resume_similarity
+
+_MONTHS = (
+    "Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec|January|February|March|"
+    "April|May|June|July|August|September|October|November|December"
+)
+
+# Every pattern the field extractors use, compiled once at import
+PATTERNS = {
+    # PDF text cleanup
+    "merged_words": re.compile(r"([a-z])([A-Z])"),
+    "merged_domain": re.compile(r"(\.com|\.in|\.org|\.net)([A-Za-z])"),
+    # Basic details
+    "non_name_chars": re.compile(r"[^a-zA-Z\s\.]"),
+    "email": re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,5}\b"),
+    "email_merged": re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,5}"),
+    "location_label": re.compile(r"(?:Location|Address|City)\s*[:|-]\s*([A-Za-z\s,]+)", re.IGNORECASE),
+    "city_state": re.compile(r"\b([A-Z][a-z]+(?: [A-Z][a-z]+)*,\s*[A-Z][a-z]+(?: [A-Z][a-z]+)*)\b"),
+    "linkedin": re.compile(r"(?:https?://)?(?:www\.)?linkedin\.com/in/[\w-]+", re.IGNORECASE),
+    "github": re.compile(r"(?:https?://)?(?:www\.)?github\.com/[\w-]+", re.IGNORECASE),
+    "url": re.compile(r"(?:https?://)?(?:www\.)?[\w-]+\.[\w]{2,}(?:/[\w-]*)*"),
+    "numeric_dotted": re.compile(r"^[\d\.]+$"),
+    "tld": re.compile(r"\.[a-z]{2,}(/|$)"),
+    # Education
+    "non_letters": re.compile(r"[^a-zA-Z]"),
+    "grad_year": re.compile(r"\b(199\d|20[0-2]\d|2030)\b"),
+    "gpa": re.compile(r"\b(\d{1,2}\.?\d{0,2})\s*(?:CGPA|GPA|%|/10|/100)\b", re.IGNORECASE),
+    "trailing_gpa": re.compile(r"(?:\||\-)\s*(\d{1,2}\.\d{2})\b"),
+    "leading_digit": re.compile(r"^\d"),
+    "digit": re.compile(r"\d"),
+    # Experience
+    "date_range": re.compile(
+        rf"({_MONTHS})[\s,]+(\d{{4}})\s*[-–]\s*({_MONTHS}|Present|Current)[\s,]*(\d{{4}})?",
+        re.IGNORECASE,
+    ),
+    # Certifications
+    "year": re.compile(r"(19|20)\d{2}"),
+    "four_digits": re.compile(r"\d{4}"),
+}
+
+# Tried in order; the first one found anywhere in the text wins
+PHONE_PATTERNS = [
+    re.compile(pattern)
+    for pattern in (
+        r"\+91[-\s]?\d{10}",
+        r"\+91[-\s]?\d{5}[-\s]?\d{5}",
+        r"\d{10}",
+        r"\(\d{3}\)[-\s]?\d{3}[-\s]?\d{4}",
+        r"\+\d{1,3}[-\s]?\d{10}",
+    )
+]
+TOTAL_EXPERIENCE_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE)
+    for pattern in (
+        r"(\d+)[\+]?\s*(?:years?|yrs?)\s*(?:of)?\s*experience",
+        r"experience[:\s]+(\d+)[\+]?\s*(?:years?|yrs?)",
+    )
+]
+
+# Degrees matched case-insensitively (3+ letters or containing dots), in priority order
+DEGREE_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE)
+    for pattern in (
+        r"\bB\.?Tech\b",
+        r"\bBachelor of Technology\b",
+        r"\bB\.?E\.\b",
+        r"\bBachelor of Engineering\b",  # B.E. with dot is safe
+        r"\bM\.?Tech\b",
+        r"\bMaster of Technology\b",
+        r"\bM\.?E\.\b",
+        r"\bMaster of Engineering\b",  # M.E. with dot is safe
+        r"\bMBA\b",
+        r"\bMaster of Business Administration\b",
+        r"\bMCA\b",
+        r"\bMaster of Computer Applications\b",
+        r"\bMaster in Computer Applications\b",
+        r"\bBCA\b",
+        r"\bBachelor of Computer Applications\b",
+        r"\bB\.?Sc\b",
+        r"\bBachelor of Science\b",
+        r"\bM\.?Sc\b",
+        r"\bMaster of Science\b",
+        r"\bB\.?Com\b",
+        r"\bBachelor of Commerce\b",
+        r"\bM\.?Com\b",
+        r"\bMaster of Commerce\b",
+        r"\bPh\.?D\b",
+        r"\bDoctorate\b",
+        r"\bDiploma\b",
+        r"\bMatriculation\b",
+        r"\bSSC\b",
+        r"\bHSC\b",
+        r"\b10th\b",
+        r"\b12th\b",
+        r"\bIntermediate\b",
+    )
+]
+
+
+def _keywords(*keywords):
+    """Pattern for 'any of these substrings' checks on lowercased lines"""
+    return re.compile("|".join(re.escape(keyword) for keyword in keywords))
+
+
+# Section name -> (heading keywords, keywords of the headings that end it)
+SECTIONS = {
+    "experience": (
+        _keywords("experience", "work history", "employment"),
+        _keywords("education", "skills", "projects", "certifications"),
+    ),
+    "projects": (
+        _keywords("projects", "project work", "academic projects"),
+        _keywords("experience", "education", "certifications", "skills"),
+    ),
+    "certifications": (
+        _keywords("certification", "certificate", "courses", "training"),
+        _keywords("experience", "education", "projects", "skills"),
+    ),
+}
+
+
+class SkillMatcher:
+    """
+    Finds the skills of a catalogue in one pass over the text.
+
+    All skills are compiled into a single trie-shaped regex that only
+    matches whole tokens, so "Go" no longer matches inside "Google" and "R"
+    inside every word. At each token start the longest skill wins, and the
+    shorter skills it begins with are added too ("Ruby on Rails" also
+    counts as "Ruby").
+    """
+
+    TOKEN_CHARS = "a-z0-9"
+
+    def __init__(self, categories):
+        # categories: {"technical": [...], "tools": [...], "soft": [...]}
+        self.categories = list(categories)
+        self._skills = {}  # lowercase -> (category, order, skill)
+        for category, skills in categories.items():
+            for order, skill in enumerate(skills):
+                self._skills.setdefault(skill.lower(), (category, order, skill))
+
+        names = sorted(self._skills)
+        self._pattern = re.compile(
+            f"(?<![{self.TOKEN_CHARS}])(?=({self._trie(names)})(?![{self.TOKEN_CHARS}]))"
+        )
+        # Skills that are whole-token prefixes of a longer one
+        self._prefixes = {
+            name: [
+                other
+                for other in names
+                if name.startswith(other)
+                and (
+                    len(other) == len(name)
+                    or not re.match(f"[{self.TOKEN_CHARS}]", name[len(other)])
+                )
+            ]
+            for name in names
+        }
+
+    @staticmethod
+    def _trie(names):
+        """Regex for ``names`` that tries longer names first"""
+        trie = {}
+        for name in names:
+            node = trie
+            for char in name:
+                node = node.setdefault(char, {})
+            node[""] = {}
+
+        def build(node):
+            branches = [re.escape(c) + build(child) for c, child in node.items() if c]
+            if not branches:
+                return ""
+            body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+            return f"(?:{body})?" if "" in node else body
+
+        return build(trie)
+
+    def find(self, text):
+        """Skills found in ``text`` per category, in catalogue order"""
+        found = set()
+        for longest in set(self._pattern.findall(text.lower())):
+            found.update(self._prefixes[longest])
+
+        result = {category: [] for category in self.categories}
+        for category, _, skill in sorted(self._skills[name] for name in found):
+            result[category].append(skill)
+        return result
+
+
+class ResumeDocument:
+    """
+    A resume's text split once for every field extractor: its lines, their
+    stripped lowercase forms and the lines of each section. Values derived
+    from it (sections, experience entries) are computed on first use.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.lines = text.split("\n")
+        self.lower_lines = [line.lower().strip() for line in self.lines]
+        self._cache = {}
+
+    @classmethod
+    def of(cls, text):
+        """The document for ``text``, which may already be one"""
+        return text if isinstance(text, cls) else cls(text)
+
+    @property
+    def lower(self):
+        return self.cached("lower", self.text.lower)
+
+    def cached(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def section(self, name):
+        """
+        Indices of the lines in a section: those after the first heading line
+        up to the next section's heading, skipping repeated heading lines.
+        """
+        return self.cached(("section", name), lambda: self._scan_section(*SECTIONS[name]))
+
+    def _scan_section(self, heading, end):
+        indices = []
+        inside = False
+        for index, line_lower in enumerate(self.lower_lines):
+            if heading.search(line_lower):
+                inside = True
+                continue
+            if inside:
+                if end.search(line_lower):
+                    break
+                indices.append(index)
+        return indices
+
 
 class EnhancedResumeParser:
     """
@@ -171,62 +410,65 @@ class EnhancedResumeParser:
         "Conflict Resolution",
     ]
 
+    # Bump when text extraction changes, so cached texts are extracted again
+    EXTRACTOR_VERSION = 1
+
     @staticmethod
     def parse_resume(file_path):
         """
         Main parsing function - extracts all information from resume
         """
+        return EnhancedResumeParser.extract_and_parse(file_path)[1]
+
+    @staticmethod
+    def extract_and_parse(file_path, text=None):
+        """
+        Parse a resume file, skipping extraction when its ``text`` is already
+        known (see ai_assistant.resume_text_cache). Returns (text, parsed_data).
+        """
         try:
             # Extract text from PDF/DOCX
-            text = EnhancedResumeParser._extract_text(file_path)
-
-            if not text:
-                return {"error": "Could not extract text from file"}
-
-            # Extract all information
-            parsed_data = {
-                # Basic Details
-                "name": EnhancedResumeParser._extract_name(text),
-                "email": EnhancedResumeParser._extract_email(text),
-                "phone": EnhancedResumeParser._extract_phone(text),
-                "location": EnhancedResumeParser._extract_location(text),
-                "linkedin": EnhancedResumeParser._extract_linkedin(text),
-                "github": EnhancedResumeParser._extract_github(text),
-                "portfolio": EnhancedResumeParser._extract_portfolio(text),
-                # Skills (categorized)
-                "skills": EnhancedResumeParser._extract_skills_legacy(
-                    text
-                ),  # Comma-separated for backward compatibility
-                "skills_json": EnhancedResumeParser._extract_skills_categorized(text),
-                # Education
-                "education": EnhancedResumeParser._extract_education(text),
-                # Experience
-                "experience": EnhancedResumeParser._extract_experience(text),
-                "total_experience_years": EnhancedResumeParser._calculate_total_experience(
-                    text
-                ),
-                # Projects
-                "projects": EnhancedResumeParser._extract_projects(text),
-                # Certifications
-                "certifications": EnhancedResumeParser._extract_certifications(text),
-                # Categorization
-                "candidate_type": EnhancedResumeParser._categorize_candidate_type(text),
-                "role_fit": EnhancedResumeParser._determine_role_fit(text),
-                "domain": EnhancedResumeParser._determine_domain(text),
-                # Duplicate Detection
-                "duplicate_check_hash": EnhancedResumeParser._generate_hash(text),
-            }
+            if text is None:
+                text = EnhancedResumeParser._extract_text(file_path)
+        except Exception as e:
+            return "", EnhancedResumeParser._error(e)
+
+        if not text:
+            return "", {"error": "Could not extract text from file"}
+
+        return text, EnhancedResumeParser.parse_text(text)
+
+    @staticmethod
+    def parse_text(text, timer=None):
+        """
+        Run every field extractor over already extracted resume text.
+        ``timer(field, seconds)`` is called after each extractor when given,
+        e.g. to find the one that dominates parse time.
+        """
+        try:
+            # The text is split into lines and sections once for all extractors
+            document = ResumeDocument(text)
+            parsed_data = {}
+            for field, extractor in FIELD_EXTRACTORS:
+                started = time.perf_counter()
+                parsed_data[field] = extractor(document)
+                if timer:
+                    timer(field, time.perf_counter() - started)
 
             return parsed_data
 
         except Exception as e:
-            return {
-                "error": str(e),
-                "name": None,
-                "email": None,
-                "phone": None,
-                "skills": None,
-            }
+            return EnhancedResumeParser._error(e)
+
+    @staticmethod
+    def _error(e):
+        return {
+            "error": str(e),
+            "name": None,
+            "email": None,
+            "phone": None,
+            "skills": None,
+        }
 
     @staticmethod
     def _extract_text(file_path):
@@ -256,12 +498,10 @@ class EnhancedResumeParser:
                     if page_text:
                         # Fix common PDF extraction issues: merged words
                         # Add space before capital letters if they follow lowercase immediately (e.g. nameEmail -> name Email)
-                        page_text = re.sub(r"([a-z])([A-Z])", r"\1 \2", page_text)
+                        page_text = PATTERNS["merged_words"].sub(r"\1 \2", page_text)
 
                         # Add space after email if stuck to next word (e.g. .comName -> .com Name)
-                        page_text = re.sub(
-                            r"(\.com|\.in|\.org|\.net)([A-Za-z])", r"\1 \2", page_text
-                        )
+                        page_text = PATTERNS["merged_domain"].sub(r"\1 \2", page_text)
 
                         text += page_text + "\n"
 
@@ -281,7 +521,8 @@ class EnhancedResumeParser:
     @staticmethod
     def _extract_name(text):
         """Extract candidate name - The Ultimate Fallback Strategy"""
-        lines = [l.strip() for l in text.split("\n") if l.strip()]
+        document = ResumeDocument.of(text)
+        lines = [l.strip() for l in document.lines if l.strip()]
 
         # Banned words - Expanded to kill "Uber Data Analytics"
         banned = [
@@ -340,7 +581,7 @@ class EnhancedResumeParser:
         # Don't look at the bottom of the resume where projects are.
 
         for line in lines[:20]:
-            clean_line = re.sub(r"[^a-zA-Z\s\.]", "", line).strip()
+            clean_line = PATTERNS["non_name_chars"].sub("", line).strip()
             if not clean_line:
                 continue
 
@@ -362,80 +603,6 @@ class EnhancedResumeParser:
 
         return "Unknown Candidate"
 
-    @staticmethod
-    def _extract_location(text):
-        """Extract location with STRICT Known-City Requirement"""
-
-        # Known cities/countries - The match MUST contain one of these.
-        known_places = [
-            "india",
-            "usa",
-            "uk",
-            "canada",
-            "australia",
-            "germany",
-            "france",
-            "singapore",
-            "dubai",
-            "uae",
-            "hyderabad",
-            "bangalore",
-            "bengaluru",
-            "mumbai",
-            "delhi",
-            "new delhi",
-            "pune",
-            "chennai",
-            "kolkata",
-            "gurgaon",
-            "noida",
-            "bhubaneswar",
-            "odisha",
-            "cuttack",
-            "berhampur",
-            "karnataka",
-            "maharashtra",
-            "telangana",
-            "tamil nadu",
-            "andhra pradesh",
-        ]
-
-        # Ban List
-        ban_list = ["git", "hub", "github", "python", "java", "react", "node"]
-
-        matches = re.findall(
-            r"\b([A-Z][a-z]+(?: [A-Z][a-z]+)*,\s*[A-Z][a-z]+(?: [A-Z][a-z]+)*)\b", text
-        )
-
-        for match in matches:
-            match_lower = match.lower()
-
-            # 1. Check Bans
-            if any(b in match_lower for b in ban_list):
-                continue
-
-            # 2. STRICT REQUIRED: Must contain a known place
-            # "Git, Git Hub" -> Fails (No 'India' or 'Hyderabad')
-            # "Hyderabad, India" -> Passes
-            has_known = False
-            for place in known_places:
-                if place in match_lower:
-                    has_known = True
-                    break
-
-            if has_known:
-                if len(match) < 60:
-                    return match
-
-        # Fallback for single line cities "Hyderabad"
-        for line in text.split("\n"):
-            line_clean = line.strip()
-            line_lower = line_clean.lower()
-            if line_lower in known_places:
-                return line_clean + ", India"
-
-        return None
-
     @staticmethod
     def _extract_email(text):
         """Extract email address with flexible regex for merged text"""
@@ -443,15 +610,14 @@ class EnhancedResumeParser:
         # e.g. "NameEmail@domain.comPhone" -> extracts "Email@domain.com"
 
         # 1. Standard search
-        email_pattern = r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,5}\b"
-        match = re.search(email_pattern, text)
+        text = ResumeDocument.of(text).text
+        match = PATTERNS["email"].search(text)
         if match:
             return match.group(0)
 
         # 2. Aggressive search (if strict boundaries \b failed due to merging)
         # Look for X@Y.Z inside a string
-        aggressive_pattern = r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,5}"
-        match = re.search(aggressive_pattern, text)
+        match = PATTERNS["email_merged"].search(text)
         if match:
             return match.group(0)
 
@@ -460,16 +626,9 @@ class EnhancedResumeParser:
     @staticmethod
     def _extract_phone(text):
         """Extract phone number"""
-        phone_patterns = [
-            r"\+91[-\s]?\d{10}",
-            r"\+91[-\s]?\d{5}[-\s]?\d{5}",
-            r"\d{10}",
-            r"\(\d{3}\)[-\s]?\d{3}[-\s]?\d{4}",
-            r"\+\d{1,3}[-\s]?\d{10}",
-        ]
-
-        for pattern in phone_patterns:
-            match = re.search(pattern, text)
+        text = ResumeDocument.of(text).text
+        for pattern in PHONE_PATTERNS:
+            match = pattern.search(text)
             if match:
                 return match.group(0)
         return None
@@ -499,15 +658,11 @@ class EnhancedResumeParser:
             "tools",
         ]
 
-        lines = text.split("\n")
+        document = ResumeDocument.of(text)
 
         # 1. Look for explicit "Location: City"
-        for line in lines[:20]:
-            match = re.search(
-                r"(?:Location|Address|City)\s*[:|-]\s*([A-Za-z\s,]+)",
-                line,
-                re.IGNORECASE,
-            )
+        for line in document.lines[:20]:
+            match = PATTERNS["location_label"].search(line)
             if match:
                 loc = match.group(1).strip()
                 # Validate it's not a banned word
@@ -515,10 +670,7 @@ class EnhancedResumeParser:
                     return loc
 
         # 2. Pattern Search (City, State)
-        loc_pattern = (
-            r"\b([A-Z][a-z]+(?: [A-Z][a-z]+)*,\s*[A-Z][a-z]+(?: [A-Z][a-z]+)*)\b"
-        )
-        matches = re.findall(loc_pattern, text)
+        matches = PATTERNS["city_state"].findall(document.text)
 
         for match in matches:
             # Check bans
@@ -536,23 +688,20 @@ class EnhancedResumeParser:
     @staticmethod
     def _extract_linkedin(text):
         """Extract LinkedIn URL"""
-        linkedin_pattern = r"(?:https?://)?(?:www\.)?linkedin\.com/in/[\w-]+"
-        match = re.search(linkedin_pattern, text, re.IGNORECASE)
+        match = PATTERNS["linkedin"].search(ResumeDocument.of(text).text)
         return match.group(0) if match else None
 
     @staticmethod
     def _extract_github(text):
         """Extract GitHub URL"""
-        github_pattern = r"(?:https?://)?(?:www\.)?github\.com/[\w-]+"
-        match = re.search(github_pattern, text, re.IGNORECASE)
+        match = PATTERNS["github"].search(ResumeDocument.of(text).text)
         return match.group(0) if match else None
 
     @staticmethod
     def _extract_portfolio(text):
         """Extract portfolio/personal website URL"""
         # Exclude LinkedIn, GitHub, email domains
-        url_pattern = r"(?:https?://)?(?:www\.)?[\w-]+\.[\w]{2,}(?:/[\w-]*)*"
-        matches = re.findall(url_pattern, text)
+        matches = PATTERNS["url"].findall(ResumeDocument.of(text).text)
 
         # Common technical terms that look like URLs but aren't
         false_positives = [
@@ -608,12 +757,12 @@ class EnhancedResumeParser:
                 continue
 
             # Skip short numeric-like strings (e.g. "7.94.2") that matched regex but aren't URLs
-            if re.match(r"^[\d\.]+$", url_lower):
+            if PATTERNS["numeric_dotted"].match(url_lower):
                 continue
 
             # Strict TLD Check: Must end with a valid-looking TLD
             # e.g., anything that ends in .00 or .94 is NOT a website
-            if not re.search(r"\.[a-z]{2,}(/|$)", url_lower):
+            if not PATTERNS["tld"].search(url_lower):
                 continue
 
             # Skip if it's just a file extension mention without protocol/www
@@ -642,25 +791,8 @@ class EnhancedResumeParser:
     @staticmethod
     def _extract_skills_categorized(text):
         """Extract and categorize skills"""
-        text_lower = text.lower()
-
-        found_technical = []
-        found_tools = []
-        found_soft = []
-
-        for skill in EnhancedResumeParser.TECHNICAL_SKILLS:
-            if skill.lower() in text_lower:
-                found_technical.append(skill)
-
-        for tool in EnhancedResumeParser.TOOLS:
-            if tool.lower() in text_lower:
-                found_tools.append(tool)
-
-        for soft_skill in EnhancedResumeParser.SOFT_SKILLS:
-            if soft_skill.lower() in text_lower:
-                found_soft.append(soft_skill)
-
-        return {"technical": found_technical, "tools": found_tools, "soft": found_soft}
+        document = ResumeDocument.of(text)
+        return document.cached("skills", lambda: SKILL_MATCHER.find(document.text))
 
     # ==================== EDUCATION ====================
 
@@ -669,49 +801,13 @@ class EnhancedResumeParser:
         """Extract education details with strict filtering"""
         education_list = []
 
-        # 1. Compile regex patterns separately for control over case-sensitivity
-
-        # Case-insensitive patterns (Safe 3+ letters or containing dots)
-        safe_patterns = [
-            r"\bB\.?Tech\b",
-            r"\bBachelor of Technology\b",
-            r"\bB\.?E\.\b",
-            r"\bBachelor of Engineering\b",  # B.E. with dot is safe
-            r"\bM\.?Tech\b",
-            r"\bMaster of Technology\b",
-            r"\bM\.?E\.\b",
-            r"\bMaster of Engineering\b",  # M.E. with dot is safe
-            r"\bMBA\b",
-            r"\bMaster of Business Administration\b",
-            r"\bMCA\b",
-            r"\bMaster of Computer Applications\b",
-            r"\bMaster in Computer Applications\b",
-            r"\bBCA\b",
-            r"\bBachelor of Computer Applications\b",
-            r"\bB\.?Sc\b",
-            r"\bBachelor of Science\b",
-            r"\bM\.?Sc\b",
-            r"\bMaster of Science\b",
-            r"\bB\.?Com\b",
-            r"\bBachelor of Commerce\b",
-            r"\bM\.?Com\b",
-            r"\bMaster of Commerce\b",
-            r"\bPh\.?D\b",
-            r"\bDoctorate\b",
-            r"\bDiploma\b",
-            r"\bMatriculation\b",
-            r"\bSSC\b",
-            r"\bHSC\b",
-            r"\b10th\b",
-            r"\b12th\b",
-            r"\bIntermediate\b",
-        ]
+        # Case-insensitive degree patterns are DEGREE_PATTERNS (module level)
 
         # Strict patterns (Case-SENSITIVE 2-letter degrees to avoid 'be', 'me', 'ma')
         # We will match these manually in the loop
         strict_acronyms = {"BE", "ME", "BA", "MA", "BS", "MS"}
 
-        lines = text.split("\n")
+        lines = ResumeDocument.of(text).lines
 
         for i, line in enumerate(lines):
             line_str = line.strip()
@@ -721,8 +817,8 @@ class EnhancedResumeParser:
             degree_found = None
 
             # Check safe patterns (Ignore Case)
-            for pat in safe_patterns:
-                match = re.search(pat, line_str, re.IGNORECASE)
+            for pat in DEGREE_PATTERNS:
+                match = pat.search(line_str)
                 if match:
                     degree_found = match.group(0)
                     # Normalize common variations
@@ -740,7 +836,7 @@ class EnhancedResumeParser:
             # Check strict acronyms (Case Sensitive) if no safe pattern found
             if not degree_found:
                 # Tokenize line to find exact words
-                words = re.split(r"[^a-zA-Z]", line_str)
+                words = PATTERNS["non_letters"].split(line_str)
                 for word in words:
                     if word in strict_acronyms:
                         # Extra check: Must be UpperCase AND (followed by space/pipe or end of line)
@@ -769,13 +865,12 @@ class EnhancedResumeParser:
                 )  # Use separator
 
                 # A. Extract Year (4 digits, 1990-2030)
-                years = re.findall(r"\b(199\d|20[0-2]\d|2030)\b", full_context)
+                years = PATTERNS["grad_year"].findall(full_context)
                 if years:
                     year = int(max(years))  # Grad year is usually the latest
 
                 # B. Extract GPA/Score
-                gpa_pattern = r"\b(\d{1,2}\.?\d{0,2})\s*(?:CGPA|GPA|%|/10|/100)\b"
-                gpa_match = re.search(gpa_pattern, full_context, re.IGNORECASE)
+                gpa_match = PATTERNS["gpa"].search(full_context)
                 if gpa_match:
                     try:
                         gpa = float(gpa_match.group(1))
@@ -783,9 +878,7 @@ class EnhancedResumeParser:
                         pass
                 else:
                     # Fallback: finding float at end of line (e.g. "... | 7.94")
-                    fallback = re.search(
-                        r"(?:\||\-)\s*(\d{1,2}\.\d{2})\b", full_context
-                    )
+                    fallback = PATTERNS["trailing_gpa"].search(full_context)
                     if fallback:
                         try:
                             gpa = float(fallback.group(1))
@@ -814,7 +907,7 @@ class EnhancedResumeParser:
                             clean_line = clean_line.replace(degree, "").strip(" ,|-")
 
                         # If meaningful text remains
-                        if len(clean_line) > 10 and not re.search(r"^\d", clean_line):
+                        if len(clean_line) > 10 and not PATTERNS["leading_digit"].search(clean_line):
                             university = clean_line
                             break
 
@@ -823,7 +916,7 @@ class EnhancedResumeParser:
                     parts = line_str.split("|")
                     for part in parts:
                         p = part.strip()
-                        if degree not in p and not re.search(r"\d", p) and len(p) > 5:
+                        if degree not in p and not PATTERNS["digit"].search(p) and len(p) > 5:
                             # Avoid "Computer Science" as uni
                             if "Science" not in p and "Engineering" not in p:
                                 university = p
@@ -883,112 +976,86 @@ class EnhancedResumeParser:
     @staticmethod
     def _extract_experience(text):
         """Extract work experience"""
-        experience_list = []
-
-        # Look for experience section
-        lines = text.split("\n")
-        in_experience_section = False
+        document = ResumeDocument.of(text)
+        return document.cached("experience", lambda: EnhancedResumeParser._scan_experience(document))
 
-        for i, line in enumerate(lines):
-            line_lower = line.lower().strip()
+    @staticmethod
+    def _scan_experience(document):
+        experience_list = []
 
-            # Detect experience section start
-            if any(
-                keyword in line_lower
-                for keyword in ["experience", "work history", "employment"]
-            ):
-                in_experience_section = True
-                continue
+        # Lines of the experience section
+        lines = document.lines
+        date_pattern = PATTERNS["date_range"]
 
-            # Detect section end
-            if in_experience_section and any(
-                keyword in line_lower
-                for keyword in ["education", "skills", "projects", "certifications"]
-            ):
-                break
+        for i in document.section("experience"):
+            line = lines[i]
 
             # Look for company/job title patterns
-            if in_experience_section:
-                # Look for date ranges (e.g., "Jan 2020 - Dec 2022")
-                date_pattern = r"(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec|January|February|March|April|May|June|July|August|September|October|November|December)[\s,]+(\d{4})\s*[-–]\s*(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec|January|February|March|April|May|June|July|August|September|October|November|December|Present|Current)[\s,]*(\d{4})?"
-
-                if re.search(date_pattern, line, re.IGNORECASE):
-                    # Found a date range, likely an experience entry
-                    match = re.search(date_pattern, line, re.IGNORECASE)
-                    start_date = f"{match.group(1)} {match.group(2)}"
-                    end_date = (
-                        f"{match.group(3)} {match.group(4) if match.group(4) else ''}"
-                    )
+            # Look for date ranges (e.g., "Jan 2020 - Dec 2022")
+            match = date_pattern.search(line)
+            if match:
+                # Found a date range, likely an experience entry
+                start_date = f"{match.group(1)} {match.group(2)}"
+                end_date = f"{match.group(3)} {match.group(4) if match.group(4) else ''}"
 
-                    # Company and title are usually in nearby lines
-                    company = None
-                    title = None
-                    description = []
-
-                    # Look backwards for company/title
-                    for j in range(max(0, i - 3), i):
-                        prev_line = lines[j].strip()
-                        if prev_line and len(prev_line) > 3:
-                            if not company:
-                                company = prev_line
-                            elif not title:
-                                title = prev_line
-
-                    # Look forward for description
-                    # Capture up to 15 lines or until next job/section
-                    for j in range(i + 1, min(i + 20, len(lines))):
-                        desc_line = lines[j].strip()
-
-                        # Stop if we hit a date pattern (likely next job)
-                        if re.search(date_pattern, desc_line, re.IGNORECASE):
-                            break
+                # Company and title are usually in nearby lines
+                company = None
+                title = None
+                description = []
 
-                        # Stop if complex empty line sequence (end of section)
-                        if (
-                            not desc_line
-                            and j + 1 < len(lines)
-                            and not lines[j + 1].strip()
-                        ):
-                            continue
+                # Look backwards for company/title
+                for j in range(max(0, i - 3), i):
+                    prev_line = lines[j].strip()
+                    if prev_line and len(prev_line) > 3:
+                        if not company:
+                            company = prev_line
+                        elif not title:
+                            title = prev_line
+
+                # Look forward for description
+                # Capture up to 15 lines or until next job/section
+                for j in range(i + 1, min(i + 20, len(lines))):
+                    desc_line = lines[j].strip()
+
+                    # Stop if we hit a date pattern (likely next job)
+                    if date_pattern.search(desc_line):
+                        break
 
-                        if desc_line:
-                            # Preserve bullet points
-                            if desc_line.startswith(("•", "-", "*", "➢", "·")):
-                                description.append(desc_line)
-                            else:
-                                description.append(desc_line)
+                    if desc_line:
+                        # Bullet points are kept as they are
+                        description.append(desc_line)
 
-                    # Format description with newlines for better display
-                    formatted_desc = "\n".join(description) if description else None
+                # Format description with newlines for better display
+                formatted_desc = "\n".join(description) if description else None
 
-                    experience_list.append(
-                        {
-                            "company": company,
-                            "title": title,
-                            "start_date": start_date,
-                            "end_date": end_date,
-                            "description": formatted_desc,
-                        }
-                    )
+                experience_list.append(
+                    {
+                        "company": company,
+                        "title": title,
+                        "start_date": start_date,
+                        "end_date": end_date,
+                        "description": formatted_desc,
+                    }
+                )
 
         return experience_list if experience_list else None
 
     @staticmethod
     def _calculate_total_experience(text):
         """Calculate total years of experience"""
-        # Look for explicit mentions
-        exp_patterns = [
-            r"(\d+)[\+]?\s*(?:years?|yrs?)\s*(?:of)?\s*experience",
-            r"experience[:\s]+(\d+)[\+]?\s*(?:years?|yrs?)",
-        ]
+        document = ResumeDocument.of(text)
+        return document.cached("total_experience", lambda: EnhancedResumeParser._total_experience(document))
 
-        for pattern in exp_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+    @staticmethod
+    def _total_experience(document):
+        # Look for explicit mentions
+        for pattern in TOTAL_EXPERIENCE_PATTERNS:
+            match = pattern.search(document.text)
             if match:
                 return float(match.group(1))
 
         # Calculate from experience dates
-        experience = EnhancedResumeParser._extract_experience(text)
+        experience = EnhancedResumeParser._extract_experience(document)
         if experience:
             total_months = 0
             for exp in experience:
@@ -1019,26 +1086,13 @@ class EnhancedResumeParser:
         """Extract project details"""
         projects_list = []
 
-        lines = text.split("\n")
-        in_projects_section = False
-
-        for i, line in enumerate(lines):
-            line_lower = line.lower().strip()
-
-            if any(
-                keyword in line_lower
-                for keyword in ["projects", "project work", "academic projects"]
-            ):
-                in_projects_section = True
-                continue
+        document = ResumeDocument.of(text)
+        lines = document.lines
 
-            if in_projects_section and any(
-                keyword in line_lower
-                for keyword in ["experience", "education", "certifications", "skills"]
-            ):
-                break
+        for i in document.section("projects"):
+            line = lines[i]
 
-            if in_projects_section and line.strip() and len(line.strip()) > 5:
+            if line.strip() and len(line.strip()) > 5:
                 # Potential project title
                 title = line.strip()
                 technologies = []
@@ -1053,10 +1107,7 @@ class EnhancedResumeParser:
                         if (
                             len(next_line) < 40
                             and j > i + 2
-                            and not any(
-                                kw in next_line.lower()
-                                for kw in EnhancedResumeParser.TECHNICAL_SKILLS
-                            )
+                            and not TECHNICAL_SKILL_SUBSTRINGS.search(next_line.lower())
                             and next_line[0].isupper()
                         ):
                             # Only break if it really looks like a header (no bullet)
@@ -1064,9 +1115,7 @@ class EnhancedResumeParser:
                                 break
 
                         # Check for technology keywords
-                        for tech in EnhancedResumeParser.TECHNICAL_SKILLS:
-                            if tech.lower() in next_line.lower():
-                                technologies.append(tech)
+                        technologies.extend(SKILL_MATCHER.find(next_line)["technical"])
 
                         description.append(next_line)
 
@@ -1124,26 +1173,13 @@ class EnhancedResumeParser:
         """Extract certifications"""
         certifications_list = []
 
-        lines = text.split("\n")
-        in_cert_section = False
-
-        for i, line in enumerate(lines):
-            line_lower = line.lower().strip()
-
-            if any(
-                keyword in line_lower
-                for keyword in ["certification", "certificate", "courses", "training"]
-            ):
-                in_cert_section = True
-                continue
+        document = ResumeDocument.of(text)
+        lines = document.lines
 
-            if in_cert_section and any(
-                keyword in line_lower
-                for keyword in ["experience", "education", "projects", "skills"]
-            ):
-                break
+        for i in document.section("certifications"):
+            line = lines[i]
 
-            if in_cert_section and line.strip() and len(line.strip()) > 5:
+            if line.strip() and len(line.strip()) > 5:
                 cert_name = line.strip()
                 issuer = None
                 year = None
@@ -1153,13 +1189,13 @@ class EnhancedResumeParser:
                     next_line = lines[i + 1].strip()
 
                     # Extract year
-                    year_match = re.search(r"(19|20)\d{2}", next_line)
+                    year_match = PATTERNS["year"].search(next_line)
                     if year_match:
                         year = int(year_match.group(0))
 
                     # Issuer is the rest of the line
                     if next_line:
-                        issuer = re.sub(r"\d{4}", "", next_line).strip()[:100]
+                        issuer = PATTERNS["four_digits"].sub("", next_line).strip()[:100]
 
                 certifications_list.append(
                     {"name": cert_name[:150], "issuer": issuer, "year": year}
@@ -1185,7 +1221,7 @@ class EnhancedResumeParser:
     @staticmethod
     def _determine_role_fit(text):
         """Determine best role fit based on skills"""
-        text_lower = text.lower()
+        text_lower = ResumeDocument.of(text).lower
 
         role_keywords = {
             "Frontend Developer": [
@@ -1277,7 +1313,7 @@ class EnhancedResumeParser:
     @staticmethod
     def _determine_domain(text):
         """Determine industry domain"""
-        text_lower = text.lower()
+        text_lower = ResumeDocument.of(text).lower
 
         if any(
             kw in text_lower
@@ -1310,3 +1346,43 @@ class EnhancedResumeParser:
         # Normalize text: lowercase, remove extra spaces
         normalized = " ".join(text.lower().split())
         return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+# Project lines mentioning a (lowercase) catalogue entry are not project titles
+TECHNICAL_SKILL_SUBSTRINGS = _keywords(*EnhancedResumeParser.TECHNICAL_SKILLS)
+
+SKILL_MATCHER = SkillMatcher(
+    {
+        "technical": EnhancedResumeParser.TECHNICAL_SKILLS,
+        "tools": EnhancedResumeParser.TOOLS,
+        "soft": EnhancedResumeParser.SOFT_SKILLS,
+    }
+)
+
+# (field, extractor) in output order; every extractor takes a ResumeDocument
+FIELD_EXTRACTORS = [
+    # Basic Details
+    ("name", EnhancedResumeParser._extract_name),
+    ("email", EnhancedResumeParser._extract_email),
+    ("phone", EnhancedResumeParser._extract_phone),
+    ("location", EnhancedResumeParser._extract_location),
+    ("linkedin", EnhancedResumeParser._extract_linkedin),
+    ("github", EnhancedResumeParser._extract_github),
+    ("portfolio", EnhancedResumeParser._extract_portfolio),
+    # Skills: comma-separated for backward compatibility, and categorized
+    ("skills", EnhancedResumeParser._extract_skills_legacy),
+    ("skills_json", EnhancedResumeParser._extract_skills_categorized),
+    # Education, Experience, Projects, Certifications
+    ("education", EnhancedResumeParser._extract_education),
+    ("experience", EnhancedResumeParser._extract_experience),
+    ("total_experience_years", EnhancedResumeParser._calculate_total_experience),
+    ("projects", EnhancedResumeParser._extract_projects),
+    ("certifications", EnhancedResumeParser._extract_certifications),
+    # Categorization
+    ("candidate_type", EnhancedResumeParser._categorize_candidate_type),
+    ("role_fit", EnhancedResumeParser._determine_role_fit),
+    ("domain", EnhancedResumeParser._determine_domain),
+    # Duplicate Detection
+    ("duplicate_check_hash", lambda document: EnhancedResumeParser._generate_hash(document.text)),
+    ("similarity_signature", lambda document: resume_similarity.signature(document.text)),
+]
@@ -0,0 +1,229 @@
+"""
+Compiled intent router for the rule-based HR chatbot.
+
+HRChatbot used to route a message through a long chain of
+``any(w in query for w in [...])`` checks, so one message was scanned once
+per phrase (a few hundred substring searches per message). Here every
+phrase of every rule is compiled once, at import, into a single trie-shaped
+regex; one pass over the message finds every phrase that occurs in it, and
+the rules are then evaluated as set lookups on those hits.
+
+Rules keep the substring semantics of the old checks ("hi" still matches
+inside "this") and are listed in priority order: classify() returns every
+matching intent and the handlers test them in the same order as before,
+so the chain (including its fall-throughs) routes exactly as it did.
+The benchmark_intent_router command checks the compiled router against
+plain substring evaluation over a query corpus.
+"""
+
+import re
+from collections import defaultdict
+
+
+class AnyOf:
+    """True when any of the phrases occurs in the message"""
+
+    def __init__(self, *phrases):
+        self.phrases = phrases
+
+    def matches(self, contains):
+        return any(contains(phrase) for phrase in self.phrases)
+
+
+class AllOf:
+    """True when every condition holds; plain strings are single phrases"""
+
+    def __init__(self, *conditions):
+        self.conditions = [AnyOf(c) if isinstance(c, str) else c for c in conditions]
+        self.phrases = tuple(phrase for condition in self.conditions for phrase in condition.phrases)
+
+    def matches(self, contains):
+        return all(condition.matches(contains) for condition in self.conditions)
+
+
+class NoneOf(AnyOf):
+    """True when none of the phrases occurs in the message"""
+
+    def matches(self, contains):
+        return not super().matches(contains)
+
+
+class Either(AllOf):
+    """True when any of the conditions holds"""
+
+    def matches(self, contains):
+        return any(condition.matches(contains) for condition in self.conditions)
+
+
+CLOCK_IN = AnyOf("clock in", "clock-in", "clockin", "punch in", "check in")
+CLOCK_OUT = AnyOf("clock out", "clock-out", "clockout", "punch out", "check out")
+SICK_LEAVE = AnyOf("apply sick leave", "take sick leave", "sick leave", "apply sl")
+CASUAL_LEAVE = AnyOf("apply casual leave", "take casual leave", "casual leave", "apply cl")
+EARNED_LEAVE = AnyOf("apply earned leave", "take earned leave", "earned leave", "apply el")
+
+# (intent, condition) in priority order
+RULES = [
+    # Critical UI actions, checked for every role before anything else
+    ("clock_in", CLOCK_IN),
+    ("clock_out", CLOCK_OUT),
+    ("apply_sick_leave", SICK_LEAVE),
+    ("apply_casual_leave", CASUAL_LEAVE),
+    ("apply_earned_leave", EARNED_LEAVE),
+    ("apply_leave", AllOf(AnyOf("apply leave", "request leave", "book leave"), NoneOf("balance"))),
+    ("leave_action", AnyOf("approve leave", "reject leave")),
+    ("add_holiday", AnyOf("add holiday")),
+    ("greeting", AnyOf("hello", "hi", "hey", "good morning", "good afternoon", "good evening")),
+    ("thanks", AnyOf("thank", "thanks", "appreciate")),
+    # Company admin
+    ("admin_add_employee", AllOf("employee", AnyOf("add", "create", "new", "onboard", "hire"))),
+    (
+        "admin_member_stats",
+        AllOf(
+            AnyOf("total", "list", "check", "view", "show", "count", "who"),
+            AnyOf("employee", "staff", "workforce", "member", "memebr", "people", "person"),
+        ),
+    ),
+    (
+        "admin_shift_settings",
+        AllOf("shift", AnyOf("setting", "config", "setup", "manage", "create", "edit", "update", "working")),
+    ),
+    ("admin_week_off", Either(AllOf("week", "off"), AnyOf("weekoff"))),
+    ("admin_roles", AnyOf("role", "permission", "access")),
+    ("admin_holidays", AllOf("holiday", AnyOf("config", "setting", "manage", "view", "add", "list"))),
+    ("admin_api", AnyOf("api", "integration", "token")),
+    ("admin_configuration", AnyOf("config", "setting", "setup", "configure")),
+    ("admin_exit", AnyOf("exit", "resign", "terminate")),
+    ("admin_alerts", AnyOf("alert", "risk", "missing")),
+    ("admin_attendance_report", AllOf("attendance", AnyOf("report", "analytics", "sheet"))),
+    ("admin_leave_report", AllOf("leave", AnyOf("report", "history"))),
+    ("admin_payroll_report", AllOf("payroll", AnyOf("report", "salary"))),
+    ("admin_employee_data", AllOf("employee", AnyOf("data", "list", "report"))),
+    ("admin_reports", AnyOf("report", "export")),
+    # Manager
+    ("manager_headcount", AllOf("total", AnyOf("employee", "staff", "workforce"))),
+    ("manager_team_attendance", AllOf("team", AnyOf("attendance", "present", "absent", "status"))),
+    ("manager_absentees", AnyOf("absent", "who is not here")),
+    ("manager_late", AnyOf("late")),
+    ("manager_pending_leaves", AllOf("leave", AnyOf("request", "pending", "approve", "approval"))),
+    ("manager_insights", AnyOf("performance", "insight", "analytics", "risk")),
+    # Employee
+    (
+        "employee_team_query",
+        AnyOf(
+            "team",
+            "subordinate",
+            "approval",
+            "approve",
+            "reject",
+            "who is",
+            "pending",
+            "insight",
+            "analytics",
+            "risk",
+            "late",
+            "absent",
+            "total employee",
+            "total staff",
+        ),
+    ),
+    ("employee_pending_leaves", AllOf("leave", AnyOf("request", "pending"), NoneOf("apply"))),
+    ("employee_regularization", AnyOf("regularize attendance", "regularization", "regularize", "missed punch")),
+    ("employee_policy", AnyOf("policy", "policies", "rule", "rules", "guideline", "guidelines")),
+    ("employee_handbook", AnyOf("handbook", "employee handbook", "manual", "guide book")),
+    (
+        "employee_leave_balance",
+        AnyOf("leave balance", "leaves left", "remaining leave", "how many leave", "leave quota", "check leave"),
+    ),
+    (
+        "employee_apply_leave",
+        AnyOf("apply leave", "apply for leave", "request leave", "take leave", "book leave"),
+    ),
+    (
+        "employee_portal_access",
+        AnyOf("portal", "login", "access", "account", "username", "password", "credentials"),
+    ),
+    ("employee_leave_info", AllOf("leave", NoneOf("balance", "apply", "request"))),
+    (
+        "employee_attendance",
+        AnyOf("attendance", "present", "check my attendance", "attendance status", "today attendance"),
+    ),
+    ("employee_holidays", AnyOf("holiday", "holidays", "festival", "off day", "upcoming holiday")),
+    ("employee_payroll", AnyOf("salary", "payslip", "pay", "payroll", "income", "ctc")),
+    ("employee_profile", AnyOf("profile", "personal detail", "update detail")),
+    ("employee_shift", AnyOf("shift", "timing", "schedule", "work time")),
+    ("employee_manager_info", AnyOf("manager", "reporting", "supervisor", "boss")),
+]
+
+
+def _trie_pattern(phrases):
+    """Regex matching the longest of ``phrases`` that starts at the current position"""
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # Greedy "?" tries the longer phrase first and backs off to the one ending here
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class IntentRouter:
+    """
+    Matches a message against ``rules`` in one pass.
+
+    At each position the compiled pattern finds the longest phrase starting
+    there; every phrase that is a prefix of it also starts there, so the hits
+    are exactly the phrases that occur anywhere in the message.
+    """
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self.priority = {intent: index for index, (intent, _) in enumerate(self.rules)}
+        phrases = sorted({phrase for _, condition in self.rules for phrase in condition.phrases})
+        self._pattern = re.compile(f"(?=({_trie_pattern(phrases)}))")
+        self._prefixes = {
+            phrase: frozenset(other for other in phrases if phrase.startswith(other)) for phrase in phrases
+        }
+        # Only rules mentioning a phrase of the message can match (every rule needs one phrase present)
+        self._rules_by_phrase = defaultdict(list)
+        for index, (_, condition) in enumerate(self.rules):
+            for phrase in condition.phrases:
+                self._rules_by_phrase[phrase].append(index)
+
+    def hits(self, text):
+        """Every phrase of the rules that occurs in ``text``"""
+        found = set()
+        for longest in {match.group(1) for match in self._pattern.finditer(text)}:
+            found |= self._prefixes[longest]
+        return found
+
+    def classify(self, text):
+        """Matching intents of a lowercased message, as a frozenset"""
+        found = self.hits(text)
+        candidates = {index for phrase in found for index in self._rules_by_phrase[phrase]}
+        return frozenset(
+            self.rules[index][0] for index in candidates if self.rules[index][1].matches(found.__contains__)
+        )
+
+    def classify_by_substring(self, text):
+        """Reference evaluation with one substring search per phrase, as the handlers used to do"""
+        return frozenset(intent for intent, condition in self.rules if condition.matches(text.__contains__))
+
+    def ordered(self, intents):
+        """``intents`` in priority order"""
+        return sorted(intents, key=self.priority.__getitem__)
+
+
+router = IntentRouter(RULES)
+
+
+def classify(text):
+    return router.classify(text)
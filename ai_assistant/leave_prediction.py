@@ -4,13 +4,115 @@ Predicts leave patterns and provides team planning insights
 """
 
 import calendar
+import time
 from collections import defaultdict
 from datetime import timedelta
 
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Count
 from django.utils import timezone
 
 from employees.models import Employee, LeaveRequest
 
+FORECAST_CACHE_TIMEOUT = 60 * 60  # Leave signals invalidate sooner
+
+
+def _forecast_version_key(company_id):
+    return f"team_forecast_version_{company_id}"
+
+
+def _forecast_version(company_id):
+    version = cache.get(_forecast_version_key(company_id))
+    if version is None:
+        version = time.time_ns()
+        cache.set(_forecast_version_key(company_id), version, None)
+    return version
+
+
+def invalidate_team_forecast(company_id):
+    """Drop the cached team availability forecasts of a company"""
+    if company_id:
+        cache.set(_forecast_version_key(company_id), time.time_ns(), None)
+
+
+def _merged_spans(spans):
+    """Merge overlapping or adjacent (first, last) day offsets"""
+    merged = []
+    for first, last in sorted(spans):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], last)
+        else:
+            merged.append([first, last])
+    return merged
+
+
+def team_availability(company, days_ahead=14):
+    """
+    Active headcount and employees on leave for every day from today to
+    today + days_ahead, per department.
+
+    Approved and pending leaves overlapping the horizon are loaded in one
+    query. Each employee's leaves are merged into disjoint spans (so
+    overlapping requests count once), and all spans are added to a
+    per-department difference array whose running sum is the daily count.
+    Cached per company until a leave changes.
+
+    Returns {"start": date, "departments": [...], "headcount": [...],
+    "on_leave": [[count per day] per department]}.
+    """
+    today = timezone.now().date()
+    cache_key = f"team_forecast_{company.id}_{today.isoformat()}_{days_ahead}_{_forecast_version(company.id)}"
+    forecast = cache.get(cache_key)
+    if forecast is not None:
+        return forecast
+
+    end_date = today + timedelta(days=days_ahead)
+    headcount = dict(
+        Employee.objects.filter(company=company, is_active=True)
+        .values("department")
+        .annotate(total=Count("id"))
+        .values_list("department", "total")
+        .order_by()
+    )
+
+    spans = defaultdict(list)
+    employee_departments = {}
+    leaves = (
+        LeaveRequest.objects.filter(
+            employee__company=company,
+            employee__is_active=True,
+            status__in=["APPROVED", "PENDING"],
+        )
+        .overlapping(today, end_date)
+        .values_list("employee_id", "employee__department", "start_date", "end_date")
+    )
+    for employee_id, department, start_date, leave_end in leaves:
+        employee_departments[employee_id] = department
+        spans[employee_id].append(
+            ((max(start_date, today) - today).days, (min(leave_end, end_date) - today).days)
+        )
+
+    departments = sorted(headcount)
+    index = {department: row for row, department in enumerate(departments)}
+    diff = np.zeros((len(departments), days_ahead + 2), dtype=np.int64)
+    for employee_id, employee_spans in spans.items():
+        row = index.get(employee_departments[employee_id])
+        if row is None:  # Department changed between the two queries
+            continue
+        for first, last in _merged_spans(employee_spans):
+            diff[row, first] += 1
+            diff[row, last + 1] -= 1
+
+    forecast = {
+        "start": today,
+        "departments": departments,
+        "headcount": [headcount[department] for department in departments],
+        "on_leave": np.cumsum(diff, axis=1)[:, : days_ahead + 1].tolist(),
+    }
+    cache.set(cache_key, forecast, FORECAST_CACHE_TIMEOUT)
+    return forecast
+
 
 class LeavePrediction:
     """
@@ -96,6 +198,22 @@ class LeavePrediction:
             "predictions": predictions,
         }
 
+    @staticmethod
+    def company_leave_counts(company, months=6):
+        """
+        Map employee id -> approved leaves started in the last ``months`` months,
+        the total_leaves of analyze_leave_patterns for a whole company in one query
+        """
+        start_date = timezone.now().date() - timedelta(days=months * 30)
+        rows = (
+            LeaveRequest.objects.filter(employee__company=company, start_date__gte=start_date, status="APPROVED")
+            .values("employee_id")
+            .annotate(total=Count("id"))
+            .values_list("employee_id", "total")
+            .order_by()
+        )
+        return dict(rows)
+
     @staticmethod
     def _predict_upcoming_leaves(employee, day_frequency):
         """
@@ -127,41 +245,41 @@ class LeavePrediction:
         """
         Predict team shortage based on approved and pending leaves
         """
-        today = timezone.now().date()
-        end_date = today + timedelta(days=days_ahead)
-
-        # Get all employees
-        employees = Employee.objects.filter(company=company, is_active=True)
+        forecast = team_availability(company, days_ahead)
         if department:
-            employees = employees.filter(department=department)
-
-        total_employees = employees.count()
+            if department in forecast["departments"]:
+                row = forecast["departments"].index(department)
+                total_employees = forecast["headcount"][row]
+                on_leave = forecast["on_leave"][row]
+            else:
+                total_employees, on_leave = 0, [0] * (days_ahead + 1)
+        else:
+            total_employees = sum(forecast["headcount"])
+            on_leave = [sum(day) for day in zip(*forecast["on_leave"], strict=True)] or [0] * (days_ahead + 1)
 
-        # Get all leaves in the period
-        leaves = LeaveRequest.objects.filter(
-            employee__company=company,
-            employee__is_active=True,
-            status__in=["APPROVED", "PENDING"],
-            start_date__lte=end_date,
-            end_date__gte=today,
-        )
+        return LeavePrediction._shortage_report(forecast["start"], total_employees, on_leave)
 
-        if department:
-            leaves = leaves.filter(employee__department=department)
-
-        # Calculate daily shortage
-        daily_shortage = {}
-        for i in range(days_ahead + 1):
-            check_date = today + timedelta(days=i)
-
-            # Count employees on leave on this date
-            on_leave = (
-                leaves.filter(start_date__lte=check_date, end_date__gte=check_date)
-                .values("employee")
-                .distinct()
-                .count()
+    @staticmethod
+    def predict_department_shortages(company, days_ahead=14):
+        """
+        predict_team_shortage for every department of the company, from one forecast
+        """
+        forecast = team_availability(company, days_ahead)
+        return {
+            department: LeavePrediction._shortage_report(
+                forecast["start"], forecast["headcount"][row], forecast["on_leave"][row]
             )
+            for row, department in enumerate(forecast["departments"])
+        }
 
+    @staticmethod
+    def _shortage_report(start, total_employees, on_leave_per_day):
+        """
+        Daily shortage figures and critical days for one team
+        """
+        daily_shortage = {}
+        for offset, on_leave in enumerate(on_leave_per_day):
+            check_date = start + timedelta(days=offset)
             shortage_percentage = (on_leave / total_employees * 100) if total_employees > 0 else 0
 
             daily_shortage[check_date.strftime("%Y-%m-%d")] = {
@@ -177,8 +295,8 @@ class LeavePrediction:
 
         return {
             "total_employees": total_employees,
-            "period_start": today,
-            "period_end": end_date,
+            "period_start": start,
+            "period_end": start + timedelta(days=len(on_leave_per_day) - 1),
             "daily_shortage": daily_shortage,
             "critical_days": critical_days,
             "has_critical_shortage": len(critical_days) > 0,
@@ -0,0 +1,94 @@
+"""
+Shared LLM client for the HR chatbot.
+
+get_llm_client() returns one client per process instead of one per message:
+the OpenAI client keeps its HTTP connection pool, so consecutive questions
+reuse open connections. Set AI_CHATBOT_LLM_BACKEND = "fake" to use
+FakeLLMClient, a local stand-in with the same chat.completions.create()
+shape for tests and offline benchmarks (see the benchmark_chatbot command).
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import openai
+from django.conf import settings
+
+_lock = threading.Lock()
+_clients = {}
+
+
+def llm_backend():
+    return getattr(settings, "AI_CHATBOT_LLM_BACKEND", "openai")
+
+
+def llm_enabled():
+    """True when chatbot questions should go to an LLM"""
+    return llm_backend() == "fake" or bool(getattr(settings, "OPENAI_API_KEY", None))
+
+
+def _count_tokens(text):
+    # Rough estimate (about 4 characters per token), good enough to compare runs
+    return max(1, len(text) // 4)
+
+
+class FakeLLMClient:
+    """
+    Offline LLM with the OpenAI client's chat.completions.create() interface.
+    Answers are deterministic; ``latency`` seconds are slept per call, and
+    calls and token estimates are counted for benchmarks.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        question = messages[-1]["content"]
+        answer = f"Here is what I found about: {question}"
+        prompt_tokens = sum(_count_tokens(message["content"]) for message in messages)
+        completion_tokens = _count_tokens(answer)
+
+        with _lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=answer))],
+            usage=SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
+            ),
+        )
+
+    def reset_stats(self):
+        self.calls = self.prompt_tokens = self.completion_tokens = 0
+
+
+def get_llm_client():
+    """The process-wide client for the configured backend"""
+    backend = llm_backend()
+    if backend == "fake":
+        key = ("fake", getattr(settings, "AI_CHATBOT_FAKE_LLM_LATENCY", 0.0))
+    else:
+        key = ("openai", settings.OPENAI_API_KEY)
+
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                if backend == "fake":
+                    client = FakeLLMClient(latency=key[1])
+                else:
+                    client = openai.OpenAI(api_key=key[1], timeout=30.0, max_retries=2)
+                _clients[key] = client
+    return client
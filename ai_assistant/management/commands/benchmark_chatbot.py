@@ -0,0 +1,71 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from ai_assistant.ai_utils import HRChatbot
+from ai_assistant.llm_client import get_llm_client
+from employees.models import Employee
+
+QUESTIONS = [
+    "What is my leave balance?",
+    "When is the next holiday?",
+    "Summarise the work from home policy",
+    "How many people in my team are present today?",
+    "Give me team performance insights",
+    "What was my last net salary?",
+    "what is my leave balance",
+    "When is the next holiday ?",
+]
+
+NO_CACHE = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+LOCAL_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "chatbot-benchmark"}}
+
+
+class Command(BaseCommand):
+    help = "Compare chatbot LLM answers with and without the context/response caches, using the fake LLM backend"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--employee-id", type=int, help="Employee asking the questions (default: first active)")
+        parser.add_argument("--role", default="MANAGER", help="Chatbot role (default: MANAGER)")
+        parser.add_argument("--rounds", type=int, default=5, help="Times the question set is asked (default: 5)")
+        parser.add_argument("--latency", type=float, default=0.2, help="Fake LLM latency in seconds (default: 0.2)")
+
+    def handle(self, *args, **options):
+        employees = Employee.objects.filter(is_active=True).select_related("user", "company", "location", "manager")
+        if options.get("employee_id"):
+            employees = employees.filter(id=options["employee_id"])
+        employee = employees.first()
+        if not employee:
+            self.stdout.write(self.style.ERROR("No active employee found"))
+            return
+
+        self.stdout.write(
+            f"{len(QUESTIONS)} questions x {options['rounds']} rounds as {employee} ({options['role']}), "
+            f"fake LLM latency {options['latency']}s"
+        )
+        for label, caches in [("No caching", NO_CACHE), ("Cached", LOCAL_CACHE)]:
+            with override_settings(
+                CACHES=caches, AI_CHATBOT_LLM_BACKEND="fake", AI_CHATBOT_FAKE_LLM_LATENCY=options["latency"]
+            ):
+                self._run(label, employee, options["role"], options["rounds"])
+
+    def _run(self, label, employee, role, rounds):
+        client = get_llm_client()
+        client.reset_stats()
+        asked = 0
+
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as ctx:
+            for _ in range(rounds):
+                for question in QUESTIONS:
+                    HRChatbot._get_llm_response(question, employee, role, None)
+                    asked += 1
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"{label:<12} {elapsed * 1000 / asked:8.1f} ms/question  "
+            f"{len(ctx.captured_queries) / asked:6.1f} queries/question  "
+            f"{client.calls:4d} LLM calls  {client.prompt_tokens + client.completion_tokens:8d} tokens"
+        )
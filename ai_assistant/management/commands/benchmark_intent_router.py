@@ -0,0 +1,143 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_assistant.intent_router import router
+
+# Questions users type into the chatbot, covering every rule
+QUERIES = [
+    "clock in",
+    "Please clock me in, I just reached office",
+    "punch in",
+    "check in for today",
+    "clock out",
+    "I want to check out now",
+    "punch out please",
+    "apply sick leave for tomorrow",
+    "I need to take sick leave",
+    "apply cl",
+    "casual leave for friday",
+    "apply earned leave next week",
+    "apply leave",
+    "I want to request leave",
+    "book leave for my wedding",
+    "request leave balance",
+    "What is my leave balance?",
+    "how many leaves left do I have",
+    "check leave quota",
+    "leaves",
+    "tell me about leave",
+    "approve leave 12",
+    "reject leave 40",
+    "add holiday Diwali on 2026-11-08",
+    "hello",
+    "hi there",
+    "good morning",
+    "thanks a lot",
+    "I appreciate it",
+    "yes",
+    "okay",
+    "add a new employee",
+    "how do I onboard a new hire employee",
+    "total employees",
+    "show me the list of members",
+    "how many people work here, count them",
+    "who are the staff in my team",
+    "shift settings",
+    "how do I create a working shift",
+    "configure week off",
+    "weekoff config",
+    "manage roles and permissions",
+    "who has access to payroll",
+    "holiday list",
+    "add holiday",
+    "manage holidays",
+    "where are the api tokens",
+    "integration settings",
+    "open configuration",
+    "setup",
+    "exit process for resigned employee",
+    "how do I terminate someone",
+    "show alerts",
+    "attrition risk",
+    "missing clock outs",
+    "attendance report for this month",
+    "attendance analytics",
+    "leave history report",
+    "payroll report",
+    "salary payroll sheet",
+    "employee data export",
+    "export reports",
+    "team attendance today",
+    "is my team present",
+    "who is absent today",
+    "who is not here",
+    "late logins today",
+    "who came late",
+    "pending leave requests",
+    "show pending leave approvals",
+    "show leave requests",
+    "team performance insights",
+    "analytics for my team",
+    "subordinate list",
+    "regularize attendance for yesterday",
+    "I missed punch yesterday",
+    "what is the leave policy",
+    "work from home rules",
+    "company guidelines",
+    "employee handbook",
+    "show me the manual",
+    "how do I apply for leave",
+    "I want to take leave",
+    "portal login problem",
+    "forgot my password",
+    "account access",
+    "my attendance today",
+    "am I present",
+    "upcoming holidays",
+    "when is the next festival",
+    "download my payslip",
+    "what is my salary",
+    "view my ctc",
+    "update my profile",
+    "personal details",
+    "change my personal detail",
+    "what is my shift timing",
+    "work schedule",
+    "who is my manager",
+    "reporting supervisor",
+    "boss",
+    "what is the weather today",
+    "tell me a joke",
+    "how are you",
+    "",
+]
+
+
+class Command(BaseCommand):
+    help = "Compare the compiled intent router with per-phrase substring checks over a query corpus"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rounds", type=int, default=200, help="Times the corpus is routed (default: 200)")
+
+    def handle(self, *args, **options):
+        queries = [query.lower().strip() for query in QUERIES]
+
+        mismatches = [query for query in queries if router.classify(query) != router.classify_by_substring(query)]
+        if mismatches:
+            raise CommandError(f"Routing differs for: {mismatches}")
+
+        routed = sum(1 for query in queries if router.classify(query))
+        self.stdout.write(
+            f"{len(queries)} queries, {routed} routed to an intent, "
+            f"{sum(len(c.phrases) for _, c in router.rules)} phrases in {len(router.rules)} rules"
+        )
+        for label, classify in [("Substring", router.classify_by_substring), ("Compiled", router.classify)]:
+            started = time.perf_counter()
+            for _ in range(options["rounds"]):
+                for query in queries:
+                    classify(query)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"{label:<10} {elapsed * 1e6 / (options['rounds'] * len(queries)):8.1f} us/query")
+
+        self.stdout.write(self.style.SUCCESS("Compiled router matches substring routing on every query"))
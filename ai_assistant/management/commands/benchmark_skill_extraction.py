@@ -0,0 +1,100 @@
+import os
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from ai_assistant.enhanced_resume_parser import SKILL_MATCHER, EnhancedResumeParser
+
+FILLER = [
+    "Designed and maintained internal tools for the operations team.",
+    "Improved report generation time by rewriting the data pipeline.",
+    "Worked closely with product managers to gather requirements.",
+    "Mentored junior engineers and reviewed their code regularly.",
+    "Migrated legacy services to a containerised deployment.",
+    "Organised weekly knowledge sharing sessions across departments.",
+    "Handled vendor coordination, onboarding and regular reporting.",
+    "Google Sheets dashboards for regional growth and marketing numbers.",
+]
+
+
+def substring_scan(text):
+    """The previous extraction: one substring search per catalogue entry"""
+    text_lower = text.lower()
+    return {
+        "technical": [s for s in EnhancedResumeParser.TECHNICAL_SKILLS if s.lower() in text_lower],
+        "tools": [s for s in EnhancedResumeParser.TOOLS if s.lower() in text_lower],
+        "soft": [s for s in EnhancedResumeParser.SOFT_SKILLS if s.lower() in text_lower],
+    }
+
+
+def sample_resumes(count, seed=7):
+    """Synthetic resumes: random skills from the catalogue mixed with prose"""
+    rng = random.Random(seed)
+    catalogue = EnhancedResumeParser.TECHNICAL_SKILLS + EnhancedResumeParser.TOOLS + EnhancedResumeParser.SOFT_SKILLS
+    resumes = []
+    for index in range(count):
+        lines = [f"Candidate {index}", "Hyderabad, India", "SKILLS", ", ".join(rng.sample(catalogue, 15)), "EXPERIENCE"]
+        for _ in range(40):
+            line = rng.choice(FILLER)
+            if rng.random() < 0.3:
+                line += f" Used {rng.choice(catalogue)} and {rng.choice(catalogue)}."
+            lines.append(line)
+        resumes.append("\n".join(lines))
+    return resumes
+
+
+def resume_texts(path=None, count=200):
+    """Texts of the .pdf/.docx/.txt resumes in ``path``, or a synthetic corpus"""
+    if not path:
+        return sample_resumes(count)
+    texts = []
+    for name in sorted(os.listdir(path)):
+        file_path = os.path.join(path, name)
+        if name.lower().endswith(".txt"):
+            with open(file_path, encoding="utf-8", errors="ignore") as handle:
+                texts.append(handle.read())
+        else:
+            texts.append(EnhancedResumeParser._extract_text(file_path))
+    return [text for text in texts if text]
+
+
+class Command(BaseCommand):
+    help = "Compare single-pass skill extraction with per-skill substring scans over a resume corpus"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", help="Directory of .pdf/.docx/.txt resumes (default: synthetic corpus)")
+        parser.add_argument("--count", type=int, default=200, help="Synthetic resumes to generate (default: 200)")
+        parser.add_argument("--rounds", type=int, default=5, help="Passes over the corpus (default: 5)")
+
+    def handle(self, *args, **options):
+        texts = resume_texts(options.get("path"), options["count"])
+        if not texts:
+            self.stdout.write(self.style.ERROR("No resume text found"))
+            return
+
+        size_mb = sum(len(text) for text in texts) / 1e6
+        self.stdout.write(f"{len(texts)} resumes, {size_mb:.2f} MB of text, {options['rounds']} rounds")
+        for label, extract in [("Substring", substring_scan), ("Compiled", SKILL_MATCHER.find)]:
+            started = time.perf_counter()
+            for _ in range(options["rounds"]):
+                for text in texts:
+                    extract(text)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{label:<10} {len(texts) * options['rounds'] / elapsed:9.0f} resumes/s  "
+                f"{size_mb * options['rounds'] / elapsed:7.2f} MB/s"
+            )
+
+        # What the token boundaries change
+        dropped = added = 0
+        for text in texts:
+            before, after = substring_scan(text), SKILL_MATCHER.find(text)
+            for category in after:
+                dropped += len(set(before[category]) - set(after[category]))
+                added += len(set(after[category]) - set(before[category]))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Token boundaries dropped {dropped} substring-only matches and added {added} skills"
+            )
+        )
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from ai_assistant import resume_similarity, resume_text_cache
+from ai_assistant.models import ResumeParsingJob
+from ai_assistant.resume_batch import index_signature, phone_digits
+
+
+class Command(BaseCommand):
+    help = "Backfill the near-duplicate index (MinHash signatures, LSH buckets, phone digits) for parsed resumes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true", help="Recompute signatures that already exist")
+
+    def handle(self, *args, **options):
+        jobs = ResumeParsingJob.objects.filter(status="PROCESSED").order_by("id")
+        if not options["rebuild"]:
+            jobs = jobs.filter(minhash_signature__isnull=True)
+
+        indexed = skipped = 0
+        for job in jobs.iterator(chunk_size=200):
+            text = resume_text_cache.text_for_job(job)
+            job.minhash_signature = resume_similarity.signature(text) if text else None
+            job.parsed_phone_digits = phone_digits(job.parsed_phone)
+            job.save(update_fields=["minhash_signature", "parsed_phone_digits", "content_hash"])
+            index_signature(job)
+            if job.minhash_signature:
+                indexed += 1
+            else:
+                skipped += 1
+
+        self.stdout.write(self.style.SUCCESS(f"{indexed} resumes indexed, {skipped} without readable text"))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from ai_assistant.models import ResumeBatch
+from ai_assistant.resume_batch import default_workers, process_batch, process_pending_batches
+
+
+class Command(BaseCommand):
+    help = "Parse queued resume batches in a process pool (run every few minutes from cron to pick up leftovers)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-id", type=int, help="Process (or retry) a specific batch only")
+        parser.add_argument("--workers", type=int, help="Parser processes (default: RESUME_PARSER_WORKERS or up to 4)")
+
+    def handle(self, *args, **options):
+        workers = options.get("workers") or default_workers()
+        batch_id = options.get("batch_id")
+        if batch_id:
+            if not ResumeBatch.objects.filter(id=batch_id).exists():
+                self.stdout.write(self.style.ERROR(f"Resume batch {batch_id} not found"))
+                return
+            batch = process_batch(batch_id, workers)
+            if not batch:
+                self.stdout.write(self.style.WARNING(f"Resume batch {batch_id} is already running or completed"))
+                return
+            batches = [batch]
+        else:
+            batches = process_pending_batches(workers)
+
+        for batch in batches:
+            progress = batch.progress()
+            self.stdout.write(
+                f"Batch {batch.id}: {progress['processed']} parsed, {progress['failed']} failed, "
+                f"{progress['duplicates']} duplicates"
+            )
+        self.stdout.write(self.style.SUCCESS(f"{len(batches)} resume batches processed with {workers} workers"))
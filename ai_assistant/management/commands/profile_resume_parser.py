@@ -0,0 +1,39 @@
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from ai_assistant.enhanced_resume_parser import EnhancedResumeParser
+from ai_assistant.management.commands.benchmark_skill_extraction import resume_texts
+
+
+class Command(BaseCommand):
+    help = "Time each resume field extractor over a resume corpus to see which one dominates parse time"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", help="Directory of .pdf/.docx/.txt resumes (default: synthetic corpus)")
+        parser.add_argument("--count", type=int, default=200, help="Synthetic resumes to generate (default: 200)")
+
+    def handle(self, *args, **options):
+        texts = resume_texts(options.get("path"), options["count"])
+        if not texts:
+            self.stdout.write(self.style.ERROR("No resume text found"))
+            return
+
+        totals = defaultdict(float)
+
+        def timer(field, seconds):
+            totals[field] += seconds
+
+        started = time.perf_counter()
+        for text in texts:
+            EnhancedResumeParser.parse_text(text, timer=timer)
+        elapsed = time.perf_counter() - started
+
+        measured = sum(totals.values()) or 1
+        self.stdout.write(f"{len(texts)} resumes in {elapsed:.2f}s ({len(texts) / elapsed:.0f} resumes/s)")
+        for field, seconds in sorted(totals.items(), key=lambda item: item[1], reverse=True):
+            self.stdout.write(
+                f"{field:<24} {seconds * 1000 / len(texts):8.3f} ms/resume  {seconds / measured:6.1%}"
+            )
+        self.stdout.write(self.style.SUCCESS("Field extractors timed"))
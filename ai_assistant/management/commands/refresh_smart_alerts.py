@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from ai_assistant.alert_engine import refresh_all_companies, refresh_company_alerts
+from companies.models import Company
+
+
+class Command(BaseCommand):
+    help = "Re-evaluate smart notification alerts for all active employees (run hourly by core.email_scheduler)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--company-id", type=int, help="Refresh a specific company only")
+
+    def handle(self, *args, **options):
+        company_id = options.get("company_id")
+        if company_id:
+            company = Company.objects.filter(id=company_id).first()
+            if not company:
+                self.stdout.write(self.style.ERROR(f"Company {company_id} not found"))
+                return
+            active = refresh_company_alerts(company)
+        else:
+            active = refresh_all_companies()
+
+        self.stdout.write(self.style.SUCCESS(f"{active} active smart alerts"))
@@ -0,0 +1,66 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from ai_assistant import resume_text_cache
+from ai_assistant.enhanced_resume_parser import EnhancedResumeParser
+from ai_assistant.models import ResumeParsingJob
+from ai_assistant.resume_batch import apply_parsed_data, default_workers
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-run the resume field extractors over the cached extracted text of parsed resumes "
+        "(after a parser change) without reading the resume files"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-id", type=int, help="Reparse one resume batch only")
+        parser.add_argument("--workers", type=int, help="Parser processes (default: RESUME_PARSER_WORKERS or up to 4)")
+        parser.add_argument(
+            "--extract-missing",
+            action="store_true",
+            help="Extract (and cache) the text of resumes not in the cache yet instead of skipping them",
+        )
+
+    def handle(self, *args, **options):
+        workers = options.get("workers") or default_workers()
+        jobs = ResumeParsingJob.objects.filter(status__in=["PROCESSED", "FAILED"]).order_by("id")
+        if options.get("batch_id"):
+            jobs = jobs.filter(batch_id=options["batch_id"])
+
+        jobs = list(jobs)
+        texts = resume_text_cache.cached_texts({job.content_hash for job in jobs if job.content_hash})
+        pending, skipped = [], 0
+        for job in jobs:
+            text = texts.get(job.content_hash)
+            if text is None and options["extract_missing"]:
+                text = resume_text_cache.text_for_job(job)
+            if text:
+                pending.append((job, text))
+            else:
+                skipped += 1
+
+        started = time.perf_counter()
+        reparsed = failed = 0
+        for (job, _), parsed_data in zip(pending, self._parse([text for _, text in pending], workers), strict=True):
+            if parsed_data.get("error") and not parsed_data.get("name"):
+                failed += 1
+                continue  # Keep the previous result
+            apply_parsed_data(job, parsed_data)
+            reparsed += 1
+        elapsed = time.perf_counter() - started
+
+        rate = reparsed / elapsed if elapsed else 0
+        self.stdout.write(f"{reparsed} resumes reparsed in {elapsed:.2f}s ({rate:.0f} resumes/s), {failed} failed")
+        self.stdout.write(self.style.SUCCESS(f"Done; {skipped} resumes skipped without cached text"))
+
+    def _parse(self, texts, workers):
+        """parse_text over the texts, in order; a spawned process pool for large runs"""
+        if workers <= 1 or len(texts) < 2 * workers:
+            return map(EnhancedResumeParser.parse_text, texts)
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            return list(executor.map(EnhancedResumeParser.parse_text, texts, chunksize=16))
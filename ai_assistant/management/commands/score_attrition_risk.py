@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from ai_assistant.attrition_scoring import score_all_companies, score_company
+from companies.models import Company
+
+
+class Command(BaseCommand):
+    help = "Recompute attrition risk scores for all active employees (run hourly by core.email_scheduler)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--company-id", type=int, help="Score a specific company only")
+
+    def handle(self, *args, **options):
+        company_id = options.get("company_id")
+        if company_id:
+            company = Company.objects.filter(id=company_id).first()
+            if not company:
+                self.stdout.write(self.style.ERROR(f"Company {company_id} not found"))
+                return
+            scored = score_company(company)
+        else:
+            scored = score_all_companies()
+
+        self.stdout.write(self.style.SUCCESS(f"Scored attrition risk for {scored} employees"))
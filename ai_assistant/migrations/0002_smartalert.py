@@ -0,0 +1,39 @@
+# Generated by Django 4.2.27 on 2026-10-19 03:11
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0026_leaverequest_period_gist'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('companies', '0018_auto_update_location_currency'),
+        ('ai_assistant', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SmartAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('audience', models.CharField(choices=[('EMPLOYEE', 'Employee'), ('MANAGER', 'Manager')], max_length=10)),
+                ('alert_type', models.CharField(choices=[('MISSED_CLOCK_OUT', 'Missed Clock-Out'), ('LOP_THRESHOLD', 'LOP Threshold'), ('CONTRACT_EXPIRY', 'Contract Expiry'), ('LATE_LOGIN_PATTERN', 'Late Login Pattern'), ('PENDING_APPROVALS', 'Pending Approvals')], max_length=30)),
+                ('severity', models.CharField(default='MEDIUM', max_length=10)),
+                ('payload', models.JSONField(default=dict)),
+                ('dedup_key', models.CharField(max_length=150, unique=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='smart_alerts', to='companies.company')),
+                ('employee', models.ForeignKey(blank=True, help_text='Employee the alert is about (empty for manager summaries)', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='smart_alerts', to='employees.employee')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='smart_alerts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-updated_at'],
+                'indexes': [models.Index(fields=['recipient', 'is_active'], name='smart_alert_recipient_idx')],
+            },
+        ),
+    ]
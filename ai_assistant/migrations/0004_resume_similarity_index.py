@@ -0,0 +1,52 @@
+# Generated by Django 4.2.27 on 2026-10-19 03:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_assistant', '0003_resume_batches'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resumeparsingjob',
+            name='duplicate_similarity',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='resumeparsingjob',
+            name='minhash_signature',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='resumeparsingjob',
+            name='parsed_phone_digits',
+            field=models.CharField(blank=True, db_index=True, max_length=15),
+        ),
+        migrations.AlterField(
+            model_name='resumeparsingjob',
+            name='duplicate_check_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.AlterField(
+            model_name='resumeparsingjob',
+            name='parsed_email',
+            field=models.EmailField(blank=True, db_index=True, max_length=254, null=True),
+        ),
+        migrations.AlterField(
+            model_name='resumeparsingjob',
+            name='parsed_phone',
+            field=models.CharField(blank=True, db_index=True, max_length=50, null=True),
+        ),
+        migrations.CreateModel(
+            name='ResumeSignatureBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.BigIntegerField(db_index=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='signature_bands', to='ai_assistant.resumeparsingjob')),
+            ],
+        ),
+    ]
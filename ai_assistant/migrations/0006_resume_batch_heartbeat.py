@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-19 04:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_assistant', '0005_resume_text_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resumebatch',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
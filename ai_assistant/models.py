@@ -32,6 +32,64 @@ class AttritionRisk(models.Model):
         return f"{self.employee} - {self.risk_level} ({self.risk_score}%)"
 
 
+class ResumeBatch(models.Model):
+    """
+    A batch upload of resumes (several files or a zip). Each file becomes a
+    ResumeParsingJob; ai_assistant.resume_batch parses them in the background.
+    """
+
+    STATUS_CHOICES = [
+        ("PENDING", "Pending"),
+        ("RUNNING", "Running"),
+        ("COMPLETED", "Completed"),
+        ("FAILED", "Failed"),
+    ]
+
+    company = models.ForeignKey(
+        "companies.Company",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="resume_batches",
+    )
+    uploaded_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="resume_batches",
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="PENDING")
+    total_files = models.PositiveIntegerField(default=0)
+    error_message = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Touched by the worker while RUNNING; a stale one means the worker died
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def progress(self):
+        """Job counts per status, plus done/percent for progress bars"""
+        counts = dict(
+            self.jobs.values_list("status").annotate(total=models.Count("id")).order_by()
+        )
+        done = counts.get("PROCESSED", 0) + counts.get("FAILED", 0)
+        return {
+            "total": self.total_files,
+            "pending": counts.get("PENDING", 0) + counts.get("PROCESSING", 0),
+            "processed": counts.get("PROCESSED", 0),
+            "failed": counts.get("FAILED", 0),
+            "duplicates": self.jobs.filter(is_duplicate=True).count(),
+            "done": done,
+            "percent": round(done * 100 / self.total_files) if self.total_files else 100,
+        }
+
+    def __str__(self):
+        return f"Resume batch {self.id} ({self.total_files} files, {self.status})"
+
+
 class ResumeParsingJob(models.Model):
     """
     Enhanced resume parsing with comprehensive data extraction
@@ -41,12 +99,23 @@ class ResumeParsingJob(models.Model):
     uploaded_at = models.DateTimeField(auto_now_add=True)
     status = models.CharField(
         max_length=20, default="PENDING"
-    )  # PENDING, PROCESSED, FAILED
+    )  # PENDING, PROCESSING, PROCESSED, FAILED
+    batch = models.ForeignKey(
+        ResumeBatch, null=True, blank=True, on_delete=models.CASCADE, related_name="jobs"
+    )
+    original_filename = models.CharField(max_length=255, blank=True)
+    content_hash = models.CharField(
+        max_length=64, blank=True, db_index=True
+    )  # SHA-256 of the file; key of its ResumeText
+    error_message = models.TextField(blank=True)
 
     # Basic Details
     parsed_name = models.CharField(max_length=255, null=True, blank=True)
-    parsed_email = models.EmailField(null=True, blank=True)
-    parsed_phone = models.CharField(max_length=50, null=True, blank=True)
+    parsed_email = models.EmailField(null=True, blank=True, db_index=True)
+    parsed_phone = models.CharField(max_length=50, null=True, blank=True, db_index=True)
+    parsed_phone_digits = models.CharField(
+        max_length=15, blank=True, db_index=True
+    )  # Last 10 digits, so "+91 98765 43210" matches "9876543210"
     parsed_location = models.CharField(max_length=255, null=True, blank=True)
     parsed_linkedin = models.URLField(null=True, blank=True)
     parsed_github = models.URLField(null=True, blank=True)
@@ -89,11 +158,22 @@ class ResumeParsingJob(models.Model):
     )  # IT, Finance, etc.
 
     # Duplicate Detection
-    duplicate_check_hash = models.CharField(max_length=64, null=True, blank=True)
+    duplicate_check_hash = models.CharField(max_length=64, null=True, blank=True, db_index=True)
     is_duplicate = models.BooleanField(default=False)
     duplicate_of = models.ForeignKey(
         "self", null=True, blank=True, on_delete=models.SET_NULL
     )
+    duplicate_similarity = models.FloatField(
+        null=True, blank=True
+    )  # Estimated text similarity to duplicate_of (1.0 for exact matches)
+    minhash_signature = models.BinaryField(
+        null=True, blank=True
+    )  # See ai_assistant.resume_similarity
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["batch", "status"], name="resume_job_batch_status_idx"),
+        ]
 
     def __str__(self):
         return (
@@ -101,6 +181,44 @@ class ResumeParsingJob(models.Model):
         )
 
 
+class ResumeText(models.Model):
+    """
+    Extracted text of a resume file, keyed by the SHA-256 of the file bytes
+    and the parser's EXTRACTOR_VERSION. Re-uploads and re-parses of the same
+    file reuse it instead of running PDF extraction again.
+    """
+
+    content_hash = models.CharField(max_length=64)
+    extractor_version = models.PositiveSmallIntegerField()
+    text = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["content_hash", "extractor_version"], name="unique_resume_text"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Resume text {self.content_hash[:12]} (v{self.extractor_version})"
+
+
+class ResumeSignatureBand(models.Model):
+    """
+    LSH index of resume signatures: one row per band of a resume's MinHash
+    signature. Resumes sharing a bucket are near-duplicate candidates.
+    """
+
+    job = models.ForeignKey(
+        ResumeParsingJob, on_delete=models.CASCADE, related_name="signature_bands"
+    )
+    bucket = models.BigIntegerField(db_index=True)
+
+    def __str__(self):
+        return f"Resume {self.job_id} bucket {self.bucket}"
+
+
 class ChatMessage(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="chat_messages"
@@ -114,3 +232,60 @@ class ChatMessage(models.Model):
 
     def __str__(self):
         return f"Chat by {self.user.username} at {self.timestamp}"
+
+
+class SmartAlert(models.Model):
+    """
+    Precomputed smart notification. Rows are written by
+    ai_assistant.alert_engine; dedup_key identifies one alert (e.g. one missed
+    clock-out per employee and day) so re-evaluating updates it in place.
+    """
+
+    AUDIENCE_CHOICES = [
+        ("EMPLOYEE", "Employee"),
+        ("MANAGER", "Manager"),
+    ]
+
+    ALERT_TYPE_CHOICES = [
+        ("MISSED_CLOCK_OUT", "Missed Clock-Out"),
+        ("LOP_THRESHOLD", "LOP Threshold"),
+        ("CONTRACT_EXPIRY", "Contract Expiry"),
+        ("LATE_LOGIN_PATTERN", "Late Login Pattern"),
+        ("PENDING_APPROVALS", "Pending Approvals"),
+    ]
+
+    recipient = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="smart_alerts"
+    )
+    employee = models.ForeignKey(
+        Employee,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="smart_alerts",
+        help_text="Employee the alert is about (empty for manager summaries)",
+    )
+    company = models.ForeignKey(
+        "companies.Company", on_delete=models.CASCADE, related_name="smart_alerts"
+    )
+    audience = models.CharField(max_length=10, choices=AUDIENCE_CHOICES)
+    alert_type = models.CharField(max_length=30, choices=ALERT_TYPE_CHOICES)
+    severity = models.CharField(max_length=10, default="MEDIUM")
+    payload = models.JSONField(default=dict)
+    dedup_key = models.CharField(max_length=150, unique=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-updated_at"]
+        indexes = [
+            models.Index(fields=["recipient", "is_active"], name="smart_alert_recipient_idx"),
+        ]
+
+    def as_dict(self):
+        """The alert in the shape SmartNotifications checks return"""
+        return {"alert": True, "type": self.alert_type, "severity": self.severity, **self.payload}
+
+    def __str__(self):
+        return f"{self.alert_type} for {self.recipient} ({self.severity})"
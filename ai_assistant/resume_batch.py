@@ -0,0 +1,359 @@
+"""
+Batch resume parsing.
+
+queue_resumes() stores an upload of many resumes (or zip files of resumes)
+as a ResumeBatch with one PENDING ResumeParsingJob per file and starts it on
+a background thread once the request's transaction commits, so the request
+returns immediately. The thread parses the files in a bounded pool of worker
+processes (parsing is CPU-bound: PDF text extraction plus regex passes) and
+writes the results in upload order as they arrive, which is what the
+progress page polls.
+
+Batches left PENDING, or RUNNING without a heartbeat for
+STALE_BATCH_AFTER (the worker died, e.g. in a restart), are picked up by
+the process_resume_jobs command. Files whose text was extracted before (same
+bytes) skip extraction through resume_text_cache.
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from . import resume_similarity, resume_text_cache
+from .enhanced_resume_parser import EnhancedResumeParser
+from .models import ResumeBatch, ResumeParsingJob, ResumeSignatureBand
+
+logger = logging.getLogger(__name__)
+
+RESUME_EXTENSIONS = (".pdf", ".doc", ".docx")
+MAX_BATCH_FILES = getattr(settings, "RESUME_BATCH_MAX_FILES", 500)
+MAX_RESUME_BYTES = getattr(settings, "RESUME_MAX_FILE_BYTES", 10 * 1024 * 1024)
+NEAR_DUPLICATE_THRESHOLD = getattr(settings, "RESUME_NEAR_DUPLICATE_THRESHOLD", 0.8)
+NEAR_DUPLICATE_CANDIDATES = 50
+STALE_BATCH_AFTER = timedelta(minutes=getattr(settings, "RESUME_BATCH_STALE_MINUTES", 15))
+
+
+def default_workers():
+    return getattr(settings, "RESUME_PARSER_WORKERS", None) or min(4, os.cpu_count() or 1)
+
+
+def expand_uploads(files):
+    """(file name, ContentFile) for every resume in the uploads, unpacking zips"""
+    resumes = []
+    for upload in files:
+        name = os.path.basename(upload.name)
+        if name.lower().endswith(".zip"):
+            with zipfile.ZipFile(upload) as archive:
+                for info in archive.infolist():
+                    entry = os.path.basename(info.filename)
+                    if (
+                        info.is_dir()
+                        or info.filename.startswith("__MACOSX/")
+                        or not entry.lower().endswith(RESUME_EXTENSIONS)
+                        or info.file_size > MAX_RESUME_BYTES
+                    ):
+                        continue
+                    resumes.append((entry, ContentFile(archive.read(info), name=entry)))
+        elif name.lower().endswith(RESUME_EXTENSIONS) and upload.size <= MAX_RESUME_BYTES:
+            resumes.append((name, upload))
+
+        if len(resumes) > MAX_BATCH_FILES:
+            raise ValueError(f"A batch can have at most {MAX_BATCH_FILES} resumes.")
+    return resumes
+
+
+def queue_resumes(files, uploaded_by=None, company=None):
+    """
+    Create a batch with one PENDING job per resume and start parsing it once
+    the current transaction commits. Raises ValueError when the upload holds
+    no usable resume or too many.
+    """
+    resumes = expand_uploads(files)
+    if not resumes:
+        raise ValueError("No PDF or Word resumes found in the upload.")
+
+    with transaction.atomic():
+        batch = ResumeBatch.objects.create(company=company, uploaded_by=uploaded_by, total_files=len(resumes))
+        for name, content in resumes:
+            job = ResumeParsingJob(batch=batch, original_filename=name)
+            job.resume.save(name, content, save=False)
+            job.save()
+
+        def start():
+            thread = threading.Thread(target=_run_queued_batch, args=(batch.pk,), daemon=True)
+            thread.start()
+
+        transaction.on_commit(start)
+
+    return batch
+
+
+def phone_digits(phone):
+    """Last 10 digits of a phone number, for format-independent matching"""
+    return "".join(c for c in phone or "" if c.isdigit())[-10:]
+
+
+def find_near_duplicate(signature, before_id=None):
+    """
+    The processed resume most similar to ``signature`` if it reaches
+    NEAR_DUPLICATE_THRESHOLD, as (job, similarity), else (None, 0.0).
+    Only resumes sharing an LSH bucket, and with ``before_id`` only those
+    uploaded before that job, are compared.
+    """
+    candidates = ResumeSignatureBand.objects.filter(
+        bucket__in=resume_similarity.band_buckets(signature), job__status="PROCESSED"
+    )
+    if before_id is not None:
+        candidates = candidates.filter(job_id__lt=before_id)
+    candidates = (
+        candidates.values("job_id")
+        .annotate(shared=Count("id"))
+        .order_by("-shared")[:NEAR_DUPLICATE_CANDIDATES]
+    )
+    best, best_score = None, 0.0
+    jobs = ResumeParsingJob.objects.filter(id__in=[row["job_id"] for row in candidates]).only("id", "minhash_signature")
+    for candidate in jobs:
+        score = resume_similarity.similarity(signature, candidate.minhash_signature)
+        if score >= NEAR_DUPLICATE_THRESHOLD and score > best_score:
+            best, best_score = candidate, score
+    return best, best_score
+
+
+def index_signature(job):
+    """(Re)write the LSH buckets of a job's signature"""
+    ResumeSignatureBand.objects.filter(job=job).delete()
+    if job.minhash_signature:
+        ResumeSignatureBand.objects.bulk_create(
+            [
+                ResumeSignatureBand(job=job, bucket=bucket)
+                for bucket in resume_similarity.band_buckets(job.minhash_signature)
+            ]
+        )
+
+
+def apply_parsed_data(job, parsed_data):
+    """
+    Copy parser output onto the job, flag duplicates and mark it PROCESSED.
+    Only earlier uploads count as originals, so reparsing a job never flags
+    it against the copies that were flagged against it.
+    """
+    # Basic Details
+    job.parsed_name = parsed_data.get("name")
+    job.parsed_email = (parsed_data.get("email") or "").lower() or None
+    job.parsed_phone = parsed_data.get("phone")
+    job.parsed_phone_digits = phone_digits(job.parsed_phone)
+    job.parsed_location = parsed_data.get("location")
+    job.parsed_linkedin = parsed_data.get("linkedin")
+    job.parsed_github = parsed_data.get("github")
+    job.parsed_portfolio = parsed_data.get("portfolio")
+
+    # Skills
+    job.parsed_skills = parsed_data.get("skills")  # Legacy comma-separated
+    job.parsed_skills_json = parsed_data.get("skills_json")  # Categorized JSON
+
+    # Education
+    job.parsed_education = parsed_data.get("education")
+
+    # Experience
+    experience = parsed_data.get("experience", [])
+    if experience:
+        for exp in experience:
+            if not exp.get("end_date"):
+                exp["end_date"] = "Present"
+    job.parsed_experience = experience
+    job.total_experience_years = parsed_data.get("total_experience_years")
+
+    # Projects
+    job.parsed_projects = parsed_data.get("projects")
+
+    # Certifications
+    job.parsed_certifications = parsed_data.get("certifications")
+
+    # Categorization
+    job.candidate_type = parsed_data.get("candidate_type")
+    job.role_fit = parsed_data.get("role_fit")
+    job.domain = parsed_data.get("domain")
+
+    # Duplicate Detection
+    job.duplicate_check_hash = parsed_data.get("duplicate_check_hash")
+    job.minhash_signature = parsed_data.get("similarity_signature")
+    job.is_duplicate = False
+    job.duplicate_of = None
+    job.duplicate_similarity = None
+
+    # Check for duplicates
+    earlier = ResumeParsingJob.objects.filter(id__lt=job.id, status="PROCESSED").order_by("id")
+    duplicate = earlier.filter(duplicate_check_hash=job.duplicate_check_hash).first()
+
+    if duplicate:
+        job.is_duplicate = True
+        job.duplicate_of = duplicate
+        job.duplicate_similarity = 1.0
+
+    # Same CV in another file (re-exported PDF, small edits)
+    elif job.minhash_signature:
+        near_duplicate, score = find_near_duplicate(job.minhash_signature, before_id=job.id)
+        if near_duplicate:
+            job.is_duplicate = True
+            job.duplicate_of = near_duplicate
+            job.duplicate_similarity = score
+
+    # Also check by email/phone (indexed lookups)
+    if not job.is_duplicate and (job.parsed_email or job.parsed_phone_digits):
+        email_duplicate = earlier.filter(parsed_email=job.parsed_email).first() if job.parsed_email else None
+        phone_duplicate = (
+            earlier.filter(parsed_phone_digits=job.parsed_phone_digits).first() if job.parsed_phone_digits else None
+        )
+
+        if email_duplicate or phone_duplicate:
+            job.is_duplicate = True
+            job.duplicate_of = email_duplicate or phone_duplicate
+
+    job.status = "PROCESSED"
+    job.error_message = ""
+    with transaction.atomic():
+        job.save()
+        index_signature(job)
+    return job
+
+
+def _record_result(job, parsed_data, text="", texts=None):
+    """Save a parse result; newly extracted text goes into the text cache"""
+    if text and texts is not None and job.content_hash not in texts:
+        resume_text_cache.store_text(job.content_hash, text)
+        texts[job.content_hash] = text
+
+    if parsed_data.get("error") and not parsed_data.get("name"):
+        job.status = "FAILED"
+        job.error_message = parsed_data["error"]
+        job.save(update_fields=["status", "error_message", "content_hash"])
+    else:
+        apply_parsed_data(job, parsed_data)
+
+
+def _hash_jobs(jobs):
+    """Set each job's content_hash and return the cached texts for them"""
+    for job in jobs:
+        try:
+            job.content_hash = resume_text_cache.file_hash(job.resume.path)
+        except (OSError, ValueError):
+            job.content_hash = ""  # Missing file: the parser reports it
+    return resume_text_cache.cached_texts({job.content_hash for job in jobs if job.content_hash})
+
+
+def parse_job(job):
+    """Parse a single job's file through the text cache and save the result"""
+    texts = _hash_jobs([job])
+    text, parsed_data = EnhancedResumeParser.extract_and_parse(job.resume.path, texts.get(job.content_hash))
+    _record_result(job, parsed_data, text, texts)
+    return parsed_data
+
+
+def parse_jobs(jobs, workers=1, on_result=None):
+    """
+    Parse the jobs' files, up to ``workers`` at a time in separate processes,
+    and save the results in id order as soon as they are ready (calling
+    ``on_result`` after each). Returns the number parsed.
+    """
+    jobs = sorted(jobs, key=lambda job: job.id)
+    ResumeParsingJob.objects.filter(id__in=[job.id for job in jobs]).update(status="PROCESSING")
+    texts = _hash_jobs(jobs)
+
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            text, parsed_data = EnhancedResumeParser.extract_and_parse(job.resume.path, texts.get(job.content_hash))
+            _record_result(job, parsed_data, text, texts)
+            if on_result:
+                on_result()
+        return len(jobs)
+
+    # Spawned workers: this may run on a thread of a web process, where fork is unsafe.
+    # extract_and_parse only needs the file path (and cached text), so the workers never touch Django.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), mp_context=context) as executor:
+        futures = {
+            executor.submit(
+                EnhancedResumeParser.extract_and_parse, job.resume.path, texts.get(job.content_hash)
+            ): job
+            for job in jobs
+        }
+        # A job is only checked against earlier ones (apply_parsed_data), so those must be saved first
+        unsaved, results = deque(jobs), {}
+        for future in as_completed(futures):
+            try:
+                results[futures[future].id] = future.result()
+            except Exception as e:
+                results[futures[future].id] = "", {"error": str(e)}
+            while unsaved and unsaved[0].id in results:
+                job = unsaved.popleft()
+                text, parsed_data = results.pop(job.id)
+                _record_result(job, parsed_data, text, texts)
+                if on_result:
+                    on_result()
+    return len(jobs)
+
+
+def _claimable():
+    """PENDING or FAILED batches, and RUNNING ones whose worker stopped beating"""
+    stale = Q(heartbeat_at__isnull=True) | Q(heartbeat_at__lt=timezone.now() - STALE_BATCH_AFTER)
+    return Q(status__in=["PENDING", "FAILED"]) | (Q(status="RUNNING") & stale)
+
+
+def _heartbeat(batch_id):
+    ResumeBatch.objects.filter(pk=batch_id, status="RUNNING").update(heartbeat_at=timezone.now())
+
+
+def process_batch(batch_id, workers=None):
+    """Parse every pending job of a batch and mark the batch COMPLETED"""
+    claimed = ResumeBatch.objects.filter(_claimable(), pk=batch_id).update(
+        status="RUNNING", heartbeat_at=timezone.now()
+    )
+    if not claimed:
+        return None  # Already running or done
+
+    batch = ResumeBatch.objects.get(pk=batch_id)
+    try:
+        # PROCESSING jobs were cut off with a dead worker: parse them again
+        jobs = batch.jobs.filter(status__in=["PENDING", "PROCESSING"]).order_by("id")
+        parse_jobs(jobs, workers or default_workers(), on_result=lambda: _heartbeat(batch_id))
+    except Exception as e:
+        logger.exception(f"Resume batch {batch_id} failed")
+        batch.status = "FAILED"
+        batch.error_message = str(e)
+    else:
+        batch.status = "COMPLETED"
+        batch.error_message = ""
+    batch.completed_at = timezone.now()
+    batch.save(update_fields=["status", "error_message", "completed_at"])
+    return batch
+
+
+def _run_queued_batch(batch_id):
+    """Background thread body for a queued batch"""
+    try:
+        process_batch(batch_id)
+    finally:
+        # The thread's own connection is not closed by the request cycle
+        connections.close_all()
+
+
+def process_pending_batches(workers=None):
+    """Run every PENDING (or stale RUNNING) batch, oldest first; returns the batches processed"""
+    processed = []
+    stranded = ResumeBatch.objects.filter(_claimable()).exclude(status="FAILED")
+    for batch_id in stranded.order_by("created_at").values_list("id", flat=True):
+        batch = process_batch(batch_id, workers)
+        if batch:
+            processed.append(batch)
+    return processed
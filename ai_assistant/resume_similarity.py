@@ -0,0 +1,81 @@
+"""
+MinHash signatures for near-duplicate resume detection.
+
+The SHA-256 duplicate hash only catches byte-identical text; the same CV
+re-exported as another PDF differs in spacing, line breaks or a changed
+line. Here a resume's normalized text (lowercase letters and digits only)
+is cut into overlapping character shingles, and each shingle set is
+summarized by NUM_HASHES minimum hash values. Two signatures agree in
+roughly the same fraction of positions as the shingle sets overlap
+(Jaccard similarity).
+
+For lookups the signature is split into BANDS bands; resumes sharing any
+band bucket are candidates (LSH), so finding near duplicates is an indexed
+lookup on ResumeSignatureBand.bucket instead of a scan of every resume.
+Everything here is plain numpy so it can run in the parser worker processes.
+"""
+
+import hashlib
+import re
+
+import numpy as np
+
+SHINGLE_SIZE = 9
+NUM_HASHES = 128
+BANDS = 16
+ROWS_PER_BAND = NUM_HASHES // BANDS
+
+# Fixed seed: signatures are stored and compared across processes and releases
+_rng = np.random.default_rng(20240601)
+_MULTIPLIERS = _rng.integers(1, 2**63, size=NUM_HASHES, dtype=np.uint64) | np.uint64(1)
+_OFFSETS = _rng.integers(0, 2**63, size=NUM_HASHES, dtype=np.uint64)
+_BASE = np.uint64(1099511628211)
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text):
+    """Lowercase letters and digits only; layout and punctuation do not count"""
+    return _NON_ALNUM.sub("", (text or "").lower())
+
+
+def _shingle_hashes(normalized):
+    codes = np.frombuffer(normalized.encode("ascii", "ignore"), dtype=np.uint8).astype(np.uint64)
+    if len(codes) < SHINGLE_SIZE:
+        return np.unique(codes) if len(codes) else codes
+    # Polynomial hash of every SHINGLE_SIZE window (wrapping uint64 arithmetic)
+    hashes = np.zeros(len(codes) - SHINGLE_SIZE + 1, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for offset in range(SHINGLE_SIZE):
+            hashes = hashes * _BASE + codes[offset : offset + len(hashes)]
+    return np.unique(hashes)
+
+
+def signature(text):
+    """MinHash signature of a resume's text as bytes (None for empty text)"""
+    shingles = _shingle_hashes(normalize(text))
+    if not len(shingles):
+        return None
+    with np.errstate(over="ignore"):
+        # Multiply-shift hashing: one row of hash values per permutation
+        hashed = (shingles[None, :] * _MULTIPLIERS[:, None] + _OFFSETS[:, None]) >> np.uint64(32)
+    return hashed.min(axis=1).astype("<u4").tobytes()
+
+
+def similarity(signature_a, signature_b):
+    """Estimated Jaccard similarity of two signatures (0.0 - 1.0)"""
+    a = np.frombuffer(bytes(signature_a), dtype="<u4")
+    b = np.frombuffer(bytes(signature_b), dtype="<u4")
+    if len(a) != len(b) or not len(a):
+        return 0.0
+    return float(np.mean(a == b))
+
+
+def band_buckets(signature_bytes):
+    """One signed 64-bit bucket per band; the band number is part of the hash"""
+    buckets = []
+    width = ROWS_PER_BAND * 4
+    for band in range(BANDS):
+        chunk = bytes([band]) + bytes(signature_bytes)[band * width : (band + 1) * width]
+        buckets.append(int.from_bytes(hashlib.blake2b(chunk, digest_size=8).digest(), "big", signed=True))
+    return buckets
@@ -0,0 +1,74 @@
+"""
+Content-addressed cache of extracted resume text.
+
+PDF text extraction dominates resume parse time, and the same file is often
+uploaded again or re-parsed after a parser change. The extracted (already
+cleaned) text is stored as a ResumeText row keyed by the SHA-256 of the file
+bytes and EnhancedResumeParser.EXTRACTOR_VERSION:
+
+- parsing a file whose hash is cached only runs the field extractors
+- the reparse_resumes command re-runs the field extractors over the whole
+  corpus from this table, without opening a single PDF
+- bumping EXTRACTOR_VERSION makes every file extract again on next use
+"""
+
+import hashlib
+
+from .enhanced_resume_parser import EnhancedResumeParser
+from .models import ResumeText
+
+
+def file_hash(path):
+    """SHA-256 of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cached_texts(content_hashes):
+    """{content_hash: text} for the hashes extracted by the current extractor"""
+    return dict(
+        ResumeText.objects.filter(
+            content_hash__in=list(content_hashes),
+            extractor_version=EnhancedResumeParser.EXTRACTOR_VERSION,
+        ).values_list("content_hash", "text")
+    )
+
+
+def store_text(content_hash, text):
+    if content_hash and text:
+        ResumeText.objects.bulk_create(
+            [
+                ResumeText(
+                    content_hash=content_hash,
+                    extractor_version=EnhancedResumeParser.EXTRACTOR_VERSION,
+                    text=text,
+                )
+            ],
+            ignore_conflicts=True,
+        )
+
+
+def text_for_job(job, extract_missing=True):
+    """
+    The job's extracted text from the cache; on a miss the file is read and
+    extracted (and cached) unless ``extract_missing`` is False.
+    """
+    if job.content_hash:
+        text = cached_texts([job.content_hash]).get(job.content_hash)
+        if text is not None or not extract_missing:
+            return text or ""
+    if not extract_missing or not job.resume:
+        return ""
+
+    try:
+        job.content_hash = file_hash(job.resume.path)
+    except OSError:
+        return ""
+    text = cached_texts([job.content_hash]).get(job.content_hash)
+    if text is None:
+        text = EnhancedResumeParser._extract_text(job.resume.path)
+        store_text(job.content_hash, text)
+    return text or ""
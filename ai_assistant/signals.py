@@ -0,0 +1,149 @@
+import logging
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from companies.models import Holiday
+from employees.attendance_backfill import absences_marked
+from employees.employee_import import employees_imported
+from employees.leave_approval import leaves_approved
+from employees.models import Attendance, Employee, HandbookSection, LeaveBalance, LeaveRequest, Payslip, PolicySection
+from employees.payslip_batch import payslips_written
+
+from . import chat_context
+from .alert_engine import PUNCH_ALERT_TYPES, refresh_employee_alerts
+from .leave_prediction import invalidate_team_forecast
+
+logger = logging.getLogger(__name__)
+
+
+def _invalidate_on_commit(company_ids):
+    company_ids = set(company_ids)
+    transaction.on_commit(lambda: [invalidate_team_forecast(company_id) for company_id in company_ids])
+
+
+@receiver(post_save, sender=LeaveRequest)
+@receiver(post_delete, sender=LeaveRequest)
+def invalidate_forecast_for_leave(sender, instance, **kwargs):
+    """A new, edited, approved or cancelled leave changes the team forecast"""
+    _invalidate_on_commit([instance.employee.company_id])
+
+
+@receiver(leaves_approved)
+def invalidate_forecast_for_approved_leaves(sender, leave_requests, **kwargs):
+    """Batched approvals bypass post_save"""
+    _invalidate_on_commit(leave_request.employee.company_id for leave_request in leave_requests)
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def invalidate_forecast_for_employee(sender, instance, **kwargs):
+    """Headcounts depend on department and is_active"""
+    _invalidate_on_commit([instance.company_id])
+
+
+@receiver(employees_imported)
+def invalidate_forecast_for_imported_employees(sender, company_id, **kwargs):
+    """Bulk imports bypass post_save"""
+    _invalidate_on_commit([company_id])
+
+
+def _refresh_alerts_on_commit(employee_ids, alert_types=None):
+    employee_ids = set(employee_ids)
+
+    def refresh():
+        try:
+            refresh_employee_alerts(employee_ids, alert_types=alert_types)
+        except Exception:
+            # Alerts are also refreshed on a schedule; never fail the write that triggered this
+            logger.exception(f"Smart alert refresh failed for employees {sorted(employee_ids)}")
+
+    transaction.on_commit(refresh)
+
+
+@receiver(post_save, sender=Attendance)
+def refresh_alerts_for_punch(sender, instance, **kwargs):
+    """Clock-in/out changes the missed clock-out and late-login alerts, and nothing else"""
+    _refresh_alerts_on_commit([instance.employee_id], alert_types=PUNCH_ALERT_TYPES)
+
+
+@receiver(post_save, sender=LeaveRequest)
+@receiver(post_delete, sender=LeaveRequest)
+def refresh_alerts_for_leave(sender, instance, **kwargs):
+    """Leave changes affect the employee's LOP alert and their manager's pending approvals"""
+    _refresh_alerts_on_commit([instance.employee_id])
+
+
+@receiver(leaves_approved)
+def refresh_alerts_for_approved_leaves(sender, leave_requests, **kwargs):
+    _refresh_alerts_on_commit(leave_request.employee_id for leave_request in leave_requests)
+
+
+@receiver(post_save, sender=LeaveBalance)
+def refresh_alerts_for_balance(sender, instance, **kwargs):
+    _refresh_alerts_on_commit([instance.employee_id])
+
+
+# Chatbot context sections (see ai_assistant.chat_context)
+def _clear_on_commit(*keys):
+    transaction.on_commit(lambda: cache.delete_many(list(keys)))
+
+
+@receiver(post_save, sender=Employee)
+def clear_chatbot_profile(sender, instance, **kwargs):
+    _clear_on_commit(chat_context.profile_key(instance.id))
+
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+def clear_chatbot_attendance(sender, instance, **kwargs):
+    _clear_on_commit(chat_context.attendance_key(instance.employee_id))
+
+
+@receiver(leaves_approved)
+def clear_chatbot_attendance_for_approved_leaves(sender, leave_requests, **kwargs):
+    """Batched approvals upsert the leave days' Attendance rows without post_save"""
+    _clear_on_commit(*{chat_context.attendance_key(leave_request.employee_id) for leave_request in leave_requests})
+
+
+@receiver(absences_marked)
+def clear_chatbot_attendance_for_absences(sender, employee_ids, **kwargs):
+    """The mark_absents backfill writes Attendance rows in bulk"""
+    _clear_on_commit(*[chat_context.attendance_key(employee_id) for employee_id in employee_ids])
+
+
+@receiver(post_save, sender=Payslip)
+@receiver(post_delete, sender=Payslip)
+def clear_chatbot_payslip(sender, instance, **kwargs):
+    _clear_on_commit(chat_context.payslip_key(instance.employee_id))
+
+
+@receiver(payslips_written)
+def clear_chatbot_payslips_for_batch(sender, employee_ids, **kwargs):
+    """Payslip batches write in bulk"""
+    _clear_on_commit(*[chat_context.payslip_key(employee_id) for employee_id in employee_ids])
+
+
+@receiver(post_save, sender=Holiday)
+@receiver(post_delete, sender=Holiday)
+def clear_chatbot_holidays(sender, instance, **kwargs):
+    _clear_on_commit(chat_context.holidays_key(instance.company_id))
+
+
+@receiver(post_save, sender=PolicySection)
+@receiver(post_delete, sender=PolicySection)
+@receiver(post_save, sender=HandbookSection)
+@receiver(post_delete, sender=HandbookSection)
+def clear_chatbot_policies(sender, instance, **kwargs):
+    _clear_on_commit(chat_context.POLICIES_KEY)
+
+
+@receiver(post_save, sender=LeaveRequest)
+@receiver(post_delete, sender=LeaveRequest)
+def clear_chatbot_team(sender, instance, **kwargs):
+    """Pending leave counts of the manager's team"""
+    manager_id = instance.employee.manager_id
+    if manager_id:
+        _clear_on_commit(chat_context.team_key(manager_id))
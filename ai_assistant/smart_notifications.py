@@ -1,6 +1,10 @@
 """
 AI Smart Notifications & Alerts Module
 Automated intelligent notifications for various HR scenarios
+
+The check_* methods evaluate one rule live for one employee. The alert lists
+shown to users are read from SmartAlert rows precomputed by
+ai_assistant.alert_engine.
 """
 
 from datetime import timedelta
@@ -8,6 +12,9 @@ from django.utils import timezone
 from employees.models import Employee, Attendance, LeaveRequest
 from loguru import logger
 
+from .alert_engine import ensure_company_alerts
+from .models import SmartAlert
+
 
 class SmartNotifications:
     """
@@ -198,64 +205,41 @@ class SmartNotifications:
 
         return {"alert": False}
 
+    @staticmethod
+    def get_alerts_for_user(user, with_employee=False):
+        """
+        Active precomputed alerts of a user as (employee alerts, manager alerts).
+        with_employee adds the Employee a manager alert is about (for templates).
+        """
+        ensure_company_alerts(getattr(user, "company_id", None))
+        employee_alerts = []
+        manager_alerts = []
+        rows = SmartAlert.objects.filter(recipient=user, is_active=True)
+        if with_employee:
+            rows = rows.select_related("employee__user")
+        for row in rows:
+            alert = row.as_dict()
+            if row.audience == "MANAGER":
+                if with_employee and row.employee:
+                    alert["employee"] = row.employee
+                manager_alerts.append(alert)
+            else:
+                employee_alerts.append(alert)
+        return employee_alerts, manager_alerts
+
     @staticmethod
     def get_all_alerts_for_employee(employee):
         """
         Get all active alerts for an employee
         """
-        alerts = []
-
-        # Check missed clock out
-        missed_clock_out = SmartNotifications.check_missed_clock_out(employee)
-        if missed_clock_out["alert"]:
-            alerts.append(missed_clock_out)
-
-        # Check LOP threshold
-        lop_threshold = SmartNotifications.check_lop_threshold(employee)
-        if lop_threshold["alert"]:
-            alerts.append(lop_threshold)
-
-        # Check contract/probation expiry
-        contract_expiry = SmartNotifications.check_contract_expiry(employee)
-        if contract_expiry["alert"]:
-            alerts.append(contract_expiry)
-
-        # Check late login pattern
-        late_pattern = SmartNotifications.check_late_login_pattern(employee)
-        if late_pattern["alert"]:
-            alerts.append(late_pattern)
-
-        return alerts
+        return SmartNotifications.get_alerts_for_user(employee.user)[0]
 
     @staticmethod
     def get_all_alerts_for_manager(manager):
         """
         Get all active alerts for a manager
         """
-        alerts = []
-
-        # Check pending approvals
-        pending_approvals = SmartNotifications.check_pending_approvals(manager)
-        if pending_approvals["alert"]:
-            alerts.append(pending_approvals)
-
-        # Check team members' contract expiry
-        try:
-            team_members = Employee.objects.filter(
-                manager=manager.employee_profile, is_active=True
-            )
-
-            for member in team_members:
-                contract_alert = SmartNotifications.check_contract_expiry(
-                    member, days_ahead=15
-                )
-                if contract_alert["alert"]:
-                    contract_alert["employee"] = member
-                    alerts.append(contract_alert)
-        except:
-            pass
-
-        return alerts
+        return SmartNotifications.get_alerts_for_user(manager, with_employee=True)[1]
 
     @staticmethod
     def send_notification_email(user, alert):
@@ -268,7 +252,7 @@ class SmartNotifications:
         pass
 
     @staticmethod
-    def generate_daily_digest(employee):
+    def generate_daily_digest(employee, alerts=None):
         """
         Generate a daily digest of important information
         """
@@ -277,7 +261,7 @@ class SmartNotifications:
         digest = {
             "date": today,
             "employee": employee,
-            "alerts": SmartNotifications.get_all_alerts_for_employee(employee),
+            "alerts": SmartNotifications.get_all_alerts_for_employee(employee) if alerts is None else alerts,
             "summary": {},
         }
 
@@ -1 +1,776 @@
-# Create your tests here.
+import io
+import random
+import shutil
+import tempfile
+import zipfile
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ai_assistant import chat_context, resume_batch, resume_similarity
+from ai_assistant.ai_utils import AttritionPredictor, HRChatbot
+from ai_assistant.alert_engine import refresh_company_alerts
+from ai_assistant.attendance_intelligence import AttendanceIntelligence, company_attendance_patterns
+from ai_assistant.attrition_scoring import refresh_stale_scores, score_company
+from ai_assistant.enhanced_resume_parser import EnhancedResumeParser
+from ai_assistant.intent_router import router
+from ai_assistant.leave_prediction import LeavePrediction
+from ai_assistant.llm_client import get_llm_client
+from ai_assistant.models import AttritionRisk, ResumeBatch, ResumeParsingJob, ResumeText, SmartAlert
+from ai_assistant.resume_batch import apply_parsed_data, process_batch
+from companies.models import Company
+from core.email_scheduler import EmailSchedulerService
+from employees.attendance_backfill import mark_absents_for_company
+from employees.leave_approval import approve_leave_requests
+from employees.models import Attendance, Employee, LeaveBalance, LeaveRequest
+
+User = get_user_model()
+
+
+class TeamShortageForecastTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.company = Company.objects.create(
+            name="Test Company", primary_domain="test.com", email_domain="test.com"
+        )
+        self.today = timezone.now().date()
+        self.employees = []
+        for index, department in enumerate(["IT", "IT", "IT", "HR", "HR"]):
+            user = User.objects.create_user(
+                username=f"emp{index}@test.com", email=f"emp{index}@test.com", password="password", company=self.company
+            )
+            self.employees.append(
+                Employee.objects.create(user=user, company=self.company, designation="Staff", department=department)
+            )
+
+    def _leave(self, employee, first, last, status="APPROVED"):
+        return LeaveRequest.objects.create(
+            employee=employee,
+            leave_type="CL",
+            start_date=self.today + timedelta(days=first),
+            end_date=self.today + timedelta(days=last),
+            status=status,
+        )
+
+    def _on_leave(self, prediction):
+        return [day["on_leave"] for day in prediction["daily_shortage"].values()]
+
+    def test_counts_each_employee_once_per_day(self):
+        self._leave(self.employees[0], -3, 1)
+        self._leave(self.employees[0], 1, 2, status="PENDING")  # Overlaps the first leave
+        self._leave(self.employees[1], 2, 20)
+        self._leave(self.employees[3], 0, 0)
+        self._leave(self.employees[4], 3, 3, status="REJECTED")
+
+        prediction = LeavePrediction.predict_team_shortage(self.company, days_ahead=4)
+        self.assertEqual(prediction["total_employees"], 5)
+        self.assertEqual(self._on_leave(prediction), [2, 1, 2, 1, 1])
+
+        it = LeavePrediction.predict_team_shortage(self.company, department="IT", days_ahead=4)
+        self.assertEqual(it["total_employees"], 3)
+        self.assertEqual(self._on_leave(it), [1, 1, 2, 1, 1])
+        self.assertEqual(len(it["critical_days"]), 5)
+
+        departments = LeavePrediction.predict_department_shortages(self.company, days_ahead=4)
+        self.assertEqual(self._on_leave(departments["HR"]), [1, 0, 0, 0, 0])
+
+    def test_forecast_is_cached_until_a_leave_changes(self):
+        leave = self._leave(self.employees[0], 0, 1, status="PENDING")
+        prediction = LeavePrediction.predict_team_shortage(self.company, days_ahead=4)
+        self.assertEqual(self._on_leave(prediction), [1, 1, 0, 0, 0])
+        with self.assertNumQueries(0):
+            LeavePrediction.predict_department_shortages(self.company, days_ahead=4)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            leave.status = "REJECTED"
+            leave.save()
+        prediction = LeavePrediction.predict_team_shortage(self.company, days_ahead=4)
+        self.assertEqual(self._on_leave(prediction), [0, 0, 0, 0, 0])
+
+
+class AttritionScoringTest(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(
+            name="Test Company", primary_domain="test.com", email_domain="test.com"
+        )
+        self.admin = User.objects.create_user(
+            username="admin@test.com",
+            email="admin@test.com",
+            password="password",
+            company=self.company,
+            role=User.Role.COMPANY_ADMIN,
+            must_change_password=False,
+        )
+        self.rng = random.Random(7)
+
+    def _add_employees(self, count):
+        today = timezone.now().date()
+        attendance = []
+        for index in range(Employee.objects.count(), Employee.objects.count() + count):
+            user = User.objects.create_user(
+                username=f"emp{index}@test.com", email=f"emp{index}@test.com", password="password", company=self.company
+            )
+            employee = Employee.objects.create(
+                user=user,
+                company=self.company,
+                designation="Developer",
+                department="IT",
+                date_of_joining=self.rng.choice([None, today - timedelta(days=self.rng.randint(0, 400))]),
+            )
+            for _ in range(self.rng.randint(0, 6)):
+                LeaveRequest.objects.create(
+                    employee=employee,
+                    leave_type=self.rng.choice(["SL", "CL"]),
+                    start_date=today,
+                    end_date=today,
+                    status=self.rng.choice(["APPROVED", "PENDING"]),
+                )
+            # Includes days outside the 90-day window
+            for offset in self.rng.sample(range(1, 120), self.rng.randint(0, 25)):
+                attendance.append(
+                    Attendance(
+                        employee=employee,
+                        date=today - timedelta(days=offset),
+                        status=self.rng.choice(["PRESENT", "ABSENT", "MISSING_PUNCH"]),
+                        is_late=self.rng.random() < 0.4,
+                    )
+                )
+        Attendance.objects.bulk_create(attendance)
+
+    def test_batch_scores_match_per_employee_scores(self):
+        self._add_employees(15)
+        Employee.objects.filter(pk=Employee.objects.first().pk).update(is_active=False)
+
+        self.assertEqual(score_company(self.company), 14)
+
+        risks = AttritionRisk.objects.select_related("employee")
+        self.assertEqual(len(risks), 14)
+        for risk in risks:
+            expected = AttritionPredictor.calculate_risk_score(risk.employee)
+            self.assertEqual(risk.risk_score, expected["score"])
+            self.assertEqual(risk.risk_level, expected["risk_level"])
+            self.assertEqual(risk.risk_factors, expected["factors"])
+
+    def test_rescoring_updates_rows_in_place(self):
+        self._add_employees(3)
+        score_company(self.company)
+        employee = Employee.objects.first()
+        Attendance.objects.filter(employee=employee).delete()
+        Attendance.objects.bulk_create(
+            [
+                Attendance(employee=employee, date=timezone.now().date() - timedelta(days=day), status="ABSENT")
+                for day in range(1, 6)
+            ]
+        )
+
+        score_company(self.company)
+
+        self.assertEqual(AttritionRisk.objects.count(), 3)
+        risk = AttritionRisk.objects.get(employee=employee)
+        self.assertEqual(risk.risk_factors["absences"]["count"], 5)
+        self.assertEqual(risk.risk_score, AttritionPredictor.calculate_risk_score(employee)["score"])
+
+    def test_dashboard_reads_precomputed_rows(self):
+        self.client.force_login(self.admin)
+        self._add_employees(3)
+        response = self.client.get(reverse("attrition_dashboard"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(AttritionRisk.objects.count(), 3)
+
+        def page_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get(reverse("attrition_dashboard"))
+            return [query["sql"] for query in ctx.captured_queries]
+
+        small = page_queries()
+        self._add_employees(20)
+        score_company(self.company)
+        large = page_queries()
+        self.assertEqual(len(large), len(small))
+        self.assertFalse([sql for sql in large if sql.startswith(("INSERT", "UPDATE"))])
+
+    def test_dashboard_rescores_stale_rows(self):
+        self.client.force_login(self.admin)
+        self._add_employees(3)
+        score_company(self.company)
+        AttritionRisk.objects.update(last_updated=timezone.now() - timedelta(hours=2), risk_score=-1)
+
+        self.client.get(reverse("attrition_dashboard"))
+
+        self.assertFalse(AttritionRisk.objects.filter(risk_score=-1).exists())
+        self.assertFalse(refresh_stale_scores(self.company))
+
+    def test_scheduler_runs_attrition_scoring(self):
+        self._add_employees(2)
+        EmailSchedulerService()._run_hourly_commands()
+        self.assertEqual(AttritionRisk.objects.count(), 2)
+
+
+class AttendancePatternsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.company = Company.objects.create(
+            name="Test Company", primary_domain="test.com", email_domain="test.com"
+        )
+        self.admin = User.objects.create_user(
+            username="admin@test.com",
+            email="admin@test.com",
+            password="password",
+            company=self.company,
+            role=User.Role.COMPANY_ADMIN,
+            must_change_password=False,
+        )
+        self.rng = random.Random(11)
+
+    def _add_employees(self, count):
+        today = timezone.now().date()
+        start = Employee.objects.count()
+        attendance = []
+        for index in range(start, start + count):
+            user = User.objects.create_user(
+                username=f"emp{index}@test.com", email=f"emp{index}@test.com", password="password", company=self.company
+            )
+            employee = Employee.objects.create(user=user, company=self.company, designation="Developer", department="IT")
+            for offset in self.rng.sample(range(0, 40), 25):
+                clock_in = timezone.now() - timedelta(days=offset) if self.rng.random() < 0.7 else None
+                attendance.append(
+                    Attendance(
+                        employee=employee,
+                        date=today - timedelta(days=offset),
+                        status=self.rng.choice(["PRESENT", "ABSENT", "HALF_DAY", "WEEKLY_OFF", "HOLIDAY"]),
+                        is_late=self.rng.random() < 0.3,
+                        is_early_departure=self.rng.random() < 0.3,
+                        clock_in=clock_in,
+                        clock_out=clock_in if clock_in and self.rng.random() < 0.5 else None,
+                    )
+                )
+        Attendance.objects.bulk_create(attendance)
+
+    def test_frame_counts_match_per_employee_queries(self):
+        self._add_employees(6)
+        today = timezone.now().date()
+        patterns = company_attendance_patterns(self.company.id)
+
+        for employee in Employee.objects.all():
+            attendances = Attendance.objects.filter(
+                employee=employee, date__gte=today - timedelta(days=30), date__lte=today
+            ).exclude(status__in=["WEEKLY_OFF", "HOLIDAY"])
+            expected = {
+                "total_days": attendances.count(),
+                "late_logins": attendances.filter(is_late=True).count(),
+                "early_logouts": attendances.filter(is_early_departure=True).count(),
+                "missed_clock_out": attendances.filter(clock_in__isnull=False, clock_out__isnull=True).count(),
+                "absences": attendances.filter(status="ABSENT").count(),
+                "half_days": attendances.filter(status="HALF_DAY").count(),
+                "friday_absences": attendances.filter(date__week_day=6, status="ABSENT").count(),
+            }
+            self.assertEqual(patterns[employee.id], expected)
+
+        employee = Employee.objects.first()
+        with self.assertNumQueries(0):
+            analysis = AttendanceIntelligence.analyze_employee_patterns(employee)
+        self.assertEqual(analysis["absences"], patterns[employee.id]["absences"])
+
+    def test_performance_dashboard_queries_do_not_grow_with_employees(self):
+        self.client.force_login(self.admin)
+
+        def page_queries():
+            cache.clear()
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(reverse("performance_insights"))
+            self.assertEqual(response.status_code, 200)
+            return len(ctx.captured_queries)
+
+        self._add_employees(2)
+        small = page_queries()
+        self._add_employees(15)
+        self.assertEqual(page_queries(), small)
+
+
+class SmartAlertEngineTest(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(
+            name="Test Company", primary_domain="test.com", email_domain="test.com"
+        )
+        self.manager = User.objects.create_user(
+            username="manager@test.com",
+            email="manager@test.com",
+            password="password",
+            company=self.company,
+            role=User.Role.MANAGER,
+            must_change_password=False,
+        )
+        lead = Employee.objects.create(user=self.manager, company=self.company, designation="Lead", department="IT")
+        LeaveBalance.objects.filter(employee=lead).update(casual_leave_allocated=5.0, sick_leave_allocated=5.0)
+        self.employees = []
+        for index in range(3):
+            user = User.objects.create_user(
+                username=f"emp{index}@test.com", email=f"emp{index}@test.com", password="password", company=self.company
+            )
+            employee = Employee.objects.create(
+                user=user, company=self.company, designation="Developer", department="IT", manager=self.manager
+            )
+            LeaveBalance.objects.filter(employee=employee).update(casual_leave_allocated=5.0, sick_leave_allocated=5.0)
+            self.employees.append(employee)
+
+    def _active(self, **kwargs):
+        return set(SmartAlert.objects.filter(is_active=True, **kwargs).values_list("alert_type", flat=True))
+
+    def test_rules_are_stored_once_and_deactivated_when_cleared(self):
+        now = timezone.now()
+        today = now.date()
+        first, second, third = self.employees
+        Attendance.objects.bulk_create(
+            [Attendance(employee=first, date=today, status="PRESENT", clock_in=now - timedelta(hours=11))]
+            + [
+                Attendance(employee=second, date=today - timedelta(days=day), status="PRESENT", is_late=True)
+                for day in range(1, 4)
+            ]
+        )
+        LeaveBalance.objects.filter(employee=third).update(casual_leave_used=6.0)
+        Employee.objects.filter(pk=third.pk).update(date_of_joining=today - timedelta(days=85))
+        LeaveRequest.objects.create(employee=first, leave_type="CL", start_date=today, end_date=today)
+
+        refresh_company_alerts(self.company, now=now)
+        refresh_company_alerts(self.company, now=now)
+
+        self.assertEqual(self._active(employee=first), {"MISSED_CLOCK_OUT"})
+        self.assertEqual(self._active(employee=second), {"LATE_LOGIN_PATTERN"})
+        self.assertEqual(self._active(recipient=third.user), {"LOP_THRESHOLD", "CONTRACT_EXPIRY"})
+        self.assertEqual(self._active(recipient=self.manager), {"PENDING_APPROVALS", "CONTRACT_EXPIRY"})
+        self.assertEqual(SmartAlert.objects.count(), 6)
+
+        LeaveBalance.objects.filter(employee=third).update(casual_leave_used=0.0)
+        LeaveRequest.objects.all().update(status="REJECTED")
+        refresh_company_alerts(self.company, now=now)
+        self.assertEqual(self._active(recipient=third.user), {"CONTRACT_EXPIRY"})
+        self.assertEqual(self._active(recipient=self.manager), {"CONTRACT_EXPIRY"})
+
+    def test_leave_request_refreshes_manager_alert(self):
+        today = timezone.now().date()
+        with self.captureOnCommitCallbacks(execute=True):
+            LeaveRequest.objects.create(employee=self.employees[0], leave_type="CL", start_date=today, end_date=today)
+        with self.captureOnCommitCallbacks(execute=True):
+            LeaveRequest.objects.create(employee=self.employees[1], leave_type="CL", start_date=today, end_date=today)
+
+        alert = SmartAlert.objects.get(recipient=self.manager, alert_type="PENDING_APPROVALS", is_active=True)
+        self.assertEqual(alert.payload["total_pending"], 2)
+
+    def test_notifications_api_reads_stored_alerts(self):
+        today = timezone.now().date()
+        with self.captureOnCommitCallbacks(execute=True):
+            LeaveRequest.objects.create(employee=self.employees[0], leave_type="CL", start_date=today, end_date=today)
+
+        self.client.force_login(self.manager)
+        # The first read evaluates the whole company once; later reads only read rows
+        self.client.get(reverse("notifications_api"))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("notifications_api"))
+        alert_queries = [query for query in ctx.captured_queries if "ai_assistant_smartalert" in query["sql"]]
+        self.assertEqual(len(alert_queries), 1)
+        data = response.json()
+        self.assertEqual(data["total_count"], 1)
+        self.assertEqual(data["manager_alerts"][0]["type"], "PENDING_APPROVALS")
+
+        response = self.client.get(reverse("smart_notifications"))
+        self.assertContains(response, "You have 1 pending leave approval(s).")
+
+    def test_first_read_populates_company_alerts(self):
+        Employee.objects.filter(pk=self.employees[0].pk).update(date_of_joining=timezone.now().date() - timedelta(days=85))
+        cache.clear()
+
+        self.client.force_login(self.manager)
+        data = self.client.get(reverse("notifications_api")).json()
+
+        self.assertEqual([alert["type"] for alert in data["manager_alerts"]], ["CONTRACT_EXPIRY"])
+        self.assertEqual(self._active(recipient=self.employees[0].user), {"CONTRACT_EXPIRY"})
+
+    def test_punch_refreshes_only_punch_alerts(self):
+        now = timezone.now()
+        employee = self.employees[0]
+        LeaveBalance.objects.filter(employee=employee).update(casual_leave_used=6.0)
+        refresh_company_alerts(self.company, now=now)
+        Attendance.objects.bulk_create(
+            [
+                Attendance(employee=employee, date=now.date() - timedelta(days=day), status="PRESENT", is_late=True)
+                for day in range(1, 3)
+            ]
+        )
+        LeaveBalance.objects.filter(employee=employee).update(casual_leave_used=0.0)
+
+        with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.create(employee=employee, date=now.date(), status="PRESENT", is_late=True)
+
+        self.assertEqual(self._active(employee=employee), {"LOP_THRESHOLD", "LATE_LOGIN_PATTERN"})
+        self.assertFalse([query for query in ctx.captured_queries if "employees_leave" in query["sql"]])
+
+    def test_scheduler_refreshes_alerts(self):
+        LeaveBalance.objects.filter(employee=self.employees[0]).update(casual_leave_used=6.0)
+        EmailSchedulerService()._run_hourly_commands()
+        self.assertEqual(self._active(employee=self.employees[0]), {"LOP_THRESHOLD"})
+
+
+@override_settings(AI_CHATBOT_LLM_BACKEND="fake", AI_CHATBOT_FAKE_LLM_LATENCY=0.0)
+class ChatbotContextCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.company = Company.objects.create(
+            name="Test Company", primary_domain="test.com", email_domain="test.com"
+        )
+        user = User.objects.create_user(
+            username="emp@test.com", email="emp@test.com", password="password", company=self.company
+        )
+        self.employee = Employee.objects.create(user=user, company=self.company, designation="Developer", department="IT")
+        self.client_llm = get_llm_client()
+        self.client_llm.reset_stats()
+
+    def _ask(self, question):
+        employee = Employee.objects.select_related("user", "company").get(pk=self.employee.pk)
+        return HRChatbot._get_llm_response(question, employee, "EMPLOYEE", None)
+
+    def test_repeated_question_is_served_from_cache(self):
+        first = self._ask("What is my leave balance?")
+        with self.assertNumQueries(0):
+            second = HRChatbot._get_llm_response("  what is my LEAVE balance ", self.employee, "EMPLOYEE", None)
+
+        self.assertEqual(first["type"], "ai_response")
+        self.assertEqual(second["answer"], first["answer"])
+        self.assertEqual(self.client_llm.calls, 1)
+
+    def test_changed_data_invalidates_only_its_section(self):
+        self._ask("What is my leave balance?")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            balance = LeaveBalance.objects.get(employee=self.employee)
+            balance.casual_leave_allocated = 4.0
+            balance.save()
+
+        with CaptureQueriesContext(connection) as ctx:
+            self._ask("What is my leave balance?")
+        section_queries = [query["sql"] for query in ctx.captured_queries if "employees_employee" not in query["sql"]]
+        # Only the leave balance is reloaded: the row, its latest snapshot and recent ledger entries
+        self.assertEqual(len(section_queries), 3)
+        self.assertEqual(self.client_llm.calls, 2)
+
+    def test_bulk_attendance_writes_invalidate_the_attendance_section(self):
+        today = timezone.now().date()
+        LeaveBalance.objects.filter(employee=self.employee).update(casual_leave_allocated=5.0)
+        leave = LeaveRequest.objects.create(
+            employee=self.employee, leave_type="CL", start_date=today, end_date=today
+        )
+        self._ask("How is my attendance?")
+        self.assertIsNotNone(cache.get(chat_context.attendance_key(self.employee.id)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            approve_leave_requests([leave], self.employee.user)
+        self.assertIsNone(cache.get(chat_context.attendance_key(self.employee.id)))
+
+        self._ask("How is my attendance?")
+        monday = today - timedelta(days=today.weekday() + 7)
+        with self.captureOnCommitCallbacks(execute=True):
+            stats = mark_absents_for_company(self.company.id, monday, monday)
+        self.assertEqual(stats["written"], 1)
+        self.assertIsNone(cache.get(chat_context.attendance_key(self.employee.id)))
+
+    def test_benchmark_command_runs(self):
+        out = StringIO()
+        call_command("benchmark_chatbot", rounds=1, latency=0, stdout=out)
+        self.assertIn("Cached", out.getvalue())
+
+
+class IntentRouterTest(TestCase):
+    def test_hits_match_substring_search(self):
+        phrases = {phrase for _, condition in router.rules for phrase in condition.phrases}
+        for text in ["please check in", "whose leave history report is this", "clock-out and apply sl", "thistle"]:
+            self.assertEqual(router.hits(text), {phrase for phrase in phrases if phrase in text})
+            self.assertEqual(router.classify(text), router.classify_by_substring(text))
+
+    def test_priority_order(self):
+        intents = router.classify("apply leave balance report")
+        self.assertNotIn("apply_leave", intents)  # Excluded by "balance"
+        self.assertEqual(
+            router.ordered(intents)[:3], ["admin_leave_report", "admin_reports", "employee_leave_balance"]
+        )
+
+    def test_benchmark_command_runs(self):
+        out = StringIO()
+        call_command("benchmark_intent_router", rounds=1, stdout=out)
+        self.assertIn("matches substring routing", out.getvalue())
+
+
+class SkillExtractionTest(TestCase):
+    def test_skills_match_whole_tokens_only(self):
+        skills = EnhancedResumeParser._extract_skills_categorized(
+            "Built APIs in Go and R at Google. Ruby on Rails, HTML5, C++ and C#.\nStrong Communication, Excel"
+        )
+        self.assertEqual(skills["technical"], ["C++", "C#", "Ruby", "Go", "R", "HTML5", "Ruby on Rails"])
+        self.assertEqual(skills["tools"], ["Excel"])
+        self.assertEqual(skills["soft"], ["Communication"])
+
+    def test_no_false_positives_inside_words(self):
+        skills = EnhancedResumeParser._extract_skills_categorized("Growing categories, reading, going")
+        self.assertEqual(skills, {"technical": [], "tools": [], "soft": []})
+
+    def test_benchmark_command_runs(self):
+        out = StringIO()
+        call_command("benchmark_skill_extraction", count=5, rounds=1, stdout=out)
+        self.assertIn("resumes/s", out.getvalue())
+
+
+class ResumeFieldExtractionTest(TestCase):
+    RESUME = "\n".join(
+        [
+            "Priya Sharma",
+            "Location: Hyderabad, Telangana",
+            "EXPERIENCE",
+            "Acme Corp",
+            "Senior Developer",
+            "Jan 2019 - Present",
+            "- Built the billing platform",
+            "EDUCATION",
+            "B.Tech in Computer Science | JNTU University | 2018 | 8.2 CGPA",
+            "CERTIFICATIONS",
+            "AWS Certified Developer",
+            "Amazon 2021",
+        ]
+    )
+
+    def test_sections_and_timer(self):
+        timings = {}
+        parsed = EnhancedResumeParser.parse_text(self.RESUME, timer=timings.__setitem__)
+
+        self.assertEqual(parsed["location"], "Hyderabad, Telangana")
+        self.assertEqual(
+            [(e["start_date"], e["end_date"]) for e in parsed["experience"]], [("Jan 2019", "Present ")]
+        )
+        self.assertEqual([(e["degree"], e["year"], e["gpa"]) for e in parsed["education"]], [("B.Tech", 2018, 8.2)])
+        self.assertEqual(parsed["certifications"][0]["name"], "AWS Certified Developer")
+        # One timing per field
+        self.assertEqual(set(timings), set(parsed))
+
+    def test_profile_command_runs(self):
+        out = StringIO()
+        call_command("profile_resume_parser", count=5, stdout=out)
+        self.assertIn("ms/resume", out.getvalue())
+
+
+def resume_pdf(name, email, skills):
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer)
+    lines = [name, email, "Hyderabad, India", "SKILLS", skills, "EXPERIENCE", "Software developer building web apps"]
+    for index, line in enumerate(lines):
+        pdf.drawString(72, 760 - index * 20, line)
+    pdf.save()
+    return buffer.getvalue()
+
+
+class ResumeBatchTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.company = Company.objects.create(
+            name="Test Company", primary_domain="test.com", email_domain="test.com"
+        )
+        self.admin = User.objects.create_user(
+            username="admin@test.com",
+            email="admin@test.com",
+            password="password",
+            company=self.company,
+            role=User.Role.COMPANY_ADMIN,
+            must_change_password=False,
+        )
+        self.client.force_login(self.admin)
+
+    def _zip(self, files):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            for name, content in files.items():
+                archive.writestr(name, content)
+        return SimpleUploadedFile("resumes.zip", buffer.getvalue(), content_type="application/zip")
+
+    def _queue(self, count):
+        upload = self._zip(
+            {
+                **{
+                    f"cv/candidate{i}.pdf": resume_pdf(f"Candidate Number{chr(65 + i)}", f"c{i}@mail.com", "Python, Django")
+                    for i in range(count)
+                },
+                "cv/notes.txt": b"not a resume",
+            }
+        )
+        response = self.client.post(reverse("resume_parser"), {"resumes": [upload]})
+        batch = ResumeBatch.objects.get()
+        self.assertRedirects(response, reverse("resume_batch_detail", args=[batch.id]), fetch_redirect_response=False)
+        return batch
+
+    def test_zip_upload_queues_one_job_per_resume(self):
+        batch = self._queue(2)
+
+        self.assertEqual(batch.total_files, 2)
+        self.assertEqual(batch.status, "PENDING")
+        self.assertEqual(
+            sorted(batch.jobs.values_list("original_filename", "status")),
+            [("candidate0.pdf", "PENDING"), ("candidate1.pdf", "PENDING")],
+        )
+
+    def test_process_batch_records_results_and_progress(self):
+        batch = self._queue(2)
+        duplicate = batch.jobs.order_by("id").last()
+        shutil.copyfile(batch.jobs.order_by("id").first().resume.path, duplicate.resume.path)
+
+        process_batch(batch.id, workers=1)
+
+        batch.refresh_from_db()
+        self.assertEqual(batch.status, "COMPLETED")
+        self.assertEqual(list(batch.jobs.values_list("status", flat=True)), ["PROCESSED", "PROCESSED"])
+        self.assertEqual(batch.jobs.get(id=duplicate.id).parsed_skills, "Python, Django")
+        self.assertTrue(batch.jobs.get(id=duplicate.id).is_duplicate)
+
+        progress = self.client.get(reverse("resume_batch_progress", args=[batch.id])).json()
+        self.assertEqual((progress["status"], progress["percent"], progress["duplicates"]), ("COMPLETED", 100, 1))
+        self.assertContains(self.client.get(reverse("resume_batch_detail", args=[batch.id])), "c0@mail.com")
+
+    def test_stale_running_batch_is_reclaimed(self):
+        batch = self._queue(2)
+        first = batch.jobs.order_by("id").first()
+        # The worker died mid-batch, leaving a job PROCESSING
+        ResumeBatch.objects.filter(pk=batch.pk).update(status="RUNNING", heartbeat_at=timezone.now())
+        batch.jobs.exclude(pk=first.pk).update(status="PROCESSING")
+
+        self.assertIsNone(process_batch(batch.id, workers=1))
+        self.assertEqual(resume_batch.process_pending_batches(workers=1), [])
+
+        ResumeBatch.objects.filter(pk=batch.pk).update(
+            heartbeat_at=timezone.now() - resume_batch.STALE_BATCH_AFTER - timedelta(minutes=1)
+        )
+        self.assertEqual([b.id for b in resume_batch.process_pending_batches(workers=1)], [batch.id])
+
+        batch.refresh_from_db()
+        self.assertEqual(batch.status, "COMPLETED")
+        self.assertEqual(list(batch.jobs.values_list("status", flat=True)), ["PROCESSED", "PROCESSED"])
+
+    def test_process_pool(self):
+        batch = self._queue(3)
+
+        process_batch(batch.id, workers=2)
+
+        self.assertEqual(batch.jobs.filter(status="PROCESSED").count(), 3)
+        self.assertEqual(
+            sorted(batch.jobs.values_list("parsed_email", flat=True)), ["c0@mail.com", "c1@mail.com", "c2@mail.com"]
+        )
+
+    def test_extracted_text_is_cached_and_reparsed_without_files(self):
+        batch = self._queue(2)
+        first, second = batch.jobs.order_by("id")
+        shutil.copyfile(first.resume.path, second.resume.path)
+        process_batch(batch.id, workers=1)
+
+        # Identical files share one cached text
+        self.assertEqual(ResumeText.objects.count(), 1)
+        first.refresh_from_db()
+        self.assertEqual(first.content_hash, ResumeText.objects.get().content_hash)
+
+        # Reparse from the cache alone, with the files gone
+        ResumeParsingJob.objects.update(parsed_skills="", parsed_email="stale@mail.com")
+        for job in batch.jobs.all():
+            job.resume.delete(save=False)
+        out = StringIO()
+        call_command("reparse_resumes", workers=1, stdout=out)
+
+        self.assertIn("2 resumes reparsed", out.getvalue())
+        self.assertEqual(list(batch.jobs.values_list("parsed_skills", flat=True)), ["Python, Django"] * 2)
+        self.assertEqual(set(batch.jobs.values_list("parsed_email", flat=True)), {"c0@mail.com"})
+
+
+class NearDuplicateResumeTest(TestCase):
+    RESUME = "\n".join(
+        [
+            "Priya Sharma",
+            "priya.sharma@mail.com  +91 98765 43210",
+            "Hyderabad, India",
+            "EXPERIENCE",
+            "Senior Software Engineer at Acme Corp, 2019 - Present",
+            "Built the billing platform in Python and Django, moved reporting to PostgreSQL",
+            "Led a team of five engineers and introduced code review and CI pipelines",
+            "Software Engineer at Initech, 2016 - 2019",
+            "Maintained REST APIs, wrote integration tests and on-call runbooks",
+            "EDUCATION",
+            "B.Tech Computer Science, JNTU Hyderabad, 2016",
+        ]
+    )
+
+    def _parse(self, text, email="priya.sharma@mail.com", phone="+91 98765 43210"):
+        job = ResumeParsingJob.objects.create(resume="resumes/cv.pdf")
+        parsed = {
+            "name": "Priya Sharma",
+            "email": email,
+            "phone": phone,
+            "duplicate_check_hash": EnhancedResumeParser._generate_hash(text),
+            "similarity_signature": resume_similarity.signature(text),
+        }
+        return apply_parsed_data(job, parsed)
+
+    def test_reexported_resume_is_a_near_duplicate(self):
+        original = self._parse(self.RESUME)
+        # Different layout and one edited line: the exact hash differs
+        reexported = self._parse(
+            self.RESUME.replace("\n", " \n ").replace("five engineers", "six engineers"),
+            email="other@mail.com",
+            phone="",
+        )
+
+        self.assertNotEqual(original.duplicate_check_hash, reexported.duplicate_check_hash)
+        self.assertTrue(reexported.is_duplicate)
+        self.assertEqual(reexported.duplicate_of, original)
+        self.assertGreater(reexported.duplicate_similarity, 0.8)
+
+    def test_unrelated_resume_is_not_a_duplicate(self):
+        self._parse(self.RESUME)
+        other = self._parse(
+            "Rahul Verma\nChartered accountant, audit and taxation for manufacturing clients in Pune",
+            email="rahul@mail.com",
+            phone="9000000001",
+        )
+        self.assertFalse(other.is_duplicate)
+
+    def test_reparsing_keeps_the_earlier_upload_as_the_original(self):
+        original = self._parse(self.RESUME)
+        copy = self._parse(self.RESUME)
+
+        for job in (original, copy):
+            apply_parsed_data(
+                job,
+                {
+                    "name": "Priya Sharma",
+                    "email": "priya.sharma@mail.com",
+                    "phone": "+91 98765 43210",
+                    "duplicate_check_hash": EnhancedResumeParser._generate_hash(self.RESUME),
+                    "similarity_signature": resume_similarity.signature(self.RESUME),
+                },
+            )
+
+        self.assertEqual(
+            list(ResumeParsingJob.objects.order_by("id").values_list("id", "is_duplicate", "duplicate_of")),
+            [(original.id, False, None), (copy.id, True, original.id)],
+        )
+
+    def test_phone_matches_across_formats(self):
+        self._parse(self.RESUME)
+        other = self._parse("Completely different text about marketing", email="x@mail.com", phone="9876543210")
+        self.assertTrue(other.is_duplicate)
+        self.assertIsNone(other.duplicate_similarity)
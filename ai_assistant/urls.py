@@ -21,6 +21,16 @@ urlpatterns = [
         views.resume_parser_result,
         name="resume_parser_result",
     ),
+    path(
+        "resume-parser/batch/<int:batch_id>/",
+        views.resume_batch_detail,
+        name="resume_batch_detail",
+    ),
+    path(
+        "resume-parser/batch/<int:batch_id>/progress/",
+        views.resume_batch_progress,
+        name="resume_batch_progress",
+    ),
     # Attendance Intelligence
     path(
         "attendance-intelligence/",
@@ -1,4 +1,5 @@
 import json
+import zipfile
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
@@ -10,10 +11,12 @@ from loguru import logger
 from core.error_handling import safe_get_employee_profile
 from employees.models import Employee
 
-from .ai_utils import AttritionPredictor, HRChatbot
+from .ai_utils import HRChatbot
 from .attendance_intelligence import AttendanceIntelligence
+from .attrition_scoring import refresh_stale_scores
 from .leave_prediction import LeavePrediction
-from .models import AttritionRisk, ChatMessage, ResumeParsingJob
+from .models import AttritionRisk, ChatMessage, ResumeBatch, ResumeParsingJob
+from .resume_batch import parse_job, queue_resumes
 from .smart_notifications import SmartNotifications
 
 
@@ -49,27 +52,16 @@ def attrition_dashboard(request):
     # Get company from request
     company = request.company
 
-    # Get all employees in the company
-    employees = Employee.objects.filter(company=company, is_active=True)
+    # Scores are precomputed hourly by the scheduler; unscored employees (new
+    # joiners) or scores past their max age are recomputed here in one batch
+    if company:
+        refresh_stale_scores(company)
+    risks = AttritionRisk.objects.filter(employee__company=company, employee__is_active=True)
 
-    # Calculate or fetch risk scores
-    risk_data = []
-    for emp in employees:
-        risk_obj, created = AttritionRisk.objects.get_or_create(employee=emp)
-
-        # Recalculate if older than 7 days or newly created
-        from datetime import timedelta
-
-        from django.utils import timezone
-
-        if created or (timezone.now() - risk_obj.last_updated) > timedelta(hours=1):
-            risk_result = AttritionPredictor.calculate_risk_score(emp)
-            risk_obj.risk_score = risk_result["score"]
-            risk_obj.risk_level = risk_result["risk_level"]
-            risk_obj.risk_factors = risk_result["factors"]
-            risk_obj.save()
-
-        risk_data.append({"employee": emp, "risk": risk_obj})
+    risk_data = [
+        {"employee": risk.employee, "risk": risk}
+        for risk in risks.select_related("employee__user")
+    ]
 
     # Sort by risk score (highest first)
     risk_data.sort(key=lambda x: x["risk"].risk_score, reverse=True)
@@ -173,107 +165,50 @@ def resume_parser_view(request):
         messages.error(request, "You don't have permission to access this page.")
         return redirect("dashboard")
 
-    if request.method == "POST" and request.FILES.get("resume"):
+    if request.method == "POST" and request.FILES.getlist("resumes"):
+        # Batch mode: queue one job per file and parse them in the background
+        try:
+            batch = queue_resumes(
+                request.FILES.getlist("resumes"),
+                uploaded_by=request.user,
+                company=getattr(request, "company", None),
+            )
+        except (ValueError, zipfile.BadZipFile) as e:
+            messages.error(request, f"Could not queue resumes: {str(e)}")
+        else:
+            messages.success(request, f"{batch.total_files} resumes queued for parsing.")
+            return redirect("resume_batch_detail", batch_id=batch.id)
+
+    elif request.method == "POST" and request.FILES.get("resume"):
         resume_file = request.FILES["resume"]
 
         # Save the resume
-        job = ResumeParsingJob.objects.create(resume=resume_file)
+        job = ResumeParsingJob.objects.create(resume=resume_file, original_filename=resume_file.name)
 
-        # Parse the resume using enhanced parser
+        # Parse the resume (reusing cached text of an identical file) and store all
+        # parsed fields, flagging duplicates
         try:
-            from .enhanced_resume_parser import EnhancedResumeParser
-
-            parsed_data = EnhancedResumeParser.parse_resume(job.resume.path)
+            parse_job(job)
 
             # Check for errors
-            if "error" in parsed_data and not parsed_data.get("name"):
-                raise Exception(parsed_data["error"])
-
-            # Update job with all parsed data
-            # Basic Details
-            job.parsed_name = parsed_data.get("name")
-            job.parsed_email = parsed_data.get("email")
-            job.parsed_phone = parsed_data.get("phone")
-            job.parsed_location = parsed_data.get("location")
-            job.parsed_linkedin = parsed_data.get("linkedin")
-            job.parsed_github = parsed_data.get("github")
-            job.parsed_portfolio = parsed_data.get("portfolio")
-
-            # Skills
-            job.parsed_skills = parsed_data.get("skills")  # Legacy comma-separated
-            job.parsed_skills_json = parsed_data.get("skills_json")  # Categorized JSON
-
-            # Education
-            job.parsed_education = parsed_data.get("education")
-
-            # Experience
-            experience = parsed_data.get("experience", [])
-            if experience:
-                for exp in experience:
-                    if not exp.get("end_date"):
-                        exp["end_date"] = "Present"
-            job.parsed_experience = experience
-            job.total_experience_years = parsed_data.get("total_experience_years")
-
-            # Projects
-            job.parsed_projects = parsed_data.get("projects")
-
-            # Certifications
-            job.parsed_certifications = parsed_data.get("certifications")
-
-            # Categorization
-            job.candidate_type = parsed_data.get("candidate_type")
-            job.role_fit = parsed_data.get("role_fit")
-            job.domain = parsed_data.get("domain")
-
-            # Duplicate Detection
-            job.duplicate_check_hash = parsed_data.get("duplicate_check_hash")
-
-            # Check for duplicates
-            duplicate = (
-                ResumeParsingJob.objects.filter(duplicate_check_hash=job.duplicate_check_hash, status="PROCESSED")
-                .exclude(id=job.id)
-                .first()
-            )
-
-            if duplicate:
-                job.is_duplicate = True
-                job.duplicate_of = duplicate
-
-            # Also check by email/phone
-            if job.parsed_email or job.parsed_phone:
-                email_duplicate = (
-                    ResumeParsingJob.objects.filter(parsed_email=job.parsed_email, status="PROCESSED")
-                    .exclude(id=job.id)
-                    .first()
-                    if job.parsed_email
-                    else None
-                )
-
-                phone_duplicate = (
-                    ResumeParsingJob.objects.filter(parsed_phone=job.parsed_phone, status="PROCESSED")
-                    .exclude(id=job.id)
-                    .first()
-                    if job.parsed_phone
-                    else None
-                )
-
-                if email_duplicate or phone_duplicate:
-                    job.is_duplicate = True
-                    job.duplicate_of = email_duplicate or phone_duplicate
-
-            job.status = "PROCESSED"
-            job.save()
+            if job.status == "FAILED":
+                raise Exception(job.error_message)
 
             messages.success(request, "Resume parsed successfully!")
             return redirect("resume_parser_result", job_id=job.id)
 
         except Exception as e:
             job.status = "FAILED"
+            job.error_message = str(e)
             job.save()
             messages.error(request, f"Failed to parse resume: {str(e)}")
 
-    return render(request, "ai_assistant/resume_parser.html")
+    batches = ResumeBatch.objects.all()
+    if getattr(request, "company", None):
+        batches = batches.filter(company=request.company)
+    context = {"batches": batches[:5]}
+
+    return render(request, "ai_assistant/resume_parser.html", context)
 
 
 @login_required
@@ -296,6 +231,51 @@ def resume_parser_result(request, job_id):
     return render(request, "ai_assistant/resume_result.html", context)
 
 
+def _get_resume_batch(request, batch_id):
+    batches = ResumeBatch.objects.all()
+    if getattr(request, "company", None):
+        batches = batches.filter(company=request.company)
+    return batches.filter(id=batch_id).first()
+
+
+@login_required
+def resume_batch_detail(request, batch_id):
+    """
+    Progress and results of a batch upload
+    """
+    if not (request.user.is_staff or request.user.is_superuser or getattr(request.user, "role", "") == "COMPANY_ADMIN"):
+        messages.error(request, "You don't have permission to access this page.")
+        return redirect("dashboard")
+
+    batch = _get_resume_batch(request, batch_id)
+    if not batch:
+        messages.error(request, "Resume batch not found.")
+        return redirect("resume_parser")
+
+    context = {
+        "batch": batch,
+        "progress": batch.progress(),
+        "jobs": batch.jobs.order_by("id"),
+    }
+
+    return render(request, "ai_assistant/resume_batch.html", context)
+
+
+@login_required
+def resume_batch_progress(request, batch_id):
+    """
+    API endpoint for batch progress (polled by the batch page)
+    """
+    if not (request.user.is_staff or request.user.is_superuser or getattr(request.user, "role", "") == "COMPANY_ADMIN"):
+        return JsonResponse({"error": "Permission denied"}, status=403)
+
+    batch = _get_resume_batch(request, batch_id)
+    if not batch:
+        return JsonResponse({"error": "Resume batch not found"}, status=404)
+
+    return JsonResponse({"success": True, "status": batch.status, **batch.progress()})
+
+
 @login_required
 def employee_risk_detail(request, employee_id):
     """
@@ -441,20 +421,19 @@ def smart_notifications_dashboard(request):
         messages.error(request, "Employee profile not found.")
         return redirect("dashboard")
 
-    # Get all alerts for employee
-    employee_alerts = SmartNotifications.get_all_alerts_for_employee(employee)
+    # Precomputed alerts for the user, in one query
+    employee_alerts, manager_alerts = SmartNotifications.get_alerts_for_user(request.user, with_employee=True)
 
-    # Get manager alerts if user is a manager
-    manager_alerts = []
-    if (
+    # Manager alerts only if user is a manager
+    if not (
         request.user.is_staff
         or request.user.is_superuser
         or getattr(request.user, "role", "") in ["MANAGER", "COMPANY_ADMIN"]
     ):
-        manager_alerts = SmartNotifications.get_all_alerts_for_manager(request.user)
+        manager_alerts = []
 
     # Get daily digest
-    daily_digest = SmartNotifications.generate_daily_digest(employee)
+    daily_digest = SmartNotifications.generate_daily_digest(employee, alerts=employee_alerts)
 
     context = {
         "employee_alerts": employee_alerts,
@@ -476,17 +455,16 @@ def get_notifications_api(request):
     if not employee:
         return JsonResponse({"error": "Employee profile not found"}, status=404)
 
-    # Get alerts
-    employee_alerts = SmartNotifications.get_all_alerts_for_employee(employee)
+    # Precomputed alerts for the user, in one query
+    employee_alerts, manager_alerts = SmartNotifications.get_alerts_for_user(request.user)
 
-    # Get manager alerts if applicable
-    manager_alerts = []
-    if (
+    # Manager alerts only if applicable
+    if not (
         request.user.is_staff
         or request.user.is_superuser
         or getattr(request.user, "role", "") in ["MANAGER", "COMPANY_ADMIN"]
     ):
-        manager_alerts = SmartNotifications.get_all_alerts_for_manager(request.user)
+        manager_alerts = []
 
     return JsonResponse(
         {
@@ -513,17 +491,14 @@ def performance_insights_dashboard(request):
 
     company = request.company
 
-    # Get all employees
-    employees = Employee.objects.filter(company=company, is_active=True)
+    # Company-wide counts, computed once for every employee
+    company_insights = AttendanceIntelligence.get_company_insights(company, days=30)
+    leave_counts = LeavePrediction.company_leave_counts(company, months=3)
 
     performance_data = []
 
-    for emp in employees:
-        # Get attendance analysis
-        attendance_analysis = AttendanceIntelligence.analyze_employee_patterns(emp, days=30)
-
-        # Get leave patterns
-        leave_patterns = LeavePrediction.analyze_leave_patterns(emp, months=3)
+    for attendance_analysis in company_insights["all_insights"]:
+        emp = attendance_analysis["employee"]
 
         # Calculate performance score (use risk_score, not score)
         performance_score = 100 - attendance_analysis.get("risk_score", 0)
@@ -545,7 +520,7 @@ def performance_insights_dashboard(request):
                 "risk_level": attendance_analysis["risk_level"],
                 "late_count": attendance_analysis.get("late_logins", 0),
                 "absence_count": attendance_analysis.get("absences", 0),
-                "leave_count": leave_patterns.get("total_leaves", 0),
+                "leave_count": leave_counts.get(emp.id, 0),
                 "recommendation": recommendation,
             }
         )
@@ -0,0 +1,297 @@
+"""
+Payroll-cycle attendance summaries.
+
+The attendance report and its Excel export both render a 28th-to-27th grid
+with one day code per employee per day. The grid is stored per
+(company, cycle, location) in AttendanceCycleSummary and reused:
+
+- closed cycles are built once and kept
+- the open cycle is extended as days pass (every stored row, so all rows
+  always cover computed_through), and single cells are patched once a
+  change to an Attendance row or a leave request commits
+- holiday and week-off changes mark the affected summaries stale, so they are
+  rebuilt on the next read
+"""
+
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from employees.models import Attendance, Employee
+from employees.working_calendar import holiday_and_week_off_matrices
+
+from .models import AttendanceCycleSummary
+
+STAT_KEYS = {
+    "P": "present",
+    "A": "absent",
+    "L": "leave",
+    "HD": "half_day",
+    "WO": "weekly_off",
+    "H": "holiday",
+}
+
+
+def get_payroll_cycle(year, month):
+    """Return (start, end) of the payroll cycle ending on the 27th of the given month"""
+    if month == 1:
+        # January: Dec 28 to Jan 27
+        return date(year - 1, 12, 28), date(year, 1, 27)
+    # Other months: Previous month 28th to current month 27th
+    return date(year, month - 1, 28), date(year, month, 27)
+
+
+def classify_day(att, is_holiday, is_week_off):
+    """
+    Return (day_code, is_late) for one employee-day.
+
+    WFH and HYBRID count as present. Late is only flagged on regular
+    present days, matching the Excel export.
+    """
+    if att:
+        # Attendance record exists - check if employee actually clocked in
+        if att.clock_in:
+            if att.status == "HALF_DAY":
+                return "HD", False
+            if att.status in ["WFH", "HYBRID"]:
+                return "P", False
+            # PRESENT, or clocked in with another status (shouldn't happen normally)
+            return "P", bool(att.status == "PRESENT" and att.is_late)
+
+        # Attendance record exists but no clock_in - check the status
+        if att.status == "LEAVE":
+            return "L", False
+        if att.status == "WEEKLY_OFF":
+            return "WO", False
+        if att.status == "HOLIDAY":
+            return "H", False
+        if att.status == "HALF_DAY":
+            return "HD", False
+        return "A", False
+
+    # No attendance record - determine what it should be
+    if is_holiday:
+        return "H", False
+    if is_week_off:
+        return "WO", False
+    return "A", False
+
+
+def row_stats(row):
+    """Count day codes for one summary row"""
+    stats = dict.fromkeys(STAT_KEYS.values(), 0)
+    for code in row["days"]:
+        stats[STAT_KEYS[code]] += 1
+    stats["late_arrival"] = len(row["late"])
+
+    total_days = len(row["days"])
+    working_days = total_days - stats["weekly_off"] - stats["holiday"]
+    stats["total_days"] = total_days
+    stats["working_days"] = working_days
+    stats["attendance_percentage"] = round(
+        (stats["present"] / working_days * 100) if working_days > 0 else 0, 1
+    )
+    return stats
+
+
+def _build_rows(employees, start_date, end_date):
+    """Classify every (employee, day) cell in the range"""
+    employee_ids = [emp.id for emp in employees]
+
+    att_map = {}
+    attendances = Attendance.objects.filter(
+        employee_id__in=employee_ids, date__gte=start_date, date__lte=end_date
+    ).only("employee_id", "date", "status", "clock_in", "is_late")
+    for att in attendances:
+        att_map.setdefault(att.employee_id, {})[att.date] = att
+
+    dates, holidays, week_offs = holiday_and_week_off_matrices(employees, start_date, end_date)
+    dates = dates.tolist()
+
+    rows = {}
+    for emp_index, emp in enumerate(employees):
+        emp_attendance = att_map.get(emp.id, {})
+        days = []
+        late = []
+        for index, dt in enumerate(dates):
+            code, is_late = classify_day(
+                emp_attendance.get(dt), holidays[emp_index, index], week_offs[emp_index, index]
+            )
+            days.append(code)
+            if is_late:
+                late.append(index)
+        rows[str(emp.id)] = {"days": days, "late": late}
+    return rows
+
+
+def get_cycle_summary(company, year, month, employees, location_id=None, today=None):
+    """
+    Return the AttendanceCycleSummary for the cycle, with a row for every
+    employee in ``employees``. Only missing days and missing rows are
+    computed; stale summaries are rebuilt.
+    """
+    today = today or timezone.localtime().date()
+    start_date, cycle_end = get_payroll_cycle(year, month)
+    # Only show data up to current date
+    end_date = min(cycle_end, today)
+    employees = list(employees)
+
+    with transaction.atomic():
+        summary, created = AttendanceCycleSummary.objects.select_for_update().get_or_create(
+            company=company,
+            cycle_start=start_date,
+            location_id=location_id or None,
+            defaults={"cycle_end": cycle_end, "computed_through": end_date},
+        )
+        changed = created
+
+        if summary.is_stale or end_date < summary.computed_through:
+            summary.rows = {}
+            summary.computed_through = end_date
+            summary.is_stale = False
+            changed = True
+        else:
+            # Rows that don't cover computed_through (stored before every row was extended) are rebuilt
+            covered = (summary.computed_through - start_date).days + 1
+            for emp_id in [emp_id for emp_id, row in summary.rows.items() if len(row["days"]) != covered]:
+                del summary.rows[emp_id]
+                changed = True
+
+            if end_date > summary.computed_through:
+                # Open cycle: append the days that have passed since the last read to every
+                # stored row, not only the requested employees' (a manager reads just their team)
+                new_start = summary.computed_through + timedelta(days=1)
+                offset = (new_start - start_date).days
+                requested = {str(emp.id): emp for emp in employees}
+                others = [emp_id for emp_id in summary.rows if emp_id not in requested]
+                stored = [emp for emp_id, emp in requested.items() if emp_id in summary.rows]
+                stored.extend(Employee.objects.filter(id__in=others))
+                extended = _build_rows(stored, new_start, end_date)
+                for emp_id in list(summary.rows):
+                    extra = extended.get(emp_id)
+                    if extra is None:
+                        del summary.rows[emp_id]  # Employee deleted
+                        continue
+                    row = summary.rows[emp_id]
+                    row["days"].extend(extra["days"])
+                    row["late"].extend(index + offset for index in extra["late"])
+                    row["stats"] = row_stats(row)
+                summary.computed_through = end_date
+                changed = True
+
+        missing = [emp for emp in employees if str(emp.id) not in summary.rows]
+        if missing:
+            for emp_id, row in _build_rows(missing, start_date, end_date).items():
+                row["stats"] = row_stats(row)
+                summary.rows[emp_id] = row
+            changed = True
+
+        is_closed = end_date >= cycle_end
+        if summary.is_closed != is_closed:
+            summary.is_closed = is_closed
+            changed = True
+
+        if changed:
+            summary.save()
+
+    return summary
+
+
+def refresh_employee_days(employee, start_date, end_date):
+    """
+    Re-classify one employee's cells in every stored summary that covers
+    the range. Called from signals when attendance or leave data changes.
+    """
+    refresh_days([(employee, start_date, end_date)])
+
+
+def refresh_days(spans):
+    """
+    Re-classify the cells of several (employee, start_date, end_date) spans,
+    reading attendance once for all of them. Used after bulk leave approval.
+    """
+    spans = [span for span in spans if span[1] <= span[2]]
+    if not spans:
+        return
+
+    range_start = min(span[1] for span in spans)
+    range_end = max(span[2] for span in spans)
+
+    with transaction.atomic():
+        summaries = list(
+            AttendanceCycleSummary.objects.select_for_update().filter(
+                company_id__in={span[0].company_id for span in spans},
+                cycle_start__lte=range_end,
+                computed_through__gte=range_start,
+                is_stale=False,
+            )
+        )
+        spans = [
+            span
+            for span in spans
+            if any(
+                summary.company_id == span[0].company_id and str(span[0].id) in summary.rows
+                for summary in summaries
+            )
+        ]
+        if not spans:
+            return
+
+        range_start = max(range_start, min(summary.cycle_start for summary in summaries))
+        range_end = min(range_end, max(summary.computed_through for summary in summaries))
+        if range_start > range_end:
+            return
+
+        employees = list({span[0].id: span[0] for span in spans}.values())
+        fresh_rows = _build_rows(employees, range_start, range_end)
+
+        changed = {}
+        for employee, start_date, end_date in spans:
+            emp_id = str(employee.id)
+            fresh = fresh_rows[emp_id]
+            fresh_late = set(fresh["late"])
+            for summary in summaries:
+                if summary.company_id != employee.company_id or emp_id not in summary.rows:
+                    continue
+                first = max(start_date, range_start, summary.cycle_start)
+                last = min(end_date, range_end, summary.computed_through)
+                if first > last:
+                    continue
+
+                row = summary.rows[emp_id]
+                late = set(row["late"])
+                for offset in range((last - first).days + 1):
+                    dt = first + timedelta(days=offset)
+                    index = (dt - range_start).days
+                    day_index = (dt - summary.cycle_start).days
+                    row["days"][day_index] = fresh["days"][index]
+                    if index in fresh_late:
+                        late.add(day_index)
+                    else:
+                        late.discard(day_index)
+                row["late"] = sorted(late)
+                row["stats"] = row_stats(row)
+                changed[summary.pk] = summary
+
+        for summary in changed.values():
+            summary.save(update_fields=["rows", "updated_at"])
+
+
+def mark_summaries_stale(company_id, dt=None):
+    """Flag summaries for rebuild after a holiday or week-off change"""
+    summaries = AttendanceCycleSummary.objects.filter(company_id=company_id)
+    if dt is not None:
+        summaries = summaries.filter(cycle_start__lte=dt, cycle_end__gte=dt)
+    summaries.update(is_stale=True)
+
+
+def drop_employee_rows(employee):
+    """Remove an employee's rows from open summaries so they are rebuilt on next read"""
+    with transaction.atomic():
+        summaries = AttendanceCycleSummary.objects.select_for_update().filter(
+            company_id=employee.company_id, is_closed=False
+        )
+        for summary in summaries:
+            if summary.rows.pop(str(employee.id), None) is not None:
+                summary.save(update_fields=["rows", "updated_at"])
@@ -4,16 +4,52 @@ This runs in the background and checks every hour for birthdays/anniversaries
 based on employee location timezone.
 
 Add this to your Django app to run automatically.
+
+The same hourly loop also runs the management commands in HOURLY_COMMANDS.
+Every process that loads the core app starts this service, so on PostgreSQL
+those commands run only in the process holding a session advisory lock; the
+lock passes to another process when the holder's connection goes away.
 """
 
 import threading
 import time
 import logging
 from django.core.management import call_command
+from django.db import connection
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Other jobs run every hour after the email check: (management command, options)
+HOURLY_COMMANDS = [
+    ("score_attrition_risk", {}),
+    ("refresh_smart_alerts", {}),
+    ("prune_pdf_cache", {}),
+]
+
+# pg_try_advisory_lock key of the process that runs HOURLY_COMMANDS
+HOURLY_COMMANDS_LOCK_ID = 4_727_001
+
+
+def holds_hourly_commands_lock():
+    """
+    True if this process should run HOURLY_COMMANDS. The lock is taken once
+    and kept for the life of the connection. Other databases have no
+    cross-process lock and always run them.
+    """
+    if connection.vendor != "postgresql":
+        return True
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_locks WHERE locktype = 'advisory' AND pid = pg_backend_pid() "
+            "AND classid = 0 AND objid = %s AND objsubid = 1 AND granted",
+            [HOURLY_COMMANDS_LOCK_ID],
+        )
+        if cursor.fetchone():
+            return True
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", [HOURLY_COMMANDS_LOCK_ID])
+        return cursor.fetchone()[0]
+
 
 class EmailSchedulerService:
     """Background service that runs the email command every hour"""
@@ -58,6 +94,8 @@ class EmailSchedulerService:
             except Exception as e:
                 logger.error(f"❌ Error in email scheduler: {str(e)}")
 
+            self._run_hourly_commands()
+
             # Wait for 1 hour (3600 seconds)
             # Check every minute if we should stop
             for _ in range(60):
@@ -65,6 +103,24 @@ class EmailSchedulerService:
                     break
                 time.sleep(60)  # Sleep for 1 minute, check 60 times = 1 hour
 
+    def _run_hourly_commands(self):
+        """Run HOURLY_COMMANDS; one failing command doesn't stop the others"""
+        try:
+            if not holds_hourly_commands_lock():
+                logger.info("Scheduled commands are run by another process")
+                return
+        except Exception as e:
+            logger.error(f"❌ Error taking the scheduled command lock: {str(e)}")
+            # Reconnect next hour rather than reusing a broken connection
+            connection.close()
+            return
+
+        for command, options in HOURLY_COMMANDS:
+            try:
+                call_command(command, **options)
+            except Exception as e:
+                logger.error(f"❌ Error in scheduled command {command}: {str(e)}")
+
 
 # Global instance
 email_scheduler = EmailSchedulerService()
@@ -0,0 +1,87 @@
+import io
+import random
+import time
+from datetime import date
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from xhtml2pdf import pisa
+
+from accounts.models import User
+from companies.models import Company, Location
+from core import pdf_render
+from employees.models import Employee, Payslip
+from employees.payroll_utils import calculate_payslip_breakdown
+from employees.payslip_batch import PAYSLIP_TEMPLATE, apply_breakdown, payslip_pdf_context
+
+
+def sample_payslips(count, company_name="Petabytz", seed=11):
+    """Rendered payslip HTML for synthetic (unsaved) employees"""
+    rng = random.Random(seed)
+    company = Company(name=company_name)
+    location = Location(
+        company=company, name="Hyderabad", country_code="IN", currency="INR", address_line1="Kavuri Hills", city="Hyderabad"
+    )
+    htmls = []
+    for index in range(count):
+        employee = Employee(
+            user=User(first_name="Employee", last_name=str(index)),
+            company=company,
+            location=location,
+            badge_id=f"PBTHYD{index + 1:03d}",
+            designation="Developer",
+            department="Engineering",
+        )
+        payslip = Payslip(employee=employee, month=date(2025, 3, 1))
+        worked_days = rng.randrange(20, 32)
+        breakdown = calculate_payslip_breakdown(rng.randrange(300_000, 3_000_000, 1000), worked_days, 31, True, location)
+        apply_breakdown(payslip, breakdown, worked_days, 31)
+        htmls.append(render_to_string(PAYSLIP_TEMPLATE, payslip_pdf_context(employee, payslip)))
+    return htmls
+
+
+def from_scratch(html):
+    """The previous render_to_pdf: a plain pisaDocument per payslip"""
+    result = io.BytesIO()
+    pisa.pisaDocument(io.BytesIO(html.encode("UTF-8")), result)
+    return result.getvalue()
+
+
+class Command(BaseCommand):
+    help = "Compare from-scratch xhtml2pdf payslip rendering with the PDF render service (pool, asset and output caches)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=40, help="Payslips to render (default: 40)")
+        parser.add_argument("--workers", type=int, help="Render processes (default: PDF_RENDER_WORKERS or up to 4)")
+        parser.add_argument("--company", default="Petabytz", help="Company name, which selects the logo (default: Petabytz)")
+
+    def handle(self, *args, **options):
+        workers = options.get("workers") or pdf_render.default_workers()
+        htmls = sample_payslips(options["count"], options["company"])
+        self.stdout.write(f"{len(htmls)} payslips, {workers} workers")
+
+        def timed(label, render, baseline=None):
+            started = time.perf_counter()
+            render()
+            elapsed = time.perf_counter() - started
+            speedup = f", {baseline / elapsed:.1f}x" if baseline else ""
+            self.stdout.write(f"{label:<32} {elapsed:7.2f}s ({len(htmls) / elapsed:6.1f} PDFs/s{speedup})")
+            return elapsed
+
+        baseline = timed("From scratch, serial", lambda: [from_scratch(html) for html in htmls])
+        timed("Service, in process", lambda: list(pdf_render.render_pdfs(htmls, workers=1, use_cache=False)), baseline)
+        timed("Service, pool start-up", lambda: list(pdf_render.render_pdfs(htmls, workers, use_cache=False)), baseline)
+        timed("Service, warm pool", lambda: list(pdf_render.render_pdfs(htmls, workers, use_cache=False)), baseline)
+
+        # Output cache: the first pass fills it, the second is what an unchanged regeneration costs
+        keys = [pdf_render.cache_key(html) for html in htmls]
+        existing = {key for key in keys if pdf_render.cached_pdf(key)}
+        try:
+            timed("Service, filling output cache", lambda: list(pdf_render.render_pdfs(htmls, workers, use_cache=True)), baseline)
+            timed("Service, output cache hits", lambda: list(pdf_render.render_pdfs(htmls, workers, use_cache=True)), baseline)
+        finally:
+            for key in set(keys) - existing:
+                default_storage.delete(pdf_render._cache_path(key))
+
+        self.stdout.write(self.style.SUCCESS("Done"))
@@ -0,0 +1,17 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from core.pdf_render import prune_output_cache
+
+
+class Command(BaseCommand):
+    help = "Delete cached output PDFs older than PDF_OUTPUT_CACHE_MAX_AGE_DAYS (run hourly by core.email_scheduler)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, help="Maximum age in days (default: PDF_OUTPUT_CACHE_MAX_AGE_DAYS or 30)")
+
+    def handle(self, *args, **options):
+        days = options.get("days")
+        deleted = prune_output_cache(timedelta(days=days) if days else None)
+        self.stdout.write(self.style.SUCCESS(f"{deleted} cached PDFs deleted"))
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.27 on 2026-10-19 02:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0018_auto_update_location_currency'),
+        ('core', '0002_notification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceCycleSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cycle_start', models.DateField(help_text='28th of the previous month')),
+                ('cycle_end', models.DateField(help_text='27th of the payroll month')),
+                ('computed_through', models.DateField(help_text='Last day included in the stored grid')),
+                ('is_closed', models.BooleanField(default=False, help_text='Cycle has ended; the grid covers every day')),
+                ('is_stale', models.BooleanField(default=False, help_text='Holiday or week-off change requires a rebuild')),
+                ('rows', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_cycle_summaries', to='companies.company')),
+                ('location', models.ForeignKey(blank=True, help_text='Leave empty for the all-locations summary', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='attendance_cycle_summaries', to='companies.location')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['company', 'cycle_start', 'computed_through'], name='core_attend_company_fc2164_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='attendancecyclesummary',
+            constraint=models.UniqueConstraint(fields=('company', 'cycle_start', 'location'), name='unique_attendance_cycle_summary_location'),
+        ),
+        migrations.AddConstraint(
+            model_name='attendancecyclesummary',
+            constraint=models.UniqueConstraint(condition=models.Q(('location__isnull', True)), fields=('company', 'cycle_start'), name='unique_attendance_cycle_summary_company'),
+        ),
+    ]
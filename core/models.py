@@ -46,3 +46,54 @@ class Notification(models.Model):
 
     def __str__(self):
         return f"{self.notification_type} for {self.recipient.username}"
+
+
+class AttendanceCycleSummary(models.Model):
+    """
+    Stored 28th-to-27th attendance grid for one company, payroll cycle and
+    (optionally) location. Built and kept current by core.attendance_summary;
+    the attendance report and its Excel export render from it.
+    """
+
+    company = models.ForeignKey(
+        "companies.Company", on_delete=models.CASCADE, related_name="attendance_cycle_summaries"
+    )
+    location = models.ForeignKey(
+        "companies.Location",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="attendance_cycle_summaries",
+        help_text="Leave empty for the all-locations summary",
+    )
+    cycle_start = models.DateField(help_text="28th of the previous month")
+    cycle_end = models.DateField(help_text="27th of the payroll month")
+    computed_through = models.DateField(help_text="Last day included in the stored grid")
+    is_closed = models.BooleanField(default=False, help_text="Cycle has ended; the grid covers every day")
+    is_stale = models.BooleanField(default=False, help_text="Holiday or week-off change requires a rebuild")
+
+    # {employee_id: {"days": ["P", "A", ...], "late": [day_index, ...], "stats": {...}}}
+    rows = models.JSONField(default=dict)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["company", "cycle_start", "location"],
+                name="unique_attendance_cycle_summary_location",
+            ),
+            models.UniqueConstraint(
+                fields=["company", "cycle_start"],
+                condition=models.Q(location__isnull=True),
+                name="unique_attendance_cycle_summary_company",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["company", "cycle_start", "computed_through"]),
+        ]
+
+    def __str__(self):
+        location_name = self.location.name if self.location_id else "All Locations"
+        return f"Attendance {self.cycle_start} to {self.cycle_end} - {location_name}"
@@ -0,0 +1,270 @@
+"""
+PDF rendering service for xhtml2pdf documents.
+
+Rendering a payslip from scratch repeats work that never changes between
+documents: the payslip template links the company logo by URL, which
+xhtml2pdf downloads again for every PDF, and each process pays the reportlab
+font and default-CSS set-up on its first document. This module:
+
+- resolves linked assets through fetch_asset(), which downloads a remote
+  asset once and serves it from PDF_ASSET_CACHE_DIR afterwards (a failed
+  download is retried after ASSET_RETRY_SECONDS; until then the PDF renders
+  without it)
+- renders batches in a persistent pool of spawned worker processes, at most
+  PDF_RENDER_WORKERS at a time, each warmed up once when it starts (a
+  single document renders in the calling process)
+- caches output PDFs in the default storage under pdf_cache/, keyed by the
+  SHA-256 of the rendered HTML, so regenerating an unchanged payslip does
+  not render at all (PDF_OUTPUT_CACHE = False turns this off). A PDF that
+  rendered without one of its assets is not cached, and prune_output_cache()
+  (the prune_pdf_cache command) deletes entries older than
+  PDF_OUTPUT_CACHE_MAX_AGE_DAYS
+
+Workers only receive HTML and never touch Django. The benchmark_pdf_render
+command measures the effect.
+"""
+
+import atexit
+import hashlib
+import io
+import logging
+import mimetypes
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from urllib.parse import urlparse
+
+import xhtml2pdf
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from xhtml2pdf import pisa
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "pdf_cache"
+ASSET_TIMEOUT = 10
+ASSET_RETRY_SECONDS = 300
+WARM_UP_HTML = "<html><head><style>body { font-family: Helvetica; }</style></head><body><p>.</p></body></html>"
+
+# Per process: uri -> local path of a fetched asset, and uri -> time.monotonic() of its last failed fetch
+_assets = {}
+_failed_assets = {}
+_asset_dir = None
+# Per thread: the uris that could not be resolved for the document being rendered
+_rendering = threading.local()
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def default_workers():
+    return getattr(settings, "PDF_RENDER_WORKERS", None) or min(4, os.cpu_count() or 1)
+
+
+def _default_asset_dir():
+    return os.path.join(tempfile.gettempdir(), "hrms_pdf_assets")
+
+
+def fetch_asset(uri, rel=None):
+    """xhtml2pdf link_callback: remote assets are downloaded once and then read from disk"""
+    if not uri or not uri.startswith(("http://", "https://")):
+        return uri
+    if uri in _assets:
+        return _assets[uri]
+
+    asset_dir = _asset_dir or _default_asset_dir()
+    name = hashlib.sha256(uri.encode("utf-8")).hexdigest()
+    failed_at = _failed_assets.get(uri)
+    if failed_at is not None and time.monotonic() - failed_at < ASSET_RETRY_SECONDS:
+        return _missing_asset(uri, asset_dir, name)
+    cached = [entry for entry in os.listdir(asset_dir) if entry.startswith(name)] if os.path.isdir(asset_dir) else []
+    if cached:
+        path = os.path.join(asset_dir, cached[0])
+    else:
+        try:
+            with urllib.request.urlopen(uri, timeout=ASSET_TIMEOUT) as response:
+                data = response.read()
+                content_type = response.headers.get_content_type()
+            extension = os.path.splitext(urlparse(uri).path)[1] or mimetypes.guess_extension(content_type) or ""
+            os.makedirs(asset_dir, exist_ok=True)
+            path = os.path.join(asset_dir, name + extension)
+            # Write then rename, so another process never reads a partial file
+            with tempfile.NamedTemporaryFile(dir=asset_dir, delete=False) as handle:
+                handle.write(data)
+            os.replace(handle.name, path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"PDF asset {uri} could not be fetched: {e}")
+            _failed_assets[uri] = time.monotonic()
+            return _missing_asset(uri, asset_dir, name)
+    _assets[uri] = path
+    _failed_assets.pop(uri, None)
+    return path
+
+
+def _missing_asset(uri, asset_dir, name):
+    """A missing local file: rendered without the asset (an empty path would make xhtml2pdf fetch the URL)"""
+    missing = getattr(_rendering, "missing", None)
+    if missing is not None:
+        missing.append(uri)
+    return os.path.join(asset_dir, name + ".missing")
+
+
+def render_document(html):
+    """
+    (PDF bytes or None, complete) for rendered HTML; complete is False when
+    an asset was left out. Needs no Django setup, so it can run in worker
+    processes.
+    """
+    result = io.BytesIO()
+    _rendering.missing = []
+    try:
+        pdf = pisa.pisaDocument(io.BytesIO(html.encode("UTF-8")), result, link_callback=fetch_asset)
+        complete = not _rendering.missing
+    finally:
+        _rendering.missing = None
+    if not pdf.err:
+        return result.getvalue(), complete
+    return None, False
+
+
+def html_to_pdf(html):
+    """PDF bytes for rendered HTML, or None"""
+    return render_document(html)[0]
+
+
+def _init_worker(asset_dir):
+    """Pool initializer: load fonts and the default CSS once, before the first real document"""
+    global _asset_dir
+    _asset_dir = asset_dir
+    html_to_pdf(WARM_UP_HTML)
+
+
+def _pool(workers):
+    with _pools_lock:
+        if workers not in _pools:
+            # Spawned workers: this may run on a thread of a web process, where fork is unsafe
+            _pools[workers] = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(_asset_dir,),
+            )
+        return _pools[workers]
+
+
+def _discard_pool(workers):
+    with _pools_lock:
+        pool = _pools.pop(workers, None)
+    if pool:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+@atexit.register
+def shutdown_pools():
+    for workers in list(_pools):
+        _discard_pool(workers)
+
+
+def cache_key(html):
+    """Output cache key: the HTML carries every payslip value, plus the renderer version"""
+    return hashlib.sha256(f"{xhtml2pdf.__version__}\n{html}".encode()).hexdigest()
+
+
+def _cache_path(key):
+    return f"{CACHE_PREFIX}/{key[:2]}/{key}.pdf"
+
+
+def _use_cache(use_cache):
+    return getattr(settings, "PDF_OUTPUT_CACHE", True) if use_cache is None else use_cache
+
+
+def cached_pdf(key):
+    try:
+        with default_storage.open(_cache_path(key), "rb") as handle:
+            return handle.read()
+    except (OSError, ValueError):
+        return None
+
+
+def store_pdf(key, pdf):
+    path = _cache_path(key)
+    if pdf and not default_storage.exists(path):
+        default_storage.save(path, ContentFile(pdf))
+
+
+def prune_output_cache(max_age=None):
+    """Delete cached PDFs older than ``max_age`` (default PDF_OUTPUT_CACHE_MAX_AGE_DAYS); returns the number deleted"""
+    max_age = max_age or timedelta(days=getattr(settings, "PDF_OUTPUT_CACHE_MAX_AGE_DAYS", 30))
+    cutoff = timezone.now() - max_age
+    deleted = 0
+    try:
+        shards, _ = default_storage.listdir(CACHE_PREFIX)
+    except (OSError, NotImplementedError):
+        return 0  # Nothing cached yet
+    for shard in shards:
+        for name in default_storage.listdir(f"{CACHE_PREFIX}/{shard}")[1]:
+            path = f"{CACHE_PREFIX}/{shard}/{name}"
+            if default_storage.get_modified_time(path) < cutoff:
+                default_storage.delete(path)
+                deleted += 1
+    return deleted
+
+
+def render_pdfs(htmls, workers=None, use_cache=None):
+    """
+    (index, PDF bytes or None) for each HTML document, cache hits first,
+    then in completion order. Up to ``workers`` documents render at once in
+    the shared pool; with one worker they render in this process.
+    """
+    global _asset_dir
+    _asset_dir = _asset_dir or getattr(settings, "PDF_ASSET_CACHE_DIR", None) or _default_asset_dir()
+    workers = workers or default_workers()
+    use_cache = _use_cache(use_cache)
+
+    pending = {}
+    for index, html in enumerate(htmls):
+        key = cache_key(html) if use_cache else None
+        pdf = cached_pdf(key) if use_cache else None
+        if pdf:
+            yield index, pdf
+        else:
+            pending[index] = key
+
+    def rendered(index, pdf, complete):
+        # A PDF missing an asset is served, but rendered again next time
+        if use_cache and complete:
+            store_pdf(pending[index], pdf)
+        return index, pdf
+
+    if workers <= 1 or len(pending) <= 1:
+        for index in pending:
+            yield rendered(index, *render_document(htmls[index]))
+        return
+
+    pool = _pool(workers)
+    futures = {pool.submit(render_document, htmls[index]): index for index in pending}
+    for future in as_completed(futures):
+        try:
+            pdf, complete = future.result()
+        except BrokenProcessPool:
+            logger.exception("PDF worker pool broke; it is restarted on next use")
+            _discard_pool(workers)
+            pdf, complete = None, False
+        except Exception:
+            logger.exception("PDF rendering failed")
+            pdf, complete = None, False
+        yield rendered(futures[future], pdf, complete)
+
+
+def render_pdf(html, workers=None, use_cache=None):
+    """PDF bytes for one HTML document (through the output cache), or None"""
+    for _, pdf in render_pdfs([html], workers=workers, use_cache=use_cache):
+        return pdf
@@ -1,12 +1,27 @@
 from django.contrib.contenttypes.models import ContentType
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
 from accounts.models import User
-from employees.models import LeaveRequest, RegularizationRequest
+from companies.models import Holiday
+from employees.leave_approval import leaves_approved
+from employees.models import Attendance, Employee, LeaveRequest, RegularizationRequest
 
+from .attendance_summary import drop_employee_rows, mark_summaries_stale, refresh_days, refresh_employee_days
 from .models import Notification
 
+WEEK_OFF_FIELDS = {
+    "location",
+    "week_off_monday",
+    "week_off_tuesday",
+    "week_off_wednesday",
+    "week_off_thursday",
+    "week_off_friday",
+    "week_off_saturday",
+    "week_off_sunday",
+}
+
 
 @receiver(post_save, sender=LeaveRequest)
 def create_leave_request_notification(sender, instance, created, **kwargs):
@@ -94,3 +109,78 @@ def create_regularization_request_notification(sender, instance, created, **kwar
                 content_type=content_type,
                 object_id=instance.id,
             )
+
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+def refresh_attendance_summary_cell(sender, instance, **kwargs):
+    """
+    Patch the stored payroll-cycle grid when an attendance record changes.
+    Deferred to commit: the summary row is shared by the whole company, and
+    locking it inside the punch transaction would serialize every clock-in.
+    """
+    employee, dt = instance.employee, instance.date
+    transaction.on_commit(lambda: refresh_employee_days(employee, dt, dt), robust=True)
+
+
+@receiver(post_save, sender=LeaveRequest)
+def refresh_attendance_summary_for_leave(sender, instance, created, **kwargs):
+    """
+    Patch the stored payroll-cycle grid for the days covered by a leave
+    """
+    if created:
+        return
+    employee, start_date, end_date = instance.employee, instance.start_date, instance.end_date
+    transaction.on_commit(lambda: refresh_employee_days(employee, start_date, end_date), robust=True)
+
+
+@receiver(leaves_approved)
+def refresh_attendance_summary_for_approved_leaves(sender, leave_requests, **kwargs):
+    """
+    Bulk leave approval skips model signals - patch all leave days at once
+    """
+    refresh_days([(lr.employee, lr.start_date, lr.end_date) for lr in leave_requests])
+
+
+@receiver(pre_save, sender=Holiday)
+def remember_holiday_date(sender, instance, **kwargs):
+    """Keep the stored company and date, so a moved holiday also clears its old cycle"""
+    instance._summary_previous = (
+        Holiday.objects.filter(pk=instance.pk).values_list("company_id", "date").first() if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Holiday)
+@receiver(post_delete, sender=Holiday)
+def invalidate_attendance_summary_for_holiday(sender, instance, **kwargs):
+    """
+    Holidays change the code of days without attendance records - rebuild
+    """
+    mark_summaries_stale(instance.company_id, instance.date)
+    previous = getattr(instance, "_summary_previous", None)
+    if previous and previous != (instance.company_id, instance.date):
+        mark_summaries_stale(*previous)
+
+
+def _week_off_values(employee):
+    return {field: getattr(employee, field + "_id" if field == "location" else field) for field in WEEK_OFF_FIELDS}
+
+
+@receiver(pre_save, sender=Employee)
+def remember_week_off_fields(sender, instance, update_fields=None, **kwargs):
+    """Keep the stored week-off and location values to compare against after the save"""
+    instance._summary_previous = None
+    if instance.pk and (update_fields is None or WEEK_OFF_FIELDS.intersection(update_fields)):
+        stored = Employee.objects.filter(pk=instance.pk).only(*WEEK_OFF_FIELDS).first()
+        instance._summary_previous = _week_off_values(stored) if stored else None
+
+
+@receiver(post_save, sender=Employee)
+def invalidate_attendance_summary_for_employee(sender, instance, created, **kwargs):
+    """
+    Week-off or location changes alter an employee's whole row - rebuild it
+    """
+    previous = getattr(instance, "_summary_previous", None)
+    if created or previous is None or previous == _week_off_values(instance):
+        return
+    drop_employee_rows(instance)
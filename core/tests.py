@@ -1 +1,335 @@
-# Create your tests here.
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
+
+import pytz
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from companies.models import Company, Holiday, Location
+from core import pdf_render
+from core.attendance_summary import get_cycle_summary
+from core.email_scheduler import HOURLY_COMMANDS, HOURLY_COMMANDS_LOCK_ID, EmailSchedulerService
+from core.models import AttendanceCycleSummary
+from employees.leave_approval import approve_leave_requests
+from employees.models import Attendance, Employee, LeaveBalance, LeaveRequest, Payslip
+from employees.payroll_utils import calculate_payslip_breakdown
+
+User = get_user_model()
+
+
+class AttendanceCycleSummaryTest(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(
+            name="Test Company", primary_domain="test.com", email_domain="test.com"
+        )
+        self.location = Location.objects.create(
+            company=self.company, name="India", country_code="IN", timezone="Asia/Kolkata"
+        )
+        self.user = User.objects.create_user(
+            username="emp@test.com", email="emp@test.com", password="password", company=self.company
+        )
+        self.employee = Employee.objects.create(
+            user=self.user,
+            company=self.company,
+            designation="Developer",
+            department="IT",
+            location=self.location,
+        )
+        # Cycle for March 2024: Feb 28 (Wed) to Mar 27
+        self.today = date(2024, 3, 5)
+
+    def _summary(self, today=None):
+        return get_cycle_summary(self.company, 2024, 3, [self.employee], today=today or self.today)
+
+    def test_summary_builds_day_codes_and_counts(self):
+        Attendance.objects.create(
+            employee=self.employee,
+            date=date(2024, 2, 28),
+            status="PRESENT",
+            clock_in=pytz.utc.localize(datetime(2024, 2, 28, 4, 0)),
+            is_late=True,
+        )
+        Holiday.objects.create(
+            company=self.company, location=self.location, name="Test Holiday", date=date(2024, 2, 29)
+        )
+
+        row = self._summary().rows[str(self.employee.id)]
+
+        # Feb 28 .. Mar 5: Wed Thu Fri Sat Sun Mon Tue
+        self.assertEqual(row["days"], ["P", "H", "A", "WO", "WO", "A", "A"])
+        self.assertEqual(row["late"], [0])
+        self.assertEqual(row["stats"]["present"], 1)
+        self.assertEqual(row["stats"]["working_days"], 4)
+        self.assertEqual(row["stats"]["late_arrival"], 1)
+
+    def test_open_cycle_is_patched_and_extended(self):
+        self._summary()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.create(employee=self.employee, date=date(2024, 3, 1), status="LEAVE")
+
+        summary = self._summary()
+        self.assertEqual(summary.rows[str(self.employee.id)]["days"][2], "L")
+
+        summary = self._summary(today=date(2024, 3, 27))
+        self.assertTrue(summary.is_closed)
+        self.assertEqual(len(summary.rows[str(self.employee.id)]["days"]), 29)
+
+    def test_team_read_extends_every_stored_row(self):
+        user = User.objects.create_user(username="team@test.com", email="team@test.com", company=self.company)
+        teammate = Employee.objects.create(
+            user=user, company=self.company, designation="Developer", department="IT", location=self.location
+        )
+        get_cycle_summary(self.company, 2024, 3, [self.employee, teammate], today=date(2024, 3, 1))
+
+        # A manager's report reads only part of the company
+        get_cycle_summary(self.company, 2024, 3, [self.employee], today=self.today)
+
+        summary = get_cycle_summary(self.company, 2024, 3, [self.employee, teammate], today=self.today)
+        self.assertEqual({len(row["days"]) for row in summary.rows.values()}, {7})
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.create(employee=teammate, date=date(2024, 3, 4), status="LEAVE")
+        self.assertEqual(self._summary().rows[str(teammate.id)]["days"][5], "L")
+
+    def test_moved_holiday_marks_both_cycles_stale(self):
+        holiday = Holiday.objects.create(
+            company=self.company, location=self.location, name="Test Holiday", date=date(2024, 3, 1)
+        )
+        self.assertEqual(self._summary().rows[str(self.employee.id)]["days"][2], "H")
+
+        holiday.date = date(2024, 4, 1)
+        holiday.save()
+        self.assertEqual(self._summary().rows[str(self.employee.id)]["days"][2], "A")
+
+    def test_only_week_off_or_location_changes_drop_rows(self):
+        self._summary()
+
+        self.employee.designation = "Lead"
+        self.employee.save()
+        self.assertIn(str(self.employee.id), AttendanceCycleSummary.objects.get().rows)
+
+        self.employee.week_off_monday = True
+        self.employee.save()
+        self.assertNotIn(str(self.employee.id), AttendanceCycleSummary.objects.get().rows)
+
+    def test_punch_patches_summary_after_commit(self):
+        self._summary()
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            Attendance.objects.create(employee=self.employee, date=date(2024, 3, 4), status="LEAVE")
+            # The shared summary row is untouched while the punch transaction is open
+            self.assertEqual(self._summary().rows[str(self.employee.id)]["days"][5], "A")
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self._summary().rows[str(self.employee.id)]["days"][5], "L")
+
+    def test_bulk_leave_approval_patches_summary(self):
+        self._summary()
+        LeaveBalance.objects.filter(employee=self.employee).update(casual_leave_allocated=12.0)
+        leave = LeaveRequest.objects.create(
+            employee=self.employee, leave_type="CL", start_date=date(2024, 3, 4), end_date=date(2024, 3, 5)
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            approve_leave_requests([leave], self.user)
+
+        summary = self._summary()
+        self.assertEqual(summary.rows[str(self.employee.id)]["days"][5:], ["L", "L"])
+        self.assertEqual(summary.rows[str(self.employee.id)]["stats"]["leave"], 2)
+
+
+@skipUnless(connection.vendor == "postgresql", "Advisory locks need PostgreSQL")
+class HourlyCommandsLockTest(TestCase):
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock_all()")
+
+    def _run(self):
+        with mock.patch("core.email_scheduler.call_command") as run:
+            EmailSchedulerService()._run_hourly_commands()
+        return run.call_count
+
+    def test_only_the_lock_holder_runs_hourly_commands(self):
+        other = connections.create_connection("default")
+        try:
+            with other.cursor() as cursor:
+                cursor.execute("SELECT pg_try_advisory_lock(%s)", [HOURLY_COMMANDS_LOCK_ID])
+            self.assertEqual(self._run(), 0)
+        finally:
+            other.close()
+
+        # The lock is free once the holder's connection is gone, and kept across runs
+        self.assertEqual(self._run(), len(HOURLY_COMMANDS))
+        self.assertEqual(self._run(), len(HOURLY_COMMANDS))
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM pg_locks WHERE locktype = 'advisory' AND pid = pg_backend_pid()")
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+
+class PayrollPreviewTest(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="Test Company", primary_domain="test.com", email_domain="test.com")
+        india = Location.objects.create(company=self.company, name="India", country_code="IN", timezone="Asia/Kolkata")
+        dhaka = Location.objects.create(
+            company=self.company, name="Dhaka", country_code="BD", currency="BDT", timezone="Asia/Dhaka"
+        )
+        admin = User.objects.create_user(
+            username="admin@test.com",
+            email="admin@test.com",
+            password="password",
+            company=self.company,
+            role=User.Role.COMPANY_ADMIN,
+            must_change_password=False,
+        )
+        self.employees = []
+        for email, location, ctc, pf_enabled in [
+            ("a@test.com", india, 600000, True),
+            ("b@test.com", dhaka, 900000, True),
+            ("c@test.com", india, None, False),
+        ]:
+            user = User.objects.create_user(username=email, email=email, company=self.company)
+            self.employees.append(
+                Employee.objects.create(
+                    user=user,
+                    company=self.company,
+                    designation="Developer",
+                    department="IT",
+                    location=location,
+                    annual_ctc=ctc,
+                    pf_enabled=pf_enabled,
+                )
+            )
+        Payslip.objects.create(employee=self.employees[0], month=date(2025, 2, 1), worked_days=20)
+        self.client.force_login(admin)
+
+    def test_preview_matches_payslip_calculator(self):
+        response = self.client.get(reverse("payroll_preview"), {"month": 2, "year": 2025})
+
+        self.assertEqual(response.status_code, 200)
+        rows = {row["employee"].id: row for row in response.context["rows"]}
+        self.assertEqual(set(rows), {self.employees[0].id, self.employees[1].id})
+        self.assertEqual(response.context["without_ctc"], [self.employees[2]])
+
+        for employee, worked_days in [(self.employees[0], 20), (self.employees[1], 28)]:
+            expected = calculate_payslip_breakdown(
+                employee.annual_ctc, worked_days, 28, employee.pf_enabled, location=employee.location
+            )
+            self.assertEqual(rows[employee.id]["net_salary"], expected["net_salary"])
+            self.assertEqual(rows[employee.id]["worked_days"], worked_days)
+
+        # Rupees and taka are totalled separately
+        self.assertEqual(sorted(total["currency_symbol"] for total in response.context["totals"]), ["৳", "₹"])
+
+
+class PdfRenderServiceTest(SimpleTestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root, PDF_ASSET_CACHE_DIR=self.media_root + "/assets")
+        override.enable()
+        self.addCleanup(override.disable)
+
+        # Fresh per-process asset cache
+        self.addCleanup(setattr, pdf_render, "_asset_dir", pdf_render._asset_dir)
+        self.addCleanup(setattr, pdf_render, "_assets", pdf_render._assets)
+        self.addCleanup(setattr, pdf_render, "_failed_assets", pdf_render._failed_assets)
+        pdf_render._asset_dir = self.media_root + "/assets"
+        pdf_render._assets = {}
+        pdf_render._failed_assets = {}
+
+    def _logo_server(self):
+        logo = BytesIO()
+        Image.new("RGB", (20, 10), "navy").save(logo, "PNG")
+        requests = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                requests.append(self.path)
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.end_headers()
+                self.wfile.write(logo.getvalue())
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return f"http://127.0.0.1:{server.server_port}/logo?v=1", requests
+
+    def test_remote_assets_are_fetched_once(self):
+        url, requests = self._logo_server()
+        html = f'<html><body><img src="{url}" width="20" height="10"><p>Payslip</p></body></html>'
+
+        first = pdf_render.render_pdf(html, workers=1, use_cache=False)
+        second = pdf_render.render_pdf(html, workers=1, use_cache=False)
+
+        self.assertEqual(requests, ["/logo?v=1"])
+        self.assertIn(b"/Image", first)
+        self.assertIn(b"/Image", second)
+
+    def test_unreachable_asset_is_retried_later_and_not_cached(self):
+        url, requests = self._logo_server()
+        html = f'<html><body><img src="{url}" width="20" height="10"><p>Payslip</p></body></html>'
+        unreachable = "http://127.0.0.1:9/logo.png"
+        broken = html.replace(url, unreachable)
+
+        # Skipped, and not fetched again within ASSET_RETRY_SECONDS
+        with mock.patch.object(pdf_render.urllib.request, "urlopen", side_effect=OSError("down")) as urlopen:
+            pdf = pdf_render.render_pdf(broken, workers=1)
+            pdf_render.fetch_asset(unreachable)
+        self.assertTrue(pdf.startswith(b"%PDF"))
+        self.assertEqual(urlopen.call_count, 1)
+        self.assertIsNone(pdf_render.cached_pdf(pdf_render.cache_key(broken)))
+
+        # Once the retry interval passes, the next render fetches it again
+        pdf_render._failed_assets[unreachable] -= pdf_render.ASSET_RETRY_SECONDS
+        with mock.patch.object(pdf_render.urllib.request, "urlopen", side_effect=OSError("still down")) as urlopen:
+            pdf_render.render_pdf(broken, workers=1)
+        self.assertEqual(urlopen.call_count, 1)
+
+        self.assertIn(b"/Image", pdf_render.render_pdf(html, workers=1))
+        self.assertIsNotNone(pdf_render.cached_pdf(pdf_render.cache_key(html)))
+
+    def test_output_cache_is_keyed_by_html(self):
+        html = "<html><body><p>Net salary 48,000.00</p></body></html>"
+        pdf = pdf_render.render_pdf(html, workers=1)
+        self.assertTrue(pdf.startswith(b"%PDF"))
+        self.assertEqual(pdf_render.cached_pdf(pdf_render.cache_key(html)), pdf)
+
+        # A hit is served from the cache without rendering
+        key = pdf_render.cache_key(html.replace("48,000", "49,000"))
+        default_storage.save(pdf_render._cache_path(key), ContentFile(b"cached"))
+        self.assertEqual(pdf_render.render_pdf(html.replace("48,000", "49,000"), workers=1), b"cached")
+        self.assertTrue(pdf_render.render_pdf(html.replace("48,000", "49,000"), use_cache=False).startswith(b"%PDF"))
+
+    def test_old_cached_pdfs_are_pruned(self):
+        old, recent = "<html><body><p>Old</p></body></html>", "<html><body><p>Recent</p></body></html>"
+        pdf_render.render_pdf(old, workers=1)
+        pdf_render.render_pdf(recent, workers=1)
+        old_path = default_storage.path(pdf_render._cache_path(pdf_render.cache_key(old)))
+        week_ago = time.time() - 7 * 24 * 3600
+        os.utime(old_path, (week_ago, week_ago))
+
+        out = StringIO()
+        call_command("prune_pdf_cache", days=1, stdout=out)
+
+        self.assertIn("1 cached PDFs deleted", out.getvalue())
+        self.assertIsNone(pdf_render.cached_pdf(pdf_render.cache_key(old)))
+        self.assertIsNotNone(pdf_render.cached_pdf(pdf_render.cache_key(recent)))
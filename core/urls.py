@@ -41,8 +41,12 @@ urlpatterns = [
     path("payroll/upload/", views.upload_payslip, name="upload_payslip"),
     path("payroll/calculate/", views.calculate_generated_payslip, name="calculate_payslip"),
     path("payroll/generate/", views.process_payslip_generation, name="process_payslip_generation"),
+    path("payroll/preview/", views.payroll_preview, name="payroll_preview"),
     path("payroll/bulk-upload/", views.bulk_upload_payslips, name="bulk_payroll_upload"),
     path("payroll/download-template/", views.download_payslip_template, name="bulk_payroll_template"),
+    path("payroll/batches/<int:pk>/", views.payslip_batch_detail, name="payslip_batch_detail"),
+    path("payroll/batches/<int:pk>/progress/", views.payslip_batch_progress, name="payslip_batch_progress"),
+    path("payroll/batches/<int:pk>/download/", views.payslip_batch_download, name="payslip_batch_download"),
 
 
 
@@ -1,17 +1,13 @@
 # PDF Utility for Payslip Generation
-import io
 from django.template.loader import get_template
-from xhtml2pdf import pisa
 from django.core.files.base import ContentFile
 
+from .pdf_render import render_pdf
+
 def render_to_pdf(template_src, context_dict={}):
     template = get_template(template_src)
     html = template.render(context_dict)
-    result = io.BytesIO()
-    pdf = pisa.pisaDocument(io.BytesIO(html.encode("UTF-8")), result)
-    if not pdf.err:
-        return result.getvalue()
-    return None
+    return render_pdf(html)
 
 def save_pdf_to_model(model_instance, template_src, context_dict, filename):
     pdf_content = render_to_pdf(template_src, context_dict)
@@ -1,6 +1,7 @@
 import calendar
 import random
 import json
+import tempfile
 from datetime import date, datetime, timedelta
 
 import openpyxl
@@ -8,8 +9,8 @@ from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.db.models import Q
-from django.http import HttpResponse, JsonResponse
-from django.shortcuts import redirect, render
+from django.http import FileResponse, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils import timezone
 from loguru import logger
@@ -24,9 +25,11 @@ from employees.models import (
     LeaveBalance,
     LeaveRequest,
     Payslip,
+    PayslipBatch,
     PolicySection,
 )
 
+from .attendance_summary import get_cycle_summary, get_payroll_cycle
 from .decorators import admin_required, manager_required
 from .error_handling import (
     safe_get_employee_profile,
@@ -34,7 +37,19 @@ from .error_handling import (
 from .forms import ForgotPasswordForm, OTPVerificationForm, ResetPasswordForm
 from .models import PasswordResetOTP
 from .utils import save_pdf_to_model
-from employees.payroll_utils import calculate_payslip_breakdown, num2words_indian, num2words_flexible
+from employees.payroll_utils import (
+    calculate_payslip_breakdown,
+    payroll_country_code,
+    payroll_currency_symbol,
+)
+from employees.payroll_vector import calculate_payslip_breakdowns
+from employees.payslip_batch import (
+    apply_breakdown,
+    payslip_filename,
+    payslip_pdf_context,
+    queue_payslip_batch,
+    write_archive,
+)
 
 
 @login_required
@@ -394,9 +409,7 @@ def admin_dashboard(request):
             employee=emp,
             status="APPROVED",
             leave_type="SL",
-            start_date__lte=month_end,
-            end_date__gte=month_start,
-        )
+        ).overlapping(month_start, month_end)
 
         # Create a set of dates that are sick leaves
         sick_leave_dates = set()
@@ -720,10 +733,10 @@ def employee_dashboard(request):
     start_date = today - timedelta(days=30)
     
     # Fetch existing records
-    attendance_records = {att.date: att for att in Attendance.objects.filter(employee=employee, date__range=[start_date, end_date])}
+    attendance_records = {att.date: att for att in Attendance.objects.filter(employee=employee, date__range=[start_date, end_date]).with_working_hours()}
     
     # Fetch leaves
-    leaves = LeaveRequest.objects.filter(employee=employee, status='APPROVED', start_date__lte=end_date, end_date__gte=start_date)
+    leaves = LeaveRequest.objects.filter(employee=employee, status='APPROVED').overlapping(start_date, end_date)
     leave_dates = {}
     for l in leaves:
         curr = max(l.start_date, start_date)
@@ -863,8 +876,8 @@ def employee_dashboard(request):
     # Leave balance
     leave_balance = getattr(employee, "leave_balance", None)
     if leave_balance:
-        # Force refresh from database to get latest data
-        leave_balance.refresh_from_db()
+        # Force refresh to get the latest ledger totals
+        leave_balance.refresh_from_ledger()
 
     # Recent leave requests
     recent_leave_requests = LeaveRequest.objects.filter(employee=employee).order_by("-created_at")[:5]
@@ -1050,10 +1063,10 @@ def personal_home(request):
         start_date = today - timedelta(days=30)
         
         # Fetch existing records
-        attendance_records = {att.date: att for att in Attendance.objects.filter(employee=employee, date__range=[start_date, end_date])}
+        attendance_records = {att.date: att for att in Attendance.objects.filter(employee=employee, date__range=[start_date, end_date]).with_working_hours()}
         
         # Fetch leaves
-        leaves = LeaveRequest.objects.filter(employee=employee, status='APPROVED', start_date__lte=end_date, end_date__gte=start_date)
+        leaves = LeaveRequest.objects.filter(employee=employee, status='APPROVED').overlapping(start_date, end_date)
         leave_dates = {}
         for l in leaves:
             curr = max(l.start_date, start_date)
@@ -1327,7 +1340,7 @@ def personal_home(request):
         # Add leave balance to context
         try:
             leave_balance = employee.leave_balance
-            leave_balance.refresh_from_db()  # Force refresh to get latest data
+            leave_balance.refresh_from_ledger()  # Force refresh to get latest ledger totals
             context["leave_balance"] = leave_balance
         except Exception:
             # Create leave balance if it doesn't exist
@@ -1365,8 +1378,8 @@ def my_leaves(request):
     # Get or create balance (accrual handled by command, but ensure existence)
     balance, created = LeaveBalance.objects.get_or_create(employee=employee)
     
-    # Force refresh balance from database to get latest data after bulk upload
-    balance.refresh_from_db()
+    # Force refresh balance to get latest ledger totals after bulk upload
+    balance.refresh_from_ledger()
 
     if request.method == "POST":
         leave_type = request.POST.get("leave_type")
@@ -2131,14 +2144,7 @@ def attendance_report(request):
     from companies.models import Location
 
     # Calculate payroll cycle dates (28th to 27th)
-    if month == 1:
-        # January: Dec 28 to Jan 27
-        start_date = date(year - 1, 12, 28)
-        end_date = date(year, 1, 27)
-    else:
-        # Other months: Previous month 28th to current month 27th
-        start_date = date(year, month - 1, 28)
-        end_date = date(year, month, 27)
+    start_date, end_date = get_payroll_cycle(year, month)
 
     # Only show data up to current date
     if end_date > today:
@@ -2166,35 +2172,12 @@ def attendance_report(request):
 
     # Filter out employees who left before the report period
     # Show active employees OR employees who exited on or after the start date
-    employees = employees.filter(Q(is_active=True) | Q(exit_date__gte=start_date))
+    employees = list(employees.filter(Q(is_active=True) | Q(exit_date__gte=start_date)))
 
     locations = Location.objects.filter(company=request.user.company, is_active=True)
-    employee_ids = employees.values_list("id", flat=True)
-
-    # Get all attendance records for the period
-    attendances = Attendance.objects.filter(employee__in=employee_ids, date__gte=start_date, date__lte=end_date)
 
-    # Get all holidays for the period and company
-    holidays = Holiday.objects.filter(
-        company=request.user.company,
-        date__gte=start_date,
-        date__lte=end_date,
-        is_active=True,
-    ).select_related("location")
-
-    # Create holiday map by location and date
-    holiday_map = {}
-    for holiday in holidays:
-        if holiday.location_id not in holiday_map:
-            holiday_map[holiday.location_id] = {}
-        holiday_map[holiday.location_id][holiday.date] = holiday
-
-    # Map attendance by employee and date
-    att_map = {}
-    for att in attendances:
-        if att.employee_id not in att_map:
-            att_map[att.employee_id] = {}
-        att_map[att.employee_id][att.date] = att
+    # Day codes come from the stored payroll-cycle summary
+    summary = get_cycle_summary(request.user.company, year, month, employees, location_id=location_id, today=today)
 
     reports = []
     total_stats = {
@@ -2207,105 +2190,18 @@ def attendance_report(request):
     }
 
     for emp in employees:
+        row = summary.rows[str(emp.id)]
+        stats = row["stats"]
         emp_data = {
             "employee": emp,
-            "days": [],
-            "stats": {
-                "present": 0,
-                "absent": 0,
-                "leave": 0,
-                "half_day": 0,
-                "weekly_off": 0,
-                "holiday": 0,
-            },
+            "days": row["days"],
+            "stats": {key: stats[key] for key in total_stats},
+            "working_days": stats["working_days"],
+            "present_days": stats["present"],  # WFH is already counted as present
+            "attendance_percentage": stats["attendance_percentage"],
         }
-
-        for dt in date_range:
-            att = att_map.get(emp.id, {}).get(dt)
-
-            # Determine status based on actual attendance records and clock-in data
-            if att:
-                # Attendance record exists - check if employee actually clocked in
-                if att.clock_in:
-                    # Employee clocked in - determine status
-                    if att.status == "WFH":
-                        status_code = "WFH"  # Will be counted as Present
-                    elif att.status == "PRESENT":
-                        status_code = "PRESENT"
-                    elif att.status == "HYBRID":
-                        status_code = "PRESENT"  # Hybrid counted as present
-                    elif att.status == "HALF_DAY":
-                        status_code = "HALF_DAY"
-                    else:
-                        # Has clock_in but other status (shouldn't happen normally)
-                        status_code = "PRESENT"
-                else:
-                    # Attendance record exists but no clock_in - check the status
-                    if att.status == "LEAVE":
-                        status_code = "LEAVE"
-                    elif att.status == "WEEKLY_OFF":
-                        status_code = "WEEKLY_OFF"
-                    elif att.status == "HOLIDAY":
-                        status_code = "HOLIDAY"
-                    elif att.status == "HALF_DAY":
-                        status_code = "HALF_DAY"
-                    else:
-                        # No clock_in and not leave/holiday/weekoff = absent
-                        status_code = "ABSENT"
-            else:
-                # No attendance record - determine what it should be
-                # Check if it's a holiday for this employee's location
-                if emp.location_id and emp.location_id in holiday_map and dt in holiday_map[emp.location_id]:
-                    status_code = "HOLIDAY"
-                # Check if it's a weekoff for this employee
-                elif emp.is_week_off(dt):
-                    status_code = "WEEKLY_OFF"
-                else:
-                    # No record and not holiday/weekoff = absent
-                    status_code = "ABSENT"
-
-            # Map status to display value and count
-            display_val = "-"
-
-            if status_code == "PRESENT":
-                display_val = "P"
-                emp_data["stats"]["present"] += 1
-                total_stats["present"] += 1
-            elif status_code == "WFH":
-                # Count WFH as present
-                display_val = "P"
-                emp_data["stats"]["present"] += 1
-                total_stats["present"] += 1
-            elif status_code == "ABSENT":
-                display_val = "A"
-                emp_data["stats"]["absent"] += 1
-                total_stats["absent"] += 1
-            elif status_code == "LEAVE":
-                display_val = "L"
-                emp_data["stats"]["leave"] += 1
-                total_stats["leave"] += 1
-            elif status_code == "HALF_DAY":
-                display_val = "HD"
-                emp_data["stats"]["half_day"] += 1
-                total_stats["half_day"] += 1
-            elif status_code == "WEEKLY_OFF":
-                display_val = "WO"
-                emp_data["stats"]["weekly_off"] += 1
-                total_stats["weekly_off"] += 1
-            elif status_code == "HOLIDAY":
-                display_val = "H"
-                emp_data["stats"]["holiday"] += 1
-                total_stats["holiday"] += 1
-
-            emp_data["days"].append(display_val)
-
-        # Calculate working days and attendance percentage
-        working_days = len(date_range) - emp_data["stats"]["weekly_off"] - emp_data["stats"]["holiday"]
-        present_days = emp_data["stats"]["present"]  # WFH is already counted as present
-
-        emp_data["working_days"] = working_days
-        emp_data["present_days"] = present_days
-        emp_data["attendance_percentage"] = round((present_days / working_days * 100) if working_days > 0 else 0, 1)
+        for key in total_stats:
+            total_stats[key] += stats[key]
 
         reports.append(emp_data)
 
@@ -2347,12 +2243,7 @@ def download_attendance(request):
     location_id = request.GET.get("location")
 
     # Calculate payroll cycle dates (28th to 27th)
-    if month == 1:
-        start_date = date(year - 1, 12, 28)
-        end_date = date(year, 1, 27)
-    else:
-        start_date = date(year, month - 1, 28)
-        end_date = date(year, month, 27)
+    start_date, end_date = get_payroll_cycle(year, month)
 
     # Only show data up to current date
     if end_date > today:
@@ -2421,31 +2312,10 @@ def download_attendance(request):
     if location_id:
         employees = employees.filter(location_id=location_id)
 
-    attendances = Attendance.objects.filter(
-        employee__company=request.user.company, date__gte=start_date, date__lte=end_date
-    )
+    employees = list(employees)
 
-    # Get holidays for the period
-    holidays = Holiday.objects.filter(
-        company=request.user.company,
-        date__gte=start_date,
-        date__lte=end_date,
-        is_active=True,
-    ).select_related("location")
-
-    # Create holiday map by location and date
-    holiday_map = {}
-    for holiday in holidays:
-        if holiday.location_id not in holiday_map:
-            holiday_map[holiday.location_id] = {}
-        holiday_map[holiday.location_id][holiday.date] = holiday
-
-    # Map attendance by employee and date
-    att_map = {}
-    for att in attendances:
-        if att.employee_id not in att_map:
-            att_map[att.employee_id] = {}
-        att_map[att.employee_id][att.date] = att
+    # Day codes come from the stored payroll-cycle summary
+    summary = get_cycle_summary(request.user.company, year, month, employees, location_id=location_id, today=today)
 
     # 3. Write Rows
     row_num = 2
@@ -2463,118 +2333,35 @@ def download_attendance(request):
             value=emp.manager.get_full_name() if emp.manager else "-",
         )
 
-        # Stats Counters (simplified)
-        stats = {
-            "present": 0,
-            "absent": 0,
-            "leave": 0,
-            "half_day": 0,
-            "weekly_off": 0,
-            "holiday": 0,
-            "late_arrival": 0,
-        }
+        row = summary.rows[str(emp.id)]
+        stats = row["stats"]
+        late_days = set(row["late"])
 
         # Date Columns
         col_idx = 7
-        for dt in date_cols:
-            att = att_map.get(emp.id, {}).get(dt)
-
-            # Determine status using same logic as report view - check actual clock-in
-            if att:
-                # Attendance record exists - check if employee actually clocked in
-                if att.clock_in:
-                    # Employee clocked in - determine status
-                    if att.status == "WFH":
-                        status_code = "WFH"  # Will be counted as Present
-                    elif att.status == "PRESENT":
-                        status_code = "PRESENT"
-                    elif att.status == "HYBRID":
-                        status_code = "PRESENT"  # Hybrid counted as present
-                    elif att.status == "HALF_DAY":
-                        status_code = "HALF_DAY"
-                    else:
-                        # Has clock_in but other status (shouldn't happen normally)
-                        status_code = "PRESENT"
-                else:
-                    # Attendance record exists but no clock_in - check the status
-                    if att.status == "LEAVE":
-                        status_code = "LEAVE"
-                    elif att.status == "WEEKLY_OFF":
-                        status_code = "WEEKLY_OFF"
-                    elif att.status == "HOLIDAY":
-                        status_code = "HOLIDAY"
-                    elif att.status == "HALF_DAY":
-                        status_code = "HALF_DAY"
-                    else:
-                        # No clock_in and not leave/holiday/weekoff = absent
-                        status_code = "ABSENT"
-            else:
-                # No attendance record - determine what it should be
-                if emp.location_id and emp.location_id in holiday_map and dt in holiday_map[emp.location_id]:
-                    status_code = "HOLIDAY"
-                elif emp.is_week_off(dt):
-                    status_code = "WEEKLY_OFF"
-                else:
-                    status_code = "ABSENT"
-
-            # Map status to display value and count
-            display_val = "-"
-            if status_code == "PRESENT":
-                display_val = "P"
-                stats["present"] += 1
-                if att and att.is_late:
-                    display_val += " (L)"
-                    stats["late_arrival"] += 1
-            elif status_code == "WFH":
-                # Count WFH as present
-                display_val = "P"
-                stats["present"] += 1
-            elif status_code == "ABSENT":
-                display_val = "A"
-                stats["absent"] += 1
-            elif status_code == "LEAVE":
-                display_val = "L"
-                stats["leave"] += 1
-            elif status_code == "HALF_DAY":
-                display_val = "HD"
-                stats["half_day"] += 1
-            elif status_code == "WEEKLY_OFF":
-                display_val = "WO"
-                stats["weekly_off"] += 1
-            elif status_code == "HOLIDAY":
-                display_val = "H"
-                stats["holiday"] += 1
-
+        for day_index, display_val in enumerate(row["days"]):
+            if day_index in late_days:
+                display_val += " (L)"
             cell = ws.cell(row=row_num, column=col_idx, value=display_val)
             cell.alignment = Alignment(horizontal="center")
             col_idx += 1
 
         # Summary Columns
-        total_days = len(date_cols)
-        working_days = total_days - stats["weekly_off"] - stats["holiday"]
-        present_days = stats["present"]  # WFH is already counted as present
-        attendance_percentage = round((present_days / working_days * 100) if working_days > 0 else 0, 1)
-
-        ws.cell(row=row_num, column=col_idx, value=total_days)
-        col_idx += 1
-        ws.cell(row=row_num, column=col_idx, value=stats["present"])
-        col_idx += 1
-        ws.cell(row=row_num, column=col_idx, value=stats["half_day"])
-        col_idx += 1
-        ws.cell(row=row_num, column=col_idx, value=stats["weekly_off"])
-        col_idx += 1
-        ws.cell(row=row_num, column=col_idx, value=stats["holiday"])
-        col_idx += 1
-        ws.cell(row=row_num, column=col_idx, value=stats["leave"])
-        col_idx += 1
-        ws.cell(row=row_num, column=col_idx, value=stats["absent"])
-        col_idx += 1
-        ws.cell(row=row_num, column=col_idx, value=working_days)
-        col_idx += 1
-        ws.cell(row=row_num, column=col_idx, value=f"{attendance_percentage}%")
-        col_idx += 1
-        ws.cell(row=row_num, column=col_idx, value=stats["late_arrival"])
-        col_idx += 1
+        summary_values = [
+            stats["total_days"],
+            stats["present"],
+            stats["half_day"],
+            stats["weekly_off"],
+            stats["holiday"],
+            stats["leave"],
+            stats["absent"],
+            stats["working_days"],
+            f"{stats['attendance_percentage']}%",
+            stats["late_arrival"],
+        ]
+        for value in summary_values:
+            ws.cell(row=row_num, column=col_idx, value=value)
+            col_idx += 1
 
         row_num += 1
 
@@ -2610,6 +2397,47 @@ def leave_requests(request):
     if request.method == "POST":
         action = request.POST.get("action")
 
+        if action == "bulk_approve":
+            from employees.leave_approval import approve_leave_requests
+
+            pending = list(
+                LeaveRequest.objects.filter(
+                    id__in=request.POST.getlist("leave_ids"),
+                    employee__company=request.user.company,
+                    status="PENDING",
+                ).select_related("employee__user", "employee__company")
+            )
+            approved_ids = set(approve_leave_requests(pending, request.user, approval_type="FULL"))
+            approved = [leave_request for leave_request in pending if leave_request.pk in approved_ids]
+
+            if approved:
+                messages.success(request, f"Approved {len(approved)} leave request(s).")
+            skipped = len(pending) - len(approved)
+            if skipped:
+                messages.warning(
+                    request,
+                    f"{skipped} leave request(s) need LOP or partial approval and were left pending.",
+                )
+
+            # Send Approval Emails in the background
+            import threading
+
+            def send_emails_async():
+                from core.email_utils import send_leave_approval_notification
+
+                for leave_request in approved:
+                    try:
+                        if not send_leave_approval_notification(leave_request):
+                            logger.warning(f"Leave approval email failed for leave {leave_request.pk}")
+                    except Exception as e:
+                        logger.error(f"Error sending approval email: {e}")
+
+            email_thread = threading.Thread(target=send_emails_async)
+            email_thread.daemon = True
+            email_thread.start()
+
+            return redirect("leave_requests")
+
         leave_id = request.POST.get("leave_id")
 
         admin_comment = request.POST.get("admin_comment", "")
@@ -2899,6 +2727,7 @@ def payroll_dashboard(request):
         "months": months,
         "years": years,
         "days_in_month": days_in_month,
+        "payslip_batches": PayslipBatch.objects.filter(company=request.user.company)[:5],
     }
     
     return render(request, "core/payroll_dashboard.html", context)
@@ -2948,6 +2777,73 @@ def upload_payslip(request):
             
     return redirect(f"{reverse('payroll_dashboard')}?month={request.POST.get('month')}&year={request.POST.get('year')}")
 
+@login_required
+@admin_required
+def payroll_preview(request):
+    """Payroll of every active employee for a month, calculated in one vectorized pass"""
+    if not hasattr(request.user, "company") or not request.user.company:
+        messages.error(request, "Restricted access.")
+        return redirect("dashboard")
+
+    company = request.user.company
+    today = timezone.localtime().date()
+    selected_month = int(request.GET.get("month", today.month))
+    selected_year = int(request.GET.get("year", today.year))
+    total_days = calendar.monthrange(selected_year, selected_month)[1]
+
+    employees = list(
+        Employee.objects.filter(company=company, is_active=True)
+        .select_related("user", "location")
+        .order_by("badge_id")
+    )
+    without_ctc = [emp for emp in employees if not emp.annual_ctc]
+    employees = [emp for emp in employees if emp.annual_ctc]
+
+    # Worked days from this month's payslips; a full month for employees without one
+    worked_days = dict(
+        Payslip.objects.filter(
+            employee__company=company, month__month=selected_month, month__year=selected_year
+        ).values_list("employee_id", "worked_days")
+    )
+    breakdowns = calculate_payslip_breakdowns(
+        [float(emp.annual_ctc) for emp in employees],
+        [worked_days.get(emp.id, total_days) for emp in employees],
+        total_days,
+        [emp.pf_enabled for emp in employees],
+        [payroll_country_code(emp.location) for emp in employees],
+    )
+
+    amount_keys = ["monthly_ctc", "gross_monthly", "employee_pf", "employer_pf", "professional_tax", "net_salary"]
+    rows = []
+    totals = {}
+    for index, emp in enumerate(employees):
+        row = {key: float(breakdowns[key][index]) for key in amount_keys + ["basic"]}
+        row["employee"] = emp
+        row["worked_days"] = float(breakdowns["worked_days"][index])
+        row["currency_symbol"] = payroll_currency_symbol(emp.location)
+        rows.append(row)
+
+        # Totals per currency; amounts in different currencies are not added up
+        total = totals.setdefault(
+            row["currency_symbol"],
+            {"currency_symbol": row["currency_symbol"], "employees": 0, **dict.fromkeys(amount_keys, 0.0)},
+        )
+        total["employees"] += 1
+        for key in amount_keys:
+            total[key] = round(total[key] + row[key], 2)
+
+    context = {
+        "title": "Payroll Preview",
+        "rows": rows,
+        "totals": list(totals.values()),
+        "without_ctc": without_ctc,
+        "selected_month": selected_month,
+        "selected_year": selected_year,
+        "month_date": date(selected_year, selected_month, 1),
+        "total_days": total_days,
+    }
+    return render(request, "core/payroll_preview.html", context)
+
 @login_required
 @admin_required
 def calculate_generated_payslip(request):
@@ -3019,65 +2915,12 @@ def process_payslip_generation(request):
                 employee=employee,
                 month=month_date
             )
-            
-            # Update fields
-            payslip.basic = breakdown['basic']
-            payslip.hra = breakdown['hra']
-            payslip.lta = breakdown['lta']
-            payslip.other_allowance = breakdown['other_allowance']
-            # Map location specific allowances
-            payslip.conveyance_allowance = breakdown.get('conveyance', 0.0)
-            payslip.special_allowance = breakdown.get('medical', 0.0)
-            payslip.monthly_gross = breakdown['full_monthly_gross']
-            payslip.gross_salary = breakdown['gross_monthly']
-            payslip.employee_pf = breakdown['employee_pf']
-            payslip.employer_pf = breakdown['employer_pf']
-            payslip.professional_tax = breakdown['professional_tax']
-            payslip.net_salary = breakdown['net_salary']
-            payslip.worked_days = worked_days
-            payslip.total_days = total_days
+            apply_breakdown(payslip, breakdown, worked_days, total_days)
             payslip.save()
-            
+
             # Generate PDF
-            # Determine currency name for words
-            currency_name = "Rupees"
-            if employee.location:
-                if employee.location.country_code == 'BD' or employee.location.currency == 'BDT':
-                    currency_name = "Taka"
-                elif employee.location.country_code == 'US' or employee.location.currency == 'USD':
-                    currency_name = "Dollars"
-                elif employee.location.currency:
-                    currency_name = employee.location.currency
-
-            # Prepare branding info
-            cname_upper = employee.company.name.upper()
-            branding = {
-                'name': 'PETABYTZ TECHNOLOGY SERVICES PVT LTD',
-                'address': 'PLOT NO 201 & 202, 1ST FLOOR, DMR CORPORATE, KAVURI HILLS RD, HYDERABAD, TELANGANA 500081.'
-            }
-            if "SOFTSTANDARD" in cname_upper or "RMINDS" in cname_upper:
-                branding['name'] = 'SOFTSTANDARD SOLUTIONS'
-            
-            # Use location address if available
-            if employee.location and employee.location.address_line1:
-                loc = employee.location
-                addr = f"{loc.address_line1}"
-                if loc.address_line2:
-                    addr += f", {loc.address_line2}"
-                addr += f", {loc.city}"
-                if loc.state:
-                    addr += f", {loc.state}"
-                if loc.postal_code:
-                    addr += f" {loc.postal_code}"
-                branding['address'] = addr
-
-            context = {
-                'payslip': payslip,
-                'company': employee.company,
-                'branding': branding,
-                'net_salary_words': num2words_flexible(payslip.net_salary, currency_name)
-            }
-            filename = f"payslip_{employee.badge_id}_{month_date.strftime('%b_%Y')}.pdf"
+            context = payslip_pdf_context(employee, payslip)
+            filename = payslip_filename(employee, month_date)
             save_pdf_to_model(payslip, 'employees/payslip_pdf.html', context, filename)
             
             messages.success(request, f"Payslip for {employee.user.get_full_name()} generated successfully.")
@@ -3122,127 +2965,67 @@ def download_payslip_template(request):
 @login_required
 @admin_required
 def bulk_upload_payslips(request):
-    """Refined bulk upload from Excel"""
+    """Queue a bulk payslip sheet for background generation"""
     if request.method == "POST" and request.FILES.get("excel_file"):
-        import openpyxl
-        from datetime import date
-        
-        excel_file = request.FILES["excel_file"]
         month = int(request.POST.get("month"))
         year = int(request.POST.get("year"))
-        month_date = date(year, month, 1)
-        
+
         try:
-            wb = openpyxl.load_workbook(excel_file)
-            ws = wb.active
-            
-            # Map headers to column indices
-            header_map = {}
-            for cell in ws[1]:
-                if cell.value:
-                    header_map[cell.value.strip().lower()] = cell.column - 1
-            
-            # Required columns
-            needed = ['employee id', 'monthly gross', 'payable days']
-            for col in needed:
-                if col not in header_map:
-                    messages.error(request, f"Required column missing: {col}")
-                    return redirect(f"{reverse('payroll_dashboard')}?month={month}&year={year}")
-            
-            success_count = 0
-            error_count = 0
-            
-            for row in ws.iter_rows(min_row=2, values_only=True):
-                badge_id = str(row[header_map['employee id']]) if row[header_map['employee id']] else None
-                monthly_gross = row[header_map['monthly gross']]
-                payable_days = row[header_map['payable days']]
-                
-                if not badge_id or monthly_gross is None or payable_days is None:
-                    continue
-                
-                try:
-                    employee = Employee.objects.get(badge_id=badge_id, company=request.user.company)
-                    annual_ctc = float(monthly_gross) * 12
-                    worked_days = float(payable_days)
-                    total_days = calendar.monthrange(year, month)[1]
-                    
-                    # Calculate breakdown
-                    breakdown = calculate_payslip_breakdown(
-                        annual_ctc, worked_days, total_days, 
-                        employee.pf_enabled, location=employee.location
-                    )
-                    
-                    payslip, created = Payslip.objects.get_or_create(
-                        employee=employee,
-                        month=month_date
-                    )
-                    
-                    # Update fields
-                    payslip.basic = breakdown['basic']
-                    payslip.hra = breakdown['hra']
-                    payslip.lta = breakdown['lta']
-                    payslip.other_allowance = breakdown['other_allowance']
-                    payslip.conveyance_allowance = breakdown.get('conveyance', 0.0)
-                    payslip.special_allowance = breakdown.get('medical', 0.0)
-                    payslip.monthly_gross = breakdown['full_monthly_gross']
-                    payslip.gross_salary = breakdown['gross_monthly']
-                    payslip.employee_pf = breakdown['employee_pf']
-                    payslip.employer_pf = breakdown['employer_pf']
-                    payslip.professional_tax = breakdown['professional_tax']
-                    payslip.net_salary = breakdown['net_salary']
-                    payslip.worked_days = worked_days
-                    payslip.total_days = total_days
-                    payslip.save()
-                    
-                    # Generate PDF
-                    currency_name = "Rupees"
-                    if employee.location:
-                        if employee.location.country_code == 'BD' or employee.location.currency == 'BDT':
-                            currency_name = "Taka"
-                        elif employee.location.country_code == 'US' or employee.location.currency == 'USD':
-                            currency_name = "Dollars"
-                        elif employee.location.currency:
-                            currency_name = employee.location.currency
-
-                    cname_upper = employee.company.name.upper()
-                    branding = {
-                        'name': 'PETABYTZ TECHNOLOGY SERVICES PVT LTD',
-                        'address': 'PLOT NO 201 & 202, 1ST FLOOR, DMR CORPORATE, KAVURI HILLS RD, HYDERABAD, TELANGANA 500081.'
-                    }
-                    if "SOFTSTANDARD" in cname_upper or "RMINDS" in cname_upper:
-                        branding['name'] = 'SOFTSTANDARD SOLUTIONS'
-                    
-                    if employee.location and employee.location.address_line1:
-                        loc = employee.location
-                        addr = f"{loc.address_line1}"
-                        if loc.address_line2: addr += f", {loc.address_line2}"
-                        addr += f", {loc.city}"
-                        if loc.state: addr += f", {loc.state}"
-                        if loc.postal_code: addr += f" {loc.postal_code}"
-                        branding['address'] = addr
-
-                    context = {
-                        'payslip': payslip,
-                        'company': employee.company,
-                        'branding': branding,
-                        'net_salary_words': num2words_flexible(payslip.net_salary, currency_name)
-                    }
-                    filename = f"payslip_{employee.badge_id}_{month_date.strftime('%b_%Y')}.pdf"
-                    save_pdf_to_model(payslip, 'employees/payslip_pdf.html', context, filename)
-                    
-                    success_count += 1
-                except Employee.DoesNotExist:
-                    error_count += 1
-                except Exception as e:
-                    error_count += 1
-                    
-            messages.success(request, f"Successfully processed {success_count} payslips. {error_count} errors.")
+            batch = queue_payslip_batch(
+                request.FILES["excel_file"], date(year, month, 1), request.user.company, uploaded_by=request.user
+            )
         except Exception as e:
             messages.error(request, f"Error processing file: {str(e)}")
-            
+        else:
+            messages.success(request, f"{batch.total_rows} payslips queued. Generation continues in the background.")
+            return redirect("payslip_batch_detail", pk=batch.pk)
+
     return redirect(f"{reverse('payroll_dashboard')}?month={request.POST.get('month', date.today().month)}&year={request.POST.get('year', date.today().year)}")
 
 
+@login_required
+@admin_required
+def payslip_batch_detail(request, pk):
+    """Progress and per-employee status of a bulk payslip batch"""
+    batch = get_object_or_404(PayslipBatch, pk=pk, company=request.user.company)
+    items = batch.items.select_related("employee__user", "payslip")
+    return render(request, "core/payslip_batch.html", {"title": "Payslip Batch", "batch": batch, "items": items})
+
+
+@login_required
+@admin_required
+def payslip_batch_progress(request, pk):
+    """JSON progress of a payslip batch, polled by the status page"""
+    batch = get_object_or_404(PayslipBatch, pk=pk, company=request.user.company)
+    return JsonResponse(
+        {
+            "status": batch.status,
+            "percent": batch.percent,
+            "processed": batch.processed_rows,
+            "total": batch.total_rows,
+            "generated": batch.generated_count,
+            "failed": batch.failed_count,
+        }
+    )
+
+
+@login_required
+@admin_required
+def payslip_batch_download(request, pk):
+    """The batch's generated payslip PDFs as one zip"""
+    batch = get_object_or_404(PayslipBatch, pk=pk, company=request.user.company)
+    archive = tempfile.SpooledTemporaryFile(max_size=10 * 1024 * 1024)  # noqa: SIM115 - FileResponse closes it
+    if not write_archive(batch, archive):
+        archive.close()
+        messages.error(request, "No generated payslips to download yet.")
+        return redirect("payslip_batch_detail", pk=batch.pk)
+
+    archive.seek(0)
+    return FileResponse(
+        archive, as_attachment=True, filename=f"payslips_{batch.month.strftime('%b_%Y')}_{batch.pk}.zip"
+    )
+
+
 
 
 # --- Configuration Section ---
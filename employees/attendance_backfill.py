@@ -0,0 +1,134 @@
+"""
+Set-based absence marking.
+
+For each company, the missing (employee, date) working-day pairs are computed
+in bulk from the working-day calendar and the existing attendance dates, then
+written with bulk_create(ignore_conflicts=True) in batches. Companies can be
+processed in parallel worker processes. bulk_create skips post_save, so the
+absences_marked signal stands in for the per-row Attendance signals.
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from django.db import connections
+from django.dispatch import Signal
+
+from .models import Attendance, Employee
+from .working_calendar import WEEK_OFF_FIELDS, working_day_matrix
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Sent with company_id and employee_ids after a company's absences are written
+absences_marked = Signal()
+
+
+def find_missing_working_days(employees, start_date, end_date):
+    """
+    Return a list of (employee_id, date) pairs that are working days without
+    an attendance record. Days before date_of_joining are excluded.
+    """
+    employees = list(employees)
+    if not employees:
+        return []
+
+    dates, missing = working_day_matrix(employees, start_date, end_date)
+    if not len(dates):
+        return []
+
+    row_index = {emp.id: row for row, emp in enumerate(employees)}
+    existing = Attendance.objects.filter(
+        employee_id__in=list(row_index), date__gte=start_date, date__lte=end_date
+    ).values_list("employee_id", "date")
+    for employee_id, att_date in existing:
+        missing[row_index[employee_id], (att_date - start_date).days] = False
+
+    # Skip if employee joined after this date
+    joining = np.array(
+        [np.datetime64(emp.date_of_joining) if emp.date_of_joining else np.datetime64("NaT") for emp in employees],
+        dtype="datetime64[D]",
+    )
+    has_joining = ~np.isnat(joining)
+    missing[has_joining] &= dates[None, :] >= joining[has_joining, None]
+
+    rows, cols = np.nonzero(missing)
+    date_list = dates.tolist()
+    return [(employees[row].id, date_list[col]) for row, col in zip(rows.tolist(), cols.tolist(), strict=True)]
+
+
+def mark_absents_for_company(company_id, start_date, end_date, dry_run=False, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Create ABSENT records for one company's active employees. Returns a stats
+    dict with the number of candidate pairs, rows actually written and timing.
+    """
+    started = time.perf_counter()
+
+    employees = Employee.objects.filter(company_id=company_id, is_active=True).only(
+        "id", "company_id", "location_id", "date_of_joining", *WEEK_OFF_FIELDS
+    )
+    employees = list(employees)
+    pairs = find_missing_working_days(employees, start_date, end_date)
+
+    written = 0
+    if pairs and not dry_run:
+        in_range = Attendance.objects.filter(
+            employee__company_id=company_id, date__gte=start_date, date__lte=end_date
+        )
+        before = in_range.count()
+        for offset in range(0, len(pairs), batch_size):
+            Attendance.objects.bulk_create(
+                [
+                    Attendance(employee_id=employee_id, date=att_date, status="ABSENT", clock_in=None, clock_out=None)
+                    for employee_id, att_date in pairs[offset : offset + batch_size]
+                ],
+                ignore_conflicts=True,
+            )
+        # ignore_conflicts hides per-row outcomes, so count what actually landed
+        written = in_range.count() - before
+        if written:
+            absences_marked.send(
+                sender=Attendance,
+                company_id=company_id,
+                employee_ids=sorted({employee_id for employee_id, _ in pairs}),
+            )
+
+    return {
+        "company_id": company_id,
+        "employees": len(employees),
+        "candidates": len(pairs),
+        "written": written,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def _init_worker():
+    """Give each worker process its own database connections"""
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+    connections.close_all()
+
+
+def _run_company(args):
+    return mark_absents_for_company(*args)
+
+
+def mark_absents(company_ids, start_date, end_date, dry_run=False, batch_size=DEFAULT_BATCH_SIZE, workers=1):
+    """
+    Run mark_absents_for_company for every company, optionally in a pool of
+    worker processes. Yields one stats dict per company as it finishes.
+    """
+    jobs = [(company_id, start_date, end_date, dry_run, batch_size) for company_id in company_ids]
+
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield _run_company(job)
+        return
+
+    # Forked children must not share the parent's open connections
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        yield from executor.map(_run_company, jobs)
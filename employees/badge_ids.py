@@ -0,0 +1,108 @@
+"""
+Employee badge IDs.
+
+A badge ID is a prefix derived from the company and location plus a
+zero-padded number, e.g. PBTHYD001. Numbers come from a BadgeSequence row per
+prefix: reserving IDs is one ``UPDATE ... RETURNING`` that advances the
+counter, so concurrent creates and bulk imports never hand out the same
+number. Employee.save() takes one ID for a new employee; bulk imports reserve
+a block of IDs per prefix at once.
+
+The counter UPDATE runs in the caller's transaction, so a rollback also
+rolls back the counter and the same numbers are handed out again. It also
+keeps the prefix's counter row locked until the outer transaction commits:
+an Employee.save() inside a long atomic block, or an import chunk
+(EMPLOYEE_IMPORT_CHUNK_SIZE rows, 500 by default), holds up other creates
+with the same prefix until it finishes. Badge IDs entered by hand move the
+counter past them; fix_sequences re-syncs the counters after manual edits.
+"""
+
+import re
+
+from django.db import connection
+
+from .models import BadgeSequence, Employee
+
+BADGE_NUMBER = re.compile(r"^(\D+)(\d+)$")
+
+
+def badge_prefix(company, location):
+    """Badge ID prefix for an employee of ``company`` at ``location``"""
+    location_name = location.name.upper()
+
+    # Determine prefix based on location
+    if "HYDERABAD" in location_name or "HYD" in location_name:
+        if company.name.upper() in ["PETABYTZ", "PETABYTES"]:
+            return "PBTHYD"
+        elif company.name.upper() in ["SOFTSTANDARD", "SOFT STANDARD"]:
+            return "SSSHYD"
+        # Default prefix for other companies in Hyderabad
+        return "EMPHYD"
+
+    # For other locations, use first 3 letters of company + first 3 of location
+    company_code = company.name[:3].upper()
+    location_code = location_name[:3].upper()
+    return f"{company_code}{location_code}"
+
+
+def highest_badge_number(prefix):
+    """Largest number among existing badge IDs with ``prefix`` (0 if none)"""
+    numbers = [
+        int(badge_id[len(prefix) :])
+        for badge_id in Employee.objects.filter(badge_id__startswith=prefix).values_list("badge_id", flat=True)
+        if badge_id[len(prefix) :].isdigit()
+    ]
+    return max(numbers, default=0)
+
+
+def _advance(prefix, count):
+    """Add ``count`` to the prefix's counter; the new last number, or None without a counter row"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {connection.ops.quote_name(BadgeSequence._meta.db_table)} "
+            "SET last_number = last_number + %s WHERE prefix = %s RETURNING last_number",
+            [count, prefix],
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def reserve_badge_ids(prefix, count):
+    """
+    Reserve ``count`` consecutive badge IDs with ``prefix``.
+    Format: PREFIX + 3-digit number (e.g., PBTHYD001).
+    """
+    if count <= 0:
+        return []
+
+    last_number = _advance(prefix, count)
+    if last_number is None:
+        # First ID for this prefix: continue after the IDs issued before the counter existed
+        BadgeSequence.objects.get_or_create(prefix=prefix, defaults={"last_number": highest_badge_number(prefix)})
+        last_number = _advance(prefix, count)
+
+    return [f"{prefix}{number:03d}" for number in range(last_number - count + 1, last_number + 1)]
+
+
+def sync_badge_sequences(badge_ids=None):
+    """
+    Move counters past the given badge IDs (entered by hand or imported),
+    or past every existing badge ID when ``badge_ids`` is None.
+    Returns the prefixes whose counter moved.
+    """
+    if badge_ids is None:
+        badge_ids = Employee.objects.exclude(badge_id__isnull=True).values_list("badge_id", flat=True)
+
+    highest = {}
+    for badge_id in badge_ids:
+        match = BADGE_NUMBER.match(badge_id or "")
+        if match:
+            prefix, number = match.group(1), int(match.group(2))
+            highest[prefix] = max(highest.get(prefix, 0), number)
+
+    # Prefixes without a counter yet are seeded from existing IDs on first use
+    return [
+        prefix
+        for prefix, number in highest.items()
+        if BadgeSequence.objects.filter(prefix=prefix, last_number__lt=number).update(last_number=number)
+    ]
@@ -0,0 +1,419 @@
+"""
+Bulk employee import.
+
+An uploaded sheet is stored as an EmployeeImport and processed on a
+background thread once the request commits; imports left PENDING, or
+RUNNING without a heartbeat for STALE_IMPORT_AFTER (the worker died, e.g. in
+a restart), are picked up by the process_employee_imports command. A
+re-claimed import skips the rows its earlier run already created.
+
+1. The whole sheet is parsed and validated column-wise with pandas, so
+   every bad row gets its own error before anything is written.
+2. Locations, departments, designations, existing users and badge IDs are
+   resolved with one query each.
+3. Users, employees and leave balances are written with bulk_create in
+   chunks of IMPORT_CHUNK_SIZE rows, with badge IDs reserved per prefix as a
+   block. A chunk that hits a constraint is retried row by row, so only the
+   offending rows fail.
+4. Activation emails are queued on the import and sent afterwards over one
+   SMTP connection.
+
+bulk_create skips post_save: leave balances are created here, and the
+employees_imported signal stands in for the per-employee signals.
+"""
+
+import logging
+import threading
+from datetime import timedelta
+from decimal import Decimal
+
+import pandas as pd
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Q
+from django.dispatch import Signal
+from django.utils import timezone
+
+from companies.models import Department, Designation, Location
+
+from .badge_ids import badge_prefix, reserve_badge_ids, sync_badge_sequences
+from .models import Employee, EmployeeImport, LeaveBalance
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+# Sent with company_id and employee_ids after each committed chunk
+employees_imported = Signal()
+
+REQUIRED_COLUMNS = [
+    "first_name",
+    "last_name",
+    "email",
+    "designation",
+    "department",
+    "date_of_joining",
+    "date_of_birth",
+]
+IMPORT_CHUNK_SIZE = getattr(settings, "EMPLOYEE_IMPORT_CHUNK_SIZE", 500)
+STALE_IMPORT_AFTER = timedelta(minutes=getattr(settings, "EMPLOYEE_IMPORT_STALE_MINUTES", 15))
+EMAIL_PATTERN = r"[^@\s]+@[^@\s]+\.[^@\s]+"
+
+
+def read_sheet(file):
+    """The sheet as a DataFrame with normalized column names; ValueError when required columns are missing"""
+    df = pd.read_excel(file)
+    df.columns = [str(c).strip().lower().replace(" ", "_") for c in df.columns]
+
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing_columns:
+        raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
+    return df
+
+
+def _column(df, name):
+    return df[name] if name in df.columns else pd.Series(pd.NA, index=df.index, dtype="object")
+
+
+def _text(series, default=""):
+    """Stripped strings, with 101.0 -> 101 for numbers read as floats; blanks become ``default``"""
+    text = series.astype("string").str.strip().str.replace(r"\.0$", "", regex=True)
+    return text.mask(text.isna() | (text == ""), default)
+
+
+def _flag(errors, mask, message):
+    """Record ``message`` (text or per-row Series) for rows in ``mask`` that have no error yet"""
+    target = mask.reindex(errors.index, fill_value=False) & errors.isna()
+    errors[target] = message[target[target].index] if isinstance(message, pd.Series) else message
+
+
+def clean_sheet(df):
+    """
+    Parse and validate every row at once. Returns (rows, errors): a
+    DataFrame of cleaned values and a Series with the first error of each
+    row (None for valid rows). The index is the sheet's row index.
+    """
+    rows = pd.DataFrame(index=df.index)
+    rows["email"] = _text(_column(df, "email")).map(User.objects.normalize_email)
+    rows["first_name"] = _text(_column(df, "first_name"))
+    rows["last_name"] = _text(_column(df, "last_name"))
+    # Synced with the role configuration by name
+    rows["department"] = _text(_column(df, "department")).str.title()
+    rows["designation"] = _text(_column(df, "designation")).str.title()
+    rows["location_name"] = _text(_column(df, "location"))
+    rows["badge_id"] = _text(_column(df, "badge_id"), default=None)
+    rows["mobile_number"] = _text(_column(df, "mobile"), default=None)
+    rows["gender"] = _text(_column(df, "gender"), default="M").str[0].str.upper()
+    rows["marital_status"] = _text(_column(df, "marital_status"), default="S").str[0].str.upper()
+
+    doj = pd.to_datetime(_column(df, "date_of_joining"), errors="coerce", format="mixed")
+    dob = pd.to_datetime(_column(df, "date_of_birth"), errors="coerce", format="mixed")
+    rows["date_of_joining"] = doj.dt.date
+    rows["dob"] = dob.dt.date
+
+    ctc_given = _column(df, "annual_ctc").notna()
+    ctc = pd.to_numeric(_column(df, "annual_ctc"), errors="coerce")
+    rows["annual_ctc"] = ctc.fillna(0)
+
+    errors = pd.Series(None, index=df.index, dtype="object")
+    _flag(errors, rows["email"] == "", "Email is required")
+    _flag(errors, ~rows["email"].str.fullmatch(EMAIL_PATTERN), "Invalid email address")
+    _flag(errors, rows["email"].str.lower().duplicated(), "Email appears more than once in the sheet")
+    _flag(errors, rows["first_name"] == "", "First Name is required")
+    _flag(errors, rows["department"] == "", "Department is required")
+    _flag(errors, rows["designation"] == "", "Designation is required")
+    _flag(errors, _column(df, "date_of_joining").isna(), "Date of Joining is mandatory")
+    _flag(errors, doj.isna(), "Date of Joining is not a valid date")
+    _flag(errors, _column(df, "date_of_birth").isna(), "Date of Birth is mandatory")
+    _flag(errors, dob.isna(), "Date of Birth is not a valid date")
+    _flag(errors, ctc_given & ctc.isna(), "Annual CTC must be a number")
+    _flag(
+        errors,
+        rows["badge_id"].notna() & rows["badge_id"].duplicated(),
+        "Employee ID appears more than once in the sheet",
+    )
+    return rows, errors
+
+
+def resolve_rows(rows, errors, company):
+    """
+    Flag rows that clash with existing data and attach locations and
+    reusable users. Returns the valid rows as dicts, in sheet order.
+    """
+    valid = rows[errors.isna()]
+
+    existing_users = {
+        user.email: user
+        for user in User.objects.filter(email__in=list(valid["email"])).select_related("employee_profile")
+    }
+    has_profile = valid["email"].map(lambda email: hasattr(existing_users.get(email), "employee_profile"))
+    _flag(errors, has_profile, "User with email " + valid["email"] + " already exists")
+
+    taken_badges = set(
+        Employee.objects.filter(badge_id__in=list(valid["badge_id"].dropna())).values_list("badge_id", flat=True)
+    )
+    _flag(errors, valid["badge_id"].isin(taken_badges), "Employee ID " + valid["badge_id"] + " already exists")
+
+    # Location by name (case-insensitive), falling back to the company's first location
+    locations = list(Location.objects.filter(company=company).order_by("pk"))
+    locations_by_name = {}
+    for location in locations:
+        locations_by_name.setdefault(location.name.lower(), location)
+    fallback_location = locations[0] if locations else None
+
+    valid = rows[errors.isna()].astype(object)
+    valid = valid.where(valid.notna(), None)  # NA -> None for the model fields
+    resolved = valid.assign(row=valid.index + 2).to_dict("records")  # Header is sheet row 1
+    for row in resolved:
+        row["user"] = existing_users.get(row["email"])
+        row["location"] = locations_by_name.get(row.pop("location_name").lower()) or fallback_location
+    return resolved
+
+
+def sync_role_configuration(company, rows):
+    """Create the departments and designations the rows use that don't exist yet"""
+    for model, field in [(Department, "department"), (Designation, "designation")]:
+        existing = set(model.objects.filter(company=company).values_list("name", flat=True))
+        names = sorted({row[field] for row in rows} - existing)
+        model.objects.bulk_create([model(company=company, name=name) for name in names], ignore_conflicts=True)
+
+
+def _assign_badge_ids(company, employees, reserved):
+    """Reserve one block of badge IDs per prefix for employees without one"""
+    by_prefix = {}
+    for employee in employees:
+        if not employee.badge_id and employee.location:
+            by_prefix.setdefault(badge_prefix(company, employee.location), []).append(employee)
+
+    for prefix, group in by_prefix.items():
+        # IDs given in the sheet are skipped; the counter only moves forward, so this ends
+        badge_ids = []
+        while len(badge_ids) < len(group):
+            block = reserve_badge_ids(prefix, len(group) - len(badge_ids))
+            badge_ids.extend(badge_id for badge_id in block if badge_id not in reserved)
+        for employee, badge_id in zip(group, badge_ids, strict=True):
+            employee.badge_id = badge_id
+        reserved.update(badge_ids)
+
+
+def create_employees(company, rows, reserved_badges):
+    """
+    Write users, employees and leave balances for ``rows`` in one
+    transaction. Returns the created employees.
+    """
+    with transaction.atomic():
+        new_users = []
+        reused_users = []
+        for row in rows:
+            if row["user"]:
+                # User exists without an employee profile -> reuse it
+                user = row["user"]
+                user.first_name = row["first_name"]
+                user.last_name = row["last_name"]
+                reused_users.append(user)
+            else:
+                user = User(
+                    username=row["email"],
+                    email=row["email"],
+                    first_name=row["first_name"],
+                    last_name=row["last_name"],
+                    role="EMPLOYEE",
+                    company=company,
+                )
+                user.set_unusable_password()
+                new_users.append(user)
+            row["_user"] = user
+
+        User.objects.bulk_create(new_users)
+        User.objects.bulk_update(reused_users, ["first_name", "last_name"])
+
+        employees = [
+            Employee(
+                user=row["_user"],
+                company=company,
+                designation=row["designation"],
+                department=row["department"],
+                location=row["location"],
+                badge_id=row["badge_id"],
+                mobile_number=row["mobile_number"],
+                gender=row["gender"],
+                marital_status=row["marital_status"],
+                date_of_joining=row["date_of_joining"],
+                dob=row["dob"],
+                annual_ctc=Decimal(str(row["annual_ctc"])),
+            )
+            for row in rows
+        ]
+        given_badge_ids = [employee.badge_id for employee in employees if employee.badge_id]
+        _assign_badge_ids(company, employees, reserved_badges)
+        Employee.objects.bulk_create(employees)
+        sync_badge_sequences(given_badge_ids)
+
+        # New employees start with 0 leaves during probation (as the post_save signal does);
+        # zero balances have no opening ledger entries
+        LeaveBalance.objects.bulk_create(
+            [
+                LeaveBalance(employee=employee, casual_leave_allocated=0.0, sick_leave_allocated=0.0)
+                for employee in employees
+            ]
+        )
+        employees_imported.send(
+            sender=EmployeeImport, company_id=company.id, employee_ids=[employee.id for employee in employees]
+        )
+    return employees
+
+
+def _row_error(row, error):
+    return {"row": row["row"], "email": row["email"], "error": error}
+
+
+def import_rows(job, rows, chunk_size=IMPORT_CHUNK_SIZE):
+    """Create employees chunk by chunk, recording progress and failed rows on the job"""
+    reserved_badges = {row["badge_id"] for row in rows if row["badge_id"]}
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start : start + chunk_size]
+        try:
+            created = create_employees(job.company, chunk, reserved_badges)
+        except IntegrityError:
+            # Isolate the rows that clash
+            created = []
+            for row in chunk:
+                try:
+                    created.extend(create_employees(job.company, [row], reserved_badges))
+                except IntegrityError as e:
+                    job.row_errors.append(_row_error(row, str(e)))
+
+        job.created_count += len(created)
+        job.processed_rows += len(chunk)
+        job.pending_activation_user_ids.extend(employee.user_id for employee in created)
+        job.heartbeat_at = timezone.now()
+        job.save(
+            update_fields=["created_count", "processed_rows", "row_errors", "pending_activation_user_ids", "heartbeat_at"]
+        )
+
+
+def _claimable():
+    """PENDING imports, and RUNNING ones whose worker stopped beating"""
+    stale = Q(heartbeat_at__isnull=True) | Q(heartbeat_at__lt=timezone.now() - STALE_IMPORT_AFTER)
+    return Q(status="PENDING") | (Q(status="RUNNING") & stale)
+
+
+def run_import(job_id, send_emails=True):
+    """Validate and import a pending sheet, then send its activation emails"""
+    claimed = EmployeeImport.objects.filter(_claimable(), pk=job_id).update(
+        status="RUNNING", heartbeat_at=timezone.now()
+    )
+    if not claimed:
+        return None  # Already running or done
+
+    job = EmployeeImport.objects.select_related("company").get(pk=job_id)
+    try:
+        with job.import_file.open("rb") as file:
+            df = read_sheet(file)
+        rows, errors = clean_sheet(df)
+
+        # Re-claimed after a dead worker: its committed chunks are not imported again
+        imported = set(User.objects.filter(id__in=job.pending_activation_user_ids).values_list("email", flat=True))
+        done = rows["email"].isin(imported) & errors.isna()
+        rows, errors = rows[~done], errors[~done]
+        valid_rows = resolve_rows(rows, errors, job.company)
+
+        job.total_rows = len(df)
+        # Errors an earlier run recorded for the skipped rows stay; the rest are checked again
+        rechecked = {index + 2 for index in rows.index}
+        job.row_errors = [error for error in job.row_errors if error["row"] not in rechecked] + [
+            {"row": index + 2, "email": rows.at[index, "email"], "error": error}
+            for index, error in errors.dropna().items()
+        ]
+        job.processed_rows = len(df) - len(valid_rows)
+        job.save(update_fields=["total_rows", "row_errors", "processed_rows"])
+
+        sync_role_configuration(job.company, valid_rows)
+        import_rows(job, valid_rows)
+        job.row_errors.sort(key=lambda error: error["row"])
+        job.status = "COMPLETED"
+    except Exception as e:
+        logger.exception(f"Employee import {job_id} failed")
+        job.status = "FAILED"
+        job.error_message = str(e)
+    job.completed_at = timezone.now()
+    job.save(update_fields=["status", "error_message", "row_errors", "completed_at"])
+
+    if send_emails:
+        send_activation_emails(job)
+    return job
+
+
+def send_activation_emails(job, connection=None):
+    """Send the import's queued activation emails over one connection"""
+    from core.email_utils import get_hr_email_connection
+
+    from .utils import send_activation_email
+
+    pending = list(job.pending_activation_user_ids)
+    if not pending:
+        return 0
+
+    users = User.objects.filter(id__in=pending).select_related("employee_profile__company")
+    connection = connection or get_hr_email_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        # Leave the emails queued for the next run
+        logger.error(f"Could not open email connection for employee import {job.id}: {e}")
+        return 0
+
+    try:
+        for user in users:
+            if send_activation_email(user, connection=connection, site_url=job.site_url):
+                job.emails_sent += 1
+            else:
+                job.emails_failed += 1
+    finally:
+        connection.close()
+
+    job.pending_activation_user_ids = []
+    job.save(update_fields=["emails_sent", "emails_failed", "pending_activation_user_ids"])
+    return job.emails_sent
+
+
+def queue_import(file, company, uploaded_by=None, site_url=""):
+    """Store the sheet as a PENDING import and start it once the current transaction commits"""
+    with transaction.atomic():
+        job = EmployeeImport(company=company, uploaded_by=uploaded_by, site_url=site_url)
+        job.import_file.save(file.name, file, save=False)
+        job.save()
+
+        def start():
+            thread = threading.Thread(target=_run_queued_import, args=(job.pk,), daemon=True)
+            thread.start()
+
+        transaction.on_commit(start)
+    return job
+
+
+def _run_queued_import(job_id):
+    """Background thread body for a queued import"""
+    try:
+        run_import(job_id)
+    finally:
+        # The thread's own connection is not closed by the request cycle
+        connections.close_all()
+
+
+def process_pending_imports():
+    """
+    Run PENDING (or stale RUNNING) imports and send emails still queued on
+    finished ones.
+    Returns the imports processed.
+    """
+    processed = []
+    for job_id in EmployeeImport.objects.filter(_claimable()).order_by("created_at").values_list("id", flat=True):
+        job = run_import(job_id)
+        if job:
+            processed.append(job)
+
+    for job in EmployeeImport.objects.filter(status__in=["COMPLETED", "FAILED"]).exclude(pending_activation_user_ids=[]):
+        send_activation_emails(job)
+        processed.append(job)
+    return processed
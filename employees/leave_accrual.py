@@ -0,0 +1,167 @@
+"""
+Monthly leave accrual.
+
+Each company is credited with one set-based UPDATE on its active employees'
+leave balances; missing balances are created first with bulk_create. A
+LeaveAccrualRun row per (company, year, month) records the run, so accruing
+the same month again does nothing. Each run also writes its ACCRUAL ledger
+entries and the month's balance snapshots (see employees.leave_ledger). The
+web trigger queues the run on a background thread instead of doing the work
+inside the request; a run left RUNNING for STALE_ACCRUAL_AFTER (its thread
+died, e.g. in a restart) can be queued again. The accrual itself is one
+transaction on the locked run row, so a second thread waits and then finds
+the month COMPLETED.
+"""
+
+import logging
+import threading
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .leave_ledger import record_entries, take_snapshots
+from .models import Employee, LeaveAccrualRun, LeaveBalance, LeaveLedgerEntry, leave_balance_cache_keys
+
+logger = logging.getLogger(__name__)
+
+STALE_ACCRUAL_AFTER = timedelta(minutes=getattr(settings, "LEAVE_ACCRUAL_STALE_MINUTES", 15))
+
+
+def default_monthly_credit(company):
+    """(casual, sick) leave credited per month: 1 CL everywhere, SL by company policy"""
+    company_name = company.name.lower()
+    if "bluebix" in company_name or "softstandard" in company_name:
+        return 1.0, 0.5
+    # Petabytz and default fallback
+    return 1.0, 1.0
+
+
+def accrue_company(company, year, month, casual_leave, sick_leave, requested_by=None, dry_run=False):
+    """
+    Credit every active employee of the company for one month.
+
+    Returns (run, accrued). A month that already completed is returned
+    unchanged with accrued=False. With dry_run the run is not saved and
+    balances are untouched.
+    """
+    if dry_run:
+        employees = Employee.objects.filter(company=company, is_active=True)
+        run = LeaveAccrualRun(
+            company=company,
+            year=year,
+            month=month,
+            casual_leave_credit=casual_leave,
+            sick_leave_credit=sick_leave,
+            balances_updated=employees.count(),
+            balances_created=employees.filter(leave_balance__isnull=True).count(),
+        )
+        return run, True
+
+    with transaction.atomic():
+        run, _ = LeaveAccrualRun.objects.select_for_update().get_or_create(
+            company=company, year=year, month=month, defaults={"requested_by": requested_by}
+        )
+        if run.status == "COMPLETED":
+            return run, False
+
+        employee_ids = list(Employee.objects.filter(company=company, is_active=True).values_list("id", flat=True))
+        missing = set(employee_ids) - set(
+            LeaveBalance.objects.filter(employee_id__in=employee_ids).values_list("employee_id", flat=True)
+        )
+        # New balances start at 0, like the create_leave_balance signal
+        LeaveBalance.objects.bulk_create(
+            [
+                LeaveBalance(employee_id=employee_id, casual_leave_allocated=0.0, sick_leave_allocated=0.0)
+                for employee_id in missing
+            ]
+        )
+
+        updated = LeaveBalance.objects.filter(employee__company=company, employee__is_active=True).update(
+            casual_leave_allocated=F("casual_leave_allocated") + casual_leave,
+            sick_leave_allocated=F("sick_leave_allocated") + sick_leave,
+            updated_at=timezone.now(),
+        )
+
+        record_entries(
+            [
+                LeaveLedgerEntry(
+                    employee_id=employee_id,
+                    entry_type="ACCRUAL",
+                    leave_type=leave_type,
+                    allocated_delta=credit,
+                    accrual_run=run,
+                )
+                for employee_id in employee_ids
+                for leave_type, credit in (("CL", casual_leave), ("SL", sick_leave))
+                if credit
+            ]
+        )
+        take_snapshots(date(year, month, 1), employee_ids)
+
+        run.status = "COMPLETED"
+        run.casual_leave_credit = casual_leave
+        run.sick_leave_credit = sick_leave
+        run.balances_updated = updated
+        run.balances_created = len(missing)
+        run.error_message = ""
+        run.completed_at = timezone.now()
+        run.save()
+
+        cache_keys = []
+        for employee_id in employee_ids:
+            cache_keys.extend(leave_balance_cache_keys(employee_id, company.id))
+        transaction.on_commit(lambda: cache.delete_many(cache_keys))
+
+    logger.info(
+        f"Leave accrual {month:02d}/{year} for {company.name}: "
+        f"{updated} balances credited, {len(missing)} created"
+    )
+    return run, True
+
+
+def _run_queued_accrual(run_id):
+    """Background thread body for a queued run"""
+    try:
+        run = LeaveAccrualRun.objects.select_related("company").get(pk=run_id)
+        if run.status == "COMPLETED":
+            return
+        LeaveAccrualRun.objects.filter(pk=run_id).update(status="RUNNING", started_at=timezone.now())
+        casual_leave, sick_leave = default_monthly_credit(run.company)
+        accrue_company(run.company, run.year, run.month, casual_leave, sick_leave)
+    except Exception as e:
+        logger.error(f"Error running leave accrual {run_id}: {e}")
+        LeaveAccrualRun.objects.filter(pk=run_id).update(status="FAILED", error_message=str(e))
+    finally:
+        # The thread's own connection is not closed by the request cycle
+        connections.close_all()
+
+
+def enqueue_monthly_accrual(company, year, month, requested_by=None):
+    """
+    Record a pending run and start it on a background thread once the
+    current transaction commits. Returns (run, queued); queued is False when
+    the month is already completed or in progress.
+    """
+    with transaction.atomic():
+        run, created = LeaveAccrualRun.objects.select_for_update().get_or_create(
+            company=company, year=year, month=month, defaults={"requested_by": requested_by}
+        )
+        stale = run.started_at is None or run.started_at < timezone.now() - STALE_ACCRUAL_AFTER
+        if run.status == "COMPLETED" or (run.status == "RUNNING" and not stale):
+            return run, False
+        if not created:
+            run.status = "PENDING"
+            run.requested_by = requested_by
+            run.save(update_fields=["status", "requested_by"])
+
+        def start():
+            thread = threading.Thread(target=_run_queued_accrual, args=(run.pk,), daemon=True)
+            thread.start()
+
+        transaction.on_commit(start)
+
+    return run, True
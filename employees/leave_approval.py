@@ -0,0 +1,166 @@
+"""
+Batched leave approval.
+
+Approving a leave touches the leave balance, the request itself and one
+attendance row per leave day. Deductions are worked out in memory and every
+table is written once per batch, inside one transaction:
+
+- balances are locked and loaded in one query and written with bulk_update
+- approved requests are written with bulk_update
+- attendance rows for every leave day are upserted with one bulk_create
+- one DEDUCTION ledger entry per leave type and request is written with
+  one bulk_create (see employees.leave_ledger)
+- cache invalidation and the leaves_approved signal fire once, on commit
+
+Bulk writes skip model signals, so code that reacts to approved leaves (the
+payroll-cycle attendance summaries in core.signals) listens to
+leaves_approved instead of LeaveRequest/Attendance post_save.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .leave_ledger import record_entries
+from .models import Attendance, Employee, LeaveBalance, LeaveLedgerEntry, LeaveRequest, leave_balance_cache_keys
+
+logger = logging.getLogger(__name__)
+
+# Sent on commit with leave_requests=[...] after a batch has been approved
+leaves_approved = Signal()
+
+HALF_DAY_DURATIONS = ["FIRST_HALF", "SECOND_HALF", "HALF"]  # Include legacy "HALF" option
+
+
+def leave_attendance_status(leave_request):
+    """Attendance status recorded for each day of an approved leave"""
+    if leave_request.duration in HALF_DAY_DURATIONS:
+        return "HALF_DAY"
+    if leave_request.leave_type == "OD":
+        return "ON_DUTY"
+    return "LEAVE"
+
+
+def _attach_employees(leave_requests):
+    """Load the employees of all requests in one query unless already cached"""
+    missing = {lr.employee_id for lr in leave_requests if not LeaveRequest.employee.is_cached(lr)}
+    if not missing:
+        return
+    employees = Employee.objects.in_bulk(missing)
+    for leave_request in leave_requests:
+        if leave_request.employee_id in missing:
+            leave_request.employee = employees[leave_request.employee_id]
+
+
+def _attendance_rows(leave_requests):
+    """One Attendance per leave day; weekly offs are skipped"""
+    rows = {}
+    for leave_request in leave_requests:
+        employee = leave_request.employee
+        status = leave_attendance_status(leave_request)
+        current_date = leave_request.start_date
+        while current_date <= leave_request.end_date:
+            if not employee.is_week_off(current_date):
+                # Later requests in the batch win on overlapping days
+                rows[(employee.id, current_date)] = Attendance(
+                    employee=employee, date=current_date, status=status, clock_in=None, clock_out=None
+                )
+            current_date += timedelta(days=1)
+    return list(rows.values())
+
+
+def approve_leave_requests(leave_requests, approved_by_user, approval_type="FULL"):
+    """
+    Approve pending leave requests in one transaction.
+
+    Returns the ids of the approved requests. Requests that are not pending,
+    whose employee has no leave balance, or that can't be approved with this
+    approval_type are left untouched.
+    """
+    leave_requests = [lr for lr in leave_requests if lr.status == "PENDING"]
+    if not leave_requests:
+        return []
+
+    with transaction.atomic():
+        _attach_employees(leave_requests)
+        balances = LeaveBalance.objects.select_for_update().in_bulk(
+            {lr.employee_id for lr in leave_requests}, field_name="employee_id"
+        )
+
+        now = timezone.now()
+        approved = []
+        changed_balances = {}
+        ledger_entries = []
+        for leave_request in leave_requests:
+            balance = balances.get(leave_request.employee_id)
+            if balance is None:
+                logger.error(f"Error approving leave {leave_request.pk}: employee has no leave balance")
+                continue
+
+            # Validation reads employee.leave_balance; sharing the locked row lets
+            # several requests of one employee see each other's deductions
+            leave_request.employee.leave_balance = balance
+            try:
+                deductions = leave_request.get_leave_deductions(approval_type)
+            except Exception as e:
+                logger.error(f"Error approving leave {leave_request.pk}: {e}")
+                continue
+            if deductions is None:
+                continue
+
+            for leave_type, days in deductions:
+                if balance.add_leave_deduction(leave_type, days):
+                    changed_balances[balance.pk] = balance
+                    ledger_entries.append(
+                        LeaveLedgerEntry(
+                            employee_id=leave_request.employee_id,
+                            entry_type="DEDUCTION",
+                            leave_type=leave_type,
+                            used_delta=days,
+                            leave_request=leave_request,
+                        )
+                    )
+
+            leave_request.status = "APPROVED"
+            leave_request.approved_by = approved_by_user
+            leave_request.approved_at = now
+            leave_request.approval_type = approval_type
+            leave_request.updated_at = now
+            approved.append(leave_request)
+
+        if not approved:
+            return []
+
+        for balance in changed_balances.values():
+            balance.updated_at = now
+        LeaveBalance.objects.bulk_update(
+            list(changed_balances.values()),
+            ["casual_leave_used", "sick_leave_used", "unpaid_leave", "updated_at"],
+        )
+        LeaveRequest.objects.bulk_update(
+            approved, ["status", "approved_by", "approved_at", "approval_type", "end_date", "updated_at"]
+        )
+        record_entries(ledger_entries)
+        for balance in changed_balances.values():
+            balance.mark_ledger_recorded()
+
+        rows = _attendance_rows(approved)
+        if rows:
+            Attendance.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=["employee", "date"],
+                update_fields=["status", "clock_in", "clock_out"],
+            )
+
+        cache_keys = set()
+        for leave_request in approved:
+            cache_keys.update(leave_balance_cache_keys(leave_request.employee_id, leave_request.employee.company_id))
+        transaction.on_commit(lambda: cache.delete_many(list(cache_keys)))
+        transaction.on_commit(lambda: leaves_approved.send(sender=LeaveRequest, leave_requests=approved))
+
+    return [lr.pk for lr in approved]
@@ -0,0 +1,232 @@
+"""
+Append-only leave ledger.
+
+Every change to a LeaveBalance is also written as LeaveLedgerEntry rows:
+accruals, deductions for approved leave, admin adjustments and reversals.
+LeaveBalanceSnapshot rows hold the ledger totals at each month end, so the
+ledger balance of an employee is the latest snapshot plus the few entries
+written after it. Balances shown to users are read that way (see
+apply_ledger_totals); the LeaveBalance columns keep a running copy for bulk
+code, and verify_leave_balances compares the two.
+
+Saving a LeaveBalance records its delta through the post_save signal in
+employees.models. Code that writes balances in bulk (leave approval, monthly
+accrual) records its entries itself with record_entries. Every writer locks
+or updates the employee's LeaveBalance row before appending entries, which
+is what keeps snapshot watermarks exact (see take_snapshots).
+"""
+
+from django.db import transaction
+from django.db.models import F, Max, OuterRef, Q, Subquery, Sum
+
+from .models import LeaveBalance, LeaveBalanceSnapshot, LeaveLedgerEntry
+
+# leave_type -> (allocated field, used field) on LeaveBalance
+BALANCE_FIELDS = {
+    "CL": ("casual_leave_allocated", "casual_leave_used"),
+    "SL": ("sick_leave_allocated", "sick_leave_used"),
+    "UL": (None, "unpaid_leave"),
+}
+
+TOLERANCE = 1e-6
+
+# Employees per ledger entry query; each adds an OR branch with two parameters
+LEDGER_READ_CHUNK = 400
+
+
+def empty_totals():
+    return dict.fromkeys(LeaveBalance.LEDGER_FIELDS, 0.0)
+
+
+def entries_for_change(employee_id, before, after, entry_type="ADJUSTMENT", **kwargs):
+    """Unsaved entries turning the ``before`` totals into ``after``; unchanged leave types are skipped"""
+    entries = []
+    for leave_type, (allocated_field, used_field) in BALANCE_FIELDS.items():
+        allocated_delta = 0.0
+        if allocated_field and allocated_field in before and allocated_field in after:
+            allocated_delta = after[allocated_field] - before[allocated_field]
+        used_delta = 0.0
+        if used_field in before and used_field in after:
+            used_delta = after[used_field] - before[used_field]
+
+        if abs(allocated_delta) > TOLERANCE or abs(used_delta) > TOLERANCE:
+            entries.append(
+                LeaveLedgerEntry(
+                    employee_id=employee_id,
+                    entry_type=entry_type,
+                    leave_type=leave_type,
+                    allocated_delta=allocated_delta,
+                    used_delta=used_delta,
+                    **kwargs,
+                )
+            )
+    return entries
+
+
+def record_entries(entries):
+    """Write entries in one INSERT"""
+    if entries:
+        LeaveLedgerEntry.objects.bulk_create(entries)
+
+
+def record_balance_change(balance, created):
+    """Ledger side of LeaveBalance.save(), called from post_save"""
+    before = empty_totals() if created else getattr(balance, "_ledger_values", {})
+    entry_type = getattr(balance, "_ledger_entry_type", "ADJUSTMENT")
+    note = "Opening balance" if created else ""
+
+    record_entries(entries_for_change(balance.employee_id, before, balance.ledger_values(), entry_type, note=note))
+
+    balance._ledger_entry_type = "ADJUSTMENT"
+    balance.mark_ledger_recorded()
+
+
+def reverse_entries(entries, note=""):
+    """
+    Undo ledger entries by appending their negation and applying it to the
+    leave balances. Returns the reversal entries.
+    """
+    reversals = [
+        LeaveLedgerEntry(
+            employee_id=entry.employee_id,
+            entry_type="REVERSAL",
+            leave_type=entry.leave_type,
+            allocated_delta=-entry.allocated_delta,
+            used_delta=-entry.used_delta,
+            leave_request_id=entry.leave_request_id,
+            accrual_run_id=entry.accrual_run_id,
+            reverses=entry,
+            note=note,
+        )
+        for entry in entries
+    ]
+
+    with transaction.atomic():
+        # Balance rows first: their locks order these entries against snapshots
+        for entry in reversals:
+            allocated_field, used_field = BALANCE_FIELDS[entry.leave_type]
+            changes = {used_field: F(used_field) + entry.used_delta}
+            if allocated_field:
+                changes[allocated_field] = F(allocated_field) + entry.allocated_delta
+            LeaveBalance.objects.filter(employee_id=entry.employee_id).update(**changes)
+        record_entries(reversals)
+    return reversals
+
+
+def _latest_snapshot(field):
+    return Subquery(
+        LeaveBalanceSnapshot.objects.filter(employee_id=OuterRef("employee_id")).order_by("-period").values(field)[:1]
+    )
+
+
+def ledger_totals(employee_ids):
+    """
+    Map employee id -> ledger totals: the latest snapshot plus the entries
+    written after it. Each employee's entries are read as an id range above
+    their snapshot watermark on the (employee, id) index, so the cost is
+    bounded by the entries since the last snapshot, not the whole history.
+    """
+    employee_ids = list(employee_ids)
+    totals = {employee_id: empty_totals() for employee_id in employee_ids}
+    if not employee_ids:
+        return totals
+
+    watermarks = dict.fromkeys(employee_ids, 0)
+    snapshots = LeaveBalanceSnapshot.objects.filter(employee_id__in=employee_ids, id=_latest_snapshot("id"))
+    for snapshot in snapshots:
+        totals[snapshot.employee_id] = {field: getattr(snapshot, field) for field in LeaveBalance.LEDGER_FIELDS}
+        watermarks[snapshot.employee_id] = snapshot.last_entry_id
+
+    items = list(watermarks.items())
+    for start in range(0, len(items), LEDGER_READ_CHUNK):
+        chunk = items[start : start + LEDGER_READ_CHUNK]
+        unsnapshotted = [employee_id for employee_id, watermark in chunk if not watermark]
+        since_snapshot = Q(employee_id__in=unsnapshotted)
+        for employee_id, watermark in chunk:
+            if watermark:
+                since_snapshot |= Q(employee_id=employee_id, id__gt=watermark)
+
+        rows = (
+            LeaveLedgerEntry.objects.filter(since_snapshot)
+            .values("employee_id", "leave_type")
+            .annotate(allocated=Sum("allocated_delta"), used=Sum("used_delta"))
+        )
+        for row in rows.order_by():
+            allocated_field, used_field = BALANCE_FIELDS[row["leave_type"]]
+            employee_totals = totals[row["employee_id"]]
+            if allocated_field:
+                employee_totals[allocated_field] += row["allocated"] or 0.0
+            employee_totals[used_field] += row["used"] or 0.0
+    return totals
+
+
+def apply_ledger_totals(balances):
+    """
+    Replace the totals of LeaveBalance instances with their ledger totals, so
+    they show the latest snapshot plus recent entries. A later save() writes
+    only the caller's own changes to the ledger. Returns the balances.
+    """
+    balances = list(balances)
+    totals = ledger_totals(balance.employee_id for balance in balances)
+    for balance in balances:
+        for field, value in totals[balance.employee_id].items():
+            setattr(balance, field, value)
+        balance.mark_ledger_recorded()
+    return balances
+
+
+def take_snapshots(period, employee_ids):
+    """
+    Store the ledger totals of the employees for ``period`` (first of a
+    month). Each snapshot's watermark is the employee's own last entry, read
+    with their balance row locked; writers hold that lock while appending, so
+    no uncommitted entry can end up below a watermark. Employees without a
+    balance are skipped.
+    """
+    with transaction.atomic():
+        employee_ids = list(
+            LeaveBalance.objects.select_for_update()
+            .filter(employee_id__in=list(employee_ids))
+            .order_by("employee_id")
+            .values_list("employee_id", flat=True)
+        )
+        last_entries = dict(
+            LeaveLedgerEntry.objects.filter(employee_id__in=employee_ids)
+            .values("employee_id")
+            .annotate(last=Max("id"))
+            .values_list("employee_id", "last")
+            .order_by()
+        )
+        totals = ledger_totals(employee_ids)
+        LeaveBalanceSnapshot.objects.bulk_create(
+            [
+                LeaveBalanceSnapshot(
+                    employee_id=employee_id, period=period, last_entry_id=last_entries.get(employee_id, 0), **values
+                )
+                for employee_id, values in totals.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["employee", "period"],
+            update_fields=[*LeaveBalance.LEDGER_FIELDS, "last_entry_id"],
+        )
+    return len(totals)
+
+
+def find_discrepancies(balances):
+    """
+    Compare LeaveBalance rows with the ledger. Returns a list of
+    (balance, ledger totals, {field: (balance value, ledger value)}).
+    """
+    balances = list(balances)
+    totals = ledger_totals(balance.employee_id for balance in balances)
+    discrepancies = []
+    for balance in balances:
+        ledger = totals[balance.employee_id]
+        diffs = {
+            field: (getattr(balance, field), ledger[field])
+            for field in LeaveBalance.LEDGER_FIELDS
+            if abs(getattr(balance, field) - ledger[field]) > TOLERANCE
+        }
+        if diffs:
+            discrepancies.append((balance, ledger, diffs))
+    return discrepancies
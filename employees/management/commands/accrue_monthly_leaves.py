@@ -1,49 +1,54 @@
-from django.core.management.base import BaseCommand
-from django.db import transaction
-from employees.models import LeaveBalance
+from datetime import date
 import logging
 
-logger = logging.getLogger(__name__)
+from django.core.management.base import BaseCommand
 
+from companies.models import Company
+from employees.leave_accrual import accrue_company, default_monthly_credit
 
-class Command(BaseCommand):
-    help = "Accrues 1 Sick Leave and 1 Casual Leave for all employees"
+logger = logging.getLogger(__name__)
 
-    def handle(self, *args, **options):
-        self.stdout.write(self.style.SUCCESS("Starting monthly leave accrual..."))
 
-        try:
-            with transaction.atomic():
-                updated_count = 0
-                leave_balances = LeaveBalance.objects.all()
+class Command(BaseCommand):
+    help = "Accrues 1 Casual Leave and the company's monthly Sick Leave for all active employees"
 
-                for balance in leave_balances:
-                    company_name = balance.employee.company.name.lower()
+    def add_arguments(self, parser):
+        parser.add_argument("--month", type=int, help="Month to accrue leaves for (1-12, default: current month)")
+        parser.add_argument("--year", type=int, help="Year to accrue leaves for (default: current year)")
+        parser.add_argument("--company-id", type=int, help="Accrue leaves for specific company ID only")
+        parser.add_argument("--dry-run", action="store_true", help="Show what would be done without making changes")
 
-                    # Casual Leave: Standard 1.0 for everyone (unless specified otherwise)
-                    balance.casual_leave_allocated += 1.0
+    def handle(self, *args, **options):
+        today = date.today()
+        month = options.get("month") or today.month
+        year = options.get("year") or today.year
+        dry_run = options.get("dry_run", False)
 
-                    # Sick Leave: Company specific
-                    if "petabytz" in company_name:
-                        balance.sick_leave_allocated += 1.0
-                    elif "bluebix" in company_name or "softstandard" in company_name:
-                        balance.sick_leave_allocated += 0.5
-                    else:
-                        # Default fallback
-                        balance.sick_leave_allocated += 1.0
+        companies = Company.objects.all()
+        if options.get("company_id"):
+            companies = companies.filter(id=options["company_id"])
 
-                    balance.save()
-                    updated_count += 1
+        self.stdout.write(self.style.SUCCESS(f"Starting monthly leave accrual for {month:02d}/{year}..."))
 
+        try:
+            updated_count = 0
+            for company in companies:
+                casual_leave, sick_leave = default_monthly_credit(company)
+                run, accrued = accrue_company(company, year, month, casual_leave, sick_leave, dry_run=dry_run)
+                if not accrued:
+                    self.stdout.write(f"  {company.name}: already accrued for {month:02d}/{year}, skipped")
+                    continue
+
+                updated_count += run.balances_updated
                 self.stdout.write(
-                    self.style.SUCCESS(
-                        f"Successfully accrued leaves for {updated_count} employees."
-                    )
-                )
-                logger.info(
-                    f"Monthly leave accrual completed for {updated_count} employees."
+                    f"  {company.name}: +{casual_leave} CL, +{sick_leave} SL for {run.balances_updated} employees "
+                    f"({run.balances_created} balances created)"
                 )
 
+            verb = "Would accrue" if dry_run else "Successfully accrued"
+            self.stdout.write(self.style.SUCCESS(f"{verb} leaves for {updated_count} employees."))
+            logger.info(f"Monthly leave accrual completed for {updated_count} employees.")
+
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"Error during leave accrual: {str(e)}"))
             logger.error(f"Error during leave accrual: {str(e)}")
@@ -1,4 +1,5 @@
 from django.core.management.base import BaseCommand
+from employees.leave_accrual import accrue_company
 from employees.models import Employee, LeaveBalance
 from companies.models import Company
 from datetime import date
@@ -108,91 +109,39 @@ class Command(BaseCommand):
                 f"   Monthly allocation: {rules['casual_leave_monthly']} CL + {rules['sick_leave_monthly']} SL"
             )
 
-            # Get active employees for this company
-            employees = Employee.objects.filter(company=company, is_active=True)
-            company_updated = 0
-
-            for employee in employees:
-                # Get or create leave balance
-                leave_balance, created = LeaveBalance.objects.get_or_create(
-                    employee=employee,
-                    defaults={
-                        "casual_leave_allocated": 0.0,
-                        "sick_leave_allocated": 0.0,
-                        "earned_leave_allocated": 0.0,
-                        "comp_off_allocated": 0.0,
-                        "casual_leave_used": 0.0,
-                        "sick_leave_used": 0.0,
-                        "earned_leave_used": 0.0,
-                        "comp_off_used": 0.0,
-                        "unpaid_leave": 0.0,
-                        "carry_forward_leave": 0.0,
-                        "lapsed_leave": 0.0,
-                    },
-                )
-
-                # Store original values for comparison
-                original_cl = leave_balance.casual_leave_allocated
-                original_sl = leave_balance.sick_leave_allocated
-
-                if preserve_manual:
-                    # Add monthly accrual to existing balance (preserves manual adjustments)
-                    new_cl = (
-                        leave_balance.casual_leave_allocated
-                        + rules["casual_leave_monthly"]
-                    )
-                    new_sl = (
-                        leave_balance.sick_leave_allocated + rules["sick_leave_monthly"]
-                    )
-                else:
-                    # Calculate expected total based on months (overwrites manual adjustments)
-                    # Calculate months from January 2026 to target month
-                    start_month = date(2026, 1, 1)
-                    target_date = date(target_year, target_month, 1)
-                    months_elapsed = (
-                        (target_date.year - start_month.year) * 12
-                        + (target_date.month - start_month.month)
-                        + 1
-                    )
-
-                    new_cl = rules["casual_leave_monthly"] * months_elapsed
-                    new_sl = rules["sick_leave_monthly"] * months_elapsed
+            # One UPDATE for all active employees; missing balances are created first
+            run, accrued = accrue_company(
+                company,
+                target_year,
+                target_month,
+                rules["casual_leave_monthly"],
+                rules["sick_leave_monthly"],
+                dry_run=dry_run,
+            )
 
-                # Show what would be done
-                if preserve_manual:
-                    self.stdout.write(
-                        f"   {employee.user.get_full_name()}: "
-                        f"CL {original_cl} → {new_cl} (+{rules['casual_leave_monthly']}), "
-                        f"SL {original_sl} → {new_sl} (+{rules['sick_leave_monthly']}) "
-                        f"[Manual adjustments preserved]"
-                    )
-                else:
-                    self.stdout.write(
-                        f"   {employee.user.get_full_name()}: "
-                        f"CL {original_cl} → {new_cl}, "
-                        f"SL {original_sl} → {new_sl} "
-                        f"[Calculated total - manual adjustments overwritten]"
+            if not accrued:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"   ⏭️  {company_name} already accrued for {target_date_str} - skipped"
                     )
+                )
+                continue
 
-                # Apply changes if not dry run
-                if not dry_run:
-                    leave_balance.casual_leave_allocated = new_cl
-                    leave_balance.sick_leave_allocated = new_sl
-                    leave_balance.save()
-
-                company_updated += 1
-                total_updated += 1
+            company_updated = run.balances_updated
+            total_updated += company_updated
 
             if dry_run:
                 self.stdout.write(
                     self.style.WARNING(
                         f"   🔍 Would update {company_updated} employees for {company_name}"
+                        f" ({run.balances_created} balances to create)"
                     )
                 )
             else:
                 self.stdout.write(
                     self.style.SUCCESS(
                         f"   ✅ Updated {company_updated} employees for {company_name}"
+                        f" ({run.balances_created} balances created)"
                     )
                 )
 
@@ -242,7 +191,7 @@ class Command(BaseCommand):
                 "   • To add previous/carry-forward leaves: Edit individual employee leave balances in Admin"
             )
             self.stdout.write(
-                "   • To override manual adjustments: Use --preserve-manual=False flag"
+                "   • Each month is accrued once per company; re-running a month is skipped"
             )
             self.stdout.write(
                 "   • Monthly accrual will continue to add to existing balances"
@@ -1,10 +1,11 @@
 from django.core.management.base import BaseCommand
 from django.db import connection, models
+from employees.badge_ids import sync_badge_sequences
 from employees.models import Employee, LeaveBalance
 
 
 class Command(BaseCommand):
-    help = "Fix PostgreSQL sequences for employee-related tables"
+    help = "Fix PostgreSQL sequences for employee-related tables and the badge ID counters"
 
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS("🔧 Fixing database sequences..."))
@@ -61,4 +62,13 @@ class Command(BaseCommand):
                     )
                 )
 
+        # Move badge ID counters past badge IDs edited by hand
+        moved = sync_badge_sequences()
+        if moved:
+            self.stdout.write(
+                self.style.SUCCESS(f"✅ Badge ID counters updated: {', '.join(sorted(moved))}")
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS("✅ Badge ID counters are correct"))
+
         self.stdout.write(self.style.SUCCESS("🎉 All sequences have been fixed!"))
@@ -2,11 +2,14 @@
 Management command to mark employees as absent for working days where they didn't clock in
 """
 
+import time
+
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from datetime import timedelta, date
-from employees.models import Employee, Attendance
-from companies.models import Holiday
+from companies.models import Company
+from employees.attendance_backfill import DEFAULT_BATCH_SIZE, mark_absents
+from employees.models import Employee
 
 
 class Command(BaseCommand):
@@ -29,6 +32,23 @@ class Command(BaseCommand):
             action="store_true",
             help="Show what would be done without making changes",
         )
+        parser.add_argument(
+            "--company-id",
+            type=int,
+            help="Process only this company (default: all companies with active employees)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of worker processes; companies are processed in parallel (default: 1)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f"Rows per bulk insert (default: {DEFAULT_BATCH_SIZE})",
+        )
 
     def handle(self, *args, **options):
         year = options["year"]
@@ -66,80 +86,38 @@ class Command(BaseCommand):
 
         self.stdout.write(f"Date range: {start_date} to {end_date}")
 
-        # Get all active employees
-        employees = Employee.objects.filter(is_active=True).select_related(
-            "company", "location"
-        )
-
-        # Get all holidays in the date range
-        holidays = Holiday.objects.filter(
-            date__gte=start_date, date__lte=end_date, is_active=True
-        ).select_related("location")
-
-        # Create holiday map by location and date
-        holiday_map = {}
-        for holiday in holidays:
-            if holiday.location_id not in holiday_map:
-                holiday_map[holiday.location_id] = set()
-            holiday_map[holiday.location_id].add(holiday.date)
+        # Companies with active employees
+        company_ids = Employee.objects.filter(is_active=True).values_list("company_id", flat=True).distinct()
+        if options.get("company_id"):
+            company_ids = company_ids.filter(company_id=options["company_id"])
+        company_ids = sorted(company_ids)
+        company_names = dict(Company.objects.filter(id__in=company_ids).values_list("id", "name"))
 
+        started = time.perf_counter()
         absent_count = 0
-        skipped_count = 0
-
-        for emp in employees:
-            # Get all existing attendance records for this employee in the date range
-            existing_attendance = set(
-                Attendance.objects.filter(
-                    employee=emp, date__gte=start_date, date__lte=end_date
-                ).values_list("date", flat=True)
+        written_count = 0
+
+        for result in mark_absents(
+            company_ids,
+            start_date,
+            end_date,
+            dry_run=dry_run,
+            batch_size=options["batch_size"],
+            workers=options["workers"],
+        ):
+            absent_count += result["candidates"]
+            written_count += result["written"]
+            company_name = company_names.get(result["company_id"], result["company_id"])
+            if dry_run:
+                outcome = f"would mark {result['candidates']} absents"
+            else:
+                outcome = f"marked {result['candidates']} absents ({result['written']} written)"
+            self.stdout.write(
+                f"  {company_name}: {result['employees']} employees, {outcome} in {result['seconds']:.2f}s"
             )
 
-            # Process each date in the range
-            current_date = start_date
-            while current_date <= end_date:
-                # Skip if attendance record already exists
-                if current_date in existing_attendance:
-                    current_date += timedelta(days=1)
-                    continue
-
-                # Skip if it's a weekly off
-                if emp.is_week_off(current_date):
-                    current_date += timedelta(days=1)
-                    continue
-
-                # Skip if it's a holiday for this employee's location
-                if (
-                    emp.location_id
-                    and emp.location_id in holiday_map
-                    and current_date in holiday_map[emp.location_id]
-                ):
-                    current_date += timedelta(days=1)
-                    continue
-
-                # Skip if employee joined after this date
-                if emp.date_of_joining and current_date < emp.date_of_joining:
-                    current_date += timedelta(days=1)
-                    continue
-
-                # This is a working day with no attendance record - mark as absent
-                if not dry_run:
-                    Attendance.objects.create(
-                        employee=emp,
-                        date=current_date,
-                        status="ABSENT",
-                        clock_in=None,
-                        clock_out=None,
-                    )
-
-                absent_count += 1
-                if absent_count <= 20:  # Show first 20 to avoid spam
-                    self.stdout.write(
-                        f"  {'[DRY RUN] Would mark' if dry_run else 'Marked'} {emp.user.get_full_name()} as ABSENT on {current_date}"
-                    )
-                elif absent_count == 21:
-                    self.stdout.write("  ... (showing first 20 only)")
-
-                current_date += timedelta(days=1)
+        elapsed = time.perf_counter() - started
+        throughput = (written_count if not dry_run else absent_count) / elapsed if elapsed > 0 else 0
 
         if dry_run:
             self.stdout.write(
@@ -149,7 +127,8 @@ class Command(BaseCommand):
             )
         else:
             self.stdout.write(
-                self.style.SUCCESS(f"\n✓ Created {absent_count} absent records")
+                self.style.SUCCESS(f"\n✓ Created {written_count} absent records")
             )
 
+        self.stdout.write(f"Processed {len(company_ids)} companies in {elapsed:.2f}s ({throughput:.0f} rows/s)")
         self.stdout.write(self.style.SUCCESS(f"✓ Processing complete!"))
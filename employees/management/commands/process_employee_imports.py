@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from employees.employee_import import process_pending_imports
+
+
+class Command(BaseCommand):
+    help = "Run queued bulk employee imports and send their pending activation emails (run from cron to pick up leftovers)"
+
+    def handle(self, *args, **options):
+        jobs = process_pending_imports()
+        for job in jobs:
+            self.stdout.write(
+                f"Import {job.id}: {job.created_count} created, {len(job.row_errors)} rows rejected, "
+                f"{job.emails_sent} activation emails sent"
+            )
+        self.stdout.write(self.style.SUCCESS(f"{len(jobs)} employee imports processed"))
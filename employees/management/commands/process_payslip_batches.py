@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from employees.models import PayslipBatch
+from employees.payslip_batch import default_workers, process_batch, process_pending_batches
+
+
+class Command(BaseCommand):
+    help = "Generate queued bulk payslip batches, rendering PDFs in a process pool (run from cron to pick up leftovers)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-id", type=int, help="Process (or retry) a specific batch only")
+        parser.add_argument("--workers", type=int, help="PDF processes (default: PAYSLIP_PDF_WORKERS or up to 4)")
+
+    def handle(self, *args, **options):
+        workers = options.get("workers") or default_workers()
+        batch_id = options.get("batch_id")
+        if batch_id:
+            if not PayslipBatch.objects.filter(id=batch_id).exists():
+                self.stdout.write(self.style.ERROR(f"Payslip batch {batch_id} not found"))
+                return
+            batch = process_batch(batch_id, workers)
+            if not batch:
+                self.stdout.write(self.style.WARNING(f"Payslip batch {batch_id} is already running or completed"))
+                return
+            batches = [batch]
+        else:
+            batches = process_pending_batches(workers)
+
+        for batch in batches:
+            self.stdout.write(f"Batch {batch.id}: {batch.generated_count} payslips generated, {batch.failed_count} failed")
+        self.stdout.write(self.style.SUCCESS(f"{len(batches)} payslip batches processed with {workers} workers"))
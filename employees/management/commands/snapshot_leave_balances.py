@@ -0,0 +1,26 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from employees.leave_ledger import take_snapshots
+from employees.models import LeaveBalance
+
+
+class Command(BaseCommand):
+    help = "Store month-end leave ledger snapshots so balances and verification only read recent entries"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--month", type=int, help="Month of the snapshot (1-12, default: current month)")
+        parser.add_argument("--year", type=int, help="Year of the snapshot (default: current year)")
+        parser.add_argument("--company-id", type=int, help="Snapshot a specific company only")
+
+    def handle(self, *args, **options):
+        today = date.today()
+        period = date(options.get("year") or today.year, options.get("month") or today.month, 1)
+
+        balances = LeaveBalance.objects.all()
+        if options.get("company_id"):
+            balances = balances.filter(employee__company_id=options["company_id"])
+
+        count = take_snapshots(period, balances.values_list("employee_id", flat=True))
+        self.stdout.write(self.style.SUCCESS(f"Stored {count} leave balance snapshots for {period:%m/%Y}"))
@@ -51,9 +51,11 @@ class Command(BaseCommand):
 
         # 1. Sync approved leaves
         self.stdout.write("\n1. Syncing approved leaves...")
-        approved_leaves = LeaveRequest.objects.filter(
-            status="APPROVED", start_date__lte=end_date, end_date__gte=start_date
-        ).select_related("employee")
+        approved_leaves = (
+            LeaveRequest.objects.filter(status="APPROVED")
+            .overlapping(start_date, end_date)
+            .select_related("employee")
+        )
 
         leave_count = 0
         for leave in approved_leaves:
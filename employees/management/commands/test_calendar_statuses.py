@@ -76,9 +76,7 @@ class Command(BaseCommand):
                 employee=emp,
                 status="APPROVED",
                 leave_type="SL",
-                start_date__lte=month_end,
-                end_date__gte=month_start,
-            )
+            ).overlapping(month_start, month_end)
 
             sick_leave_dates = set()
             for sl in sick_leaves:
@@ -1,11 +1,12 @@
 from django.core.management.base import BaseCommand
 from django.db import transaction
+from employees.leave_ledger import find_discrepancies
 from employees.models import Employee, LeaveBalance
 from loguru import logger
 
 
 class Command(BaseCommand):
-    help = 'Verify and fix leave balance consistency after bulk uploads'
+    help = 'Verify leave balances against the leave ledger (latest snapshot + recent entries)'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -22,129 +23,85 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         company_id = options.get('company_id')
         fix_issues = options.get('fix', False)
-        
+
         self.stdout.write("Starting leave balance verification...")
-        
-        # Get employees to check
+
         employees = Employee.objects.all()
+        balances = LeaveBalance.objects.select_related('employee__user')
         if company_id:
             employees = employees.filter(company_id=company_id)
-        
+            balances = balances.filter(employee__company_id=company_id)
+
         issues_found = 0
         issues_fixed = 0
-        
+
         with transaction.atomic():
-            for employee in employees:
-                try:
-                    # Get or create leave balance
-                    leave_balance, created = LeaveBalance.objects.get_or_create(
-                        employee=employee,
-                        defaults={
-                            'casual_leave_allocated': 0.0,
-                            'sick_leave_allocated': 0.0,
-                            'casual_leave_used': 0.0,
-                            'sick_leave_used': 0.0,
-                            'carry_forward_leave': 0.0
-                        }
+            # Missing balances
+            missing = list(employees.filter(leave_balance__isnull=True).select_related('user'))
+            for employee in missing:
+                self.stdout.write(
+                    self.style.WARNING(f"Missing leave balance for {employee.user.get_full_name()}")
+                )
+            issues_found += len(missing)
+            if missing and fix_issues:
+                LeaveBalance.objects.bulk_create(
+                    [
+                        LeaveBalance(employee=employee, casual_leave_allocated=0.0, sick_leave_allocated=0.0)
+                        for employee in missing
+                    ]
+                )
+                issues_fixed += len(missing)
+
+            balances = list(balances)
+
+            # Negative and unrealistic values
+            for balance in balances:
+                name = balance.employee.user.get_full_name()
+                negative = [
+                    field
+                    for field in ('casual_leave_allocated', 'sick_leave_allocated', 'casual_leave_used', 'sick_leave_used')
+                    if getattr(balance, field) < 0
+                ]
+                for field in negative:
+                    self.stdout.write(
+                        self.style.ERROR(f"{name}: Negative {field.replace('_', ' ')}: {getattr(balance, field)}")
                     )
-                    
-                    if created:
-                        self.stdout.write(
-                            self.style.WARNING(
-                                f"Created missing leave balance for {employee.user.get_full_name()}"
-                            )
-                        )
-                        issues_found += 1
-                        if fix_issues:
-                            issues_fixed += 1
-                    
-                    # Check for negative values
-                    has_negative = False
-                    if leave_balance.casual_leave_allocated < 0:
-                        self.stdout.write(
-                            self.style.ERROR(
-                                f"{employee.user.get_full_name()}: Negative casual leave allocated: {leave_balance.casual_leave_allocated}"
-                            )
-                        )
-                        has_negative = True
-                        issues_found += 1
-                        
-                    if leave_balance.sick_leave_allocated < 0:
-                        self.stdout.write(
-                            self.style.ERROR(
-                                f"{employee.user.get_full_name()}: Negative sick leave allocated: {leave_balance.sick_leave_allocated}"
-                            )
-                        )
-                        has_negative = True
-                        issues_found += 1
-                        
-                    if leave_balance.casual_leave_used < 0:
-                        self.stdout.write(
-                            self.style.ERROR(
-                                f"{employee.user.get_full_name()}: Negative casual leave used: {leave_balance.casual_leave_used}"
-                            )
-                        )
-                        has_negative = True
-                        issues_found += 1
-                        
-                    if leave_balance.sick_leave_used < 0:
-                        self.stdout.write(
-                            self.style.ERROR(
-                                f"{employee.user.get_full_name()}: Negative sick leave used: {leave_balance.sick_leave_used}"
-                            )
-                        )
-                        has_negative = True
-                        issues_found += 1
-                    
-                    # Fix negative values if requested
-                    if has_negative and fix_issues:
-                        leave_balance.validate_and_save()
-                        issues_fixed += 1
-                        self.stdout.write(
-                            self.style.SUCCESS(
-                                f"Fixed negative values for {employee.user.get_full_name()}"
-                            )
-                        )
-                    
-                    # Check for unrealistic values (more than 365 days)
-                    if leave_balance.casual_leave_allocated > 365:
-                        self.stdout.write(
-                            self.style.WARNING(
-                                f"{employee.user.get_full_name()}: Unusually high casual leave allocated: {leave_balance.casual_leave_allocated}"
-                            )
-                        )
-                        issues_found += 1
-                        
-                    if leave_balance.sick_leave_allocated > 365:
+                issues_found += len(negative)
+                if negative and fix_issues:
+                    balance.validate_and_save()
+                    issues_fixed += 1
+                    self.stdout.write(self.style.SUCCESS(f"Fixed negative values for {name}"))
+
+                for field in ('casual_leave_allocated', 'sick_leave_allocated'):
+                    if getattr(balance, field) > 365:
                         self.stdout.write(
                             self.style.WARNING(
-                                f"{employee.user.get_full_name()}: Unusually high sick leave allocated: {leave_balance.sick_leave_allocated}"
+                                f"{name}: Unusually high {field.replace('_', ' ')}: {getattr(balance, field)}"
                             )
                         )
                         issues_found += 1
-                    
-                    # Log current balance for verification
-                    self.stdout.write(
-                        f"{employee.user.get_full_name()}: "
-                        f"CL: {leave_balance.casual_leave_allocated}/{leave_balance.casual_leave_used} "
-                        f"(Balance: {leave_balance.casual_leave_balance}), "
-                        f"SL: {leave_balance.sick_leave_allocated}/{leave_balance.sick_leave_used} "
-                        f"(Balance: {leave_balance.sick_leave_balance}), "
-                        f"CF: {leave_balance.carry_forward_leave}"
-                    )
-                    
-                except Exception as e:
-                    self.stdout.write(
-                        self.style.ERROR(
-                            f"Error processing {employee.user.get_full_name()}: {str(e)}"
-                        )
-                    )
-                    issues_found += 1
-        
+
+            # Totals changed outside the ledger
+            for balance, ledger, diffs in find_discrepancies(balances):
+                name = balance.employee.user.get_full_name()
+                changes = ", ".join(f"{field} {current} (ledger {expected})" for field, (current, expected) in diffs.items())
+                self.stdout.write(self.style.ERROR(f"{name}: Balance differs from ledger: {changes}"))
+                issues_found += 1
+
+                if fix_issues:
+                    # The ledger is the source of truth: save its totals as already recorded, so no
+                    # entry is added, while the save signals clear caches and refresh alerts
+                    for field, value in ledger.items():
+                        setattr(balance, field, value)
+                    balance.mark_ledger_recorded()
+                    balance.save()
+                    issues_fixed += 1
+                    self.stdout.write(self.style.SUCCESS(f"Restored ledger totals for {name}"))
+
         # Summary
         self.stdout.write("\n" + "="*50)
-        self.stdout.write(f"Verification completed for {employees.count()} employees")
-        
+        self.stdout.write(f"Verification completed for {len(balances) + len(missing)} employees")
+
         if issues_found > 0:
             self.stdout.write(
                 self.style.WARNING(f"Issues found: {issues_found}")
@@ -161,5 +118,5 @@ class Command(BaseCommand):
             self.stdout.write(
                 self.style.SUCCESS("No issues found! All leave balances are consistent.")
             )
-        
-        logger.info(f"Leave balance verification completed: {issues_found} issues found, {issues_fixed} fixed")
\ No newline at end of file
+
+        logger.info(f"Leave balance verification completed: {issues_found} issues found, {issues_fixed} fixed")
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.27 on 2026-10-19 02:56
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0018_auto_update_location_currency'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('employees', '0023_payslip_monthly_gross'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveAccrualRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], default='PENDING', max_length=10)),
+                ('casual_leave_credit', models.FloatField(default=0.0, help_text='CL added to each balance')),
+                ('sick_leave_credit', models.FloatField(default=0.0, help_text='SL added to each balance')),
+                ('balances_updated', models.PositiveIntegerField(default=0)),
+                ('balances_created', models.PositiveIntegerField(default=0)),
+                ('error_message', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_accrual_runs', to='companies.company')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='leave_accrual_runs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-year', '-month'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='leaveaccrualrun',
+            constraint=models.UniqueConstraint(fields=('company', 'year', 'month'), name='unique_leave_accrual_run'),
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 4.2.27 on 2026-10-19 03:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def record_opening_balances(apps, schema_editor):
+    """Start the ledger from the current balances with one opening ADJUSTMENT per leave type"""
+    LeaveBalance = apps.get_model("employees", "LeaveBalance")
+    LeaveLedgerEntry = apps.get_model("employees", "LeaveLedgerEntry")
+
+    entries = []
+    for balance in LeaveBalance.objects.all().iterator():
+        for leave_type, allocated, used in (
+            ("CL", balance.casual_leave_allocated, balance.casual_leave_used),
+            ("SL", balance.sick_leave_allocated, balance.sick_leave_used),
+            ("UL", 0.0, balance.unpaid_leave),
+        ):
+            if allocated or used:
+                entries.append(
+                    LeaveLedgerEntry(
+                        employee_id=balance.employee_id,
+                        entry_type="ADJUSTMENT",
+                        leave_type=leave_type,
+                        allocated_delta=allocated,
+                        used_delta=used,
+                        note="Opening balance",
+                    )
+                )
+    LeaveLedgerEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0024_leaveaccrualrun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveBalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField(help_text='First day of the month the snapshot was taken for')),
+                ('casual_leave_allocated', models.FloatField(default=0.0)),
+                ('casual_leave_used', models.FloatField(default=0.0)),
+                ('sick_leave_allocated', models.FloatField(default=0.0)),
+                ('sick_leave_used', models.FloatField(default=0.0)),
+                ('unpaid_leave', models.FloatField(default=0.0)),
+                ('last_entry_id', models.BigIntegerField(default=0, help_text='Ledger entries up to this id are included')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_balance_snapshots', to='employees.employee')),
+            ],
+            options={
+                'ordering': ['-period'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LeaveLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_type', models.CharField(choices=[('ACCRUAL', 'Accrual'), ('DEDUCTION', 'Deduction'), ('ADJUSTMENT', 'Adjustment'), ('REVERSAL', 'Reversal')], max_length=10)),
+                ('leave_type', models.CharField(choices=[('CL', 'Casual Leave'), ('SL', 'Sick Leave'), ('UL', 'Unpaid Leave (LOP)')], max_length=2)),
+                ('allocated_delta', models.FloatField(default=0.0)),
+                ('used_delta', models.FloatField(default=0.0)),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('accrual_run', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='employees.leaveaccrualrun')),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_ledger', to='employees.employee')),
+                ('leave_request', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='employees.leaverequest')),
+                ('reverses', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reversals', to='employees.leaveledgerentry')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['employee', 'id'], name='employees_l_employe_1b8f13_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='leavebalancesnapshot',
+            constraint=models.UniqueConstraint(fields=('employee', 'period'), name='unique_leave_balance_snapshot'),
+        ),
+        migrations.RunPython(record_opening_balances, migrations.RunPython.noop),
+    ]
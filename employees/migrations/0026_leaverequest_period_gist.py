@@ -0,0 +1,31 @@
+from django.db import migrations
+
+INDEX_NAME = "employees_leaverequest_period_gist"
+
+
+def create_period_index(apps, schema_editor):
+    """GiST index on the leave's inclusive date range, used by LeaveRequest.objects.overlapping()"""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    # daterange() raises on reversed periods; 0030 repairs them the same way on every backend
+    schema_editor.execute("UPDATE employees_leaverequest SET end_date = start_date WHERE end_date < start_date")
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON employees_leaverequest "
+        "USING gist (daterange(start_date, end_date, '[]'))"
+    )
+
+
+def drop_period_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"DROP INDEX IF EXISTS {INDEX_NAME}")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("employees", "0025_leave_ledger"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_period_index, drop_period_index),
+    ]
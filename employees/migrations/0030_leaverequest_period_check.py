@@ -0,0 +1,24 @@
+# Generated by Django 4.2.27 on 2026-10-19 04:27
+
+from django.db import migrations, models
+
+
+def repair_reversed_periods(apps, schema_editor):
+    """ONLY_AVAILABLE approvals with less than one available day saved end_date = start_date - 1"""
+    LeaveRequest = apps.get_model("employees", "LeaveRequest")
+    LeaveRequest.objects.filter(end_date__lt=models.F("start_date")).update(end_date=models.F("start_date"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0029_payslip_batch'),
+    ]
+
+    operations = [
+        migrations.RunPython(repair_reversed_periods, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='leaverequest',
+            constraint=models.CheckConstraint(check=models.Q(('end_date__gte', models.F('start_date'))), name='leaverequest_end_date_after_start_date', violation_error_message='End date cannot be before start date.'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-19 04:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0031_employee_import_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payslipbatch',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
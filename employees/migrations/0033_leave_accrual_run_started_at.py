@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-19 04:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0032_payslip_batch_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='leaveaccrualrun',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,13 +1,14 @@
 from datetime import timedelta
 
 from django.conf import settings
-from django.db import models
-from django.db.models.signals import post_save
+from django.db import connections, models, transaction
+from django.db.models import DurationField, ExpressionWrapper, F, Func, OuterRef, Subquery, Sum
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.utils import timezone
 from loguru import logger
 
-from companies.models import Company
+from companies.models import Company, Holiday, Location
 
 
 class Employee(models.Model):
@@ -209,42 +210,31 @@ class Employee(models.Model):
 
     def save(self, *args, **kwargs):
         """Auto-generate employee ID if not set"""
+        from .badge_ids import badge_prefix, reserve_badge_ids, sync_badge_sequences
+
         if not self.badge_id and self.location:
             # Generate employee ID based on location
-            location_name = self.location.name.upper()
-
-            # Determine prefix based on location
-            if "HYDERABAD" in location_name or "HYD" in location_name:
-                if self.company.name.upper() in ["PETABYTZ", "PETABYTES"]:
-                    prefix = "PBTHYD"
-                elif self.company.name.upper() in ["SOFTSTANDARD", "SOFT STANDARD"]:
-                    prefix = "SSSHYD"
-                else:
-                    # Default prefix for other companies in Hyderabad
-                    prefix = "EMPHYD"
-            else:
-                # For other locations, use first 3 letters of company + first 3 of location
-                company_code = self.company.name[:3].upper()
-                location_code = location_name[:3].upper()
-                prefix = f"{company_code}{location_code}"
+            self.badge_id = reserve_badge_ids(badge_prefix(self.company, self.location), 1)[0]
+        elif self.badge_id and self._state.adding:
+            # Keep generated IDs clear of one entered by hand
+            sync_badge_sequences([self.badge_id])
 
-            # Get the last employee with this prefix
-            last_employee = Employee.objects.filter(badge_id__startswith=prefix).order_by("-badge_id").first()
+        super().save(*args, **kwargs)
 
-            if last_employee and last_employee.badge_id:
-                # Extract the number part and increment
-                try:
-                    last_number = int(last_employee.badge_id[len(prefix) :])
-                    new_number = last_number + 1
-                except (ValueError, IndexError):
-                    new_number = 1
-            else:
-                new_number = 1
 
-            # Format: PREFIX + 3-digit number (e.g., PBTHYD001)
-            self.badge_id = f"{prefix}{new_number:03d}"
+class BadgeSequence(models.Model):
+    """
+    Last badge ID number issued for a prefix (see employees.badge_ids).
+    IDs are reserved by incrementing last_number, so issuing one is a single
+    row update instead of a scan of existing badge IDs.
+    """
 
-        super().save(*args, **kwargs)
+    prefix = models.CharField(max_length=20, unique=True)
+    last_number = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.prefix}: {self.last_number}"
 
 
 class EmergencyContact(models.Model):
@@ -293,6 +283,44 @@ class EmployeeIDProof(models.Model):
         return f"ID Proofs - {self.employee.user.get_full_name()}"
 
 
+class AttendanceQuerySet(models.QuerySet):
+    def with_working_hours(self):
+        """
+        Annotate session totals so listings can render working hours without
+        querying AttendanceSession once per row.
+
+        Adds:
+        - completed_session_duration: sum of (clock_out - clock_in) over completed sessions
+        - active_session_start: clock_in of the currently active session, if any
+        """
+        completed = (
+            AttendanceSession.objects.filter(
+                employee=OuterRef("employee"),
+                date=OuterRef("date"),
+                clock_in__isnull=False,
+                clock_out__isnull=False,
+            )
+            .order_by()
+            .values("employee", "date")
+            .annotate(total=Sum(ExpressionWrapper(F("clock_out") - F("clock_in"), output_field=DurationField())))
+            .values("total")
+        )
+        active = (
+            AttendanceSession.objects.filter(
+                employee=OuterRef("employee"),
+                date=OuterRef("date"),
+                clock_out__isnull=True,
+                is_active=True,
+            )
+            .order_by("-session_number")
+            .values("clock_in")[:1]
+        )
+        return self.annotate(
+            completed_session_duration=Subquery(completed, output_field=DurationField()),
+            active_session_start=Subquery(active, output_field=models.DateTimeField()),
+        )
+
+
 class Attendance(models.Model):
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name="attendances")
     date = models.DateField()
@@ -377,6 +405,8 @@ class Attendance(models.Model):
         help_text="Current session type (WEB/REMOTE)",
     )
 
+    objects = AttendanceQuerySet.as_manager()
+
     class Meta:
         unique_together = [["employee", "date"]]
         ordering = ["-date"]
@@ -384,6 +414,36 @@ class Attendance(models.Model):
     def __str__(self):
         return f"{self.employee} - {self.date}"
 
+    def _has_session_annotations(self):
+        """True when loaded through AttendanceQuerySet.with_working_hours()"""
+        return hasattr(self, "completed_session_duration") and hasattr(self, "active_session_start")
+
+    def get_completed_session_seconds(self):
+        """Total seconds across completed sessions, using annotations when present"""
+        if self._has_session_annotations():
+            duration = self.completed_session_duration
+            return duration.total_seconds() if duration else 0
+
+        sessions = AttendanceSession.objects.filter(
+            employee=self.employee,
+            date=self.date,
+            clock_in__isnull=False,
+            clock_out__isnull=False,
+        ).only("clock_in", "clock_out")
+
+        total_seconds = 0
+        for session in sessions:
+            total_seconds += (session.clock_out - session.clock_in).total_seconds()
+        return total_seconds
+
+    def get_active_session_start(self):
+        """Clock-in time of the active session, using annotations when present"""
+        if self._has_session_annotations():
+            return self.active_session_start
+
+        current_session = self.get_current_session()
+        return current_session.clock_in if current_session else None
+
     def calculate_late_arrival(self):
         """Calculate if employee is late based on their shift schedule and location timezone"""
         from datetime import datetime, timedelta
@@ -576,19 +636,7 @@ class Attendance(models.Model):
     def get_shift_completion_percentage(self):
         """Calculate what percentage of the shift has been completed"""
         # Get total worked hours from all completed sessions
-        sessions = AttendanceSession.objects.filter(
-            employee=self.employee,
-            date=self.date,
-            clock_in__isnull=False,
-            clock_out__isnull=False,
-        )
-
-        total_minutes = 0
-        for session in sessions:
-            duration = session.clock_out - session.clock_in
-            total_minutes += duration.total_seconds() / 60
-
-        worked_hours = total_minutes / 60
+        worked_hours = self.get_completed_session_seconds() / 3600
         expected_hours = self.get_shift_duration_hours()
 
         if expected_hours > 0:
@@ -698,20 +746,7 @@ class Attendance(models.Model):
     def calculate_total_working_hours(self):
         """Calculate and update total working hours from all sessions"""
         try:
-            from .models import AttendanceSession
-
-            # Fetch all completed sessions for this attendance record
-            sessions = AttendanceSession.objects.filter(
-                employee=self.employee,
-                date=self.date,
-                clock_in__isnull=False,
-                clock_out__isnull=False,
-            )
-
-            total_seconds = 0
-            for session in sessions:
-                duration = session.clock_out - session.clock_in
-                total_seconds += duration.total_seconds()
+            total_seconds = self.get_completed_session_seconds()
 
             # Convert to hours
             self.total_working_hours = round(total_seconds / 3600, 2)
@@ -725,28 +760,13 @@ class Attendance(models.Model):
     def get_cumulative_working_hours_including_current(self):
         """Calculate total working hours including current active session"""
         try:
-            from django.utils import timezone
-            from .models import AttendanceSession
-
-            # Get all completed sessions for today
-            completed_sessions = AttendanceSession.objects.filter(
-                employee=self.employee,
-                date=self.date,
-                clock_in__isnull=False,
-                clock_out__isnull=False,
-            )
-            
             # Calculate total hours from completed sessions
-            total_seconds = 0
-            for session in completed_sessions:
-                duration = session.clock_out - session.clock_in
-                total_seconds += duration.total_seconds()
-            
+            total_seconds = self.get_completed_session_seconds()
+
             # Add current active session if exists
-            current_session = self.get_current_session()
-            if current_session and current_session.clock_in:
-                current_duration = timezone.now() - current_session.clock_in
-                total_seconds += current_duration.total_seconds()
+            active_start = self.get_active_session_start()
+            if active_start:
+                total_seconds += (timezone.now() - active_start).total_seconds()
             
             # Convert to hours
             return round(total_seconds / 3600, 2)
@@ -967,6 +987,38 @@ class LocationLog(models.Model):
         return f"{self.employee} - {self.get_log_type_display()} - {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
 
 
+class LeaveBalanceManager(models.Manager):
+    def attach(self, employees):
+        """
+        Load fresh balances for all employees in one query, create missing ones
+        with one bulk_create, and cache each on employee.leave_balance. Leave
+        totals come from the leave ledger. Returns the employees as a list.
+        """
+        from .leave_ledger import apply_ledger_totals
+
+        employees = list(employees)
+        balances = self.in_bulk([employee.id for employee in employees], field_name="employee_id")
+
+        missing = [employee for employee in employees if employee.id not in balances]
+        if missing:
+            # Create with 0 leaves for new employees (probation period), like create_leave_balance
+            # ignore_conflicts tolerates a concurrent request creating the same rows,
+            # but returns no ids, so the new rows are read back
+            self.bulk_create(
+                [
+                    LeaveBalance(employee=employee, casual_leave_allocated=0.0, sick_leave_allocated=0.0)
+                    for employee in missing
+                ],
+                ignore_conflicts=True,
+            )
+            balances.update(self.in_bulk([employee.id for employee in missing], field_name="employee_id"))
+        apply_ledger_totals(balances.values())
+
+        for employee in employees:
+            employee.leave_balance = balances[employee.id]
+        return employees
+
+
 class LeaveBalance(models.Model):
     employee = models.OneToOneField(Employee, on_delete=models.CASCADE, related_name="leave_balance")
 
@@ -985,6 +1037,39 @@ class LeaveBalance(models.Model):
 
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = LeaveBalanceManager()
+
+    # Totals mirrored by the leave ledger (see employees.leave_ledger)
+    LEDGER_FIELDS = [
+        "casual_leave_allocated",
+        "casual_leave_used",
+        "sick_leave_allocated",
+        "sick_leave_used",
+        "unpaid_leave",
+    ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored totals so a later save() can be written to the ledger as a delta
+        instance.mark_ledger_recorded()
+        return instance
+
+    def ledger_values(self):
+        """Loaded ledger totals; deferred fields are left out"""
+        return {field: self.__dict__[field] for field in self.LEDGER_FIELDS if field in self.__dict__}
+
+    def mark_ledger_recorded(self):
+        """Treat the current in-memory totals as already written to the ledger"""
+        self._ledger_values = self.ledger_values()
+
+    def refresh_from_ledger(self):
+        """Reload the balance, with leave totals from the leave ledger (latest snapshot + recent entries)"""
+        from .leave_ledger import apply_ledger_totals
+
+        self.refresh_from_db()
+        apply_ledger_totals([self])
+
     @property
     def casual_leave_balance(self):
         return max(0, self.casual_leave_allocated - self.casual_leave_used)
@@ -1025,16 +1110,24 @@ class LeaveBalance(models.Model):
             "will_be_lop": will_be_lop,
         }
 
-    def apply_leave_deduction(self, leave_type, days_approved):
-        """Deduct approved leave from balance"""
-        if leave_type == "CL":
-            self.casual_leave_used += days_approved
-        elif leave_type == "SL":
-            self.sick_leave_used += days_approved
-        elif leave_type == "UL":
-            self.unpaid_leave += days_approved
+    USED_FIELDS = {
+        "CL": "casual_leave_used",
+        "SL": "sick_leave_used",
+        "UL": "unpaid_leave",
+    }
+
+    def add_leave_deduction(self, leave_type, days_approved):
+        """Add approved days to the used counter without saving; returns the field changed, if any"""
+        field = self.USED_FIELDS.get(leave_type)
         # OD (On Duty) and OT (Others) don't affect leave balance
+        if field:
+            setattr(self, field, getattr(self, field) + days_approved)
+        return field
 
+    def apply_leave_deduction(self, leave_type, days_approved):
+        """Deduct approved leave from balance"""
+        self.add_leave_deduction(leave_type, days_approved)
+        self._ledger_entry_type = "DEDUCTION"
         self.save()
 
     def validate_and_save(self):
@@ -1066,6 +1159,36 @@ class LeaveBalance(models.Model):
         return f"Balance: {self.employee.user.get_full_name()}"
 
 
+class LeaveRequestQuerySet(models.QuerySet):
+    def overlapping(self, start_date, end_date=None):
+        """
+        Requests whose [start_date, end_date] touches the given range (a single
+        day when end_date is omitted).
+
+        On PostgreSQL this filters on daterange(start_date, end_date, '[]'),
+        which the GiST expression index from migration 0026 serves; other
+        backends fall back to the plain two-column comparison.
+        """
+        end_date = end_date or start_date
+        if connections[self.db].vendor != "postgresql":
+            return self.filter(start_date__lte=end_date, end_date__gte=start_date)
+
+        from django.contrib.postgres.fields import DateRangeField
+        from psycopg2.extras import DateRange
+
+        # Must match the indexed expression exactly for the planner to use the index
+        leave_period = Func(
+            F("start_date"),
+            F("end_date"),
+            function="daterange",
+            template="%(function)s(%(expressions)s, '[]')",
+            output_field=DateRangeField(),
+        )
+        return self.alias(leave_period=leave_period).filter(
+            leave_period__overlap=DateRange(start_date, end_date, "[]")
+        )
+
+
 class LeaveRequest(models.Model):
     LEAVE_TYPES = [
         ("CL", "Casual Leave"),
@@ -1129,8 +1252,18 @@ class LeaveRequest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = LeaveRequestQuerySet.as_manager()
+
     class Meta:
         ordering = ["-created_at"]
+        constraints = [
+            # daterange(start_date, end_date) in the overlap index rejects reversed periods
+            models.CheckConstraint(
+                check=models.Q(end_date__gte=models.F("start_date")),
+                name="leaverequest_end_date_after_start_date",
+                violation_error_message="End date cannot be before start date.",
+            ),
+        ]
 
     @property
     def total_days(self):
@@ -1226,6 +1359,64 @@ class LeaveRequest(models.Model):
 
         super().save(*args, **kwargs)
 
+    def get_leave_deductions(self, approval_type="FULL"):
+        """
+        Work out the balance deductions for approving this leave as a list of
+        (leave_type, days), without saving anything. Returns None if the leave
+        can't be approved this way. ONLY_AVAILABLE may shorten end_date.
+        """
+        validation = self.validate_leave_application()
+        if "error" in validation:
+            raise ValueError(validation["error"])
+
+        deductions = []
+        if approval_type == "ONLY_AVAILABLE":
+            # Approve only available days, don't process LOP
+            available = validation["available_balance"]
+            if available > 0:
+                deductions.append((self.leave_type, available))
+            # Update the leave request to reflect only approved days
+            # Note: This changes the original request
+            if self.duration == "HALF":
+                # Can't split half day
+                if available >= 0.5:
+                    deductions.append((self.leave_type, 0.5))
+                else:
+                    return None  # Can't approve
+            else:
+                # Adjust end date to match available days; without a whole day there is nothing to approve
+                if int(available) < 1:
+                    return None
+                self.end_date = self.start_date + timedelta(days=int(available) - 1)
+
+        elif self.leave_type == "UL" or approval_type == "WITH_LOP":
+            # Direct unpaid leave application OR approval with LOP
+            if self.leave_type == "UL":
+                deductions.append(("UL", self.total_days))
+            elif validation["will_be_lop"]:
+                # Split into paid leave + LOP
+                available = validation["available_balance"]
+                lop_days = validation["shortfall"]
+
+                # Deduct available balance from requested leave type
+                if available > 0:
+                    deductions.append((self.leave_type, available))
+
+                # Deduct remaining days as LOP
+                if lop_days > 0:
+                    deductions.append(("UL", lop_days))
+            else:
+                # Full deduction from requested leave type (sufficient balance)
+                deductions.append((self.leave_type, self.total_days))
+        else:
+            # FULL approval - deduct from requested leave type
+            if validation["will_be_lop"]:
+                # Insufficient balance and not approved with LOP
+                return None
+            deductions.append((self.leave_type, self.total_days))
+
+        return deductions
+
     def approve_leave(self, approved_by_user, approval_type="FULL"):
         """
         Approve leave and deduct from balance
@@ -1234,93 +1425,13 @@ class LeaveRequest(models.Model):
             approved_by_user: User who is approving
             approval_type: 'FULL', 'WITH_LOP', or 'ONLY_AVAILABLE'
         """
+        from .leave_approval import approve_leave_requests
+
         if self.status != "PENDING":
             return False
 
-        # Deduct from leave balance first, then update status
         try:
-            balance = self.employee.leave_balance
-            validation = self.validate_leave_application()
-
-            if approval_type == "ONLY_AVAILABLE":
-                # Approve only available days, don't process LOP
-                available = validation["available_balance"]
-                if available > 0:
-                    balance.apply_leave_deduction(self.leave_type, available)
-                # Update the leave request to reflect only approved days
-                # Note: This changes the original request
-                from datetime import timedelta
-
-                if self.duration == "HALF":
-                    # Can't split half day
-                    if available >= 0.5:
-                        balance.apply_leave_deduction(self.leave_type, 0.5)
-                    else:
-                        return False  # Can't approve
-                else:
-                    # Adjust end date to match available days
-                    self.end_date = self.start_date + timedelta(days=int(available) - 1)
-
-            elif self.leave_type == "UL" or approval_type == "WITH_LOP":
-                # Direct unpaid leave application OR approval with LOP
-                if self.leave_type == "UL":
-                    balance.apply_leave_deduction("UL", self.total_days)
-                elif validation["will_be_lop"]:
-                    # Split into paid leave + LOP
-                    available = validation["available_balance"]
-                    lop_days = validation["shortfall"]
-
-                    # Deduct available balance from requested leave type
-                    if available > 0:
-                        balance.apply_leave_deduction(self.leave_type, available)
-
-                    # Deduct remaining days as LOP
-                    if lop_days > 0:
-                        balance.apply_leave_deduction("UL", lop_days)
-                else:
-                    # Full deduction from requested leave type (sufficient balance)
-                    balance.apply_leave_deduction(self.leave_type, self.total_days)
-            else:
-                # FULL approval - deduct from requested leave type
-                if validation["will_be_lop"] and approval_type != "WITH_LOP":
-                    # Insufficient balance and not approved with LOP
-                    return False
-                balance.apply_leave_deduction(self.leave_type, self.total_days)
-
-            # Update status after successful deduction
-            self.status = "APPROVED"
-            self.approved_by = approved_by_user
-            self.approved_at = timezone.now()
-            self.approval_type = approval_type
-            self.save()
-
-            # Create attendance records for each day of the leave
-            from datetime import timedelta
-
-            current_date = self.start_date
-            while current_date <= self.end_date:
-                # Skip weekends/weekly offs if they exist
-                if not self.employee.is_week_off(current_date):
-                    # Determine attendance status based on duration
-                    if self.duration in ["FIRST_HALF", "SECOND_HALF", "HALF"]:  # Include legacy "HALF" option
-                        attendance_status = "HALF_DAY"
-                    else:
-                        attendance_status = "LEAVE"
-                    
-                    # Create or update attendance record
-                    Attendance.objects.update_or_create(
-                        employee=self.employee,
-                        date=current_date,
-                        defaults={
-                            "status": attendance_status,
-                            "clock_in": None,
-                            "clock_out": None,
-                        },
-                    )
-                current_date += timedelta(days=1)
-
-            return True
-
+            return self.pk in approve_leave_requests([self], approved_by_user, approval_type)
         except Exception as e:
             # Don't change status if deduction fails
             logger.error(f"Error approving leave: {e}")
@@ -1330,6 +1441,189 @@ class LeaveRequest(models.Model):
         return f"{self.get_leave_type_display()} - {self.employee.user.get_full_name()} ({self.start_date} to {self.end_date})"
 
 
+class LeaveAccrualRun(models.Model):
+    """
+    One monthly leave accrual per company. The unique (company, year, month)
+    row makes re-running a month a no-op.
+    """
+
+    STATUS_CHOICES = [
+        ("PENDING", "Pending"),
+        ("RUNNING", "Running"),
+        ("COMPLETED", "Completed"),
+        ("FAILED", "Failed"),
+    ]
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name="leave_accrual_runs")
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="PENDING")
+
+    casual_leave_credit = models.FloatField(default=0.0, help_text="CL added to each balance")
+    sick_leave_credit = models.FloatField(default=0.0, help_text="SL added to each balance")
+    balances_updated = models.PositiveIntegerField(default=0)
+    balances_created = models.PositiveIntegerField(default=0)
+    error_message = models.TextField(blank=True)
+
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="leave_accrual_runs",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-year", "-month"]
+        constraints = [
+            models.UniqueConstraint(fields=["company", "year", "month"], name="unique_leave_accrual_run"),
+        ]
+
+    def __str__(self):
+        return f"Leave accrual {self.month:02d}/{self.year} - {self.company.name} ({self.get_status_display()})"
+
+
+class EmployeeImport(models.Model):
+    """
+    A bulk employee import sheet, processed in the background (see
+    employees.employee_import). Rows that could not be imported are kept in
+    row_errors; activation emails wait in pending_activation_user_ids until
+    they are sent.
+    """
+
+    STATUS_CHOICES = [
+        ("PENDING", "Pending"),
+        ("RUNNING", "Running"),
+        ("COMPLETED", "Completed"),
+        ("FAILED", "Failed"),
+    ]
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name="employee_imports")
+    uploaded_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="employee_imports",
+    )
+    import_file = models.FileField(upload_to="employee_imports/")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="PENDING")
+
+    total_rows = models.PositiveIntegerField(default=0)
+    processed_rows = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    row_errors = models.JSONField(default=list, blank=True, help_text="[{row, email, error}] per rejected row")
+    error_message = models.TextField(blank=True)
+
+    # Activation emails
+    site_url = models.CharField(max_length=255, blank=True, help_text="Base URL for activation links")
+    pending_activation_user_ids = models.JSONField(default=list, blank=True)
+    emails_sent = models.PositiveIntegerField(default=0)
+    emails_failed = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Touched by the worker while RUNNING; a stale one means the worker died
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"Employee import {self.id} - {self.company.name} ({self.get_status_display()})"
+
+    @property
+    def percent(self):
+        if not self.total_rows:
+            return 100 if self.status in ("COMPLETED", "FAILED") else 0
+        return round(self.processed_rows * 100 / self.total_rows)
+
+
+class LeaveLedgerEntry(models.Model):
+    """
+    Append-only record of a change to an employee's leave balance. Rows are
+    never edited; a mistake is undone with a REVERSAL entry.
+    """
+
+    ENTRY_TYPES = [
+        ("ACCRUAL", "Accrual"),
+        ("DEDUCTION", "Deduction"),
+        ("ADJUSTMENT", "Adjustment"),
+        ("REVERSAL", "Reversal"),
+    ]
+    LEAVE_TYPES = [
+        ("CL", "Casual Leave"),
+        ("SL", "Sick Leave"),
+        ("UL", "Unpaid Leave (LOP)"),
+    ]
+
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name="leave_ledger")
+    entry_type = models.CharField(max_length=10, choices=ENTRY_TYPES)
+    leave_type = models.CharField(max_length=2, choices=LEAVE_TYPES)
+    allocated_delta = models.FloatField(default=0.0)
+    used_delta = models.FloatField(default=0.0)
+
+    leave_request = models.ForeignKey(
+        LeaveRequest, on_delete=models.SET_NULL, null=True, blank=True, related_name="ledger_entries"
+    )
+    accrual_run = models.ForeignKey(
+        LeaveAccrualRun, on_delete=models.SET_NULL, null=True, blank=True, related_name="ledger_entries"
+    )
+    reverses = models.ForeignKey(
+        "self", on_delete=models.SET_NULL, null=True, blank=True, related_name="reversals"
+    )
+    note = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["employee", "id"]),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.pk:
+            raise ValueError("Leave ledger entries are append-only")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return (
+            f"{self.get_entry_type_display()} {self.leave_type} "
+            f"(allocated {self.allocated_delta:+}, used {self.used_delta:+}) - Employee {self.employee_id}"
+        )
+
+
+class LeaveBalanceSnapshot(models.Model):
+    """
+    Leave ledger totals for an employee as of a month end. The current
+    balance is the latest snapshot plus the entries after last_entry_id.
+    """
+
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name="leave_balance_snapshots")
+    period = models.DateField(help_text="First day of the month the snapshot was taken for")
+
+    casual_leave_allocated = models.FloatField(default=0.0)
+    casual_leave_used = models.FloatField(default=0.0)
+    sick_leave_allocated = models.FloatField(default=0.0)
+    sick_leave_used = models.FloatField(default=0.0)
+    unpaid_leave = models.FloatField(default=0.0)
+
+    last_entry_id = models.BigIntegerField(default=0, help_text="Ledger entries up to this id are included")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-period"]
+        constraints = [
+            models.UniqueConstraint(fields=["employee", "period"], name="unique_leave_balance_snapshot"),
+        ]
+
+    def __str__(self):
+        return f"Leave snapshot {self.period:%m/%Y} - Employee {self.employee_id}"
+
+
 class Payslip(models.Model):
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name="payslips")
     month = models.DateField(help_text="Select any date in the month")
@@ -1369,6 +1663,82 @@ class Payslip(models.Model):
         return f"Payslip - {self.employee.user.get_full_name()} - {self.month.strftime('%b %Y')}"
 
 
+class PayslipBatch(models.Model):
+    """
+    A bulk payslip sheet for one month, generated in the background (see
+    employees.payslip_batch). Each sheet row is a PayslipBatchItem with its
+    own status, so one bad row does not hide the others.
+    """
+
+    STATUS_CHOICES = [
+        ("PENDING", "Pending"),
+        ("RUNNING", "Running"),
+        ("COMPLETED", "Completed"),
+        ("FAILED", "Failed"),
+    ]
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name="payslip_batches")
+    uploaded_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="payslip_batches",
+    )
+    month = models.DateField(help_text="First day of the payslip month")
+    upload_file = models.FileField(upload_to="payslip_batches/")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="PENDING")
+
+    total_rows = models.PositiveIntegerField(default=0)
+    processed_rows = models.PositiveIntegerField(default=0)
+    generated_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    error_message = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Touched by the worker while RUNNING; a stale one means the worker died
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"Payslip batch {self.id} - {self.company.name} {self.month.strftime('%b %Y')}"
+
+    @property
+    def percent(self):
+        if not self.total_rows:
+            return 100 if self.status in ("COMPLETED", "FAILED") else 0
+        return round(self.processed_rows * 100 / self.total_rows)
+
+
+class PayslipBatchItem(models.Model):
+    """One sheet row of a PayslipBatch and the payslip generated from it"""
+
+    STATUS_CHOICES = [
+        ("PENDING", "Pending"),
+        ("GENERATED", "Generated"),
+        ("FAILED", "Failed"),
+    ]
+
+    batch = models.ForeignKey(PayslipBatch, on_delete=models.CASCADE, related_name="items")
+    row = models.PositiveIntegerField(help_text="Sheet row number")
+    badge_id = models.CharField(max_length=50, blank=True)
+    monthly_gross = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    payable_days = models.FloatField(null=True, blank=True)
+    employee = models.ForeignKey(Employee, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    payslip = models.ForeignKey(Payslip, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="PENDING")
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ["row"]
+
+    def __str__(self):
+        return f"{self.batch} row {self.row} ({self.get_status_display()})"
+
+
 class HandbookSection(models.Model):
     title = models.CharField(max_length=100)
     content = models.TextField(help_text="HTML content is supported")
@@ -1537,26 +1907,75 @@ def create_leave_balance(sender, instance, created, **kwargs):
         )
 
 
+def leave_balance_cache_keys(employee_id, company_id):
+    """Cache keys that hold data derived from an employee's leave balance"""
+    return [
+        f"employee_leave_balance_{employee_id}",
+        f"employee_dashboard_data_{employee_id}",
+        f"employee_profile_data_{employee_id}",
+        f"employee_personal_home_{employee_id}",
+        f"chatbot_context_leave_balance_{employee_id}",
+        f"leave_config_data_{company_id}",
+        f"company_leave_summary_{company_id}",
+    ]
+
+
+@receiver(pre_save, sender=LeaveBalance)
+def load_leave_balance_ledger_values(sender, instance, **kwargs):
+    """Balances that weren't loaded from the database need their stored totals for the ledger delta"""
+    if instance._state.adding or hasattr(instance, "_ledger_values"):
+        return
+    stored = LeaveBalance.objects.filter(pk=instance.pk).values(*LeaveBalance.LEDGER_FIELDS).first()
+    instance._ledger_values = stored or {}
+
+
+@receiver(post_save, sender=LeaveBalance)
+def record_leave_balance_ledger(sender, instance, created, **kwargs):
+    """Append the change made by this save to the leave ledger"""
+    from .leave_ledger import record_balance_change
+
+    record_balance_change(instance, created)
+
+
 # Signal to clear cache when leave balance is updated
 @receiver(post_save, sender=LeaveBalance)
 def invalidate_leave_balance_cache(sender, instance, **kwargs):
-    """Clear cached data when leave balance is updated"""
+    """Clear cached data once the leave balance update is committed"""
     from django.core.cache import cache
-    
-    employee = instance.employee
-    company = employee.company
-    
-    # Clear employee-specific cache
-    cache_keys_to_clear = [
-        f"employee_leave_balance_{employee.id}",
-        f"employee_dashboard_data_{employee.id}",
-        f"employee_profile_data_{employee.id}",
-        f"employee_personal_home_{employee.id}",
-        f"leave_config_data_{company.id}",
-        f"company_leave_summary_{company.id}",
-    ]
-    
-    for cache_key in cache_keys_to_clear:
-        cache.delete(cache_key)
-    
-    logger.info(f"Cache invalidated for employee {employee.user.get_full_name()} leave balance update")
+
+    cache_keys_to_clear = leave_balance_cache_keys(instance.employee_id, instance.employee.company_id)
+    transaction.on_commit(lambda: cache.delete_many(cache_keys_to_clear))
+
+    logger.info(f"Cache invalidated for employee {instance.employee_id} leave balance update")
+
+
+# Signals to keep the working-day calendar's holiday bitmaps current
+@receiver(pre_save, sender=Holiday)
+def remember_holiday_location(sender, instance, **kwargs):
+    """Remember the previous location so a moved holiday clears both calendars"""
+    instance._previous_location_id = None
+    if instance.pk:
+        instance._previous_location_id = (
+            Holiday.objects.filter(pk=instance.pk).values_list("location_id", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Holiday)
+@receiver(post_delete, sender=Holiday)
+def invalidate_holiday_calendar(sender, instance, **kwargs):
+    """Clear cached holiday bitmaps when a holiday changes"""
+    from .working_calendar import invalidate_location_calendar
+
+    invalidate_location_calendar(instance.location_id)
+    previous_location_id = getattr(instance, "_previous_location_id", None)
+    if previous_location_id and previous_location_id != instance.location_id:
+        invalidate_location_calendar(previous_location_id)
+
+
+@receiver(post_save, sender=Location)
+def reset_location_calendar(sender, instance, created, **kwargs):
+    """Start new locations with an empty calendar"""
+    if created:
+        from .working_calendar import invalidate_location_calendar
+
+        invalidate_location_calendar(instance.id)
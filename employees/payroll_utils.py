@@ -3,21 +3,9 @@ from decimal import Decimal
 from django.utils import timezone
 from .models import Payslip
 
-def calculate_payslip_breakdown(annual_ctc, worked_days, total_days, pf_enabled=True, location=None):
-    """
-    Calculates the payslip breakdown based on the user's provided logic.
-    Integrates the specific formulas and rounding rules based on location.
-    """
-    # Convert inputs to float/Decimal
-    if isinstance(annual_ctc, str):
-        annual_ctc = annual_ctc.replace(",", "")
-    annual_ctc = float(annual_ctc)
-    worked_days = float(worked_days)
-    total_days = int(total_days)
-
-    # Determine location-specific logic
+def payroll_country_code(location):
+    """Country whose payroll rules apply to ``location`` (a Location or a country string); IN by default"""
     country_code = "IN"
-    currency_symbol = "₹"
     if location:
         if hasattr(location, 'country_code') and location.country_code:
             status_code = str(location.country_code).strip().upper()
@@ -35,17 +23,40 @@ def calculate_payslip_breakdown(annual_ctc, worked_days, total_days, pf_enabled=
                 country_code = "US"
             else:
                 country_code = loc_str
-        
-        # Determine currency symbol from location
-        if hasattr(location, 'currency'):
-            if location.currency == "USD":
-                currency_symbol = "$"
-            elif location.currency == "BDT":
-                currency_symbol = "৳"
-            elif location.currency == "INR":
-                currency_symbol = "₹"
-            else:
-                currency_symbol = location.currency + " "
+    return country_code
+
+
+def payroll_currency_symbol(location):
+    """Currency symbol for amounts paid at ``location``"""
+    currency_symbol = "₹"
+    # Determine currency symbol from location
+    if location and hasattr(location, 'currency'):
+        if location.currency == "USD":
+            currency_symbol = "$"
+        elif location.currency == "BDT":
+            currency_symbol = "৳"
+        elif location.currency == "INR":
+            currency_symbol = "₹"
+        else:
+            currency_symbol = location.currency + " "
+    return currency_symbol
+
+
+def calculate_payslip_breakdown(annual_ctc, worked_days, total_days, pf_enabled=True, location=None):
+    """
+    Calculates the payslip breakdown based on the user's provided logic.
+    Integrates the specific formulas and rounding rules based on location.
+    """
+    # Convert inputs to float/Decimal
+    if isinstance(annual_ctc, str):
+        annual_ctc = annual_ctc.replace(",", "")
+    annual_ctc = float(annual_ctc)
+    worked_days = float(worked_days)
+    total_days = int(total_days)
+
+    # Determine location-specific logic
+    country_code = payroll_country_code(location)
+    currency_symbol = payroll_currency_symbol(location)
 
     def get_breakdown_logic(ctc_to_use, is_pf_enabled, country="IN"):
         """Helper to apply the specific calculation logic to a given CTC amount"""
@@ -0,0 +1,382 @@
+"""
+Batch payslip generation.
+
+queue_payslip_batch() stores a bulk payslip sheet as a PayslipBatch with one
+PayslipBatchItem per row and starts it on a background thread once the
+request's transaction commits. The thread:
+
+- loads the sheet's employees and their existing payslips for the month in
+  one query each
+- computes every breakdown and writes the payslips with one bulk_create and
+  one bulk_update
+- renders the payslip HTML in-process and converts it to PDF through
+  core.pdf_render (a pool of worker processes, as xhtml2pdf is CPU-bound,
+  with unchanged payslips served from its output cache), saving each PDF as
+  it arrives
+
+Each item records its own status and error; the generated PDFs can be
+downloaded as one zip (write_archive). Batches left PENDING, or RUNNING
+without a heartbeat for STALE_BATCH_AFTER (the worker died, e.g. in a
+restart), are picked up by the process_payslip_batches command; items
+already GENERATED are not rendered again.
+
+bulk_create, bulk_update and the pdf_file update skip post_save; the
+payslips_written signal stands in for it.
+"""
+
+import calendar
+import logging
+import os
+import threading
+import zipfile
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+import openpyxl
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.dispatch import Signal
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from core.pdf_render import render_pdfs
+
+from .models import Employee, Payslip, PayslipBatch, PayslipBatchItem
+from .payroll_utils import calculate_payslip_breakdown, num2words_flexible
+
+logger = logging.getLogger(__name__)
+
+# Sent with employee_ids whenever the batch writes their payslips
+payslips_written = Signal()
+
+REQUIRED_COLUMNS = ["employee id", "monthly gross", "payable days"]
+PAYSLIP_TEMPLATE = "employees/payslip_pdf.html"
+BREAKDOWN_FIELDS = [
+    "basic",
+    "hra",
+    "lta",
+    "other_allowance",
+    "conveyance_allowance",
+    "special_allowance",
+    "monthly_gross",
+    "gross_salary",
+    "employee_pf",
+    "employer_pf",
+    "professional_tax",
+    "net_salary",
+    "worked_days",
+    "total_days",
+]
+STALE_BATCH_AFTER = timedelta(minutes=getattr(settings, "PAYSLIP_BATCH_STALE_MINUTES", 15))
+
+
+def default_workers():
+    return getattr(settings, "PAYSLIP_PDF_WORKERS", None) or min(4, os.cpu_count() or 1)
+
+
+def apply_breakdown(payslip, breakdown, worked_days, total_days):
+    """Copy a calculate_payslip_breakdown() result onto a payslip (not saved)"""
+    payslip.basic = breakdown["basic"]
+    payslip.hra = breakdown["hra"]
+    payslip.lta = breakdown["lta"]
+    payslip.other_allowance = breakdown["other_allowance"]
+    # Map location specific allowances
+    payslip.conveyance_allowance = breakdown.get("conveyance", 0.0)
+    payslip.special_allowance = breakdown.get("medical", 0.0)
+    payslip.monthly_gross = breakdown["full_monthly_gross"]
+    payslip.gross_salary = breakdown["gross_monthly"]
+    payslip.employee_pf = breakdown["employee_pf"]
+    payslip.employer_pf = breakdown["employer_pf"]
+    payslip.professional_tax = breakdown["professional_tax"]
+    payslip.net_salary = breakdown["net_salary"]
+    payslip.worked_days = worked_days
+    payslip.total_days = total_days
+
+
+def payslip_pdf_context(employee, payslip):
+    """Template context of employees/payslip_pdf.html"""
+    # Determine currency name for words
+    currency_name = "Rupees"
+    if employee.location:
+        if employee.location.country_code == "BD" or employee.location.currency == "BDT":
+            currency_name = "Taka"
+        elif employee.location.country_code == "US" or employee.location.currency == "USD":
+            currency_name = "Dollars"
+        elif employee.location.currency:
+            currency_name = employee.location.currency
+
+    # Prepare branding info
+    cname_upper = employee.company.name.upper()
+    branding = {
+        "name": "PETABYTZ TECHNOLOGY SERVICES PVT LTD",
+        "address": "PLOT NO 201 & 202, 1ST FLOOR, DMR CORPORATE, KAVURI HILLS RD, HYDERABAD, TELANGANA 500081.",
+    }
+    if "SOFTSTANDARD" in cname_upper or "RMINDS" in cname_upper:
+        branding["name"] = "SOFTSTANDARD SOLUTIONS"
+
+    # Use location address if available
+    if employee.location and employee.location.address_line1:
+        loc = employee.location
+        addr = f"{loc.address_line1}"
+        if loc.address_line2:
+            addr += f", {loc.address_line2}"
+        addr += f", {loc.city}"
+        if loc.state:
+            addr += f", {loc.state}"
+        if loc.postal_code:
+            addr += f" {loc.postal_code}"
+        branding["address"] = addr
+
+    return {
+        "payslip": payslip,
+        "company": employee.company,
+        "branding": branding,
+        "net_salary_words": num2words_flexible(payslip.net_salary, currency_name),
+    }
+
+
+def payslip_filename(employee, month):
+    return f"payslip_{employee.badge_id}_{month.strftime('%b_%Y')}.pdf"
+
+
+def _number(value, cast=float):
+    """A sheet cell as a number (commas allowed), or None"""
+    if value is None or str(value).strip() == "":
+        return None
+    try:
+        return cast(str(value).replace(",", "").strip())
+    except (ValueError, InvalidOperation):
+        return None
+
+
+def read_rows(file):
+    """
+    PayslipBatchItems (unsaved) for the sheet's rows; ValueError when a
+    required column is missing. Blank rows are skipped.
+    """
+    wb = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    ws = wb.active
+    rows = ws.iter_rows(values_only=True)
+
+    # Map headers to column indices
+    header_map = {}
+    for index, value in enumerate(next(rows, ())):
+        if value:
+            header_map.setdefault(str(value).strip().lower(), index)
+    for col in REQUIRED_COLUMNS:
+        if col not in header_map:
+            raise ValueError(f"Required column missing: {col}")
+
+    items = []
+    for row_number, row in enumerate(rows, start=2):
+        badge_cell, gross_cell, days_cell = (
+            row[header_map[col]] if header_map[col] < len(row) else None for col in REQUIRED_COLUMNS
+        )
+        if all(cell is None or str(cell).strip() == "" for cell in (badge_cell, gross_cell, days_cell)):
+            continue
+
+        item = PayslipBatchItem(
+            row=row_number,
+            badge_id=str(badge_cell).strip().removesuffix(".0") if badge_cell is not None else "",
+            monthly_gross=_number(gross_cell, Decimal),
+            payable_days=_number(days_cell),
+        )
+        if not item.badge_id:
+            item.status, item.error = "FAILED", "Employee ID is required"
+        elif item.monthly_gross is None or item.payable_days is None:
+            item.status, item.error = "FAILED", "Monthly gross and payable days must be numbers"
+        items.append(item)
+    wb.close()
+    return items
+
+
+def queue_payslip_batch(file, month, company, uploaded_by=None):
+    """
+    Store the sheet as a PENDING batch for ``month`` and start it once the
+    current transaction commits. Raises ValueError for an unusable sheet.
+    """
+    items = read_rows(file)
+    if not items:
+        raise ValueError("The sheet has no payslip rows.")
+    file.seek(0)
+
+    with transaction.atomic():
+        invalid = sum(1 for item in items if item.status == "FAILED")
+        batch = PayslipBatch(
+            company=company,
+            uploaded_by=uploaded_by,
+            month=month,
+            total_rows=len(items),
+            processed_rows=invalid,
+            failed_count=invalid,
+        )
+        batch.upload_file.save(file.name, file, save=False)
+        batch.save()
+        for item in items:
+            item.batch = batch
+        PayslipBatchItem.objects.bulk_create(items)
+
+        def start():
+            thread = threading.Thread(target=_run_queued_batch, args=(batch.pk,), daemon=True)
+            thread.start()
+
+        transaction.on_commit(start)
+    return batch
+
+
+def calculate_payslips(batch, items):
+    """
+    Compute and write the payslips of the batch's pending items. Items that
+    cannot be computed are marked FAILED. Returns the (item, payslip) pairs
+    to render, one per employee.
+    """
+    total_days = calendar.monthrange(batch.month.year, batch.month.month)[1]
+    employees = {
+        employee.badge_id: employee
+        for employee in Employee.objects.filter(
+            company=batch.company, badge_id__in={item.badge_id for item in items}
+        ).select_related("user", "company", "location")
+    }
+    existing = {}
+    for payslip in Payslip.objects.filter(employee__in=employees.values(), month=batch.month).order_by("id"):
+        existing.setdefault(payslip.employee_id, payslip)
+
+    payslips = {}
+    for item in items:
+        employee = employees.get(item.badge_id)
+        if employee is None:
+            item.status, item.error = "FAILED", "No employee with this ID"
+            continue
+        item.employee = employee
+        try:
+            breakdown = calculate_payslip_breakdown(
+                float(item.monthly_gross) * 12, item.payable_days, total_days, employee.pf_enabled, location=employee.location
+            )
+        except (TypeError, ValueError, ZeroDivisionError) as e:
+            item.status, item.error = "FAILED", f"Could not calculate the payslip: {e}"
+            continue
+
+        if employee.id in payslips:
+            # Repeated employee: the later row wins, as it did when rows were saved one by one
+            previous, payslip = payslips[employee.id]
+            previous.status, previous.error = "FAILED", f"Employee ID repeated on row {item.row}"
+        else:
+            payslip = existing.get(employee.id) or Payslip(month=batch.month)
+            payslip.employee = employee
+        apply_breakdown(payslip, breakdown, item.payable_days, total_days)
+        payslips[employee.id] = (item, payslip)
+
+    with transaction.atomic():
+        Payslip.objects.bulk_create([payslip for _, payslip in payslips.values() if payslip.pk is None])
+        Payslip.objects.bulk_update(
+            [payslip for employee_id, (_, payslip) in payslips.items() if employee_id in existing], BREAKDOWN_FIELDS
+        )
+        for item, payslip in payslips.values():
+            item.payslip = payslip
+        PayslipBatchItem.objects.bulk_update(items, ["employee", "payslip", "status", "error"])
+        if payslips:
+            payslips_written.send(sender=Payslip, employee_ids=list(payslips))
+
+    failed = sum(1 for item in items if item.status == "FAILED")
+    PayslipBatch.objects.filter(pk=batch.pk).update(
+        processed_rows=F("processed_rows") + failed, failed_count=F("failed_count") + failed, heartbeat_at=timezone.now()
+    )
+    return list(payslips.values())
+
+
+def _record_pdf(batch, item, payslip, pdf):
+    if pdf:
+        payslip.pdf_file.save(payslip_filename(payslip.employee, batch.month), ContentFile(pdf), save=False)
+        Payslip.objects.filter(pk=payslip.pk).update(pdf_file=payslip.pdf_file.name)
+        payslips_written.send(sender=Payslip, employee_ids=[payslip.employee_id])
+        item.status, item.error = "GENERATED", ""
+    else:
+        item.status, item.error = "FAILED", "PDF could not be generated"
+    item.save(update_fields=["status", "error"])
+
+    generated = item.status == "GENERATED"
+    PayslipBatch.objects.filter(pk=batch.pk).update(
+        processed_rows=F("processed_rows") + 1,
+        generated_count=F("generated_count") + int(generated),
+        failed_count=F("failed_count") + int(not generated),
+        heartbeat_at=timezone.now(),
+    )
+
+
+def generate_payslips(batch, workers=1):
+    """Calculate, save and render the payslips of the batch's pending items"""
+    items = list(batch.items.filter(status="PENDING"))
+    pending = calculate_payslips(batch, items)
+    htmls = [render_to_string(PAYSLIP_TEMPLATE, payslip_pdf_context(item.employee, payslip)) for item, payslip in pending]
+    for index, pdf in render_pdfs(htmls, workers):
+        item, payslip = pending[index]
+        _record_pdf(batch, item, payslip, pdf)
+
+
+def _claimable():
+    """PENDING or FAILED batches, and RUNNING ones whose worker stopped beating"""
+    stale = Q(heartbeat_at__isnull=True) | Q(heartbeat_at__lt=timezone.now() - STALE_BATCH_AFTER)
+    return Q(status__in=["PENDING", "FAILED"]) | (Q(status="RUNNING") & stale)
+
+
+def process_batch(batch_id, workers=None):
+    """Generate a pending batch and mark it COMPLETED"""
+    claimed = PayslipBatch.objects.filter(_claimable(), pk=batch_id).update(
+        status="RUNNING", heartbeat_at=timezone.now()
+    )
+    if not claimed:
+        return None  # Already running or done
+
+    batch = PayslipBatch.objects.select_related("company").get(pk=batch_id)
+    try:
+        generate_payslips(batch, workers or default_workers())
+    except Exception as e:
+        logger.exception(f"Payslip batch {batch_id} failed")
+        batch.status = "FAILED"
+        batch.error_message = str(e)
+    else:
+        batch.status = "COMPLETED"
+        batch.error_message = ""
+    batch.completed_at = timezone.now()
+    batch.save(update_fields=["status", "error_message", "completed_at"])
+    batch.refresh_from_db()  # Counters were updated in the database
+    return batch
+
+
+def _run_queued_batch(batch_id):
+    """Background thread body for a queued batch"""
+    try:
+        process_batch(batch_id)
+    finally:
+        # The thread's own connection is not closed by the request cycle
+        connections.close_all()
+
+
+def process_pending_batches(workers=None):
+    """Run every PENDING (or stale RUNNING) batch, oldest first; returns the batches processed"""
+    processed = []
+    stranded = PayslipBatch.objects.filter(_claimable()).exclude(status="FAILED")
+    for batch_id in stranded.order_by("created_at").values_list("id", flat=True):
+        batch = process_batch(batch_id, workers)
+        if batch:
+            processed.append(batch)
+    return processed
+
+
+def write_archive(batch, file):
+    """Write the batch's generated payslip PDFs to ``file`` as a zip; returns the number written"""
+    written = 0
+    items = batch.items.filter(status="GENERATED").select_related("payslip", "employee")
+    with zipfile.ZipFile(file, "w", zipfile.ZIP_DEFLATED) as archive:
+        for item in items:
+            if not item.payslip or not item.payslip.pdf_file:
+                continue
+            try:
+                with item.payslip.pdf_file.open("rb") as pdf:
+                    archive.writestr(payslip_filename(item.employee, batch.month), pdf.read())
+            except OSError:
+                continue
+            written += 1
+    return written
@@ -1 +1,962 @@
-# Create your tests here.
+import random
+import shutil
+import tempfile
+import unittest
+import zipfile
+from datetime import date, datetime, timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
+import pandas as pd
+import pytz
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ai_assistant.chat_context import payslip_key
+from companies.models import Company, Department, Holiday, Location
+from employees import employee_import, leave_accrual, payslip_batch
+from employees.badge_ids import reserve_badge_ids, sync_badge_sequences
+from employees.employee_import import process_pending_imports, run_import, send_activation_emails
+from employees.leave_accrual import enqueue_monthly_accrual
+from employees.leave_approval import approve_leave_requests
+from employees.leave_ledger import find_discrepancies, ledger_totals, reverse_entries, take_snapshots
+from employees.models import (
+    Attendance,
+    AttendanceSession,
+    BadgeSequence,
+    Employee,
+    EmployeeImport,
+    LeaveAccrualRun,
+    LeaveBalance,
+    LeaveBalanceSnapshot,
+    LeaveLedgerEntry,
+    LeaveRequest,
+    Payslip,
+    PayslipBatch,
+)
+from employees.payroll_utils import calculate_payslip_breakdown
+from employees.payroll_vector import AMOUNT_KEYS, calculate_payslip_breakdowns, round2
+from employees.payslip_batch import process_batch
+from employees.working_calendar import is_working_day, working_day_matrix, working_days_count
+
+User = get_user_model()
+
+
+class AttendanceWorkingHoursAnnotationTest(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(
+            name="Test Company", primary_domain="test.com", email_domain="test.com"
+        )
+        self.location = Location.objects.create(
+            company=self.company, name="India", country_code="IN", timezone="Asia/Kolkata"
+        )
+        self.user = User.objects.create_user(
+            username="emp@test.com", email="emp@test.com", password="password", company=self.company
+        )
+        self.employee = Employee.objects.create(
+            user=self.user,
+            company=self.company,
+            designation="Developer",
+            department="IT",
+            location=self.location,
+        )
+
+    def _create_rows(self, count):
+        start = date(2024, 1, 1)
+        attendances = []
+        sessions = []
+        for offset in range(count):
+            day = start + timedelta(days=offset)
+            clock_in = pytz.utc.localize(datetime.combine(day, datetime.min.time()) + timedelta(hours=4))
+            attendances.append(Attendance(employee=self.employee, date=day, status="PRESENT", clock_in=clock_in))
+            sessions.append(
+                AttendanceSession(
+                    employee=self.employee,
+                    date=day,
+                    session_number=1,
+                    session_type="WEB",
+                    clock_in=clock_in,
+                    clock_out=clock_in + timedelta(hours=4, minutes=30),
+                    is_active=False,
+                )
+            )
+            sessions.append(
+                AttendanceSession(
+                    employee=self.employee,
+                    date=day,
+                    session_number=2,
+                    session_type="WEB",
+                    clock_in=clock_in + timedelta(hours=5),
+                    clock_out=clock_in + timedelta(hours=9),
+                    is_active=False,
+                )
+            )
+        Attendance.objects.bulk_create(attendances)
+        AttendanceSession.objects.bulk_create(sessions)
+
+    def test_annotated_listing_runs_in_constant_queries(self):
+        self._create_rows(500)
+
+        with self.assertNumQueries(1):
+            rows = list(
+                Attendance.objects.filter(employee=self.employee)
+                .with_working_hours()
+                .select_related("employee__assigned_shift")
+            )
+            hours = [row.effective_hours for row in rows]
+            percentages = [row.get_shift_completion_percentage() for row in rows]
+
+        self.assertEqual(len(rows), 500)
+        self.assertEqual(set(hours), {"8:30"})
+        self.assertEqual(set(percentages), {8.5 / 9 * 100})
+
+    def test_annotations_match_per_row_calculation(self):
+        self._create_rows(3)
+        annotated = {row.pk: row for row in Attendance.objects.with_working_hours()}
+
+        for row in Attendance.objects.all():
+            self.assertEqual(row.effective_hours, annotated[row.pk].effective_hours)
+            self.assertEqual(
+                row.get_cumulative_working_hours_including_current(),
+                annotated[row.pk].get_cumulative_working_hours_including_current(),
+            )
+
+
+class WorkingCalendarTest(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(
+            name="Test Company", primary_domain="test.com", email_domain="test.com"
+        )
+        self.loc_india = Location.objects.create(
+            company=self.company, name="India", country_code="IN", timezone="Asia/Kolkata"
+        )
+        self.loc_us = Location.objects.create(
+            company=self.company, name="US", country_code="US", timezone="America/New_York"
+        )
+        self.employees = []
+        for index, location in enumerate([self.loc_india, self.loc_us, None]):
+            user = User.objects.create_user(
+                username=f"emp{index}@test.com", email=f"emp{index}@test.com", password="password", company=self.company
+            )
+            self.employees.append(
+                Employee.objects.create(
+                    user=user, company=self.company, designation="Developer", department="IT", location=location
+                )
+            )
+        # Third employee works Saturdays and is off on Fridays
+        self.employees[2].week_off_saturday = False
+        self.employees[2].week_off_friday = True
+        self.employees[2].save()
+
+        Holiday.objects.create(company=self.company, location=self.loc_india, name="Republic Day", date=date(2025, 1, 26))
+        Holiday.objects.create(company=self.company, location=self.loc_india, name="Diwali", date=date(2024, 11, 1))
+        Holiday.objects.create(company=self.company, location=self.loc_us, name="New Year", date=date(2025, 1, 1))
+
+    def test_matrix_matches_per_day_rules(self):
+        start, end = date(2024, 10, 1), date(2025, 2, 28)
+        dates, working = working_day_matrix(self.employees, start, end)
+        holidays = {
+            (h.location_id, h.date) for h in Holiday.objects.filter(company=self.company, is_active=True)
+        }
+
+        for row, emp in enumerate(self.employees):
+            for col, dt in enumerate(dates.tolist()):
+                expected = not emp.is_week_off(dt) and (emp.location_id, dt) not in holidays
+                self.assertEqual(bool(working[row, col]), expected, (emp.id, dt))
+
+    def test_holiday_changes_invalidate_cached_bitmaps(self):
+        emp = self.employees[0]
+        self.assertTrue(is_working_day(emp, date(2024, 8, 15)))
+
+        holiday = Holiday.objects.create(
+            company=self.company, location=self.loc_india, name="Independence Day", date=date(2024, 8, 15)
+        )
+        self.assertFalse(is_working_day(emp, date(2024, 8, 15)))
+
+        holiday.location = self.loc_us
+        holiday.save()
+        self.assertTrue(is_working_day(emp, date(2024, 8, 15)))
+        self.assertFalse(is_working_day(self.employees[1], date(2024, 8, 15)))
+
+        counts = working_days_count(self.employees, date(2024, 8, 12), date(2024, 8, 18))
+        self.assertEqual(counts, {self.employees[0].id: 5, self.employees[1].id: 4, self.employees[2].id: 5})
+
+
+class MarkAbsentsCommandTest(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(
+            name="Test Company", primary_domain="test.com", email_domain="test.com"
+        )
+        self.location = Location.objects.create(
+            company=self.company, name="India", country_code="IN", timezone="Asia/Kolkata"
+        )
+        self.user = User.objects.create_user(
+            username="emp@test.com", email="emp@test.com", password="password", company=self.company
+        )
+        self.employee = Employee.objects.create(
+            user=self.user,
+            company=self.company,
+            designation="Developer",
+            department="IT",
+            location=self.location,
+            date_of_joining=date(2024, 3, 5),
+        )
+        Holiday.objects.create(company=self.company, location=self.location, name="Holi", date=date(2024, 3, 25))
+        Attendance.objects.create(employee=self.employee, date=date(2024, 3, 6), status="PRESENT")
+
+    def test_marks_missing_working_days_once(self):
+        call_command("mark_absents", year=2024, month=3, stdout=StringIO())
+
+        absent_dates = set(
+            Attendance.objects.filter(employee=self.employee, status="ABSENT").values_list("date", flat=True)
+        )
+        expected = {
+            date(2024, 3, day)
+            for day in range(5, 32)
+            if date(2024, 3, day).weekday() < 5 and day not in (6, 25)
+        }
+        self.assertEqual(absent_dates, expected)
+
+        out = StringIO()
+        call_command("mark_absents", year=2024, month=3, stdout=out)
+        self.assertIn("Created 0 absent records", out.getvalue())
+
+
+class BatchedLeaveApprovalTest(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(
+            name="Test Company", primary_domain="test.com", email_domain="test.com"
+        )
+        self.admin = User.objects.create_user(
+            username="admin@test.com", email="admin@test.com", password="password", company=self.company
+        )
+        self.employees = []
+        for index in range(5):
+            user = User.objects.create_user(
+                username=f"emp{index}@test.com", email=f"emp{index}@test.com", password="password", company=self.company
+            )
+            employee = Employee.objects.create(user=user, company=self.company, designation="Developer", department="IT")
+            LeaveBalance.objects.filter(employee=employee).update(casual_leave_allocated=100.0, sick_leave_allocated=100.0)
+            self.employees.append(employee)
+
+    def _leave(self, employee, start, days, **kwargs):
+        return LeaveRequest.objects.create(
+            employee=employee,
+            leave_type=kwargs.pop("leave_type", "CL"),
+            start_date=start,
+            end_date=start + timedelta(days=days - 1),
+            **kwargs,
+        )
+
+    def _approve_queries(self, leave_requests):
+        """Return (queries, attendance insert batches) used to approve the requests"""
+        leave_requests = list(LeaveRequest.objects.filter(pk__in=[lr.pk for lr in leave_requests]))
+        with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks(execute=True):
+            approved = approve_leave_requests(leave_requests, self.admin)
+        self.assertEqual(len(approved), len(leave_requests))
+        inserts = [q for q in ctx.captured_queries if q["sql"].startswith('INSERT INTO "employees_attendance"')]
+        return len(ctx.captured_queries) - len(inserts), len(inserts)
+
+    def test_single_long_leave_writes_once(self):
+        leave = self._leave(self.employees[0], date(2024, 3, 4), 20)
+
+        leave = LeaveRequest.objects.get(pk=leave.pk)
+        self.assertTrue(leave.approve_leave(self.admin))
+
+        balance = LeaveBalance.objects.get(employee=self.employees[0])
+        self.assertEqual(balance.casual_leave_used, 20.0)
+        leave_days = set(Attendance.objects.filter(employee=self.employees[0], status="LEAVE").values_list("date", flat=True))
+        # Weekly offs (Sat/Sun) are not written
+        self.assertEqual(leave_days, {leave.start_date + timedelta(days=i) for i in range(20) if (4 + i) % 7 not in (2, 3)})
+        self.assertFalse(leave.approve_leave(self.admin))
+
+    def test_query_count_does_not_grow_with_days_or_leaves(self):
+        one_day = self._approve_queries([self._leave(self.employees[0], date(2024, 3, 4), 1)])
+        twenty_days = self._approve_queries([self._leave(self.employees[1], date(2024, 3, 4), 20)])
+        fifty_leaves = self._approve_queries(
+            [
+                self._leave(self.employees[2 + index % 3], date(2024, 4, 1) + timedelta(days=7 * index), 2)
+                for index in range(50)
+            ]
+        )
+
+        self.assertEqual(one_day, twenty_days)
+        self.assertEqual(one_day[1], 1)
+        # The attendance upsert is one statement, split only by the backend's query parameter limit
+        self.assertEqual(fifty_leaves[0], one_day[0])
+        fields = [field for field in Attendance._meta.concrete_fields if not field.primary_key]
+        batch_size = connection.ops.bulk_batch_size(fields, [None] * 100) or 100
+        self.assertEqual(fifty_leaves[1], -(-100 // batch_size))
+        self.assertEqual(LeaveBalance.objects.get(employee=self.employees[2]).casual_leave_used, 34.0)
+
+    def test_half_day_and_on_duty_statuses(self):
+        Attendance.objects.create(employee=self.employees[0], date=date(2024, 3, 5), status="ABSENT")
+        self._leave(self.employees[0], date(2024, 3, 5), 1, duration="FIRST_HALF")
+        self._leave(self.employees[1], date(2024, 3, 5), 1, leave_type="OD")
+
+        # OD has no balance of its own, so it is approved with LOP like before
+        approve_leave_requests(LeaveRequest.objects.filter(leave_type="CL").select_related("employee"), self.admin)
+        approve_leave_requests(LeaveRequest.objects.filter(leave_type="OD"), self.admin, approval_type="WITH_LOP")
+
+        self.assertEqual(Attendance.objects.get(employee=self.employees[0], date=date(2024, 3, 5)).status, "HALF_DAY")
+        self.assertEqual(Attendance.objects.get(employee=self.employees[1], date=date(2024, 3, 5)).status, "ON_DUTY")
+        self.assertEqual(LeaveBalance.objects.get(employee=self.employees[0]).casual_leave_used, 0.5)
+
+    def test_insufficient_balance_is_left_pending(self):
+        LeaveBalance.objects.filter(employee=self.employees[0]).update(casual_leave_allocated=1.0)
+        leave = self._leave(self.employees[0], date(2024, 3, 4), 3)
+
+        self.assertEqual(approve_leave_requests([leave], self.admin), [])
+        leave.refresh_from_db()
+        self.assertEqual(leave.status, "PENDING")
+        self.assertFalse(Attendance.objects.filter(employee=self.employees[0]).exists())
+
+        self.assertEqual(approve_leave_requests([leave], self.admin, approval_type="WITH_LOP"), [leave.pk])
+        balance = LeaveBalance.objects.get(employee=self.employees[0])
+        self.assertEqual((balance.casual_leave_used, balance.unpaid_leave), (1.0, 2.0))
+
+
+class MonthlyLeaveAccrualTest(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(
+            name="Bluebix", primary_domain="bluebix.com", email_domain="bluebix.com"
+        )
+        self.employees = []
+        for index in range(3):
+            user = User.objects.create_user(
+                username=f"emp{index}@bluebix.com", email=f"emp{index}@bluebix.com", password="password", company=self.company
+            )
+            self.employees.append(
+                Employee.objects.create(user=user, company=self.company, designation="Developer", department="IT")
+            )
+        LeaveBalance.objects.filter(employee=self.employees[0]).delete()
+        self.employees[2].is_active = False
+        self.employees[2].save()
+
+    def test_accrual_runs_once_per_month(self):
+        call_command("accrue_monthly_leaves", year=2026, month=1, stdout=StringIO())
+
+        balances = {b.employee_id: b for b in LeaveBalance.objects.all()}
+        self.assertEqual(
+            (balances[self.employees[0].id].casual_leave_allocated, balances[self.employees[0].id].sick_leave_allocated),
+            (1.0, 0.5),
+        )
+        self.assertEqual(balances[self.employees[1].id].casual_leave_allocated, 1.0)
+        # Inactive employees are not credited
+        self.assertEqual(balances[self.employees[2].id].casual_leave_allocated, 0.0)
+
+        run = LeaveAccrualRun.objects.get(company=self.company, year=2026, month=1)
+        self.assertEqual((run.status, run.balances_updated, run.balances_created), ("COMPLETED", 2, 1))
+
+        out = StringIO()
+        call_command("accrue_monthly_leaves", year=2026, month=1, stdout=out)
+        self.assertIn("already accrued", out.getvalue())
+        self.assertEqual(LeaveBalance.objects.get(employee=self.employees[1]).casual_leave_allocated, 1.0)
+
+        call_command("accrue_monthly_leaves", year=2026, month=2, stdout=StringIO())
+        self.assertEqual(LeaveBalance.objects.get(employee=self.employees[1]).casual_leave_allocated, 2.0)
+
+    def test_stale_running_accrual_can_be_queued_again(self):
+        run = LeaveAccrualRun.objects.create(
+            company=self.company, year=2026, month=1, status="RUNNING", started_at=timezone.now()
+        )
+        self.assertEqual(enqueue_monthly_accrual(self.company, 2026, 1), (run, False))
+
+        LeaveAccrualRun.objects.filter(pk=run.pk).update(
+            started_at=timezone.now() - leave_accrual.STALE_ACCRUAL_AFTER - timedelta(minutes=1)
+        )
+        with mock.patch.object(leave_accrual.threading, "Thread") as thread, self.captureOnCommitCallbacks(execute=True):
+            run, queued = enqueue_monthly_accrual(self.company, 2026, 1)
+        self.assertEqual((run.status, queued), ("PENDING", True))
+        self.assertEqual(thread.call_args.kwargs["args"], (run.pk,))
+
+        with mock.patch.object(leave_accrual.connections, "close_all"):
+            leave_accrual._run_queued_accrual(run.pk)
+        run.refresh_from_db()
+        self.assertEqual(run.status, "COMPLETED")
+        self.assertEqual(LeaveBalance.objects.get(employee=self.employees[1]).casual_leave_allocated, 1.0)
+
+
+class LeaveLedgerTest(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(
+            name="Petabytz", primary_domain="petabytz.com", email_domain="petabytz.com"
+        )
+        self.user = User.objects.create_user(
+            username="emp@petabytz.com", email="emp@petabytz.com", password="password", company=self.company
+        )
+        self.employee = Employee.objects.create(
+            user=self.user, company=self.company, designation="Developer", department="IT"
+        )
+
+    def _balance(self):
+        return LeaveBalance.objects.get(employee=self.employee)
+
+    def test_every_balance_change_is_in_the_ledger(self):
+        balance = self._balance()
+        balance.casual_leave_allocated = 5.0
+        balance.save()
+
+        call_command("accrue_monthly_leaves", year=2026, month=1, stdout=StringIO())
+        self.assertEqual(LeaveBalanceSnapshot.objects.get(employee=self.employee).casual_leave_allocated, 6.0)
+
+        leave = LeaveRequest.objects.create(
+            employee=self.employee, leave_type="CL", start_date=date(2026, 1, 5), end_date=date(2026, 1, 6)
+        )
+        self.assertTrue(leave.approve_leave(self.user))
+
+        entry_types = list(
+            LeaveLedgerEntry.objects.filter(employee=self.employee).values_list("entry_type", "leave_type")
+        )
+        self.assertEqual(
+            entry_types,
+            [("ADJUSTMENT", "CL"), ("ACCRUAL", "CL"), ("ACCRUAL", "SL"), ("DEDUCTION", "CL")],
+        )
+
+        balance = self._balance()
+        self.assertEqual(ledger_totals([self.employee.id])[self.employee.id], balance.ledger_values())
+        self.assertEqual(find_discrepancies([balance]), [])
+
+        reverse_entries(LeaveLedgerEntry.objects.filter(leave_request=leave), note="Leave withdrawn")
+        self.assertEqual(self._balance().casual_leave_used, 0.0)
+        self.assertEqual(find_discrepancies([self._balance()]), [])
+
+    def test_verify_restores_balances_changed_outside_the_ledger(self):
+        balance = self._balance()
+        balance.sick_leave_allocated = 4.0
+        balance.save()
+        LeaveBalance.objects.filter(pk=balance.pk).update(sick_leave_allocated=40.0)
+
+        out = StringIO()
+        call_command("verify_leave_balances", stdout=out)
+        self.assertIn("Balance differs from ledger", out.getvalue())
+
+        cache.set(f"employee_leave_balance_{self.employee.id}", "stale")
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("verify_leave_balances", fix=True, stdout=StringIO())
+        self.assertEqual(self._balance().sick_leave_allocated, 4.0)
+        self.assertIsNone(cache.get(f"employee_leave_balance_{self.employee.id}"))
+        # The repair itself is not a ledger change
+        self.assertEqual(LeaveLedgerEntry.objects.filter(employee=self.employee).count(), 1)
+
+    def test_balances_are_read_from_snapshot_and_recent_entries(self):
+        other = Employee.objects.create(
+            user=User.objects.create_user(
+                username="other@petabytz.com", email="other@petabytz.com", company=self.company
+            ),
+            company=self.company,
+            designation="Developer",
+            department="IT",
+        )
+        balance = self._balance()
+        balance.casual_leave_allocated = 3.0
+        balance.save()
+        take_snapshots(date(2026, 1, 1), [self.employee.id, other.id])
+
+        other_balance = LeaveBalance.objects.get(employee=other)
+        other_balance.sick_leave_allocated = 2.0
+        other_balance.save()
+        balance = self._balance()
+        balance.casual_leave_used = 1.0
+        balance.save()
+
+        # Each snapshot's watermark is that employee's own last entry
+        snapshot = LeaveBalanceSnapshot.objects.get(employee=self.employee)
+        self.assertEqual(
+            snapshot.last_entry_id, LeaveLedgerEntry.objects.filter(employee=self.employee).first().id
+        )
+        self.assertEqual(LeaveBalanceSnapshot.objects.get(employee=other).last_entry_id, 0)
+
+        # Entries are read only above each watermark: the snapshot query and one entry query
+        with CaptureQueriesContext(connection) as queries:
+            ledger_totals([self.employee.id, other.id])
+        self.assertEqual(len(queries), 2)
+        self.assertIn(f'"id" > {snapshot.last_entry_id}', queries[1]["sql"])
+
+        # A change outside the ledger does not show up
+        LeaveBalance.objects.filter(employee=self.employee).update(casual_leave_allocated=30.0)
+        balance = self._balance()
+        balance.refresh_from_ledger()
+        self.assertEqual((balance.casual_leave_allocated, balance.casual_leave_used), (3.0, 1.0))
+        self.assertEqual(LeaveBalance.objects.attach([other])[0].leave_balance.sick_leave_allocated, 2.0)
+
+        # Saving a ledger-read balance records only the new change, and re-syncs the columns
+        balance.casual_leave_used = 2.0
+        balance.save()
+        self.assertEqual(self._balance().casual_leave_allocated, 3.0)
+        self.assertEqual(find_discrepancies([self._balance()]), [])
+
+
+class LeaveBalanceLoaderTest(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(
+            name="Test Company", primary_domain="test.com", email_domain="test.com"
+        )
+        self.admin = User.objects.create_user(
+            username="admin@test.com",
+            email="admin@test.com",
+            password="password",
+            company=self.company,
+            role=User.Role.COMPANY_ADMIN,
+            must_change_password=False,
+        )
+
+    def _add_employees(self, count):
+        for index in range(count):
+            user = User.objects.create_user(
+                username=f"emp{index}-{count}@test.com",
+                email=f"emp{index}-{count}@test.com",
+                password="password",
+                company=self.company,
+            )
+            Employee.objects.create(user=user, company=self.company, designation="Developer", department="IT")
+
+    def _page_queries(self):
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("leave_configuration"))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_attach_creates_missing_and_loads_fresh_balances(self):
+        self._add_employees(3)
+        employees = list(Employee.objects.order_by("id"))
+        LeaveBalance.objects.filter(employee=employees[0]).delete()
+        balance = LeaveBalance.objects.get(employee=employees[1])
+        balance.casual_leave_allocated = 7.0
+        balance.save()
+
+        # Balances, the missing insert and read-back, latest snapshots, recent ledger entries
+        with self.assertNumQueries(5):
+            LeaveBalance.objects.attach(employees)
+
+        self.assertEqual(employees[0].leave_balance.casual_leave_allocated, 0.0)
+        self.assertEqual(employees[1].leave_balance.casual_leave_allocated, 7.0)
+        self.assertEqual(LeaveBalance.objects.count(), 3)
+
+    def test_leave_configuration_queries_do_not_grow_with_employees(self):
+        self._add_employees(3)
+        small = self._page_queries()
+        self._add_employees(30)
+        self.assertEqual(self._page_queries(), small)
+
+
+class LeaveRequestOverlapTest(TestCase):
+    def setUp(self):
+        company = Company.objects.create(name="Test Company", primary_domain="test.com", email_domain="test.com")
+        user = User.objects.create_user(
+            username="emp@test.com", email="emp@test.com", password="password", company=company
+        )
+        self.employee = Employee.objects.create(user=user, company=company, designation="Developer", department="IT")
+
+    def _leave(self, start, end):
+        return LeaveRequest.objects.create(employee=self.employee, leave_type="CL", start_date=start, end_date=end)
+
+    def test_overlapping_includes_touching_ranges(self):
+        before = self._leave(date(2024, 1, 1), date(2024, 1, 9))
+        touching = self._leave(date(2024, 1, 5), date(2024, 1, 10))
+        inside = self._leave(date(2024, 1, 12), date(2024, 1, 12))
+        self._leave(date(2024, 1, 21), date(2024, 1, 25))
+
+        found = set(LeaveRequest.objects.overlapping(date(2024, 1, 10), date(2024, 1, 20)))
+        self.assertEqual(found, {touching, inside})
+
+        found = set(LeaveRequest.objects.overlapping(date(2024, 1, 9)))
+        self.assertEqual(found, {before, touching})
+
+    def test_only_available_approval_never_reverses_the_period(self):
+        LeaveBalance.objects.filter(employee=self.employee).update(casual_leave_allocated=0.5)
+        leave = self._leave(date(2024, 1, 8), date(2024, 1, 9))
+
+        # Less than one whole available day: nothing to approve
+        self.assertFalse(leave.approve_leave(self.employee.user, approval_type="ONLY_AVAILABLE"))
+        leave.refresh_from_db()
+        self.assertEqual((leave.status, leave.end_date), ("PENDING", date(2024, 1, 9)))
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self._leave(date(2024, 1, 9), date(2024, 1, 8))
+
+    @unittest.skipUnless(connection.vendor == "postgresql", "daterange overlap queries are PostgreSQL only")
+    def test_overlapping_uses_the_period_index_on_postgresql(self):
+        for day in range(1, 29):
+            self._leave(date(2024, 2, day), date(2024, 2, day))
+        leaves = LeaveRequest.objects.overlapping(date(2024, 2, 10), date(2024, 2, 11))
+
+        self.assertIn("daterange", str(leaves.query))
+        self.assertEqual(len(leaves), 2)
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            plan = leaves.explain()
+        self.assertIn("employees_leaverequest_period_gist", plan)
+
+
+class BulkEmployeeImportTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.company = Company.objects.create(name="Petabytz", primary_domain="pbt.com", email_domain="pbt.com")
+        self.location = Location.objects.create(
+            company=self.company, name="Hyderabad", country_code="IN", timezone="Asia/Kolkata"
+        )
+        self.admin = User.objects.create_user(
+            username="admin@pbt.com",
+            email="admin@pbt.com",
+            password="password",
+            company=self.company,
+            role=User.Role.COMPANY_ADMIN,
+            must_change_password=False,
+        )
+        Employee.objects.create(
+            user=self.admin, company=self.company, designation="HR", department="HR", location=self.location
+        )
+        # Account without an employee profile is reused
+        User.objects.create_user(username="reuse@pbt.com", email="reuse@pbt.com", company=self.company)
+        self.client.force_login(self.admin)
+
+    def _sheet(self, rows):
+        columns = ["First Name", "Last Name", "Email", "Designation", "Department", "Date of Joining", "Date of Birth"]
+        buffer = BytesIO()
+        pd.DataFrame(rows, columns=columns + ["Badge ID", "Location"]).to_excel(buffer, index=False)
+        return SimpleUploadedFile("employees.xlsx", buffer.getvalue())
+
+    def test_import_validates_rows_and_bulk_creates(self):
+        sheet = self._sheet(
+            [
+                ["Asha", "Rao", "asha@pbt.com", "developer", "engineering", "2025-01-06", "1995-04-02", None, "hyderabad"],
+                ["Reuse", "Me", "reuse@pbt.com", "Developer", "Engineering", "2025-01-06", "1990-01-01", None, None],
+                ["Dup", "Row", "asha@pbt.com", "Developer", "Engineering", "2025-01-06", "1990-01-01", None, None],
+                ["No", "Dob", "nodob@pbt.com", "Developer", "Engineering", "2025-01-06", None, None, None],
+                ["Old", "Hand", "admin@pbt.com", "Developer", "Engineering", "2025-01-06", "1990-01-01", None, None],
+                ["Given", "Badge", "given@pbt.com", "Analyst", "Finance", "2025-02-01", "1992-03-03", "PBTHYD002", None],
+            ]
+        )
+        response = self.client.post(reverse("employee_bulk_import"), {"import_file": sheet})
+        job = EmployeeImport.objects.get()
+        self.assertRedirects(response, reverse("employee_import_detail", args=[job.id]), fetch_redirect_response=False)
+        self.assertEqual(job.status, "PENDING")
+
+        run_import(job.id, send_emails=False)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.total_rows, job.processed_rows, job.created_count), ("COMPLETED", 6, 6, 3))
+        self.assertEqual(
+            [(error["row"], error["error"]) for error in job.row_errors],
+            [
+                (4, "Email appears more than once in the sheet"),
+                (5, "Date of Birth is mandatory"),
+                (6, "User with email admin@pbt.com already exists"),
+            ],
+        )
+
+        # Block badge IDs skip the one given in the sheet
+        badges = dict(Employee.objects.values_list("user__email", "badge_id"))
+        self.assertEqual(badges["admin@pbt.com"], "PBTHYD001")
+        self.assertEqual(badges["given@pbt.com"], "PBTHYD002")
+        self.assertEqual({badges["asha@pbt.com"], badges["reuse@pbt.com"]}, {"PBTHYD003", "PBTHYD004"})
+
+        asha = Employee.objects.get(user__email="asha@pbt.com")
+        self.assertEqual((asha.designation, asha.department, asha.location), ("Developer", "Engineering", self.location))
+        self.assertEqual(asha.date_of_joining, date(2025, 1, 6))
+        self.assertFalse(asha.user.has_usable_password())
+        self.assertEqual(LeaveBalance.objects.get(employee=asha).casual_leave_allocated, 0.0)
+        self.assertEqual(User.objects.get(email="reuse@pbt.com").first_name, "Reuse")
+        self.assertTrue(Department.objects.filter(company=self.company, name="Finance").exists())
+
+        # Activation emails are queued until sent
+        self.assertEqual(len(job.pending_activation_user_ids), 3)
+        send_activation_emails(job, connection=mail.get_connection())
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ["asha@pbt.com", "given@pbt.com", "reuse@pbt.com"])
+        self.assertEqual((job.emails_sent, job.pending_activation_user_ids), (3, []))
+
+        response = self.client.get(reverse("employee_import_errors", args=[job.id]))
+        self.assertContains(response, "Date of Birth is mandatory")
+
+    def test_stale_running_import_resumes_after_its_committed_chunks(self):
+        sheet = self._sheet(
+            [
+                ["Asha", "Rao", "asha@pbt.com", "Developer", "Engineering", "2025-01-06", "1995-04-02", None, None],
+                ["Given", "Badge", "given@pbt.com", "Analyst", "Finance", "2025-02-01", "1992-03-03", None, None],
+            ]
+        )
+        self.client.post(reverse("employee_bulk_import"), {"import_file": sheet})
+        job = EmployeeImport.objects.get()
+
+        class WorkerDied(BaseException):
+            pass
+
+        create_employees = employee_import.create_employees
+
+        def dies_after_first_chunk(company, rows, reserved_badges):
+            if Employee.objects.filter(user__email="asha@pbt.com").exists():
+                raise WorkerDied
+            return create_employees(company, rows, reserved_badges)
+
+        with mock.patch.object(employee_import.import_rows, "__defaults__", (1,)), mock.patch.object(
+            employee_import, "create_employees", dies_after_first_chunk
+        ), self.assertRaises(WorkerDied):
+            run_import(job.id, send_emails=False)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.created_count), ("RUNNING", 1))
+        self.assertIsNone(run_import(job.id, send_emails=False))
+
+        # An error a committed chunk recorded for a row that is not imported again
+        chunk_error = {"row": 2, "email": "asha@pbt.com", "error": "Badge ID clash"}
+        EmployeeImport.objects.filter(pk=job.pk).update(
+            heartbeat_at=timezone.now() - employee_import.STALE_IMPORT_AFTER - timedelta(minutes=1),
+            row_errors=[chunk_error],
+        )
+        with mock.patch.object(employee_import, "send_activation_emails"):
+            process_pending_imports()
+
+        job.refresh_from_db()
+        self.assertEqual(
+            (job.status, job.processed_rows, job.created_count, job.row_errors), ("COMPLETED", 2, 2, [chunk_error])
+        )
+        self.assertEqual(
+            set(User.objects.filter(id__in=job.pending_activation_user_ids).values_list("email", flat=True)),
+            {"asha@pbt.com", "given@pbt.com"},
+        )
+
+    def test_missing_columns_are_rejected_upfront(self):
+        buffer = BytesIO()
+        pd.DataFrame([["Asha", "asha@pbt.com"]], columns=["First Name", "Email"]).to_excel(buffer, index=False)
+        response = self.client.post(
+            reverse("employee_bulk_import"), {"import_file": SimpleUploadedFile("employees.xlsx", buffer.getvalue())}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(EmployeeImport.objects.exists())
+
+
+class BadgeSequenceTest(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="Petabytz", primary_domain="pbt.com", email_domain="pbt.com")
+        self.location = Location.objects.create(
+            company=self.company, name="Hyderabad", country_code="IN", timezone="Asia/Kolkata"
+        )
+
+    def _employee(self, username, badge_id=None):
+        user = User.objects.create_user(username=username, email=username, company=self.company)
+        return Employee.objects.create(
+            user=user,
+            company=self.company,
+            designation="Developer",
+            department="Engineering",
+            location=self.location,
+            badge_id=badge_id,
+        )
+
+    def test_counter_starts_after_existing_badges(self):
+        # Badges issued before the counter existed; 1000 sorts before 999 as text
+        Employee.objects.bulk_create(
+            [
+                Employee(
+                    user=User.objects.create_user(username=f"old{n}@pbt.com", email=f"old{n}@pbt.com"),
+                    company=self.company,
+                    badge_id=badge,
+                )
+                for n, badge in enumerate(["PBTHYD999", "PBTHYD1000"])
+            ]
+        )
+
+        self.assertEqual(self._employee("a@pbt.com").badge_id, "PBTHYD1001")
+        self.assertEqual(reserve_badge_ids("PBTHYD", 3), ["PBTHYD1002", "PBTHYD1003", "PBTHYD1004"])
+        self.assertEqual(self._employee("b@pbt.com").badge_id, "PBTHYD1005")
+        self.assertEqual(BadgeSequence.objects.get(prefix="PBTHYD").last_number, 1005)
+
+    def test_reservation_is_one_update(self):
+        reserve_badge_ids("PBTHYD", 1)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(reserve_badge_ids("PBTHYD", 500)[-1], "PBTHYD501")
+        self.assertEqual(len(queries), 1)
+
+    def test_hand_entered_badges_move_the_counter(self):
+        self.assertEqual(self._employee("a@pbt.com").badge_id, "PBTHYD001")
+        self._employee("b@pbt.com", badge_id="PBTHYD010")
+        self.assertEqual(self._employee("c@pbt.com").badge_id, "PBTHYD011")
+
+        # Edited after creation: only the fix_sequences sync sees it
+        Employee.objects.filter(badge_id="PBTHYD010").update(badge_id="PBTHYD020")
+        self.assertEqual(sync_badge_sequences(), ["PBTHYD"])
+        self.assertEqual(self._employee("d@pbt.com").badge_id, "PBTHYD021")
+
+
+class PayslipBatchTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.company = Company.objects.create(name="Petabytz", primary_domain="pbt.com", email_domain="pbt.com")
+        self.location = Location.objects.create(
+            company=self.company, name="Hyderabad", country_code="IN", timezone="Asia/Kolkata"
+        )
+        self.admin = User.objects.create_user(
+            username="admin@pbt.com",
+            email="admin@pbt.com",
+            password="password",
+            company=self.company,
+            role=User.Role.COMPANY_ADMIN,
+            must_change_password=False,
+        )
+        self.employees = [
+            Employee.objects.create(
+                user=User.objects.create_user(username=email, email=email, first_name=email[0], company=self.company),
+                company=self.company,
+                designation="Developer",
+                department="Engineering",
+                location=self.location,
+            )
+            for email in ["a@pbt.com", "b@pbt.com"]
+        ]
+        self.client.force_login(self.admin)
+
+    def _sheet(self, rows):
+        buffer = BytesIO()
+        pd.DataFrame(rows, columns=["Employee ID", "Name", "Monthly Gross", "Payable Days"]).to_excel(buffer, index=False)
+        return SimpleUploadedFile("payslips.xlsx", buffer.getvalue())
+
+    def test_batch_upserts_payslips_and_zips_pdfs(self):
+        first, second = self.employees
+        existing = Payslip.objects.create(employee=first, month=date(2025, 3, 1), basic=1)
+        sheet = self._sheet(
+            [
+                [first.badge_id, "A", "50,000", 31],
+                [second.badge_id, "B", 40000, 15.5],
+                ["PBTHYD999", "Nobody", 30000, 31],
+                [second.badge_id, "B", "n/a", 31],
+            ]
+        )
+        response = self.client.post(reverse("bulk_payroll_upload"), {"excel_file": sheet, "month": 3, "year": 2025})
+        batch = PayslipBatch.objects.get()
+        self.assertRedirects(response, reverse("payslip_batch_detail", args=[batch.id]), fetch_redirect_response=False)
+        self.assertEqual((batch.status, batch.total_rows, batch.processed_rows), ("PENDING", 4, 1))
+        cache.set_many({payslip_key(employee.id): (None, "No payslips found.") for employee in self.employees})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            batch = process_batch(batch.id, workers=1)
+        # The bulk writes clear the chatbot's cached payslip sections
+        self.assertEqual(cache.get_many([payslip_key(employee.id) for employee in self.employees]), {})
+
+        self.assertEqual((batch.status, batch.processed_rows, batch.generated_count, batch.failed_count), ("COMPLETED", 4, 2, 2))
+        self.assertEqual(
+            [(item.row, item.status, item.error) for item in batch.items.all()],
+            [
+                (2, "GENERATED", ""),
+                (3, "GENERATED", ""),
+                (4, "FAILED", "No employee with this ID"),
+                (5, "FAILED", "Monthly gross and payable days must be numbers"),
+            ],
+        )
+
+        # The existing payslip is updated in place; the breakdown matches the single-payslip calculator
+        payslips = Payslip.objects.filter(month=date(2025, 3, 1)).order_by("employee_id")
+        self.assertEqual([payslip.id for payslip in payslips][0], existing.id)
+        self.assertEqual(payslips.count(), 2)
+        breakdown = calculate_payslip_breakdown(40000 * 12, 15.5, 31, second.pf_enabled, location=self.location)
+        self.assertEqual(float(payslips[1].net_salary), breakdown["net_salary"])
+        self.assertTrue(all(payslip.pdf_file for payslip in payslips))
+
+        response = self.client.get(reverse("payslip_batch_download", args=[batch.id]))
+        archive = zipfile.ZipFile(BytesIO(b"".join(response.streaming_content)))
+        self.assertEqual(
+            sorted(archive.namelist()),
+            sorted(f"payslip_{employee.badge_id}_Mar_2025.pdf" for employee in self.employees),
+        )
+        self.assertTrue(archive.read(archive.namelist()[0]).startswith(b"%PDF"))
+
+    def test_stale_running_batch_renders_only_the_rest(self):
+        sheet = self._sheet([[employee.badge_id, employee.user.first_name, 40000, 31] for employee in self.employees])
+        self.client.post(reverse("bulk_payroll_upload"), {"excel_file": sheet, "month": 3, "year": 2025})
+        batch = PayslipBatch.objects.get()
+
+        class WorkerDied(BaseException):
+            pass
+
+        render_pdfs = payslip_batch.render_pdfs
+
+        def dies_after_first_pdf(htmls, workers):
+            for index, pdf in render_pdfs(htmls, workers):
+                yield index, pdf
+                raise WorkerDied
+
+        with mock.patch.object(payslip_batch, "render_pdfs", dies_after_first_pdf), self.assertRaises(WorkerDied):
+            process_batch(batch.id, workers=1)
+        self.assertIsNone(process_batch(batch.id, workers=1))
+
+        PayslipBatch.objects.filter(pk=batch.pk).update(
+            heartbeat_at=timezone.now() - payslip_batch.STALE_BATCH_AFTER - timedelta(minutes=1)
+        )
+        with mock.patch.object(payslip_batch, "render_pdfs", wraps=render_pdfs) as rendered:
+            (batch,) = payslip_batch.process_pending_batches(workers=1)
+
+        self.assertEqual(len(rendered.call_args.args[0]), 1)
+        self.assertEqual((batch.status, batch.processed_rows, batch.generated_count), ("COMPLETED", 2, 2))
+        self.assertEqual(list(batch.items.values_list("status", flat=True)), ["GENERATED", "GENERATED"])
+
+    def test_missing_column_is_rejected(self):
+        buffer = BytesIO()
+        pd.DataFrame([["X", 1]], columns=["Employee ID", "Monthly Gross"]).to_excel(buffer, index=False)
+        sheet = SimpleUploadedFile("payslips.xlsx", buffer.getvalue())
+
+        self.client.post(reverse("bulk_payroll_upload"), {"excel_file": sheet, "month": 3, "year": 2025})
+        self.assertFalse(PayslipBatch.objects.exists())
+
+
+class VectorizedPayrollTest(TestCase):
+    """Property: calculate_payslip_breakdowns equals calculate_payslip_breakdown element by element"""
+
+    def _random_cases(self, rng, count):
+        for _ in range(count):
+            annual_ctc = rng.choice(
+                [
+                    round(rng.uniform(0, 6_000_000), 2),
+                    rng.randrange(0, 6_000_000, 1000),
+                    round(rng.uniform(380_000, 420_000), 2),  # Around the PF gross cut-off
+                    rng.uniform(0, 100_000),
+                ]
+            )
+            worked_days = rng.choice([rng.randrange(0, 32), rng.randrange(0, 63) / 2, rng.uniform(0, 31)])
+            total_days = rng.choice([28, 29, 30, 31, 0])
+            yield annual_ctc, worked_days, total_days, rng.random() < 0.5, rng.choice(["IN", "BD", "US", "AE", "UK"])
+
+    def test_matches_scalar_calculator(self):
+        rng = random.Random(20251)
+        cases = list(self._random_cases(rng, 3000))
+        # Edge cases every run covers: an empty month and countries without their own rules
+        cases += [
+            (1_200_000, 0, 0, True, "IN"),
+            (1_200_000, 10, 0, False, "UK"),
+            (400_000, 15.5, 30, True, "UK"),
+            (600_000, 31, 31, True, "AE"),
+        ]
+        self.assertTrue({case[4] for case in cases} >= {"IN", "BD", "US", "AE", "UK"})
+        self.assertIn(0, {case[2] for case in cases})
+        breakdowns = calculate_payslip_breakdowns(*zip(*cases, strict=True))
+
+        for index, (annual_ctc, worked_days, total_days, pf_enabled, country) in enumerate(cases):
+            expected = calculate_payslip_breakdown(annual_ctc, worked_days, total_days, pf_enabled, location=country)
+            actual = {key: float(breakdowns[key][index]) for key in AMOUNT_KEYS}
+            self.assertEqual(actual, {key: expected[key] for key in AMOUNT_KEYS}, cases[index])
+
+    def test_round2_matches_round(self):
+        rng = random.Random(7)
+        # Exact ties (0.125), representation ties (2.675, 1.005) and half-cent products
+        values = [0.125, 0.375, 2.675, 1.005, -2.675, 617.285, 1e9 + 0.005]
+        values += [n / 1000 for n in range(-20000, 20000)]
+        values += [rng.uniform(-1e7, 1e7) for _ in range(20000)]
+        self.assertEqual(list(round2(values)), [round(value, 2) for value in values])
@@ -9,6 +9,9 @@ urlpatterns = [
     path(
         "import/", views.BulkEmployeeImportView.as_view(), name="employee_bulk_import"
     ),
+    path("import/<int:pk>/", views.employee_import_detail, name="employee_import_detail"),
+    path("import/<int:pk>/progress/", views.employee_import_progress, name="employee_import_progress"),
+    path("import/<int:pk>/errors.csv", views.employee_import_errors, name="employee_import_errors"),
     path(
         "import/download-sample/",
         views.download_sample_import_file,
@@ -11,10 +11,12 @@ from django.utils.html import strip_tags
 logger = logging.getLogger(__name__)
 
 
-def send_activation_email(user, request=None):
+def send_activation_email(user, request=None, connection=None, site_url=None):
     """
     Sends an account activation email to the user.
     Enhanced with detailed logging and error handling.
+    Without a request, links use ``site_url`` (or settings.SITE_URL); pass an
+    open ``connection`` to send many emails over one SMTP session.
     """
     try:
         # Log the attempt
@@ -44,7 +46,7 @@ def send_activation_email(user, request=None):
                 activation_link = request.build_absolute_uri(reset_path)
             else:
                 # Fallback for when request is not available
-                domain = getattr(settings, "SITE_URL", "http://127.0.0.1:8000")
+                domain = site_url or getattr(settings, "SITE_URL", "http://127.0.0.1:8000")
                 activation_link = f"{domain}{reset_path}"
 
             logger.info(f"Activation link generated: {activation_link}")
@@ -84,11 +86,12 @@ def send_activation_email(user, request=None):
             # MANDATORY: Use hrms@petabytz.com for all activation emails
             from_email = "Petabytz HR <hrms@petabytz.com>"
 
-            logger.info(f"Getting HR email connection for {user.email}")
-            # Get standardized connection
-            from core.email_utils import get_hr_email_connection
+            if connection is None:
+                logger.info(f"Getting HR email connection for {user.email}")
+                # Get standardized connection
+                from core.email_utils import get_hr_email_connection
 
-            connection = get_hr_email_connection()
+                connection = get_hr_email_connection()
 
             logger.info(f"Creating email object for {user.email}")
             # Create email object
@@ -1,3 +1,4 @@
+import csv
 import json
 from datetime import timedelta
 
@@ -8,8 +9,8 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.db import transaction
 from django.db.models import Q
-from django.http import JsonResponse
-from django.shortcuts import render
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404, render
 from django.urls import reverse, reverse_lazy
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
@@ -1288,6 +1289,7 @@ class LeaveApplyView(LoginRequiredMixin, CreateView):
             employee = self.request.user.employee_profile
             if hasattr(employee, "leave_balance"):
                 balance = employee.leave_balance
+                balance.refresh_from_ledger()
                 context["cl_balance"] = balance.casual_leave_balance
                 context["sl_balance"] = balance.sick_leave_balance
                 context["leave_balance"] = balance
@@ -1409,6 +1411,8 @@ def check_leave_balance(request):
                 )
 
             employee = request.user.employee_profile
+            # Validation and the response read the same ledger totals
+            LeaveBalance.objects.attach([employee])
 
             # Create temporary leave request for validation
             from datetime import datetime
@@ -1468,36 +1472,8 @@ def approve_leave(request, pk):
             approval_type = "FULL"
 
         # Use the new approval method from the model
+        # approve_leave also writes the leave days to attendance
         if leave_request.approve_leave(user, approval_type=approval_type):
-            # Update Attendance Records
-            from datetime import timedelta
-
-            current_date = leave_request.start_date
-            while current_date <= leave_request.end_date:
-                # Get or Create Attendance
-                att_record, created = Attendance.objects.get_or_create(
-                    employee=leave_request.employee, date=current_date
-                )
-
-                # Update status
-                if leave_request.leave_type == "OD":
-                    att_record.status = "ON_DUTY"
-                elif approval_type == "WITH_LOP" or leave_request.leave_type == "UL":
-                    # Mark as LOP for days beyond available balance
-                    validation = leave_request.validate_leave_application()
-                    days_from_start = (current_date - leave_request.start_date).days
-                    available_days = validation.get("available_balance", 0)
-
-                    if days_from_start < available_days:
-                        att_record.status = "LEAVE"
-                    else:
-                        att_record.status = "LEAVE"  # Still mark as leave, LOP tracked in balance
-                else:
-                    att_record.status = "LEAVE"
-
-                att_record.save()
-                current_date += timedelta(days=1)
-
             # Send Approval Email with approval type info asynchronously
             import threading
 
@@ -1776,13 +1752,12 @@ def employee_detail(request, pk):
 
         # Fetch Attendance for the period
         attendance_records = {
-            att.date: att for att in Attendance.objects.filter(employee=employee, date__range=[start_date, end_date])
+            att.date: att
+            for att in Attendance.objects.filter(employee=employee, date__range=[start_date, end_date]).with_working_hours()
         }
 
         # Fetch Approved Leaves
-        leaves = LeaveRequest.objects.filter(
-            employee=employee, status="APPROVED", start_date__lte=end_date, end_date__gte=start_date
-        )
+        leaves = LeaveRequest.objects.filter(employee=employee, status="APPROVED").overlapping(start_date, end_date)
         leave_dates = {}
         for l in leaves:
             curr = max(l.start_date, start_date)
@@ -2922,175 +2897,83 @@ class BulkEmployeeImportView(LoginRequiredMixin, CompanyAdminRequiredMixin, Form
     success_url = reverse_lazy("employee_list")
 
     def form_valid(self, form):
-        import pandas as pd
         from django.contrib import messages
 
-        from .utils import send_activation_email
+        from .employee_import import queue_import, read_sheet
 
         file = form.cleaned_data["import_file"]
         try:
-            # Read Excel
-            try:
-                df = pd.read_excel(file)
-            except Exception as e:
-                messages.error(self.request, f"Error reading Excel file: {str(e)}")
-                return self.form_invalid(form)
-
-            # Normalize columns
-            df.columns = [str(c).strip().lower().replace(" ", "_") for c in df.columns]
-
-            # DOJ and DOB are now mandatory
-            required_columns = [
-                "first_name",
-                "last_name",
-                "email",
-                "designation",
-                "department",
-                "date_of_joining",
-                "date_of_birth",
-            ]
-            missing_columns = [col for col in required_columns if col not in df.columns]
-
-            if missing_columns:
-                messages.error(
-                    self.request,
-                    f"Missing required columns: {', '.join(missing_columns)}",
-                )
-                return self.form_invalid(form)
+            # Check the columns now; rows are validated and imported in the background
+            read_sheet(file)
+        except ValueError as e:
+            messages.error(self.request, str(e))
+            return self.form_invalid(form)
+        except Exception as e:
+            messages.error(self.request, f"Error reading Excel file: {str(e)}")
+            return self.form_invalid(form)
 
-            success_count = 0
-            errors = []
+        file.seek(0)
+        job = queue_import(
+            file,
+            self.request.user.company,
+            uploaded_by=self.request.user,
+            site_url=self.request.build_absolute_uri("/").rstrip("/"),
+        )
+        messages.success(self.request, "Import started. Activation emails are sent once the employees are created.")
+        return redirect("employee_import_detail", pk=job.pk)
 
-            for index, row in df.iterrows():
-                try:
-                    with transaction.atomic():
-                        # 1. Basic Data
-                        email = str(row.get("email", "")).strip()
-                        if not email:
-                            raise ValueError("Email is required")
-
-                        # Check if user already exists
-                        user = User.objects.filter(email=email).first()
-                        if user:
-                            # Check if the user already has an employee profile (is a real employee)
-                            if hasattr(user, "employee_profile"):
-                                raise ValueError(f"User with email {email} already exists")
-                            else:
-                                # User exists but no employee profile (Zombie record) -> Reuse it
-                                user.first_name = str(row.get("first_name", "")).strip()
-                                user.last_name = str(row.get("last_name", "")).strip()
-                                user.save()
-                        else:
-                            # 2. Create New User
-                            first_name = str(row.get("first_name", "")).strip()
-                            last_name = str(row.get("last_name", "")).strip()
-                            user = User.objects.create_user(
-                                username=email,
-                                email=email,
-                                password=None,
-                                first_name=first_name,
-                                last_name=last_name,
-                                role="EMPLOYEE",
-                                company=self.request.user.company,
-                            )
-                            user.set_unusable_password()
-                            user.save()
-
-                        # 3. Parse Dates
-                        doj = row.get("date_of_joining")
-                        if pd.isna(doj):
-                            raise ValueError("Date of Joining is mandatory")
-                        elif hasattr(doj, "date"):
-                            doj = doj.date()
-                        else:
-                            # Try parsing string
-                            doj = pd.to_datetime(doj).date()
-
-                        dob = row.get("date_of_birth")
-                        if pd.isna(dob):
-                            raise ValueError("Date of Birth is mandatory")
-                        elif hasattr(dob, "date"):
-                            dob = dob.date()
-                        else:
-                            # Try parsing string
-                            dob = pd.to_datetime(dob).date()
-
-                        # 4. Parse Location
-                        from companies.models import Location
-
-                        location_name = str(row.get("location", "")).strip()
-                        location = None
-                        if location_name:
-                            location = Location.objects.filter(
-                                company=self.request.user.company,
-                                name__iexact=location_name,
-                            ).first()
-
-                        # Fallback location
-                        if not location:
-                            location = Location.objects.filter(company=self.request.user.company).first()
-
-                        # 5. Create Employee
-                        badge_id = str(row.get("badge_id", ""))
-                        if badge_id == "nan":
-                            badge_id = None
-                        elif badge_id.endswith(".0"):
-                            badge_id = badge_id[:-2]  # 101.0 -> 101
-
-                        # Sync Department & Designation with Role Configuration
-                        from companies.models import Department, Designation
-
-                        dept_name = str(row.get("department", "General")).strip().title()
-                        desig_name = str(row.get("designation", "Employee")).strip().title()
-
-                        # Ensure they exist in Role Config (prevents duplicates)
-                        Department.objects.get_or_create(company=self.request.user.company, name=dept_name)
-                        Designation.objects.get_or_create(company=self.request.user.company, name=desig_name)
-
-                        employee = Employee.objects.create(
-                            user=user,
-                            company=self.request.user.company,
-                            designation=desig_name,
-                            department=dept_name,
-                            location=location,
-                            badge_id=badge_id,
-                            mobile_number=str(row.get("mobile", "")) if not pd.isna(row.get("mobile")) else None,
-                            gender=str(row.get("gender", "M"))[0].upper(),
-                            marital_status=str(row.get("marital_status", "S"))[0].upper(),
-                            date_of_joining=doj,
-                            dob=dob,
-                            annual_ctc=row.get("annual_ctc") if not pd.isna(row.get("annual_ctc")) else 0,
-                        )
 
-                        # 6. Create Leave Balance (handled by signal)
-                        # LeaveBalance.objects.create(...) - REMOVED to avoid duplicate key error
+def _get_employee_import(request, pk):
+    from .models import EmployeeImport
 
-                        # 7. Send Activation Email
-                        send_activation_email(user, self.request)
+    return get_object_or_404(EmployeeImport, pk=pk, company=request.user.company)
 
-                        success_count += 1
 
-                except Exception as e:
-                    errors.append(f"Row {index + 2} ({row.get('email', 'Unknown')}): {str(e)}")
+@login_required
+def employee_import_detail(request, pk):
+    """Progress and row errors of a bulk import"""
+    if request.user.role != User.Role.COMPANY_ADMIN:
+        messages.error(request, "Permission denied.")
+        return redirect("employee_list")
+
+    job = _get_employee_import(request, pk)
+    return render(request, "employees/bulk_import_status.html", {"job": job})
 
-            if success_count > 0:
-                messages.success(
-                    self.request,
-                    f"Successfully created {success_count} employees. Activation emails sent.",
-                )
 
-            if errors:
-                # Show first 5 errors
-                error_msg = "Errors occurred:<br>" + "<br>".join(errors[:5])
-                if len(errors) > 5:
-                    error_msg += f"<br>...and {len(errors) - 5} more."
-                messages.warning(self.request, error_msg)
+@login_required
+def employee_import_progress(request, pk):
+    """JSON progress of a bulk import, polled by the status page"""
+    if request.user.role != User.Role.COMPANY_ADMIN:
+        return JsonResponse({"error": "Permission denied"}, status=403)
 
-            return super().form_valid(form)
+    job = _get_employee_import(request, pk)
+    return JsonResponse(
+        {
+            "status": job.status,
+            "percent": job.percent,
+            "processed": job.processed_rows,
+            "total": job.total_rows,
+            "created": job.created_count,
+            "errors": len(job.row_errors),
+        }
+    )
 
-        except Exception as e:
-            messages.error(self.request, f"System Error: {str(e)}")
-            return self.form_invalid(form)
+
+@login_required
+def employee_import_errors(request, pk):
+    """Rows that were not imported, as CSV"""
+    if request.user.role != User.Role.COMPANY_ADMIN:
+        messages.error(request, "Permission denied.")
+        return redirect("employee_list")
+
+    job = _get_employee_import(request, pk)
+    response = HttpResponse(content_type="text/csv")
+    response["Content-Disposition"] = f"attachment; filename=employee_import_{job.pk}_errors.csv"
+    writer = csv.writer(response)
+    writer.writerow(["Row", "Email", "Error"])
+    for error in job.row_errors:
+        writer.writerow([error["row"], error["email"], error["error"]])
+    return response
 
 
 @login_required
@@ -3415,21 +3298,8 @@ def leave_configuration(request):
     else:
         employees = Employee.objects.filter(company=company)
 
-    # Prefetch leave balances to avoid N+1 queries and ensure fresh data
-    employees = employees.select_related("user", "leave_balance").order_by("user__first_name")
-
-    # Ensure all employees have leave balance records and refresh from DB
-    from django.core.exceptions import ObjectDoesNotExist
-
-    for employee in employees:
-        try:
-            # Force refresh from database to get latest data
-            employee.refresh_from_db()
-            leave_balance = employee.leave_balance
-            leave_balance.refresh_from_db()
-        except ObjectDoesNotExist:
-            # Create with 0 leaves for new employees (probation period)
-            LeaveBalance.objects.create(employee=employee, casual_leave_allocated=0.0, sick_leave_allocated=0.0)
+    # Fresh leave balances for every employee in one query; missing ones are created
+    employees = LeaveBalance.objects.attach(employees.select_related("user").order_by("user__first_name"))
 
     # Context for Accrual Modal (Safe from template syntax errors)
     import calendar
@@ -3478,9 +3348,10 @@ def update_leave_balance(request, pk):
         if user.role == User.Role.MANAGER and employee.manager != user:
             return JsonResponse({"status": "error", "message": "Permission Denied"}, status=403)
 
-        if user.role == User.Role.COMPANY_ADMIN and employee.company != user.company:
+        if user.role == User.Role.COMPANY_ADMIN and employee.company_id != user.company_id:
             return JsonResponse({"status": "error", "message": "Permission Denied"}, status=403)
 
+        LeaveBalance.objects.attach([employee])
         balance = employee.leave_balance
 
         # Get data
@@ -3528,35 +3399,26 @@ def run_monthly_accrual(request):
         messages.error(request, "Permission Denied")
         return redirect("leave_configuration")
 
-    from django.core.management import call_command
+    from .leave_accrual import enqueue_monthly_accrual
 
     try:
-        month = request.POST.get("month")
-        year = request.POST.get("year")
-
-        period_msg = ""
-        if month and year:
-            try:
-                month_name = calendar.month_name[int(month)]
-                period_msg = f"for {month_name} {year}"
-            except (ValueError, IndexError) as e:
-                logger.debug(
-                    "Failed to parse month/year for accrual message",
-                    month=month,
-                    year=year,
-                    error=str(e),
-                )
-
-        # Run the command
-        call_command("accrue_monthly_leaves")
+        today = timezone.localdate()
+        month = int(request.POST.get("month") or today.month)
+        year = int(request.POST.get("year") or today.year)
+        period_msg = f"for {calendar.month_name[month]} {year}"
 
-        success_msg = (
-            f"Monthly accrual processed {period_msg}: +1 Sick and +1 Casual leave added to all employees."
-            if period_msg
-            else "Monthly accrual processed: +1 Sick and +1 Casual leave added to all employees."
-        )
+        # Queue the run; the balances are updated on a background thread
+        run, queued = enqueue_monthly_accrual(user.company, year, month, requested_by=user)
 
-        messages.success(request, success_msg)
+        if queued:
+            messages.success(
+                request,
+                f"Monthly accrual queued {period_msg}. Leave balances will update shortly.",
+            )
+        elif run.status == "RUNNING":
+            messages.info(request, f"Monthly accrual {period_msg} is already running.")
+        else:
+            messages.info(request, f"Monthly accrual {period_msg} was already processed.")
 
     except Exception as e:
         logger.exception("Error running monthly leave accrual", error=str(e))
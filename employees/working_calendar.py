@@ -0,0 +1,155 @@
+"""
+Working-day calendar.
+
+Answers "is this date a working day for this employee?" for many employees
+and dates at once:
+
+- holidays are cached as one packed bitmap per (location, year)
+- each employee's week-offs become a 7-bit weekday mask
+- range queries combine both with NumPy instead of walking day by day
+
+The week_off_* flags on Employee are the source of truth for weekly offs;
+companies.views.week_off_config copies LocationWeekOff onto them, so masks
+are read straight from the employee rows. Holiday bitmaps are invalidated by
+the Holiday and Location signals in employees.models.
+"""
+
+import calendar
+import time
+from datetime import date
+
+import numpy as np
+from django.core.cache import cache
+
+from companies.models import Holiday
+
+WEEK_OFF_FIELDS = [
+    "week_off_monday",
+    "week_off_tuesday",
+    "week_off_wednesday",
+    "week_off_thursday",
+    "week_off_friday",
+    "week_off_saturday",
+    "week_off_sunday",
+]
+
+CACHE_TIMEOUT = 60 * 60 * 24 * 7  # Holiday lists rarely change; signals invalidate sooner
+
+
+def weekday_mask(employee):
+    """Bit i is set when weekday i (0=Monday) is a working day for the employee"""
+    mask = 0
+    for weekday, field in enumerate(WEEK_OFF_FIELDS):
+        if not getattr(employee, field):
+            mask |= 1 << weekday
+    return mask
+
+
+def _version_key(location_id):
+    return f"working_calendar_version_{location_id}"
+
+
+def _location_version(location_id):
+    version = cache.get(_version_key(location_id))
+    if version is None:
+        version = time.time_ns()
+        cache.set(_version_key(location_id), version, None)
+    return version
+
+
+def invalidate_location_calendar(location_id):
+    """Drop every cached holiday bitmap of a location"""
+    if location_id:
+        cache.set(_version_key(location_id), time.time_ns(), None)
+
+
+def holiday_bitmap(location_id, year):
+    """
+    Return a bool array with one entry per day of the year, True on active
+    holidays of the location. Stored in the cache as packed bits.
+    """
+    num_days = 366 if calendar.isleap(year) else 365
+    cache_key = f"working_calendar_holidays_{location_id}_{year}_{_location_version(location_id)}"
+    packed = cache.get(cache_key)
+
+    if packed is None:
+        bits = np.zeros(num_days, dtype=bool)
+        year_start = date(year, 1, 1)
+        holiday_dates = Holiday.objects.filter(
+            location_id=location_id,
+            date__gte=year_start,
+            date__lte=date(year, 12, 31),
+            is_active=True,
+        ).values_list("date", flat=True)
+        for holiday_date in holiday_dates:
+            bits[(holiday_date - year_start).days] = True
+        packed = np.packbits(bits).tobytes()
+        cache.set(cache_key, packed, CACHE_TIMEOUT)
+
+    return np.unpackbits(np.frombuffer(packed, dtype=np.uint8), count=num_days).astype(bool)
+
+
+def holidays_between(location_id, start_date, end_date):
+    """Bool array over start_date..end_date (inclusive), True on holidays"""
+    parts = []
+    for year in range(start_date.year, end_date.year + 1):
+        year_start = date(year, 1, 1)
+        first = (max(start_date, year_start) - year_start).days
+        last = (min(end_date, date(year, 12, 31)) - year_start).days
+        parts.append(holiday_bitmap(location_id, year)[first : last + 1])
+    return np.concatenate(parts) if parts else np.zeros(0, dtype=bool)
+
+
+def date_range(start_date, end_date):
+    """datetime64[D] array of every date from start_date to end_date inclusive"""
+    return np.arange(np.datetime64(start_date), np.datetime64(end_date) + 1, dtype="datetime64[D]")
+
+
+def holiday_and_week_off_matrices(employees, start_date, end_date):
+    """
+    Return (dates, holidays, week_offs) for the range.
+
+    ``holidays`` and ``week_offs`` are bool matrices of shape
+    (len(employees), len(dates)); row i belongs to employees[i].
+    """
+    employees = list(employees)
+    dates = date_range(start_date, end_date)
+    shape = (len(employees), len(dates))
+    if not len(dates) or not employees:
+        return dates, np.zeros(shape, dtype=bool), np.zeros(shape, dtype=bool)
+
+    # 1970-01-01 was a Thursday (weekday 3)
+    weekdays = (dates.astype("int64") + 3) % 7
+    masks = np.array([weekday_mask(emp) for emp in employees], dtype=np.uint8)
+    week_offs = ((masks[:, None] >> weekdays[None, :]) & 1) == 0
+
+    holidays = np.zeros(shape, dtype=bool)
+    location_ids = sorted({emp.location_id for emp in employees if emp.location_id})
+    if location_ids:
+        location_holidays = np.vstack([holidays_between(loc_id, start_date, end_date) for loc_id in location_ids])
+        location_index = {loc_id: index for index, loc_id in enumerate(location_ids)}
+        rows = np.array([location_index.get(emp.location_id, -1) for emp in employees])
+        has_location = rows >= 0
+        holidays[has_location] = location_holidays[rows[has_location]]
+
+    return dates, holidays, week_offs
+
+
+def working_day_matrix(employees, start_date, end_date):
+    """Return (dates, working) where working[i, j] is True if dates[j] is a working day for employees[i]"""
+    dates, holidays, week_offs = holiday_and_week_off_matrices(employees, start_date, end_date)
+    return dates, ~(holidays | week_offs)
+
+
+def working_days_count(employees, start_date, end_date):
+    """Map employee id -> number of working days in the range"""
+    employees = list(employees)
+    _, working = working_day_matrix(employees, start_date, end_date)
+    counts = working.sum(axis=1)
+    return {emp.id: int(count) for emp, count in zip(employees, counts, strict=True)}
+
+
+def is_working_day(employee, dt):
+    """Single-date convenience wrapper"""
+    _, working = working_day_matrix([employee], dt, dt)
+    return bool(working[0, 0])
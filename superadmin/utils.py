@@ -50,9 +50,7 @@ def get_dashboard_metrics(company_id=None):
     present_today = attendance_qs.count()
 
     # On Leave Today (filtered by company if selected)
-    leave_qs = LeaveRequest.objects.filter(
-        start_date__lte=today, end_date__gte=today, status="APPROVED"
-    )
+    leave_qs = LeaveRequest.objects.filter(status="APPROVED").overlapping(today)
     if company_id:
         leave_qs = leave_qs.filter(employee__company_id=company_id)
     on_leave_today = leave_qs.count()
@@ -73,6 +71,7 @@ def get_attendance_today_data(company_id=None):
 
     attendance_qs = (
         Attendance.objects.filter(date=today, status="PRESENT")
+        .with_working_hours()
         .select_related(
             "employee__user", "employee__company", "employee__assigned_shift"
         )
@@ -92,9 +91,8 @@ def get_leaves_today_data(company_id=None):
     today = timezone.localtime().date()
 
     leave_qs = (
-        LeaveRequest.objects.filter(
-            start_date__lte=today, end_date__gte=today, status="APPROVED"
-        )
+        LeaveRequest.objects.filter(status="APPROVED")
+        .overlapping(today)
         .select_related("employee__user", "employee__company")
         .order_by("-start_date")
     )
@@ -450,7 +448,7 @@ def get_employee_attendance_stats(employee, months=3):
     # Fetch data
     attendance_records = {att.date: att for att in Attendance.objects.filter(employee=employee, date__range=[start_date, end_date])}
     
-    leaves = LeaveRequest.objects.filter(employee=employee, status='APPROVED', start_date__lte=end_date, end_date__gte=start_date)
+    leaves = LeaveRequest.objects.filter(employee=employee, status='APPROVED').overlapping(start_date, end_date)
     leave_dates = set()
     for l in leaves:
         curr = max(l.start_date, start_date)
@@ -527,10 +525,13 @@ def get_employee_recent_attendance(employee, days=30):
     start_date = end_date - timedelta(days=days)
 
     # Fetch existing records
-    attendance_records = {att.date: att for att in Attendance.objects.filter(employee=employee, date__range=[start_date, end_date])}
+    attendance_records = {
+        att.date: att
+        for att in Attendance.objects.filter(employee=employee, date__range=[start_date, end_date]).with_working_hours()
+    }
     
     # Fetch leaves
-    leaves = LeaveRequest.objects.filter(employee=employee, status='APPROVED', start_date__lte=end_date, end_date__gte=start_date)
+    leaves = LeaveRequest.objects.filter(employee=employee, status='APPROVED').overlapping(start_date, end_date)
     leave_dates = {}
     for l in leaves:
         curr = max(l.start_date, start_date)
@@ -624,7 +625,7 @@ def get_employee_working_hours_compliance(employee, months=1):
 
     attendance_records = Attendance.objects.filter(
         employee=employee, date__gte=start_date, status="PRESENT"
-    )
+    ).with_working_hours()
 
     total_hours = 0
     expected_hours = 0
@@ -332,8 +332,10 @@ def export_data_view(request, report_type):
         )
 
         today = timezone.localtime().date()
-        attendance = Attendance.objects.filter(date=today).select_related(
-            "employee__user", "employee__company"
+        attendance = (
+            Attendance.objects.filter(date=today)
+            .with_working_hours()
+            .select_related("employee__user", "employee__company")
         )
 
         company_id = request.GET.get("company_id")